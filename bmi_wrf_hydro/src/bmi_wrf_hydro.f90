@@ -22,6 +22,11 @@ module wrfhydro_bmi_state_mod
   ! Saved ntime from first initialization (intent(out) on initialize resets
   ! the bmi_wrf_hydro type, so we save ntime here for re-initialization).
   integer, save :: wrfhydro_saved_ntime = 0
+  ! Communicator supplied by the caller (set_comm) for WRF-Hydro to run on
+  ! instead of MPI_COMM_WORLD. It must be set before the first initialize,
+  ! so it lives here rather than in the intent(out) type.
+  integer, save :: wrfhydro_caller_comm = 0
+  logical, save :: wrfhydro_caller_comm_set = .false.
 end module wrfhydro_bmi_state_mod
 
 
@@ -34,6 +39,7 @@ end module wrfhydro_bmi_state_mod
 !   This module implements ALL 41 BMI functions (55 procedure bindings
 !   including type-specific variants for get/set) so that WRF-Hydro can be
 !   controlled externally by coupling frameworks like PyMT or NextGen.
+!   A few WRF-Hydro-specific extensions (Section 8) sit alongside them.
 !
 ! WHAT IS BMI?
 !   BMI = Basic Model Interface. It is a set of 41+ standardized functions
@@ -64,7 +70,7 @@ end module wrfhydro_bmi_state_mod
 !
 !   The CALLER (PyMT/NextGen) controls the time loop, not the model.
 !
-! VARIABLES EXPOSED (8 output + 4 input):
+! VARIABLES EXPOSED (9 output + 4 input):
 !   Output (what the model produces):
 !     1. channel_water__volume_flow_rate        -> streamflow (m3/s)
 !     2. land_surface_water__depth              -> surface water head (m)
@@ -74,6 +80,7 @@ end module wrfhydro_bmi_state_mod
 !     6. land_surface_water__runoff_volume_flux  -> surface runoff (m)
 !     7. soil_water__domain_time_integral_of_baseflow_volume_flux -> baseflow (mm)
 !     8. land_surface_air__temperature           -> 2m temperature (K)
+!     9. channel_link__id                        -> feature ID of each link
 !
 !   Input (what the caller can push in):
 !     1. atmosphere_water__precipitation_leq-volume_flux -> precip (mm/s)
@@ -133,8 +140,10 @@ module bmiwrfhydrof
 
   use bmif_2_0
   use, intrinsic :: iso_c_binding, only: c_ptr, c_loc, c_f_pointer
+  use, intrinsic :: iso_fortran_env, only: int64
   use wrfhydro_bmi_state_mod, only: wrfhydro_bmi_state, &
-       wrfhydro_engine_initialized, wrfhydro_saved_ntime
+       wrfhydro_engine_initialized, wrfhydro_saved_ntime, &
+       wrfhydro_caller_comm, wrfhydro_caller_comm_set
 
   implicit none
 
@@ -156,6 +165,25 @@ module bmiwrfhydrof
   ! variables — they must go through BMI functions (encapsulation).
   ! ==========================================================================
 
+  ! One non-blocking send or receive posted on the intercommunicator.
+  integer, parameter :: MAX_PENDING = 64
+  type :: pending_exchange
+     character (len=BMI_MAX_VAR_NAME) :: name = ""
+     logical :: receive = .false.
+     integer :: request = 0
+     double precision, allocatable :: buffer(:)
+  end type pending_exchange
+
+  ! How one grid's owned tiles are gathered across ranks: counts and
+  ! displacements for MPI_(All)Gatherv, every rank's tile, and the staging
+  ! buffer the blocks arrive in (rank after rank) before they are placed.
+  type :: gather_plan
+     integer, allocatable :: counts(:)        ! (0:nprocs-1)
+     integer, allocatable :: displs(:)        ! (0:nprocs-1)
+     integer, allocatable :: tiles(:,:)       ! (4, 0:nprocs-1)
+     double precision, allocatable :: staging(:)
+  end type gather_plan
+
   type, extends (bmi) :: bmi_wrf_hydro
      private
 
@@ -190,6 +218,73 @@ module bmiwrfhydrof
      double precision, allocatable :: sea_water_elevation(:,:)  ! (IX,JX)
      double precision, allocatable :: sea_water_x_velocity(:,:) ! (IX,JX)
 
+     ! --- Validity mask for the LSM grid (computed once in initialize) ---
+     ! Noah-MP skips open-water cells (XLAND >= 1.5), so land-only fields
+     ! there hold whatever was last written -- for T2MVXY that is
+     ! undefined_real (~9.97E+36). lsm_mask(k) is 1 where flat LSM cell k
+     ! is computed and 0 where it is not. The sentinel is also on every
+     ! cell before the first update, so temperature has a mask of its own:
+     ! t2m_mask(k) is 0 until cell k is computed by Noah-MP or set by the
+     ! caller, and t2m_unset lists its 0 cells, so get_value fills them
+     ! without scanning the field.
+     integer, allocatable :: lsm_mask(:)       ! (IX*JX)
+     integer, allocatable :: t2m_mask(:)       ! (IX*JX)
+     integer, allocatable :: t2m_unset(:)      ! 1-based flat indices
+     logical :: t2m_stepped = .false.          ! land cells computed
+
+     ! How get_value fills invalid cells of sentinel-valued fields:
+     !   "zero" -> 0.0 (default, matches earlier releases)
+     !   "nan"  -> quiet NaN
+     !   "raw"  -> leave WRF-Hydro's value untouched
+     character(len=8) :: fill_policy = "zero"
+
+     ! --- Feature-ID index and gauge ring buffer (Section 8) ---
+     ! link_keys/link_slots is an open-addressing hash table from LINKID
+     ! (the NWM feature ID) to 1-based link position, built once in
+     ! initialize. Registered gauges get their streamflow appended to
+     ! gauge_ring after every update; callers drain it in bulk.
+     integer(kind=int64), allocatable :: link_keys(:)
+     integer, allocatable :: link_slots(:)     ! 0 = empty slot
+     integer, allocatable :: gauge_links(:)    ! 1-based link positions
+     double precision, allocatable :: gauge_ring(:,:)   ! (gauges, capacity)
+     double precision, allocatable :: gauge_times(:)    ! (capacity)
+     integer :: gauge_next = 1     ! ring slot the next record goes to
+     integer :: gauge_count = 0    ! records waiting to be drained
+
+     ! --- Channel topology (computed once in initialize) ---
+     ! link_down(i) is the 1-based position of the link that link i flows
+     ! into, or 0 for an outlet. Served as the edges of GRID_CHANNEL.
+     integer, allocatable :: link_down(:)
+
+     ! --- MPMD exchange over an intercommunicator (Section 8) ---
+     ! intercomm joins WRF-Hydro's ranks to a partner model's; it is built
+     ! in initialize from partner_leader or handed over with set_intercomm.
+     ! Each posted send/receive keeps its own buffer in pending until
+     ! wait_exchanges; the array is never reallocated, so buffers stay put
+     ! while MPI owns them.
+     integer :: intercomm = 0
+     logical :: has_intercomm = .false.
+     logical :: owns_intercomm = .false.   ! created here, freed in finalize
+     type(pending_exchange) :: pending(MAX_PENDING)
+     integer :: n_pending = 0
+
+     ! --- Domain decomposition (Section 8) ---
+     ! Under mpirun -np N each rank holds one tile of the LSM and routing
+     ! grids and a share of the channel links, and the standard BMI
+     ! functions serve that rank-local array. tile(:, grid) is the block
+     ! this rank owns as [row offset, column offset, rows, columns] of the
+     ! global grid (0-based offsets, C order; channel links are one row);
+     ! halo(:, grid) is where that block starts in the local array (the
+     ! routing grid keeps a one-cell halo towards each neighbour).
+     ! Computed in initialize, with the gather plans.
+     integer :: nprocs = 1
+     integer :: my_rank = 0
+     integer :: comm = 0                   ! HYDRO_COMM_WORLD
+     integer :: tile(4, 0:2) = 0
+     integer :: halo(2, 0:2) = 0
+     integer :: global_shape(2, 0:2) = 0   ! [rows, columns]
+     type(gather_plan) :: plans(0:2)
+
    contains
 
      ! --- Control functions (4) ---
@@ -294,6 +389,31 @@ module bmiwrfhydrof
           set_value_at_indices_float, &
           set_value_at_indices_double
 
+     ! --- Extension functions (not part of BMI 2.0) ---
+     ! Extra queries exposed through the interoperability layer.
+     procedure :: get_var_mask => wrfhydro_var_mask
+     procedure :: get_value_stats => wrfhydro_get_value_stats
+     procedure :: get_value_zonal => wrfhydro_get_value_zonal
+     procedure :: get_link_positions => wrfhydro_link_positions
+     procedure :: get_grid_lonlat => wrfhydro_grid_lonlat
+     procedure :: register_gauges => wrfhydro_register_gauges
+     procedure :: get_gauge_count => wrfhydro_gauge_count
+     procedure :: drain_gauges => wrfhydro_drain_gauges
+     procedure :: set_comm => wrfhydro_set_comm
+     procedure :: set_intercomm => wrfhydro_set_intercomm
+     procedure :: send_value => wrfhydro_send_value
+     procedure :: recv_value => wrfhydro_recv_value
+     procedure :: wait_exchanges => wrfhydro_wait_exchanges
+     procedure :: get_decomposition => wrfhydro_decomposition
+     procedure :: get_grid_tile => wrfhydro_grid_tile
+     procedure :: get_grid_global_shape => wrfhydro_grid_global_shape
+     procedure :: get_value_local => wrfhydro_get_value_local
+     procedure :: get_value_global => wrfhydro_get_value_global
+     procedure :: get_value_at_global_indices => &
+          wrfhydro_get_at_global_indices
+     procedure :: set_value_at_global_indices => &
+          wrfhydro_set_at_global_indices
+
   end type bmi_wrf_hydro
 
   ! ==========================================================================
@@ -317,7 +437,7 @@ module bmiwrfhydrof
   ! Named N_INPUT_VARS / N_OUTPUT_VARS to avoid collision with the
   ! procedure names wrfhydro_input_item_count / wrfhydro_output_item_count.
   integer, parameter :: N_INPUT_VARS = 4
-  integer, parameter :: N_OUTPUT_VARS = 8
+  integer, parameter :: N_OUTPUT_VARS = 9
 
   ! --- Variable name arrays ---
   ! BMI_MAX_VAR_NAME is defined in bmif_2_0 (typically 2048 chars).
@@ -335,6 +455,17 @@ module bmiwrfhydrof
   integer, parameter :: GRID_ROUTING = 1   ! 250m terrain routing grid
   integer, parameter :: GRID_CHANNEL = 2   ! Vector channel network
 
+  ! --- Reduction codes for get_value_stats (extension) ---
+  ! Percentiles are requested as STAT_PERCENTILE + nint(100 * p), so
+  ! STAT_PERCENTILE + 9500 asks for the 95th percentile (0.01 resolution).
+  integer, parameter, public :: STAT_MIN = 1
+  integer, parameter, public :: STAT_MAX = 2
+  integer, parameter, public :: STAT_MEAN = 3
+  integer, parameter, public :: STAT_SUM = 4
+  integer, parameter, public :: STAT_STD = 5      ! population (ddof = 0)
+  integer, parameter, public :: STAT_COUNT = 6
+  integer, parameter, public :: STAT_PERCENTILE = 10000
+
 ! ============================================================================
 ! IMPLEMENTATION OF ALL BMI FUNCTIONS
 ! ============================================================================
@@ -373,7 +504,25 @@ contains
   ! The config file format (Fortran namelist):
   !   &bmi_wrf_hydro_config
   !     wrfhydro_run_dir = "/path/to/run/directory/"
+  !     fill_policy = "zero"    ! optional: "zero", "nan" or "raw"
+  !     mpi_color = -1          ! optional: split MPI_COMM_WORLD by color
+  !     partner_leader = -1     ! optional: world rank of a partner's leader
+  !     coupling_tag = 0        ! optional: tag for the intercommunicator
+  !     ranks_per_member = 0    ! optional: ensemble of groups of N ranks
   !   /
+  !
+  ! MPI communicator (first initialize only): a communicator given with
+  ! set_comm wins; otherwise mpi_color >= 0 splits MPI_COMM_WORLD and
+  ! WRF-Hydro runs on this color's ranks, as in an MPMD job where another
+  ! executable uses a different color; otherwise WRF-Hydro duplicates
+  ! MPI_COMM_WORLD. With partner_leader >= 0, initialize also creates the
+  ! intercommunicator to the partner's ranks (collective with the partner).
+  !
+  ! Ensembles: with ranks_per_member = N > 0, consecutive groups of N
+  ! world ranks each run their own WRF-Hydro instance (member k has ranks
+  ! k*N .. k*N+N-1 and, unless mpi_color is set, color k), and
+  ! "{member}" in wrfhydro_run_dir becomes the member number with at least
+  ! three digits, so one config file serves every member.
   ! --------------------------------------------------------------------------
   function wrfhydro_initialize(this, config_file) result (bmi_status)
     use module_noahmp_hrldas_driver, only: land_driver_ini, IX, JX, &
@@ -388,6 +537,8 @@ contains
     ! Local variables for config reading
     integer :: rc, fu
     character(len=256) :: wrfhydro_run_dir
+    character(len=8) :: fill_policy
+    integer :: mpi_color, partner_leader, coupling_tag, ranks_per_member
     character(len=256) :: saved_dir
     integer :: ntime_local
 
@@ -399,10 +550,16 @@ contains
 
     ! Namelist definition — this tells Fortran how to parse the config file.
     ! The group name "&bmi_wrf_hydro_config" must match what's in the file.
-    namelist /bmi_wrf_hydro_config/ wrfhydro_run_dir
+    namelist /bmi_wrf_hydro_config/ wrfhydro_run_dir, fill_policy, &
+         mpi_color, partner_leader, coupling_tag, ranks_per_member
 
     ! --- Step 1: Read the BMI configuration file ---
     wrfhydro_run_dir = ""
+    fill_policy = "zero"
+    mpi_color = -1
+    partner_leader = -1
+    coupling_tag = 0
+    ranks_per_member = 0
 
     if (len_trim(config_file) == 0) then
        bmi_status = BMI_FAILURE
@@ -433,6 +590,37 @@ contains
 
     this%run_dir = trim(wrfhydro_run_dir)
 
+    select case(fill_policy)
+    case("zero", "nan", "raw")
+       this%fill_policy = fill_policy
+    case default
+       write(0,*) "[BMI] Unknown fill_policy: ", trim(fill_policy)
+       bmi_status = BMI_FAILURE
+       return
+    end select
+
+    ! --- Step 1b: Ensemble member (ranks_per_member > 0) ---
+    ! The member follows from the world rank, so MPI is started here
+    ! rather than in Step 3; the color split itself happens there.
+    if (ranks_per_member > 0) then
+       block
+          use mpi
+          integer :: mpi_ierr, world_rank, k
+          logical :: mpi_is_init
+          character(len=16) :: member_text
+          call MPI_Initialized(mpi_is_init, mpi_ierr)
+          if (.not. mpi_is_init) call MPI_Init(mpi_ierr)
+          call MPI_Comm_rank(MPI_COMM_WORLD, world_rank, mpi_ierr)
+          if (mpi_color < 0) mpi_color = world_rank / ranks_per_member
+          k = index(this%run_dir, "{member}")
+          if (k > 0) then
+             write(member_text, '(i0.3)') world_rank / ranks_per_member
+             this%run_dir = this%run_dir(1:k - 1) // trim(member_text) // &
+                  this%run_dir(k + 8:)
+          end if
+       end block
+    end if
+
     ! --- Step 2: Change to WRF-Hydro run directory ---
     ! WRF-Hydro reads its namelists (namelist.hrldas, hydro.namelist) from
     ! the current working directory, so we must chdir there before init.
@@ -461,15 +649,37 @@ contains
        ! When MPI is already initialized by an external caller (e.g., mpi4py),
        ! WRF-Hydro's MPP_LAND_INIT skips MPI_Comm_dup, leaving HYDRO_COMM_WORLD
        ! as MPI_COMM_NULL. We must set it here before any WRF-Hydro code runs.
+       ! A caller communicator or color split also applies when MPI is not
+       ! up yet, so start it here rather than letting WRF-Hydro dup WORLD.
        block
           use mpi
           use MODULE_CPL_LAND, only: HYDRO_COMM_WORLD
-          integer :: mpi_ierr
+          integer :: mpi_ierr, world_rank
           logical :: mpi_is_init
           call MPI_Initialized(mpi_is_init, mpi_ierr)
+          if (.not. mpi_is_init .and. mpi_color >= 0) then
+             call MPI_Init(mpi_ierr)
+             mpi_is_init = .true.
+          end if
           if (mpi_is_init .and. HYDRO_COMM_WORLD == MPI_COMM_NULL) then
-             call MPI_Comm_dup(MPI_COMM_WORLD, HYDRO_COMM_WORLD, mpi_ierr)
-             write(0,*) "[BMI] Set HYDRO_COMM_WORLD from pre-initialized MPI"
+             if (wrfhydro_caller_comm_set) then
+                call MPI_Comm_dup(wrfhydro_caller_comm, HYDRO_COMM_WORLD, &
+                     mpi_ierr)
+                write(0,*) "[BMI] Set HYDRO_COMM_WORLD from caller communicator"
+             else if (mpi_color >= 0) then
+                call MPI_Comm_rank(MPI_COMM_WORLD, world_rank, mpi_ierr)
+                call MPI_Comm_split(MPI_COMM_WORLD, mpi_color, world_rank, &
+                     HYDRO_COMM_WORLD, mpi_ierr)
+                write(0,*) "[BMI] Split HYDRO_COMM_WORLD with color", mpi_color
+             else
+                call MPI_Comm_dup(MPI_COMM_WORLD, HYDRO_COMM_WORLD, mpi_ierr)
+                write(0,*) "[BMI] Set HYDRO_COMM_WORLD from pre-initialized MPI"
+             end if
+             if (mpi_ierr /= MPI_SUCCESS) then
+                call chdir(trim(saved_dir), rc)
+                bmi_status = BMI_FAILURE
+                return
+             end if
           end if
        end block
 
@@ -516,6 +726,45 @@ contains
        end if
     end block
 
+    ! --- Step 4b: Build the LSM validity mask ---
+    ! XLAND is Noah-MP's land/water flag (1 = land, 2 = water); the land
+    ! driver skips every cell with XLAND >= 1.5. It is static for the run,
+    ! so the mask is computed once here. Without XLAND, treat all as valid.
+    block
+       use module_noahmp_hrldas_driver, only: XLAND
+       integer :: k
+
+       allocate(this%lsm_mask(this%ix * this%jx))
+       this%lsm_mask = 1
+       if (allocated(XLAND)) then
+          where (reshape(XLAND(1:this%ix, 1:this%jx), &
+               [this%ix * this%jx]) >= 1.5) this%lsm_mask = 0
+       end if
+
+       ! Temperature starts with no valid cells; see update and set_value
+       allocate(this%t2m_mask(this%ix * this%jx))
+       this%t2m_mask = 0
+       this%t2m_unset = [(k, k = 1, this%ix * this%jx)]
+       this%t2m_stepped = .false.
+    end block
+
+    ! --- Step 4c: Index channel links by feature ID ---
+    ! For get_link_positions / register_gauges. Built once; LINKID is
+    ! static for the run.
+    if (this%nlinks > 0 .and. allocated(rt_domain(1)%LINKID)) &
+         call build_link_index(this)
+
+    ! --- Step 4d: Channel connectivity (link -> downstream link) ---
+    if (this%nlinks > 0) call build_link_topology(this)
+
+    ! --- Step 4e: This rank's tiles and the gather plans ---
+    ! Collective over HYDRO_COMM_WORLD when WRF-Hydro runs on several ranks.
+    if (build_decomposition(this) /= BMI_SUCCESS) then
+       call chdir(trim(saved_dir), rc)
+       bmi_status = BMI_FAILURE
+       return
+    end if
+
     ! --- Step 5: Set up time tracking ---
     this%start_time = 0.0d0
     this%current_time = 0.0d0
@@ -532,6 +781,27 @@ contains
        this%sea_water_x_velocity = 0.0d0
     end if
 
+    ! --- Step 6b: Intercommunicator to a partner model (MPMD) ---
+    ! Collective over both models' ranks: the partner must call
+    ! MPI_Intercomm_create with the same tag, naming our leader (local
+    ! rank 0 of HYDRO_COMM_WORLD) by its MPI_COMM_WORLD rank.
+    if (partner_leader >= 0) then
+       block
+          use mpi
+          use MODULE_CPL_LAND, only: HYDRO_COMM_WORLD
+          integer :: mpi_ierr
+          call MPI_Intercomm_create(HYDRO_COMM_WORLD, 0, MPI_COMM_WORLD, &
+               partner_leader, coupling_tag, this%intercomm, mpi_ierr)
+          if (mpi_ierr /= MPI_SUCCESS) then
+             call chdir(trim(saved_dir), rc)
+             bmi_status = BMI_FAILURE
+             return
+          end if
+          this%has_intercomm = .true.
+          this%owns_intercomm = .true.
+       end block
+    end if
+
     ! --- Step 7: Change back to original directory ---
     call chdir(trim(saved_dir), rc)
 
@@ -572,9 +842,20 @@ contains
     ! Execute one timestep of Noah-MP land surface + HYDRO routing
     call land_driver_exe(this%current_timestep, wrfhydro_bmi_state)
 
+    ! The first step computes T2MVXY on every land cell
+    if (.not. this%t2m_stepped .and. allocated(this%t2m_mask)) then
+       where (this%lsm_mask == 1) this%t2m_mask = 1
+       this%t2m_unset = pack(this%t2m_unset, &
+            this%t2m_mask(this%t2m_unset) == 0)
+       this%t2m_stepped = .true.
+    end if
+
     ! Update time tracking
     this%current_time = dble(this%current_timestep) * this%dt
 
+    ! Append this step's flows at registered gauges to the ring buffer
+    if (allocated(this%gauge_links)) call record_gauges(this)
+
     ! Return to original directory
     call chdir(trim(saved_dir), rc)
 
@@ -631,18 +912,47 @@ contains
     class (bmi_wrf_hydro), intent(inout) :: this
     integer :: bmi_status
 
+    ! Complete outstanding exchanges first: pending receives land in the
+    ! coupling fields below. A failure is reported once cleanup is done.
+    bmi_status = BMI_SUCCESS
+    if (this%n_pending > 0) bmi_status = this%wait_exchanges()
+
     ! Deallocate coupling placeholders
     if (allocated(this%sea_water_elevation)) &
          deallocate(this%sea_water_elevation)
     if (allocated(this%sea_water_x_velocity)) &
          deallocate(this%sea_water_x_velocity)
 
+    ! Deallocate validity mask
+    if (allocated(this%lsm_mask)) deallocate(this%lsm_mask)
+    if (allocated(this%t2m_mask)) deallocate(this%t2m_mask)
+    if (allocated(this%t2m_unset)) deallocate(this%t2m_unset)
+
+    ! Deallocate feature-ID index and gauges
+    if (allocated(this%link_keys)) deallocate(this%link_keys)
+    if (allocated(this%link_slots)) deallocate(this%link_slots)
+    if (allocated(this%gauge_links)) deallocate(this%gauge_links)
+    if (allocated(this%gauge_ring)) deallocate(this%gauge_ring)
+    if (allocated(this%gauge_times)) deallocate(this%gauge_times)
+    this%gauge_next = 1
+    this%gauge_count = 0
+    if (allocated(this%link_down)) deallocate(this%link_down)
+
+    ! Release the intercommunicator
+    if (this%owns_intercomm) then
+       block
+          use mpi
+          integer :: mpi_ierr
+          call MPI_Comm_free(this%intercomm, mpi_ierr)
+       end block
+    end if
+    this%has_intercomm = .false.
+    this%owns_intercomm = .false.
+
     ! Reset state tracking
     this%initialized = .false.
     this%current_timestep = 0
     this%current_time = 0.0d0
-
-    bmi_status = BMI_SUCCESS
   end function wrfhydro_finalize
 
 
@@ -740,6 +1050,8 @@ contains
     output_items(7) = 'soil_water__domain_time_integral_of_baseflow_volume_flux'
     ! 2-meter air temperature
     output_items(8) = 'land_surface_air__temperature'
+    ! Feature ID (LINKID) of each channel link, in streamflow order
+    output_items(9) = 'channel_link__id'
 
     names => output_items
     bmi_status = BMI_SUCCESS
@@ -784,6 +1096,10 @@ contains
          'sea_water__x_velocity')
        type = "double precision"
        bmi_status = BMI_SUCCESS
+    ! Link feature IDs are integers
+    case('channel_link__id')
+       type = "integer"
+       bmi_status = BMI_SUCCESS
     case default
        type = "-"
        bmi_status = BMI_FAILURE
@@ -833,6 +1149,9 @@ contains
     case('sea_water__x_velocity')
        units = "m s-1"           ! Meters per second
        bmi_status = BMI_SUCCESS
+    case('channel_link__id')
+       units = "1"               ! Identifier, no physical unit
+       bmi_status = BMI_SUCCESS
     case default
        units = "-"
        bmi_status = BMI_FAILURE
@@ -854,7 +1173,8 @@ contains
 
     select case(name)
     ! Channel network variables (Grid 2)
-    case('channel_water__volume_flow_rate')
+    case('channel_water__volume_flow_rate', &
+         'channel_link__id')
        grid = GRID_CHANNEL
        bmi_status = BMI_SUCCESS
     ! Routing grid variables (Grid 1)
@@ -906,6 +1226,9 @@ contains
          'sea_water__x_velocity')
        size = 8   ! double precision = 8 bytes
        bmi_status = BMI_SUCCESS
+    case('channel_link__id')
+       size = 4   ! default integer = 4 bytes
+       bmi_status = BMI_SUCCESS
     case default
        size = -1
        bmi_status = BMI_FAILURE
@@ -963,7 +1286,8 @@ contains
          'land_surface_air__temperature', &
          'atmosphere_water__precipitation_leq-volume_flux', &
          'sea_water_surface__elevation', &
-         'sea_water__x_velocity')
+         'sea_water__x_velocity', &
+         'channel_link__id')
        location = "node"
        bmi_status = BMI_SUCCESS
     case default
@@ -1323,8 +1647,10 @@ contains
   ! --------------------------------------------------------------------------
   ! get_grid_edge_count: Number of edges in a grid.
   ! --------------------------------------------------------------------------
-  ! Only applicable to unstructured grids. For WRF-Hydro's structured and
-  ! vector grids, we return BMI_FAILURE.
+  ! Only applicable to the channel network. Its nodes are the links (where
+  ! streamflow lives) and each edge joins a link to the link it drains
+  ! into, so there is one edge per link that is not an outlet. For the
+  ! structured grids, we return BMI_FAILURE.
   ! --------------------------------------------------------------------------
   function wrfhydro_grid_edge_count(this, grid, count) result(bmi_status)
     class(bmi_wrf_hydro), intent(in) :: this
@@ -1334,8 +1660,12 @@ contains
 
     select case(grid)
     case(GRID_CHANNEL)
-       ! In a channel network, each link is an edge.
-       count = this%nlinks
+       if (allocated(this%link_down)) then
+          ! (the count intrinsic is shadowed by the argument name)
+          count = sum(merge(1, 0, this%link_down > 0))
+       else
+          count = 0
+       end if
        bmi_status = BMI_SUCCESS
     case default
        count = -1
@@ -1364,16 +1694,35 @@ contains
   end function wrfhydro_grid_face_count
 
   ! --------------------------------------------------------------------------
-  ! get_grid_edge_nodes: Edge-node connectivity (unstructured only).
+  ! get_grid_edge_nodes: Edge-node connectivity (channel network only).
+  ! --------------------------------------------------------------------------
+  ! Pairs of 0-based node indices (BMI convention), edge k being
+  ! edge_nodes(2k-1) -> edge_nodes(2k): upstream link, then the
+  ! downstream link it flows into. Edges are listed in link order.
   ! --------------------------------------------------------------------------
   function wrfhydro_grid_edge_nodes(this, grid, edge_nodes) result(bmi_status)
     class(bmi_wrf_hydro), intent(in) :: this
     integer, intent(in) :: grid
     integer, dimension(:), intent(out) :: edge_nodes
     integer :: bmi_status
+    integer :: i, k, n_edges
 
     edge_nodes(:) = -1
-    bmi_status = BMI_FAILURE
+    bmi_status = this%get_grid_edge_count(grid, n_edges)
+    if (bmi_status /= BMI_SUCCESS .or. grid /= GRID_CHANNEL .or. &
+         size(edge_nodes) < 2 * n_edges) then
+       bmi_status = BMI_FAILURE
+       return
+    end if
+
+    k = 0
+    do i = 1, this%nlinks
+       if (this%link_down(i) == 0) cycle
+       edge_nodes(k + 1) = i - 1
+       edge_nodes(k + 2) = this%link_down(i) - 1
+       k = k + 2
+    end do
+    bmi_status = BMI_SUCCESS
   end function wrfhydro_grid_edge_nodes
 
   ! --------------------------------------------------------------------------
@@ -1429,8 +1778,8 @@ contains
   !
   ! Three data types: int, float (single), double.
   ! WRF-Hydro stores everything as REAL. We support double precision
-  ! as the primary interface (with dble() conversion) and return
-  ! BMI_FAILURE for int and float variants (not used for WRF-Hydro vars).
+  ! as the primary interface (with dble() conversion). The int variant
+  ! serves the channel link IDs only; float returns BMI_FAILURE.
   !
   ! KEY DESIGN: All arrays are flattened to 1D. A 2D array of shape
   ! (IX, JX) becomes a 1D array of size IX*JX using Fortran's column-major
@@ -1438,17 +1787,42 @@ contains
   ! **************************************************************************
 
   ! --------------------------------------------------------------------------
-  ! get_value_int: Get integer variable values (not used by WRF-Hydro).
+  ! get_value_int: Get integer variable values (channel link IDs only).
+  ! --------------------------------------------------------------------------
+  ! WRF-Hydro physical variables are all floating-point. The only integer
+  ! variable is the feature ID of each channel link, rt_domain(1)%LINKID,
+  ! in the same order as streamflow. LINKID is int64 in WRF-Hydro and BMI
+  ! integers are default integers, so a domain with any ID above huge(0)
+  ! gets BMI_FAILURE rather than silently wrapped IDs; get_link_positions
+  ! still takes the full int64 IDs.
   ! --------------------------------------------------------------------------
   function wrfhydro_get_int(this, name, dest) result (bmi_status)
+    use module_RT_data, only: rt_domain
+
     class (bmi_wrf_hydro), intent(in) :: this
     character (len=*), intent(in) :: name
     integer, intent(inout) :: dest(:)
     integer :: bmi_status
+    integer :: n
 
-    ! WRF-Hydro physical variables are all floating-point, not integer.
-    dest(:) = -1
-    bmi_status = BMI_FAILURE
+    select case(name)
+    case('channel_link__id')
+       if (allocated(rt_domain(1)%LINKID)) then
+          n = min(this%nlinks, size(dest))
+          if (any(abs(rt_domain(1)%LINKID(1:n)) > huge(dest))) then
+             dest(:) = -1
+             bmi_status = BMI_FAILURE
+             return
+          end if
+          dest(1:n) = int(rt_domain(1)%LINKID(1:n))
+       else
+          dest(:) = 0
+       end if
+       bmi_status = BMI_SUCCESS
+    case default
+       dest(:) = -1
+       bmi_status = BMI_FAILURE
+    end select
   end function wrfhydro_get_int
 
   ! --------------------------------------------------------------------------
@@ -1481,12 +1855,14 @@ contains
     use module_noahmp_hrldas_driver, only: SMOIS, SFCRUNOFF, UDRUNOFF, &
          RAINBL, T2MVXY, ACCECAN, ACCETRAN, ACCEDIR, sfcheadrt, IX, JX
     use module_RT_data, only: rt_domain
+    use, intrinsic :: ieee_arithmetic, only: ieee_value, ieee_quiet_nan
 
     class (bmi_wrf_hydro), intent(in) :: this
     character (len=*), intent(in) :: name
     double precision, intent(inout) :: dest(:)
     integer :: bmi_status
-    integer :: i
+    integer :: i, n
+    double precision :: fill
 
     select case(name)
 
@@ -1592,16 +1968,23 @@ contains
     ! --- Output variable 8: 2-meter air temperature (K) ---
     ! Source: T2MVXY(:,:) — 2m temperature of vegetation part
     ! NOTE: WRF-Hydro initializes T2MVXY to "undefined_real" (~9.97E+036)
-    ! for cells that haven't been computed (water cells, etc.).
-    ! We replace those sentinel values with 0.0 for clean BMI output.
+    ! on every cell; Noah-MP overwrites it on the cells it computes, and
+    ! never on open-water cells. The t2m_unset cells, which get_var_mask
+    ! marks 0, are filled according to fill_policy: every cell before the
+    ! first update, open water after it, and none once the caller has set
+    ! the field. The rest of the field is never scanned.
     case('land_surface_air__temperature')
        if (allocated(T2MVXY)) then
-          dest(1:this%ix*this%jx) = dble(reshape( &
-               T2MVXY(1:this%ix, 1:this%jx), [this%ix * this%jx]))
-          ! Replace WRF-Hydro's undefined_real sentinel with 0
-          do i = 1, this%ix * this%jx
-             if (abs(dest(i)) > 1.0d30) dest(i) = 0.0d0
-          end do
+          n = this%ix * this%jx
+          dest(1:n) = dble(reshape(T2MVXY(1:this%ix, 1:this%jx), [n]))
+          if (this%fill_policy /= "raw") then
+             if (this%fill_policy == "nan") then
+                fill = ieee_value(0.0d0, ieee_quiet_nan)
+             else
+                fill = 0.0d0
+             end if
+             if (allocated(this%t2m_unset)) dest(this%t2m_unset) = fill
+          end if
           bmi_status = BMI_SUCCESS
        else
           dest(:) = 0.0d0
@@ -1704,9 +2087,32 @@ contains
     integer, intent(inout) :: dest(:)
     integer, intent(in) :: inds(:)
     integer :: bmi_status
+    integer, allocatable :: full_array(:)
+    integer :: grid, grid_size, i
+
+    bmi_status = this%get_var_grid(name, grid)
+    if (bmi_status == BMI_SUCCESS) &
+         bmi_status = this%get_grid_size(grid, grid_size)
+    if (bmi_status /= BMI_SUCCESS) then
+       dest(:) = -1
+       return
+    end if
 
-    dest(:) = -1
-    bmi_status = BMI_FAILURE
+    ! Same approach as the double variant: full array, then pick
+    allocate(full_array(grid_size))
+    bmi_status = this%get_value_int(name, full_array)
+
+    if (bmi_status == BMI_SUCCESS) then
+       do i = 1, size(inds)
+          if (inds(i) >= 1 .and. inds(i) <= grid_size) then
+             dest(i) = full_array(inds(i))
+          else
+             dest(i) = -1
+          end if
+       end do
+    end if
+
+    deallocate(full_array)
   end function wrfhydro_get_at_indices_int
 
   ! --------------------------------------------------------------------------
@@ -1833,6 +2239,11 @@ contains
        if (allocated(T2MVXY)) then
           T2MVXY(1:this%ix, 1:this%jx) = reshape( &
                real(src(1:this%ix*this%jx)), [this%ix, this%jx])
+          ! Every cell now holds a caller-supplied value
+          if (allocated(this%t2m_mask)) then
+             this%t2m_mask = 1
+             this%t2m_unset = [integer ::]
+          end if
           bmi_status = BMI_SUCCESS
        else
           bmi_status = BMI_FAILURE
@@ -1933,4 +2344,1116 @@ contains
     deallocate(full_array)
   end function wrfhydro_set_at_indices_double
 
+
+  ! **************************************************************************
+  ! SECTION 8: EXTENSION FUNCTIONS (not part of BMI 2.0)
+  ! **************************************************************************
+  ! Extra queries for callers that know they are talking to WRF-Hydro.
+  ! They follow the BMI conventions (status return, flattened 1D arrays)
+  ! and are reached through the interoperability layer like the rest.
+  ! **************************************************************************
+
+  ! --------------------------------------------------------------------------
+  ! get_var_mask: Which elements of a variable hold computed values.
+  ! --------------------------------------------------------------------------
+  ! mask(k) = 1 where element k is valid and 0 where the model does not
+  ! compute it (open-water cells on the LSM grid). The mask belongs to the
+  ! variable's grid and is static for the run, so callers can fetch it once
+  ! and reuse it for every step. Routing and channel grids are all valid.
+  ! The exception is air temperature: a cell is valid once Noah-MP has
+  ! computed it or the caller has set it, so its mask is 0 everywhere
+  ! before the first update, matching what get_value returns.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_var_mask(this, name, mask) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    character (len=*), intent(in) :: name
+    integer, intent(out) :: mask(:)
+    integer :: bmi_status
+    integer :: grid, grid_size
+
+    bmi_status = this%get_var_grid(name, grid)
+    if (bmi_status == BMI_SUCCESS) &
+         bmi_status = this%get_grid_size(grid, grid_size)
+    if (bmi_status /= BMI_SUCCESS .or. size(mask) < grid_size) then
+       mask(:) = -1
+       bmi_status = BMI_FAILURE
+       return
+    end if
+
+    select case(grid)
+    case(GRID_LSM)
+       if (name == 'land_surface_air__temperature' .and. &
+           allocated(this%t2m_mask)) then
+          mask(1:grid_size) = this%t2m_mask
+       else if (allocated(this%lsm_mask)) then
+          mask(1:grid_size) = this%lsm_mask
+       else
+          mask(1:grid_size) = 1
+       end if
+    case default
+       mask(1:grid_size) = 1
+    end select
+  end function wrfhydro_var_mask
+
+  ! --------------------------------------------------------------------------
+  ! get_value_stats: Reduce a variable to a few summary numbers in place.
+  ! --------------------------------------------------------------------------
+  ! stats(k) is a STAT_* code and result(k) receives that reduction, so a
+  ! monitor gets min/max/mean/percentiles without copying the field out.
+  ! Only elements with a nonzero mask take part; without a mask, the variable's
+  ! validity mask (get_var_mask) is used. NaNs are skipped. Over an empty
+  ! selection, count is 0 and every other statistic is NaN.
+  !
+  ! Percentiles interpolate linearly between the two nearest ranks (the
+  ! numpy default), from one heapsort shared by all requested percentiles.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_get_value_stats(this, name, stats, result, mask) &
+       result (bmi_status)
+    use, intrinsic :: ieee_arithmetic, only: ieee_value, ieee_quiet_nan, &
+         ieee_is_nan
+
+    class (bmi_wrf_hydro), intent(in) :: this
+    character (len=*), intent(in) :: name
+    integer, intent(in) :: stats(:)
+    double precision, intent(out) :: result(:)
+    integer, intent(in), optional :: mask(:)
+    integer :: bmi_status
+
+    double precision, allocatable :: values(:), selected(:)
+    integer, allocatable :: use_mask(:)
+    logical :: sorted
+    integer :: grid, grid_size, k, n, lo
+    double precision :: nan, mean, pos
+
+    nan = ieee_value(0.0d0, ieee_quiet_nan)
+    result(:) = nan
+
+    bmi_status = this%get_var_grid(name, grid)
+    if (bmi_status == BMI_SUCCESS) &
+         bmi_status = this%get_grid_size(grid, grid_size)
+    if (bmi_status /= BMI_SUCCESS .or. size(result) < size(stats)) then
+       bmi_status = BMI_FAILURE
+       return
+    end if
+
+    allocate(values(grid_size), use_mask(grid_size))
+    bmi_status = get_value_as_double(this, name, values)
+    if (bmi_status /= BMI_SUCCESS) return
+
+    if (present(mask)) then
+       if (size(mask) < grid_size) then
+          bmi_status = BMI_FAILURE
+          return
+       end if
+       use_mask = mask(1:grid_size)
+    else
+       bmi_status = this%get_var_mask(name, use_mask)
+       if (bmi_status /= BMI_SUCCESS) return
+    end if
+
+    selected = pack(values, use_mask /= 0 .and. .not. ieee_is_nan(values))
+    n = size(selected)
+    if (n > 0) mean = sum(selected) / dble(n)
+    sorted = .false.
+
+    do k = 1, size(stats)
+       if (stats(k) == STAT_COUNT) then
+          result(k) = dble(n)
+          cycle
+       end if
+       if (n == 0) cycle
+
+       select case(stats(k))
+       case(STAT_MIN)
+          result(k) = minval(selected)
+       case(STAT_MAX)
+          result(k) = maxval(selected)
+       case(STAT_MEAN)
+          result(k) = mean
+       case(STAT_SUM)
+          result(k) = sum(selected)
+       case(STAT_STD)
+          result(k) = sqrt(sum((selected - mean)**2) / dble(n))
+       case(STAT_PERCENTILE:STAT_PERCENTILE + 10000)
+          if (.not. sorted) then
+             call heapsort(selected)
+             sorted = .true.
+          end if
+          pos = dble(stats(k) - STAT_PERCENTILE) / 10000.0d0 * dble(n - 1)
+          lo = min(int(pos), n - 1)
+          if (lo + 1 < n) then
+             result(k) = selected(lo + 1) + (pos - dble(lo)) * &
+                  (selected(lo + 2) - selected(lo + 1))
+          else
+             result(k) = selected(n)
+          end if
+       case default
+          bmi_status = BMI_FAILURE
+          return
+       end select
+    end do
+
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_get_value_stats
+
+  ! --------------------------------------------------------------------------
+  ! get_value_zonal: Per-zone reductions of a variable in one pass.
+  ! --------------------------------------------------------------------------
+  ! Zones are given in compressed sparse row form: the 0-based flat indices
+  ! of zone z's cells are cells(indptr(z)+1 : indptr(z+1)), with indptr(1)
+  ! = 0. The caller builds (indptr, cells) once from a label raster and
+  ! passes it every step; nothing is stored here. result(z, k) receives
+  ! stats(k) for zone z; being column-major, C sees it as result[k][z],
+  ! one row of n_zones values per statistic.
+  !
+  ! Cells outside the variable's validity mask and NaN cells are skipped,
+  ! as in get_value_stats. Only STAT_MIN/MAX/MEAN/SUM/STD/COUNT are
+  ! supported; percentiles would need a sort per zone.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_get_value_zonal(this, name, indptr, cells, stats, &
+       result) result (bmi_status)
+    use, intrinsic :: ieee_arithmetic, only: ieee_value, ieee_quiet_nan, &
+         ieee_is_nan
+
+    class (bmi_wrf_hydro), intent(in) :: this
+    character (len=*), intent(in) :: name
+    integer, intent(in) :: indptr(:), cells(:), stats(:)
+    double precision, intent(out) :: result(:,:)
+    integer :: bmi_status
+
+    double precision, allocatable :: values(:)
+    integer, allocatable :: valid(:)
+    integer :: grid, grid_size, n_zones, z, i, k, n
+    double precision :: nan, v, total, vmin, vmax, mean, m2, delta
+
+    nan = ieee_value(0.0d0, ieee_quiet_nan)
+    n_zones = size(indptr) - 1
+    result(:,:) = nan
+
+    bmi_status = this%get_var_grid(name, grid)
+    if (bmi_status == BMI_SUCCESS) &
+         bmi_status = this%get_grid_size(grid, grid_size)
+    if (bmi_status /= BMI_SUCCESS) return
+
+    ! Validate the index once: O(zones + cells)
+    bmi_status = BMI_FAILURE
+    if (n_zones < 0) return
+    if (size(result, 1) < n_zones .or. size(result, 2) < size(stats)) return
+    if (indptr(1) /= 0 .or. indptr(n_zones + 1) > size(cells)) return
+    if (any(indptr(2:) < indptr(:n_zones))) return
+    if (any(cells(:indptr(n_zones + 1)) < 0) .or. &
+         any(cells(:indptr(n_zones + 1)) >= grid_size)) return
+    if (any(stats < STAT_MIN .or. stats > STAT_COUNT)) return
+
+    allocate(values(grid_size), valid(grid_size))
+    bmi_status = get_value_as_double(this, name, values)
+    if (bmi_status == BMI_SUCCESS) bmi_status = this%get_var_mask(name, valid)
+    if (bmi_status /= BMI_SUCCESS) return
+    where (ieee_is_nan(values)) valid = 0
+
+    do z = 1, n_zones
+       n = 0
+       total = 0.0d0
+       mean = 0.0d0
+       m2 = 0.0d0
+       vmin = huge(1.0d0)
+       vmax = -huge(1.0d0)
+       do i = indptr(z) + 1, indptr(z + 1)
+          if (valid(cells(i) + 1) /= 1) cycle
+          v = values(cells(i) + 1)
+          n = n + 1
+          total = total + v
+          delta = v - mean         ! Welford update for the variance
+          mean = mean + delta / dble(n)
+          m2 = m2 + delta * (v - mean)
+          vmin = min(vmin, v)
+          vmax = max(vmax, v)
+       end do
+
+       do k = 1, size(stats)
+          if (stats(k) == STAT_COUNT) then
+             result(z, k) = dble(n)
+             cycle
+          end if
+          if (n == 0) cycle
+
+          select case(stats(k))
+          case(STAT_MIN)
+             result(z, k) = vmin
+          case(STAT_MAX)
+             result(z, k) = vmax
+          case(STAT_MEAN)
+             result(z, k) = total / dble(n)
+          case(STAT_SUM)
+             result(z, k) = total
+          case(STAT_STD)
+             result(z, k) = sqrt(m2 / dble(n))
+          end select
+       end do
+    end do
+
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_get_value_zonal
+
+  ! --------------------------------------------------------------------------
+  ! get_grid_lonlat: Longitude and latitude of every node of a grid.
+  ! --------------------------------------------------------------------------
+  ! One value per node in flat value order: cell centres on the LSM grid
+  ! (XLONG/XLAT from wrfinput) and the routing grid (LONGITUDE/LATITUDE
+  ! from Fulldom_hires), link positions on the channel grid. The LSM and
+  ! routing grids stay uniform_rectilinear to BMI, with the local
+  ! origin/spacing frame; this places their cells on the Earth for
+  ! nearest-neighbour matching and remapping.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_grid_lonlat(this, grid, lon, lat) result (bmi_status)
+    use module_RT_data, only: rt_domain
+    use module_noahmp_hrldas_driver, only: XLONG, XLAT
+
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(in) :: grid
+    double precision, intent(out) :: lon(:), lat(:)
+    integer :: bmi_status
+    integer :: n
+
+    lon(:) = -1.d0
+    lat(:) = -1.d0
+    bmi_status = BMI_FAILURE
+
+    select case(grid)
+    case(GRID_LSM)
+       n = this%ix * this%jx
+       if (.not. (allocated(XLONG) .and. allocated(XLAT))) return
+       if (size(lon) < n .or. size(lat) < n) return
+       lon(1:n) = dble(reshape(XLONG(1:this%ix, 1:this%jx), [n]))
+       lat(1:n) = dble(reshape(XLAT(1:this%ix, 1:this%jx), [n]))
+    case(GRID_ROUTING)
+       n = this%ixrt * this%jxrt
+       if (.not. (allocated(rt_domain(1)%LONVAL) .and. &
+            allocated(rt_domain(1)%LATVAL))) return
+       if (size(lon) < n .or. size(lat) < n) return
+       lon(1:n) = dble(reshape(rt_domain(1)%LONVAL(1:this%ixrt, &
+            1:this%jxrt), [n]))
+       lat(1:n) = dble(reshape(rt_domain(1)%LATVAL(1:this%ixrt, &
+            1:this%jxrt), [n]))
+    case(GRID_CHANNEL)
+       if (this%get_grid_x(grid, lon) /= BMI_SUCCESS) return
+       if (this%get_grid_y(grid, lat) /= BMI_SUCCESS) return
+    case default
+       return
+    end select
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_grid_lonlat
+
+  ! --------------------------------------------------------------------------
+  ! get_link_positions: Map NWM feature IDs to channel-grid positions.
+  ! --------------------------------------------------------------------------
+  ! positions(k) is the 0-based index of feature_ids(k) in the channel
+  ! grid (and so in channel_water__volume_flow_rate), or -1 if no link
+  ! has that ID. One hash lookup per ID against the index built in
+  ! initialize, so a few hundred gauges cost nothing next to a model step.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_link_positions(this, feature_ids, positions) &
+       result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer(kind=int64), intent(in) :: feature_ids(:)
+    integer, intent(out) :: positions(:)
+    integer :: bmi_status
+    integer :: k
+
+    if (.not. allocated(this%link_keys) .or. &
+         size(positions) < size(feature_ids)) then
+       positions(:) = -1
+       bmi_status = BMI_FAILURE
+       return
+    end if
+
+    do k = 1, size(feature_ids)
+       positions(k) = link_position(this, feature_ids(k)) - 1
+    end do
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_link_positions
+
+  ! --------------------------------------------------------------------------
+  ! register_gauges: Record streamflow at these links after every update.
+  ! --------------------------------------------------------------------------
+  ! Replaces any earlier registration and empties the ring buffer, which
+  ! holds the last `capacity` steps. Each update appends one record (the
+  ! flow at every gauge plus the model time); once full, the oldest record
+  ! is overwritten, so drain at least every `capacity` steps. Fails without
+  ! registering anything if an ID is unknown. An empty list unregisters.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_register_gauges(this, feature_ids, capacity) &
+       result (bmi_status)
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer(kind=int64), intent(in) :: feature_ids(:)
+    integer, intent(in) :: capacity
+    integer :: bmi_status
+    integer, allocatable :: positions(:)
+
+    bmi_status = BMI_FAILURE
+    if (capacity < 1) return
+    allocate(positions(size(feature_ids)))
+    if (this%get_link_positions(feature_ids, positions) /= BMI_SUCCESS) return
+    if (any(positions < 0)) return
+
+    if (allocated(this%gauge_links)) deallocate(this%gauge_links)
+    if (allocated(this%gauge_ring)) deallocate(this%gauge_ring)
+    if (allocated(this%gauge_times)) deallocate(this%gauge_times)
+    this%gauge_next = 1
+    this%gauge_count = 0
+
+    if (size(feature_ids) > 0) then
+       this%gauge_links = positions + 1
+       allocate(this%gauge_ring(size(feature_ids), capacity), &
+            this%gauge_times(capacity))
+    end if
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_register_gauges
+
+  ! --------------------------------------------------------------------------
+  ! get_gauge_count: Number of records waiting in the gauge ring buffer.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_gauge_count(this, count) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(out) :: count
+    integer :: bmi_status
+
+    count = this%gauge_count
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_gauge_count
+
+  ! --------------------------------------------------------------------------
+  ! drain_gauges: Move all pending gauge records out, oldest first.
+  ! --------------------------------------------------------------------------
+  ! values receives count records of size(gauges) flows each, record-major
+  ! (C sees values[record][gauge]); times(r) is the model time of record
+  ! r. The buffer is empty afterwards. Fails, draining nothing, if the
+  ! arrays are too small for the pending records.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_drain_gauges(this, values, times, count) &
+       result (bmi_status)
+    class (bmi_wrf_hydro), intent(inout) :: this
+    double precision, intent(out) :: values(:)
+    double precision, intent(out) :: times(:)
+    integer, intent(out) :: count
+    integer :: bmi_status
+    integer :: n_gauges, capacity, r, slot
+
+    count = 0
+    if (this%gauge_count == 0) then
+       bmi_status = BMI_SUCCESS
+       return
+    end if
+
+    n_gauges = size(this%gauge_ring, 1)
+    capacity = size(this%gauge_ring, 2)
+    if (size(times) < this%gauge_count .or. &
+         size(values) < n_gauges * this%gauge_count) then
+       bmi_status = BMI_FAILURE
+       return
+    end if
+
+    ! Oldest record sits gauge_count slots behind the next free one
+    slot = modulo(this%gauge_next - this%gauge_count - 1, capacity) + 1
+    do r = 1, this%gauge_count
+       values((r - 1) * n_gauges + 1 : r * n_gauges) = &
+            this%gauge_ring(:, slot)
+       times(r) = this%gauge_times(slot)
+       slot = modulo(slot, capacity) + 1
+    end do
+
+    count = this%gauge_count
+    this%gauge_count = 0
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_drain_gauges
+
+  ! --------------------------------------------------------------------------
+  ! set_comm: Run WRF-Hydro on a caller's communicator (MPMD jobs).
+  ! --------------------------------------------------------------------------
+  ! comm is a Fortran MPI handle (mpi4py: comm.py2f()). Must be called
+  ! before the first initialize; WRF-Hydro cannot move to another
+  ! communicator once its engine is up, so later calls fail.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_set_comm(this, comm) result (bmi_status)
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer, intent(in) :: comm
+    integer :: bmi_status
+
+    if (wrfhydro_engine_initialized) then
+       bmi_status = BMI_FAILURE
+       return
+    end if
+    wrfhydro_caller_comm = comm
+    wrfhydro_caller_comm_set = .true.
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_set_comm
+
+  ! --------------------------------------------------------------------------
+  ! set_intercomm: Use the caller's communicator for send/recv_value.
+  ! --------------------------------------------------------------------------
+  ! Normally an intercommunicator to the partner model's ranks, so ranks
+  ! in send_value/recv_value are the partner's; an intracommunicator also
+  ! works, with ranks in that communicator. The caller keeps ownership.
+  ! Call after initialize (initialize resets it).
+  ! --------------------------------------------------------------------------
+  function wrfhydro_set_intercomm(this, comm) result (bmi_status)
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer, intent(in) :: comm
+    integer :: bmi_status
+
+    if (this%n_pending > 0) then
+       bmi_status = BMI_FAILURE
+       return
+    end if
+    if (this%owns_intercomm) then
+       block
+          use mpi
+          integer :: mpi_ierr
+          call MPI_Comm_free(this%intercomm, mpi_ierr)
+       end block
+    end if
+    this%intercomm = comm
+    this%has_intercomm = .true.
+    this%owns_intercomm = .false.
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_set_intercomm
+
+  ! --------------------------------------------------------------------------
+  ! send_value: Post a non-blocking send of a variable to a partner rank.
+  ! --------------------------------------------------------------------------
+  ! The variable's current values are copied (as double) into a buffer
+  ! owned by the pending send, so the model may update straight away. The
+  ! send completes in wait_exchanges.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_send_value(this, name, rank, tag) result (bmi_status)
+    use mpi
+    class (bmi_wrf_hydro), intent(inout) :: this
+    character (len=*), intent(in) :: name
+    integer, intent(in) :: rank, tag
+    integer :: bmi_status
+    integer :: grid, grid_size, k, mpi_ierr
+
+    bmi_status = BMI_FAILURE
+    if (.not. this%has_intercomm .or. this%n_pending >= MAX_PENDING) return
+    if (this%get_var_grid(name, grid) /= BMI_SUCCESS) return
+    if (this%get_grid_size(grid, grid_size) /= BMI_SUCCESS) return
+
+    k = this%n_pending + 1
+    if (allocated(this%pending(k)%buffer)) deallocate(this%pending(k)%buffer)
+    allocate(this%pending(k)%buffer(grid_size))
+    if (get_value_as_double(this, name, this%pending(k)%buffer) &
+         /= BMI_SUCCESS) return
+
+    call MPI_Isend(this%pending(k)%buffer, grid_size, MPI_DOUBLE_PRECISION, &
+         rank, tag, this%intercomm, this%pending(k)%request, mpi_ierr)
+    if (mpi_ierr /= MPI_SUCCESS) return
+    this%pending(k)%name = name
+    this%pending(k)%receive = .false.
+    this%n_pending = k
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_send_value
+
+  ! --------------------------------------------------------------------------
+  ! recv_value: Post a non-blocking receive of an input variable.
+  ! --------------------------------------------------------------------------
+  ! The partner sends grid-size doubles on the variable's grid (already
+  ! remapped). They are applied with set_value in wait_exchanges.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_recv_value(this, name, rank, tag) result (bmi_status)
+    use mpi
+    class (bmi_wrf_hydro), intent(inout) :: this
+    character (len=*), intent(in) :: name
+    integer, intent(in) :: rank, tag
+    integer :: bmi_status
+    integer :: grid, grid_size, k, mpi_ierr
+    character (len=BMI_MAX_TYPE_NAME) :: type
+
+    bmi_status = BMI_FAILURE
+    if (.not. this%has_intercomm .or. this%n_pending >= MAX_PENDING) return
+    if (this%get_var_type(name, type) /= BMI_SUCCESS) return
+    if (type /= "double precision") return
+    if (this%get_var_grid(name, grid) /= BMI_SUCCESS) return
+    if (this%get_grid_size(grid, grid_size) /= BMI_SUCCESS) return
+
+    k = this%n_pending + 1
+    if (allocated(this%pending(k)%buffer)) deallocate(this%pending(k)%buffer)
+    allocate(this%pending(k)%buffer(grid_size))
+
+    call MPI_Irecv(this%pending(k)%buffer, grid_size, MPI_DOUBLE_PRECISION, &
+         rank, tag, this%intercomm, this%pending(k)%request, mpi_ierr)
+    if (mpi_ierr /= MPI_SUCCESS) return
+    this%pending(k)%name = name
+    this%pending(k)%receive = .true.
+    this%n_pending = k
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_recv_value
+
+  ! --------------------------------------------------------------------------
+  ! wait_exchanges: Complete every posted send and receive.
+  ! --------------------------------------------------------------------------
+  ! Received fields are applied with set_value in the order they were
+  ! posted. Fails if MPI reports an error or a field cannot be set; the
+  ! pending list is cleared either way.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_wait_exchanges(this) result (bmi_status)
+    use mpi
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer :: bmi_status
+    integer :: k, n, mpi_ierr
+    integer, allocatable :: requests(:)
+
+    n = this%n_pending
+    bmi_status = BMI_SUCCESS
+    if (n == 0) return
+
+    requests = [(this%pending(k)%request, k = 1, n)]
+    call MPI_Waitall(n, requests, MPI_STATUSES_IGNORE, mpi_ierr)
+    if (mpi_ierr /= MPI_SUCCESS) bmi_status = BMI_FAILURE
+
+    do k = 1, n
+       if (this%pending(k)%receive .and. bmi_status == BMI_SUCCESS) then
+          bmi_status = this%set_value_double(trim(this%pending(k)%name), &
+               this%pending(k)%buffer)
+       end if
+       deallocate(this%pending(k)%buffer)
+    end do
+    this%n_pending = 0
+  end function wrfhydro_wait_exchanges
+
+  ! --------------------------------------------------------------------------
+  ! get_decomposition: This rank and the number of ranks WRF-Hydro runs on.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_decomposition(this, rank, nprocs) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(out) :: rank, nprocs
+    integer :: bmi_status
+
+    rank = this%my_rank
+    nprocs = this%nprocs
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_decomposition
+
+  ! --------------------------------------------------------------------------
+  ! get_grid_tile: The block of a grid this rank owns.
+  ! --------------------------------------------------------------------------
+  ! tile = [row offset, column offset, rows, columns] within the global
+  ! grid, offsets 0-based in C order. Channel links are one row, so a
+  ! rank's links are [0, first link, 1, count]. With a single rank the
+  ! tile is the whole grid.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_grid_tile(this, grid, tile) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(in) :: grid
+    integer, intent(out) :: tile(:)
+    integer :: bmi_status
+
+    if (grid < GRID_LSM .or. grid > GRID_CHANNEL .or. size(tile) < 4) then
+       tile(:) = -1
+       bmi_status = BMI_FAILURE
+       return
+    end if
+    tile(1:4) = this%tile(:, grid)
+    bmi_status = BMI_SUCCESS
+  end function wrfhydro_grid_tile
+
+  ! --------------------------------------------------------------------------
+  ! get_grid_global_shape: get_grid_shape of the whole, undecomposed grid.
+  ! --------------------------------------------------------------------------
+  ! [rows, columns] for the LSM and routing grids, [links] for the
+  ! channel grid.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_grid_global_shape(this, grid, shape) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(in) :: grid
+    integer, intent(out) :: shape(:)
+    integer :: bmi_status
+
+    bmi_status = BMI_SUCCESS
+    select case(grid)
+    case(GRID_LSM, GRID_ROUTING)
+       shape(1:2) = this%global_shape(:, grid)
+    case(GRID_CHANNEL)
+       shape(1) = this%global_shape(2, grid)
+    case default
+       shape(:) = -1
+       bmi_status = BMI_FAILURE
+    end select
+  end function wrfhydro_grid_global_shape
+
+  ! --------------------------------------------------------------------------
+  ! get_value_local: A variable's values on this rank's tile, as double.
+  ! --------------------------------------------------------------------------
+  ! Like get_value, but without the routing halo: dest holds the tile's
+  ! rows x columns cells in C order (see get_grid_tile). No communication.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_get_value_local(this, name, dest) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    character (len=*), intent(in) :: name
+    double precision, intent(out) :: dest(:)
+    integer :: bmi_status
+    double precision, allocatable :: full(:)
+    integer :: grid, grid_size, rows, cols, local_cols, first, r
+
+    bmi_status = BMI_FAILURE
+    if (this%get_var_grid(name, grid) /= BMI_SUCCESS) return
+    if (this%get_grid_size(grid, grid_size) /= BMI_SUCCESS) return
+    rows = this%tile(3, grid)
+    cols = this%tile(4, grid)
+    if (size(dest) < rows * cols) return
+
+    allocate(full(grid_size))
+    bmi_status = get_value_as_double(this, name, full)
+    if (bmi_status /= BMI_SUCCESS) return
+    if (all(this%halo(:, grid) == 0) .and. rows * cols == grid_size) then
+       dest(1:grid_size) = full
+       return
+    end if
+
+    local_cols = local_columns(this, grid)
+    do r = 1, rows
+       first = (this%halo(1, grid) + r - 1) * local_cols + this%halo(2, grid)
+       dest((r - 1) * cols + 1:r * cols) = full(first + 1:first + cols)
+    end do
+  end function wrfhydro_get_value_local
+
+  ! --------------------------------------------------------------------------
+  ! get_value_global: A variable over the whole domain, as double.
+  ! --------------------------------------------------------------------------
+  ! Collective: every rank must call it. Each rank's tile is gathered with
+  ! MPI_Gatherv onto rank `root` of WRF-Hydro's communicator, or with
+  ! MPI_Allgatherv onto every rank if root < 0, using the counts and
+  ! displacements computed in initialize. dest (global grid size, C order)
+  ! is only written on the ranks that receive; channel links come rank
+  ! after rank. Equivalent to get_value_local on a single rank.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_get_value_global(this, name, dest, root) &
+       result (bmi_status)
+    use mpi
+    class (bmi_wrf_hydro), intent(inout) :: this
+    character (len=*), intent(in) :: name
+    double precision, intent(inout) :: dest(:)
+    integer, intent(in) :: root
+    integer :: bmi_status
+    double precision, allocatable :: local(:)
+    integer :: grid, n, p, r, rows, cols, global_cols, first, offset
+    integer :: mpi_ierr
+    logical :: receives
+
+    bmi_status = BMI_FAILURE
+    if (this%get_var_grid(name, grid) /= BMI_SUCCESS) return
+    if (this%nprocs == 1) then
+       bmi_status = this%get_value_local(name, dest)
+       return
+    end if
+    if (root >= this%nprocs) return
+
+    ! Every rank enters the collective even if its own part failed, so
+    ! that the others do not hang; the failure is reported afterwards.
+    n = this%tile(3, grid) * this%tile(4, grid)
+    allocate(local(n))
+    bmi_status = this%get_value_local(name, local)
+    receives = root < 0 .or. this%my_rank == root
+    associate (plan => this%plans(grid))
+      if (receives .and. size(dest) < size(plan%staging)) &
+           bmi_status = BMI_FAILURE
+      if (root < 0) then
+         call MPI_Allgatherv(local, n, MPI_DOUBLE_PRECISION, plan%staging, &
+              plan%counts, plan%displs, MPI_DOUBLE_PRECISION, this%comm, &
+              mpi_ierr)
+      else
+         call MPI_Gatherv(local, n, MPI_DOUBLE_PRECISION, plan%staging, &
+              plan%counts, plan%displs, MPI_DOUBLE_PRECISION, root, &
+              this%comm, mpi_ierr)
+      end if
+      if (mpi_ierr /= MPI_SUCCESS) bmi_status = BMI_FAILURE
+      if (bmi_status /= BMI_SUCCESS .or. .not. receives) return
+
+      ! Place each rank's block at its tile
+      global_cols = this%global_shape(2, grid)
+      do p = 0, this%nprocs - 1
+         rows = plan%tiles(3, p)
+         cols = plan%tiles(4, p)
+         do r = 1, rows
+            first = (plan%tiles(1, p) + r - 1) * global_cols + plan%tiles(2, p)
+            offset = plan%displs(p) + (r - 1) * cols
+            dest(first + 1:first + cols) = plan%staging(offset + 1:offset + cols)
+         end do
+      end do
+    end associate
+  end function wrfhydro_get_value_global
+
+  ! --------------------------------------------------------------------------
+  ! get_value_at_global_indices: Values at 0-based global flat indices.
+  ! --------------------------------------------------------------------------
+  ! Collective when decomposed: each rank fills the indices its tile owns
+  ! (mapped with global_to_local) and an MPI_Allreduce combines them, so
+  ! every rank gets every value. Out-of-range indices give -1, as in
+  ! get_value_at_indices.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_get_at_global_indices(this, name, dest, inds) &
+       result (bmi_status)
+    use mpi
+    class (bmi_wrf_hydro), intent(in) :: this
+    character (len=*), intent(in) :: name
+    double precision, intent(out) :: dest(:)
+    integer, intent(in) :: inds(:)
+    integer :: bmi_status
+    double precision, allocatable :: full(:)
+    integer :: grid, grid_size, i, k, mpi_ierr, global_size
+
+    dest(:) = 0.0d0
+    bmi_status = BMI_FAILURE
+    if (size(dest) < size(inds)) return
+    if (this%get_var_grid(name, grid) /= BMI_SUCCESS) return
+    if (this%get_grid_size(grid, grid_size) /= BMI_SUCCESS) return
+
+    allocate(full(grid_size))
+    bmi_status = get_value_as_double(this, name, full)
+    if (bmi_status == BMI_SUCCESS) then
+       do i = 1, size(inds)
+          k = global_to_local(this, grid, inds(i))
+          if (k > 0) dest(i) = full(k)
+       end do
+    end if
+
+    if (this%nprocs > 1) then
+       ! Reduce the failure too, so that all ranks agree on the status
+       call MPI_Allreduce(MPI_IN_PLACE, bmi_status, 1, MPI_INTEGER, MPI_MAX, &
+            this%comm, mpi_ierr)
+       call MPI_Allreduce(MPI_IN_PLACE, dest, size(inds), &
+            MPI_DOUBLE_PRECISION, MPI_SUM, this%comm, mpi_ierr)
+       if (mpi_ierr /= MPI_SUCCESS) bmi_status = BMI_FAILURE
+    end if
+
+    global_size = product(this%global_shape(:, grid))
+    where (inds(:) < 0 .or. inds(:) >= global_size) dest(1:size(inds)) = -1.d0
+  end function wrfhydro_get_at_global_indices
+
+  ! --------------------------------------------------------------------------
+  ! set_value_at_global_indices: Set values at 0-based global flat indices.
+  ! --------------------------------------------------------------------------
+  ! Every rank passes the same indices and values and keeps those its tile
+  ! owns; no communication. Halo copies on neighbouring ranks catch up at
+  ! WRF-Hydro's next halo exchange.
+  ! --------------------------------------------------------------------------
+  function wrfhydro_set_at_global_indices(this, name, inds, src) &
+       result (bmi_status)
+    class (bmi_wrf_hydro), intent(inout) :: this
+    character (len=*), intent(in) :: name
+    integer, intent(in) :: inds(:)
+    double precision, intent(in) :: src(:)
+    integer :: bmi_status
+    integer, allocatable :: local(:)
+    integer :: grid, i
+
+    bmi_status = BMI_FAILURE
+    if (size(src) < size(inds)) return
+    if (this%get_var_grid(name, grid) /= BMI_SUCCESS) return
+
+    allocate(local(size(inds)))
+    do i = 1, size(inds)
+       local(i) = global_to_local(this, grid, inds(i))
+    end do
+    if (.not. any(local > 0)) then
+       bmi_status = BMI_SUCCESS
+       return
+    end if
+    bmi_status = this%set_value_at_indices_double(name, pack(local, local > 0), &
+         pack(src(1:size(inds)), local > 0))
+  end function wrfhydro_set_at_global_indices
+
+  ! --------------------------------------------------------------------------
+  ! record_gauges: Append the current flows at registered gauges (update).
+  ! --------------------------------------------------------------------------
+  subroutine record_gauges(this)
+    use module_RT_data, only: rt_domain
+
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer :: capacity
+
+    if (.not. allocated(rt_domain(1)%QLINK)) return
+    capacity = size(this%gauge_ring, 2)
+
+    this%gauge_ring(:, this%gauge_next) = &
+         dble(rt_domain(1)%QLINK(this%gauge_links, 2))
+    this%gauge_times(this%gauge_next) = this%current_time
+    this%gauge_next = modulo(this%gauge_next, capacity) + 1
+    this%gauge_count = min(this%gauge_count + 1, capacity)
+  end subroutine record_gauges
+
+  ! --------------------------------------------------------------------------
+  ! build_link_index: Hash LINKID -> link position (initialize, once).
+  ! --------------------------------------------------------------------------
+  ! Open addressing with linear probing in a power-of-two table at most
+  ! half full. Duplicate IDs keep their first position.
+  ! --------------------------------------------------------------------------
+  subroutine build_link_index(this)
+    use module_RT_data, only: rt_domain
+
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer :: table_size, i, slot
+
+    table_size = 16
+    do while (table_size < 2 * this%nlinks)
+       table_size = 2 * table_size
+    end do
+
+    if (allocated(this%link_keys)) deallocate(this%link_keys)
+    if (allocated(this%link_slots)) deallocate(this%link_slots)
+    allocate(this%link_keys(table_size), this%link_slots(table_size))
+    this%link_slots = 0
+
+    do i = 1, this%nlinks
+       slot = link_hash(int(rt_domain(1)%LINKID(i), int64), table_size)
+       do while (this%link_slots(slot) /= 0)
+          if (this%link_keys(slot) == rt_domain(1)%LINKID(i)) exit
+          slot = modulo(slot, table_size) + 1
+       end do
+       if (this%link_slots(slot) == 0) then
+          this%link_keys(slot) = int(rt_domain(1)%LINKID(i), int64)
+          this%link_slots(slot) = i
+       end if
+    end do
+  end subroutine build_link_index
+
+  ! --------------------------------------------------------------------------
+  ! build_link_topology: Resolve each link's downstream link (initialize).
+  ! --------------------------------------------------------------------------
+  ! Reach-based routing (channel_option 1/2) stores the downstream feature
+  ! ID in TO_NODE, which the link index turns into a position. Gridded
+  ! routing (channel_option 3) stores the downstream node number itself.
+  ! Anything that does not resolve to another link is an outlet.
+  ! --------------------------------------------------------------------------
+  subroutine build_link_topology(this)
+    use module_RT_data, only: rt_domain
+    use config_base, only: nlst
+
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer :: i
+    integer(kind=int64) :: to
+
+    if (allocated(this%link_down)) deallocate(this%link_down)
+    allocate(this%link_down(this%nlinks))
+    this%link_down = 0
+    if (.not. allocated(rt_domain(1)%TO_NODE)) return
+
+    do i = 1, this%nlinks
+       to = int(rt_domain(1)%TO_NODE(i), int64)
+       if (to <= 0) cycle
+       if (nlst(1)%channel_option == 3) then
+          if (to <= this%nlinks) this%link_down(i) = int(to)
+       else if (allocated(this%link_keys)) then
+          this%link_down(i) = link_position(this, to)
+       end if
+       if (this%link_down(i) == i) this%link_down(i) = 0
+    end do
+  end subroutine build_link_topology
+
+  ! 1-based link position of a feature ID, or 0 if absent
+  integer function link_position(this, id)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer(kind=int64), intent(in) :: id
+    integer :: slot
+
+    slot = link_hash(id, size(this%link_slots))
+    do while (this%link_slots(slot) /= 0)
+       if (this%link_keys(slot) == id) exit
+       slot = modulo(slot, size(this%link_slots)) + 1
+    end do
+    link_position = this%link_slots(slot)
+  end function link_position
+
+  ! Slot for a key in a power-of-two table; folds the high bits in so
+  ! IDs sharing their low bits still spread out
+  integer function link_hash(id, table_size)
+    integer(kind=int64), intent(in) :: id
+    integer, intent(in) :: table_size
+
+    link_hash = int(modulo(ieor(id, ishft(id, -17)), &
+         int(table_size, int64))) + 1
+  end function link_hash
+
+  ! --------------------------------------------------------------------------
+  ! build_decomposition: Tiles of this rank and gather plans (initialize).
+  ! --------------------------------------------------------------------------
+  ! WRF-Hydro's MPP layer splits the LSM grid into blocks starting at
+  ! (startx, starty) of its global grid; a rank's routing block is that
+  ! block refined by AGGFACTRT, plus a one-cell halo on every side that has
+  ! a neighbour. Channel links are numbered rank after rank. Every rank's
+  ! tiles are exchanged once here, so gathers only move values.
+  ! --------------------------------------------------------------------------
+  function build_decomposition(this) result (bmi_status)
+    use mpi
+    use module_mpp_land, only: my_id, numprocs, global_nx, global_ny, &
+         global_rt_nx, global_rt_ny, startx, starty, left_id, down_id
+    use MODULE_CPL_LAND, only: HYDRO_COMM_WORLD
+    use config_base, only: nlst
+
+    class (bmi_wrf_hydro), intent(inout) :: this
+    integer :: bmi_status
+    integer :: agg, grid, p, mpi_ierr
+    integer, allocatable :: tiles(:,:,:)    ! (4, grid, rank)
+
+    bmi_status = BMI_SUCCESS
+    this%tile(:, GRID_LSM) = [0, 0, this%jx, this%ix]
+    this%tile(:, GRID_ROUTING) = [0, 0, this%jxrt, this%ixrt]
+    this%tile(:, GRID_CHANNEL) = [0, 0, 1, this%nlinks]
+    this%halo = 0
+    this%nprocs = 1
+    this%my_rank = 0
+
+    if (numprocs > 1 .and. allocated(startx)) then
+       this%nprocs = numprocs
+       this%my_rank = my_id
+       this%comm = HYDRO_COMM_WORLD
+       agg = nlst(1)%AGGFACTRT
+       this%tile(:, GRID_LSM) = [starty(my_id) - 1, startx(my_id) - 1, &
+            this%jx, this%ix]
+       this%tile(:, GRID_ROUTING) = [(starty(my_id) - 1) * agg, &
+            (startx(my_id) - 1) * agg, this%jx * agg, this%ix * agg]
+       if (down_id >= 0) this%halo(1, GRID_ROUTING) = 1
+       if (left_id >= 0) this%halo(2, GRID_ROUTING) = 1
+    end if
+
+    allocate(tiles(4, 0:2, 0:this%nprocs - 1))
+    if (this%nprocs > 1) then
+       call MPI_Allgather(this%tile, 12, MPI_INTEGER, tiles, 12, MPI_INTEGER, &
+            this%comm, mpi_ierr)
+       if (mpi_ierr /= MPI_SUCCESS) then
+          bmi_status = BMI_FAILURE
+          return
+       end if
+       ! Links: each rank's first link follows the previous rank's last
+       do p = 1, this%nprocs - 1
+          tiles(2, GRID_CHANNEL, p) = tiles(2, GRID_CHANNEL, p - 1) + &
+               tiles(4, GRID_CHANNEL, p - 1)
+       end do
+       this%tile(2, GRID_CHANNEL) = tiles(2, GRID_CHANNEL, this%my_rank)
+       this%global_shape(:, GRID_LSM) = [global_ny, global_nx]
+       this%global_shape(:, GRID_ROUTING) = [global_rt_ny, global_rt_nx]
+    else
+       tiles(:, :, 0) = this%tile
+       this%global_shape(:, GRID_LSM) = [this%jx, this%ix]
+       this%global_shape(:, GRID_ROUTING) = [this%jxrt, this%ixrt]
+    end if
+    this%global_shape(:, GRID_CHANNEL) = &
+         [1, sum(tiles(4, GRID_CHANNEL, :))]
+
+    do grid = GRID_LSM, GRID_CHANNEL
+       associate (plan => this%plans(grid))
+         allocate(plan%tiles(4, 0:this%nprocs - 1), &
+              plan%counts(0:this%nprocs - 1), plan%displs(0:this%nprocs - 1))
+         plan%tiles = tiles(:, grid, :)
+         plan%counts = plan%tiles(3, :) * plan%tiles(4, :)
+         plan%displs(0) = 0
+         do p = 1, this%nprocs - 1
+            plan%displs(p) = plan%displs(p - 1) + plan%counts(p - 1)
+         end do
+         allocate(plan%staging(sum(plan%counts)))
+       end associate
+    end do
+  end function build_decomposition
+
+  ! --------------------------------------------------------------------------
+  ! global_to_local: 1-based index in this rank's local array of a 0-based
+  ! global flat index, or 0 if another rank (or no rank) owns it.
+  ! --------------------------------------------------------------------------
+  integer function global_to_local(this, grid, index)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(in) :: grid, index
+    integer :: row, col
+
+    global_to_local = 0
+    if (index < 0 .or. index >= product(this%global_shape(:, grid))) return
+    row = index / this%global_shape(2, grid) - this%tile(1, grid)
+    col = mod(index, this%global_shape(2, grid)) - this%tile(2, grid)
+    if (row < 0 .or. row >= this%tile(3, grid) .or. &
+         col < 0 .or. col >= this%tile(4, grid)) return
+    global_to_local = (row + this%halo(1, grid)) * local_columns(this, grid) &
+         + col + this%halo(2, grid) + 1
+  end function global_to_local
+
+  ! --------------------------------------------------------------------------
+  ! local_columns: Row length of a grid's rank-local array.
+  ! --------------------------------------------------------------------------
+  integer function local_columns(this, grid)
+    class (bmi_wrf_hydro), intent(in) :: this
+    integer, intent(in) :: grid
+
+    select case(grid)
+    case(GRID_LSM)
+       local_columns = this%ix
+    case(GRID_ROUTING)
+       local_columns = this%ixrt
+    case default
+       local_columns = this%nlinks
+    end select
+  end function local_columns
+
+  ! --------------------------------------------------------------------------
+  ! get_value_as_double: get_value for any variable type, as doubles.
+  ! --------------------------------------------------------------------------
+  ! Lets the reductions above accept integer variables too.
+  ! --------------------------------------------------------------------------
+  function get_value_as_double(this, name, dest) result (bmi_status)
+    class (bmi_wrf_hydro), intent(in) :: this
+    character (len=*), intent(in) :: name
+    double precision, intent(out) :: dest(:)
+    integer :: bmi_status
+    character (len=BMI_MAX_TYPE_NAME) :: type
+    integer, allocatable :: ivalues(:)
+
+    bmi_status = this%get_var_type(name, type)
+    if (bmi_status /= BMI_SUCCESS) return
+
+    if (type == "integer") then
+       allocate(ivalues(size(dest)))
+       bmi_status = this%get_value_int(name, ivalues)
+       dest = dble(ivalues)
+    else
+       bmi_status = this%get_value_double(name, dest)
+    end if
+  end function get_value_as_double
+
+  ! --------------------------------------------------------------------------
+  ! heapsort: Sort a double array ascending in place (O(n log n), no
+  ! recursion or scratch space -- fine for fields of millions of cells).
+  ! --------------------------------------------------------------------------
+  subroutine heapsort(a)
+    double precision, intent(inout) :: a(:)
+    integer :: n, i
+    double precision :: tmp
+
+    n = size(a)
+    do i = n / 2, 1, -1
+       call sift_down(a, i, n)
+    end do
+    do i = n, 2, -1
+       tmp = a(1)
+       a(1) = a(i)
+       a(i) = tmp
+       call sift_down(a, 1, i - 1)
+    end do
+  end subroutine heapsort
+
+  subroutine sift_down(a, start, last)
+    double precision, intent(inout) :: a(:)
+    integer, intent(in) :: start, last
+    integer :: root, child
+    double precision :: tmp
+
+    root = start
+    do while (2 * root <= last)
+       child = 2 * root
+       if (child < last) then
+          if (a(child) < a(child + 1)) child = child + 1
+       end if
+       if (a(root) >= a(child)) return
+       tmp = a(root)
+       a(root) = a(child)
+       a(child) = tmp
+       root = child
+    end do
+  end subroutine sift_down
+
 end module bmiwrfhydrof
@@ -31,6 +31,7 @@
 !   Section 6: Get/Set Value Tests -- get_value, set_value for key variables
 !   Section 7: Edge Case Tests     -- invalid names, invalid grids, expected failures
 !   Section 8: Integration Tests   -- full IRF cycle, output evolution over time
+!   Section 9: Extension Tests     -- WRF-Hydro-specific functions beyond BMI 2.0
 !
 ! HOW TO COMPILE (once bmi_wrf_hydro.f90 is ready):
 !   gfortran -c -I$CONDA_PREFIX/include bmi_wrf_hydro.f90
@@ -86,6 +87,8 @@ program bmi_wrf_hydro_test
   use bmiwrfhydrof                  ! Our BMI wrapper module for WRF-Hydro
   use bmif_2_0                      ! BMI constants and abstract interface
   use mpi                           ! MPI for clean shutdown (MPI_Finalize)
+  use module_RT_data, only: rt_domain  ! To plant an out-of-range link ID
+  use, intrinsic :: iso_fortran_env, only: int64
   implicit none                     ! CRITICAL: forces all variables to be declared
 
   ! ==========================================================================
@@ -171,6 +174,18 @@ program bmi_wrf_hydro_test
   ! For get_value_ptr
   double precision, pointer :: ptr_values(:)
 
+  ! --- Variables for Extension tests (Section 9) ---
+  integer, allocatable :: mask_values(:)
+  double precision :: stats_result(4)
+  integer, allocatable :: zone_cells(:)
+  double precision :: zone_result(2, 2)
+  integer, allocatable :: link_ids(:), link_pos(:)
+  integer, allocatable :: edge_nodes(:)
+  integer :: gauge_count
+  double precision :: gauge_values(8), gauge_times(4)
+  integer :: tile(4)
+  double precision, allocatable :: gathered(:)
+
   ! --- Loop counters and temporaries ---
   ! "i", "j", "k" are loop counters. "n" is a temporary for sizes.
   ! These are plain integers, used throughout the test.
@@ -460,14 +475,15 @@ program bmi_wrf_hydro_test
   ! What: Count how many output variables the model produces.
   ! Why:  The caller needs to know how many variables it can read from
   !       the model (e.g., streamflow, soil moisture, snow).
-  ! Expect: 8 (streamflow, surface water, soil moisture, snow, ET, runoff,
-  !            baseflow, temperature)
+  ! Expect: 9 (streamflow, surface water, soil moisture, snow, ET, runoff,
+  !            baseflow, temperature + the integer channel link IDs, which
+  !            are tested in Section 9 and so are not in output_var_list)
   ! --------------------------------------------------------------------------
   status = model%get_output_item_count(output_count)
   call check_status(status, "T07: get_output_item_count returns SUCCESS", &
        test_count, pass_count, fail_count)
-  call check_true(output_count == N_OUTPUT_VARS, &
-       "T07b: output item count == 8", &
+  call check_true(output_count == N_OUTPUT_VARS + 1, &
+       "T07b: output item count == 9", &
        test_count, pass_count, fail_count)
   write(0,*) "       Output item count =", output_count
 
@@ -999,6 +1015,22 @@ program bmi_wrf_hydro_test
     deallocate(grid_y_arr)
   end if
 
+  ! get_grid_lonlat(0) -- geographic LSM cell centres; get_grid_x(0)
+  ! still fails, as BMI expects of a uniform_rectilinear grid
+  status = model%get_grid_size(0, grid_size_val)
+  allocate(grid_x_arr(grid_size_val), grid_y_arr(grid_size_val))
+  status = model%get_grid_lonlat(0, grid_x_arr, grid_y_arr)
+  call check_true(status == BMI_SUCCESS .and. &
+       all(abs(grid_x_arr) <= 180.0d0) .and. &
+       all(abs(grid_y_arr) <= 90.0d0), &
+       "T38b: get_grid_lonlat(0) gives longitudes and latitudes", &
+       test_count, pass_count, fail_count)
+  status = model%get_grid_x(0, grid_x_arr)
+  call check_true(status == BMI_FAILURE, &
+       "T38c: get_grid_x(0) returns FAILURE", &
+       test_count, pass_count, fail_count)
+  deallocate(grid_x_arr, grid_y_arr)
+
   ! get_grid_edge_count(2)
   status = model%get_grid_edge_count(2, edge_count)
   call check_status(status, "T39: get_grid_edge_count(2) returns SUCCESS", &
@@ -1635,6 +1667,376 @@ program bmi_wrf_hydro_test
 
   write(0,*)
 
+  ! **************************************************************************
+  ! SECTION 9: EXTENSION TESTS
+  ! **************************************************************************
+  ! These test the WRF-Hydro-specific functions the wrapper adds on top of
+  ! BMI 2.0 (see Section 8 of bmi_wrf_hydro.f90). They run on a fresh
+  ! instance advanced one step, like the integration tests above.
+  ! **************************************************************************
+  write(0,*) "=============================================================="
+  write(0,*) "  SECTION 9: Extension Tests"
+  write(0,*) "=============================================================="
+
+  status = model%initialize(trim(config_file))
+  call check_status(status, "T70: init for extension tests", &
+       test_count, pass_count, fail_count)
+
+  ! --------------------------------------------------------------------------
+  ! TEST: temperature before the first update
+  ! --------------------------------------------------------------------------
+  ! What: Read temperature at t=0, before Noah-MP has run.
+  ! Why:  T2MVXY starts as the ~9.97E+36 sentinel on every cell, land
+  !       included; with the default fill_policy none of it may leak out,
+  !       and the mask must not call any of it valid.
+  ! --------------------------------------------------------------------------
+  status = model%get_var_grid(trim(output_var_list(8)), grid_id)
+  status = model%get_grid_size(grid_id, n)
+  if (n > 0) then
+    allocate(values(n))
+    allocate(mask_values(n))
+    status = model%get_value_double(trim(output_var_list(8)), values)
+    call check_true(status == BMI_SUCCESS .and. all(values == 0.0d0), &
+         "T70b: no undefined_real sentinel in temperature at t=0", &
+         test_count, pass_count, fail_count)
+    status = model%get_var_mask(trim(output_var_list(8)), mask_values)
+    call check_true(status == BMI_SUCCESS .and. all(mask_values == 0), &
+         "T70c: temperature mask is all invalid at t=0", &
+         test_count, pass_count, fail_count)
+    deallocate(mask_values)
+    deallocate(values)
+  end if
+
+  status = model%update()
+
+  ! --------------------------------------------------------------------------
+  ! TEST: get_var_mask for temperature (LSM grid)
+  ! --------------------------------------------------------------------------
+  ! What: Fetch the validity mask and compare it with get_value.
+  ! Why:  Open-water cells are never computed by Noah-MP. The mask must
+  !       flag exactly those, and with the default fill_policy ("zero")
+  !       get_value must read them as 0.0 -- never the ~9.97E+36 sentinel.
+  ! --------------------------------------------------------------------------
+  status = model%get_var_grid(trim(output_var_list(8)), grid_id)
+  status = model%get_grid_size(grid_id, n)
+  if (n > 0) then
+    allocate(mask_values(n))
+    allocate(values(n))
+
+    status = model%get_var_mask(trim(output_var_list(8)), mask_values)
+    call check_status(status, "T71: get_var_mask(land_surface_air__temperature)", &
+         test_count, pass_count, fail_count)
+    call check_true(all(mask_values == 0 .or. mask_values == 1) .and. &
+         any(mask_values == 1), &
+         "T71b: mask is 0/1 with some valid cells", &
+         test_count, pass_count, fail_count)
+
+    status = model%get_value_double(trim(output_var_list(8)), values)
+    call check_true(all(abs(values) < 1.0d30), &
+         "T71c: no undefined_real sentinel in temperature", &
+         test_count, pass_count, fail_count)
+    call check_true(all(pack(values, mask_values == 0) == 0.0d0), &
+         "T71d: invalid cells read as 0.0", &
+         test_count, pass_count, fail_count)
+
+    write(0,*) "       Invalid cells =", count(mask_values == 0), " of", n
+
+    deallocate(mask_values)
+    deallocate(values)
+  end if
+
+  ! --------------------------------------------------------------------------
+  ! TEST: get_var_mask for streamflow (channel grid) and invalid names
+  ! --------------------------------------------------------------------------
+  status = model%get_var_grid(trim(output_var_list(1)), grid_id)
+  status = model%get_grid_size(grid_id, n)
+  if (n > 0) then
+    allocate(mask_values(n))
+    status = model%get_var_mask(trim(output_var_list(1)), mask_values)
+    call check_true(status == BMI_SUCCESS .and. all(mask_values == 1), &
+         "T72: channel grid mask is all valid", &
+         test_count, pass_count, fail_count)
+
+    status = model%get_var_mask("not_a_variable", mask_values)
+    call check_true(status == BMI_FAILURE, &
+         "T72b: get_var_mask(invalid name) returns BMI_FAILURE", &
+         test_count, pass_count, fail_count)
+    deallocate(mask_values)
+  end if
+
+  ! --------------------------------------------------------------------------
+  ! TEST: get_value_stats for streamflow
+  ! --------------------------------------------------------------------------
+  ! What: Reduce streamflow to min/max/count/median inside the wrapper and
+  !       compare with minval/maxval over the full get_value array.
+  ! Why:  Monitoring only needs summaries; they must agree with what a
+  !       caller would compute from the copied-out field.
+  ! --------------------------------------------------------------------------
+  status = model%get_var_grid(trim(output_var_list(1)), grid_id)
+  status = model%get_grid_size(grid_id, n)
+  if (n > 0) then
+    allocate(values(n))
+    status = model%get_value_double(trim(output_var_list(1)), values)
+
+    status = model%get_value_stats(trim(output_var_list(1)), &
+         [STAT_MIN, STAT_MAX, STAT_COUNT, STAT_PERCENTILE + 5000], stats_result)
+    call check_status(status, "T73: get_value_stats(streamflow)", &
+         test_count, pass_count, fail_count)
+    call check_true(stats_result(1) == minval(values) .and. &
+         stats_result(2) == maxval(values) .and. &
+         nint(stats_result(3)) == n, &
+         "T73b: min/max/count match get_value", &
+         test_count, pass_count, fail_count)
+    call check_true(stats_result(4) >= stats_result(1) .and. &
+         stats_result(4) <= stats_result(2), &
+         "T73c: median lies between min and max", &
+         test_count, pass_count, fail_count)
+
+    write(0,*) "       Min    =", stats_result(1)
+    write(0,*) "       Max    =", stats_result(2)
+    write(0,*) "       Median =", stats_result(4)
+
+    status = model%get_value_stats(trim(output_var_list(1)), [-7], &
+         stats_result)
+    call check_true(status == BMI_FAILURE, &
+         "T73d: get_value_stats(unknown code) returns BMI_FAILURE", &
+         test_count, pass_count, fail_count)
+
+    ! ------------------------------------------------------------------------
+    ! TEST: get_value_zonal over two zones (first / second half of links)
+    ! ------------------------------------------------------------------------
+    ! What: Zone sums and counts from the CSR index must match sums over
+    !       the corresponding slices of the get_value array.
+    ! Why:  Reporting aggregates over sub-basins through this call every
+    !       step instead of copying whole grids out.
+    ! ------------------------------------------------------------------------
+    allocate(zone_cells(n))
+    zone_cells = [(i - 1, i = 1, n)]
+    status = model%get_value_zonal(trim(output_var_list(1)), [0, n / 2, n], &
+         zone_cells, [STAT_SUM, STAT_COUNT], zone_result)
+    call check_status(status, "T74: get_value_zonal(streamflow)", &
+         test_count, pass_count, fail_count)
+    call check_true(abs(zone_result(1,1) - sum(values(1:n/2))) <= &
+         1.0d-9 * max(1.0d0, abs(sum(values(1:n/2)))) .and. &
+         abs(zone_result(2,1) - sum(values(n/2+1:n))) <= &
+         1.0d-9 * max(1.0d0, abs(sum(values(n/2+1:n)))), &
+         "T74b: zone sums match get_value slices", &
+         test_count, pass_count, fail_count)
+    call check_true(nint(zone_result(1,2)) == n / 2 .and. &
+         nint(zone_result(2,2)) == n - n / 2, &
+         "T74c: zone counts match", test_count, pass_count, fail_count)
+
+    zone_cells(1) = n
+    status = model%get_value_zonal(trim(output_var_list(1)), [0, n / 2, n], &
+         zone_cells, [STAT_SUM], zone_result)
+    call check_true(status == BMI_FAILURE, &
+         "T74d: get_value_zonal(cell out of range) returns BMI_FAILURE", &
+         test_count, pass_count, fail_count)
+    deallocate(zone_cells)
+
+    deallocate(values)
+  end if
+
+  ! --------------------------------------------------------------------------
+  ! TEST: channel_link__id, feature-ID lookup and the gauge ring buffer
+  ! --------------------------------------------------------------------------
+  ! What: Read the link IDs, map them back to positions, register two
+  !       gauges, run two steps and drain the recorded flows.
+  ! Why:  Operational users address links by NWM feature ID and want the
+  !       flow at a few hundred gauges per step, not whole-network copies.
+  ! --------------------------------------------------------------------------
+  status = model%get_var_grid("channel_link__id", grid_id)
+  status = model%get_grid_size(grid_id, n)
+  if (n > 0) then
+    allocate(link_ids(n), link_pos(n), values(n))
+
+    status = model%get_value_int("channel_link__id", link_ids)
+    call check_status(status, "T75: get_value_int(channel_link__id)", &
+         test_count, pass_count, fail_count)
+
+    ! An ID beyond a default integer must fail, not wrap
+    rt_domain(1)%LINKID(1) = int(huge(0), int64) + 1
+    status = model%get_value_int("channel_link__id", link_pos)
+    call check_true(status == BMI_FAILURE, &
+         "T75a: get_value_int rejects a feature ID above huge(0)", &
+         test_count, pass_count, fail_count)
+    rt_domain(1)%LINKID(1) = int(link_ids(1), int64)
+
+    status = model%get_link_positions(int(link_ids, int64), link_pos)
+    call check_true(status == BMI_SUCCESS .and. &
+         all(link_pos == [(i - 1, i = 1, n)]), &
+         "T75b: get_link_positions maps each ID to its position", &
+         test_count, pass_count, fail_count)
+
+    status = model%get_link_positions([maxval(int(link_ids, int64)) + 1], &
+         link_pos(1:1))
+    call check_true(link_pos(1) == -1, &
+         "T75c: unknown feature ID maps to -1", &
+         test_count, pass_count, fail_count)
+
+    status = model%register_gauges(int([link_ids(n), link_ids(1)], int64), 4)
+    call check_status(status, "T75d: register_gauges", &
+         test_count, pass_count, fail_count)
+    status = model%update()
+    status = model%update()
+    status = model%get_value_double("channel_water__volume_flow_rate", values)
+    status = model%drain_gauges(gauge_values, gauge_times, gauge_count)
+    call check_true(status == BMI_SUCCESS .and. gauge_count == 2, &
+         "T75e: two records after two updates", &
+         test_count, pass_count, fail_count)
+    call check_true(gauge_values(3) == values(n) .and. &
+         gauge_values(4) == values(1), &
+         "T75f: latest record matches get_value at the gauges", &
+         test_count, pass_count, fail_count)
+
+    write(0,*) "       Gauge times =", gauge_times(1:gauge_count)
+
+    deallocate(link_ids, link_pos, values)
+  end if
+
+  ! --------------------------------------------------------------------------
+  ! TEST: channel connectivity through get_grid_edge_nodes (grid 2)
+  ! --------------------------------------------------------------------------
+  ! What: Every edge joins two distinct valid links, and no link has two
+  !       downstream links.
+  ! Why:  Network kernels (accumulation, tracing) are built on these edges.
+  ! --------------------------------------------------------------------------
+  status = model%get_grid_node_count(2, n)
+  status = model%get_grid_edge_count(2, edge_count)
+  call check_true(status == BMI_SUCCESS .and. edge_count >= 0 .and. &
+       edge_count < max(n, 1), &
+       "T76: channel edge count is below the link count", &
+       test_count, pass_count, fail_count)
+  if (edge_count > 0) then
+    allocate(edge_nodes(2 * edge_count), link_pos(n))
+    status = model%get_grid_edge_nodes(2, edge_nodes)
+    call check_status(status, "T76b: get_grid_edge_nodes(channel)", &
+         test_count, pass_count, fail_count)
+    call check_true(all(edge_nodes >= 0 .and. edge_nodes < n) .and. &
+         all(edge_nodes(1::2) /= edge_nodes(2::2)), &
+         "T76c: edges join two distinct links", &
+         test_count, pass_count, fail_count)
+    link_pos = 0
+    do i = 1, edge_count
+      link_pos(edge_nodes(2 * i - 1) + 1) = link_pos(edge_nodes(2 * i - 1) + 1) + 1
+    end do
+    call check_true(all(link_pos <= 1), &
+         "T76d: each link drains into at most one link", &
+         test_count, pass_count, fail_count)
+    write(0,*) "       Channel edges =", edge_count, " links =", n
+    deallocate(edge_nodes, link_pos)
+  end if
+
+  ! --------------------------------------------------------------------------
+  ! TEST: intercommunicator exchange (send_value / recv_value)
+  ! --------------------------------------------------------------------------
+  ! What: Without an intercommunicator send_value fails. With
+  !       MPI_COMM_SELF as the "partner", a field sent to rank 0 comes
+  !       back through recv_value and wait_exchanges applies it.
+  ! Why:  MPMD coupling moves fields between executables over MPI, with
+  !       the library owning the buffers until the exchange completes.
+  ! --------------------------------------------------------------------------
+  status = model%send_value("sea_water_surface__elevation", 0, 7)
+  call check_true(status == BMI_FAILURE, &
+       "T77: send_value without an intercommunicator fails", &
+       test_count, pass_count, fail_count)
+  status = model%wait_exchanges()
+  call check_status(status, "T77b: wait_exchanges with nothing pending", &
+       test_count, pass_count, fail_count)
+
+  status = model%set_intercomm(MPI_COMM_SELF)
+  call check_status(status, "T77c: set_intercomm(MPI_COMM_SELF)", &
+       test_count, pass_count, fail_count)
+  status = model%get_var_grid("sea_water_surface__elevation", grid_id)
+  status = model%get_grid_size(grid_id, n)
+  allocate(values(n))
+  values = [(0.5d0 * i, i = 1, n)]
+  status = model%set_value("sea_water_surface__elevation", values)
+  status = model%send_value("sea_water_surface__elevation", 0, 7)
+  call check_status(status, "T77d: send_value to rank 0", &
+       test_count, pass_count, fail_count)
+  values = -1.0d0
+  status = model%set_value("sea_water_surface__elevation", values)
+  status = model%recv_value("sea_water_surface__elevation", 0, 7)
+  call check_status(status, "T77e: recv_value from rank 0", &
+       test_count, pass_count, fail_count)
+  status = model%recv_value("channel_link__id", 0, 8)
+  call check_true(status == BMI_FAILURE, &
+       "T77f: recv_value rejects a non-double variable", &
+       test_count, pass_count, fail_count)
+  status = model%wait_exchanges()
+  status = model%get_value("sea_water_surface__elevation", values)
+  call check_true(status == BMI_SUCCESS .and. &
+       all(values == [(0.5d0 * i, i = 1, n)]), &
+       "T77g: wait_exchanges applies the received field", &
+       test_count, pass_count, fail_count)
+  deallocate(values)
+
+  ! --------------------------------------------------------------------------
+  ! TEST: decomposed access on a single rank (tiles, local and global)
+  ! --------------------------------------------------------------------------
+  ! What: On one rank the tile is the whole grid, and get_value_local,
+  !       get_value_global and get_value_at_global_indices all agree with
+  !       get_value.
+  ! Why:  Under mpirun -np N these gather the rank tiles; with one rank
+  !       they must reduce to the plain BMI calls.
+  ! --------------------------------------------------------------------------
+  status = model%get_decomposition(i, j)
+  call check_true(status == BMI_SUCCESS .and. i == 0 .and. j == 1, &
+       "T78: get_decomposition on one rank is (0, 1)", &
+       test_count, pass_count, fail_count)
+  status = model%get_var_grid("soil_water__volume_fraction", grid_id)
+  if (allocated(grid_shape_arr)) deallocate(grid_shape_arr)
+  allocate(grid_shape_arr(2))
+  status = model%get_grid_shape(grid_id, grid_shape_arr)
+  status = model%get_grid_tile(grid_id, tile)
+  call check_true(status == BMI_SUCCESS .and. &
+       all(tile == [0, 0, grid_shape_arr(1), grid_shape_arr(2)]), &
+       "T78b: the tile is the whole grid", &
+       test_count, pass_count, fail_count)
+  status = model%get_grid_global_shape(grid_id, tile(1:2))
+  call check_true(status == BMI_SUCCESS .and. &
+       all(tile(1:2) == grid_shape_arr(1:2)), &
+       "T78c: global shape equals the grid shape", &
+       test_count, pass_count, fail_count)
+  status = model%get_grid_size(grid_id, n)
+  allocate(values(n), gathered(n))
+  status = model%get_value("soil_water__volume_fraction", values)
+  status = model%get_value_global("soil_water__volume_fraction", &
+       gathered, -1)
+  call check_true(status == BMI_SUCCESS .and. all(gathered == values), &
+       "T78d: get_value_global matches get_value", &
+       test_count, pass_count, fail_count)
+  gathered = 0.0d0
+  status = model%get_value_local("soil_water__volume_fraction", gathered)
+  call check_true(status == BMI_SUCCESS .and. all(gathered == values), &
+       "T78e: get_value_local matches get_value", &
+       test_count, pass_count, fail_count)
+  status = model%get_value_at_global_indices("soil_water__volume_fraction", &
+       gathered(1:3), [n - 1, 0, n])
+  call check_true(status == BMI_SUCCESS .and. &
+       gathered(1) == values(n) .and. gathered(2) == values(1) .and. &
+       gathered(3) == -1.0d0, &
+       "T78f: global indices map to local cells, out of range gives -1", &
+       test_count, pass_count, fail_count)
+  deallocate(values, gathered)
+
+  ! finalize completes exchanges still pending, before it frees the
+  ! coupling fields their receives land in
+  status = model%get_var_grid("sea_water_surface__elevation", grid_id)
+  status = model%get_grid_size(grid_id, n)
+  allocate(values(n))
+  values = 1.0d0
+  status = model%set_value("sea_water_surface__elevation", values)
+  status = model%send_value("sea_water_surface__elevation", 0, 9)
+  status = model%recv_value("sea_water_surface__elevation", 0, 9)
+  deallocate(values)
+  status = model%finalize()
+  call check_status(status, "T78g: finalize completes pending exchanges", &
+       test_count, pass_count, fail_count)
+
+  write(0,*)
+
   ! ==========================================================================
   ! FINAL SUMMARY
   ! ==========================================================================
@@ -0,0 +1,130 @@
+#!/usr/bin/env bash
+# =============================================================================
+# benchmark.sh -- Strong/weak scaling benchmark for pymt_wrfhydro under MPI
+#
+# Runs python -m pymt_wrfhydro.benchmark on 1..MAX_NP ranks of this machine
+# (mpirun --oversubscribe, as in validate.sh) and tabulates the results:
+#   Strong scaling: the Croton case plus any STRONG_CASES, same domain on
+#                   every rank count
+#   Weak scaling:   WEAK_RUN_DIR with "{np}" replaced by the rank count,
+#                   i.e. a domain that grows with the ranks (optional)
+#   Synthetic:      SYNTHETIC_CELLS_PER_RANK routing cells per rank, written
+#                   by pymt_wrfhydro.synthetic (optional, no data needed)
+#
+# Usage:
+#   cd pymt_wrfhydro
+#   bash benchmark.sh
+#   MAX_NP=8 STEPS=24 STRONG_CASES="big=/data/big/run" bash benchmark.sh
+#   WEAK_RUN_DIR="/data/synthetic/np{np}/run" bash benchmark.sh
+#   SYNTHETIC_CELLS_PER_RANK=1000000 bash benchmark.sh
+#
+# Output: one JSON record per run plus scaling.json in RESULTS_DIR.
+# =============================================================================
+set -euo pipefail
+
+# ---------------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------------
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
+RUN_DIR="$PROJECT_ROOT/WRF_Hydro_Run_Local/run"
+
+MAX_NP="${MAX_NP:-$(nproc)}"
+STEPS="${STEPS:-6}"
+REPEAT="${REPEAT:-5}"
+RESULTS_DIR="${RESULTS_DIR:-$SCRIPT_DIR/benchmark_results}"
+STRONG_CASES="croton=$RUN_DIR ${STRONG_CASES:-}"
+WEAK_RUN_DIR="${WEAK_RUN_DIR:-}"
+SYNTHETIC_CELLS_PER_RANK="${SYNTHETIC_CELLS_PER_RANK:-}"
+
+# Activate conda environment if not already active
+if [[ "${CONDA_DEFAULT_ENV:-}" != "wrfhydro-bmi" ]]; then
+    echo "[benchmark.sh] Activating conda env: wrfhydro-bmi"
+    source ~/miniconda3/etc/profile.d/conda.sh
+    conda activate wrfhydro-bmi
+fi
+
+# Rank counts: powers of two up to MAX_NP, and MAX_NP itself
+NP_LIST=""
+np=1
+while [[ $np -lt $MAX_NP ]]; do
+    NP_LIST="$NP_LIST $np"
+    np=$((np * 2))
+done
+NP_LIST="$NP_LIST $MAX_NP"
+
+mkdir -p "$RESULTS_DIR"
+
+echo "======================================================================"
+echo "  pymt_wrfhydro Scaling Benchmark"
+echo "======================================================================"
+echo "  Rank counts: $NP_LIST"
+echo "  Steps: $STEPS   Repeats per read: $REPEAT"
+echo "  Results: $RESULTS_DIR"
+echo "======================================================================"
+
+run_case() {
+    local np=$1 case=$2 dir=$3 series=${4:-}
+    echo ""
+    echo "  [np=$np] $case: $dir"
+    local extra=()
+    if [[ -n "$series" ]]; then
+        extra=(--series "$series")
+    fi
+    mpirun --oversubscribe -np "$np" python -m pymt_wrfhydro.benchmark run \
+        --run-dir "$dir" --case "$case" --steps "$STEPS" --repeat "$REPEAT" \
+        --output "$RESULTS_DIR/${case}_np${np}.json" "${extra[@]}" \
+        > "$RESULTS_DIR/${case}_np${np}.log" 2>&1 \
+        || echo "  >>> FAILED (see $RESULTS_DIR/${case}_np${np}.log)"
+}
+
+# ---------------------------------------------------------------------------
+# Strong scaling: fixed domains
+# ---------------------------------------------------------------------------
+for spec in $STRONG_CASES; do
+    case_name="${spec%%=*}"
+    case_dir="${spec#*=}"
+    if [[ ! -d "$case_dir" ]]; then
+        echo "  WARNING: run directory not found, skipping $case_name: $case_dir"
+        continue
+    fi
+    for np in $NP_LIST; do
+        run_case "$np" "$case_name" "$case_dir"
+    done
+done
+
+# ---------------------------------------------------------------------------
+# Weak scaling: one domain per rank count
+# ---------------------------------------------------------------------------
+if [[ -n "$WEAK_RUN_DIR" ]]; then
+    for np in $NP_LIST; do
+        case_dir="${WEAK_RUN_DIR//\{np\}/$np}"
+        if [[ ! -d "$case_dir" ]]; then
+            echo "  WARNING: no weak-scaling domain for np=$np: $case_dir"
+            continue
+        fi
+        run_case "$np" "weak_np$np" "$case_dir" weak
+    done
+fi
+
+# ---------------------------------------------------------------------------
+# Weak scaling on synthetic domains (parameter tables from the Croton run)
+# ---------------------------------------------------------------------------
+if [[ -n "$SYNTHETIC_CELLS_PER_RANK" ]]; then
+    for np in $NP_LIST; do
+        case_dir="$RESULTS_DIR/synthetic/np$np"
+        python -m pymt_wrfhydro.synthetic "$case_dir" \
+            --cells "$((SYNTHETIC_CELLS_PER_RANK * np))" \
+            --hours "$STEPS" --tables-dir "$RUN_DIR"
+        run_case "$np" "synthetic_np$np" "$case_dir" synthetic
+    done
+fi
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+echo ""
+echo "======================================================================"
+echo "  SCALING SUMMARY"
+echo "======================================================================"
+python -m pymt_wrfhydro.benchmark report "$RESULTS_DIR"
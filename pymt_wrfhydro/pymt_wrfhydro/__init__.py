@@ -1,44 +1,57 @@
-"""PyMT plugin for WRF-Hydro hydrological model."""
+"""PyMT plugin for WRF-Hydro hydrological model.
+
+Importing the package loads neither MPI nor the WRF-Hydro library, so
+tools that only need metadata, the mock model or the pure-Python helpers
+start at once. Both are brought up by the first ``WrfHydroBmi()`` (or
+:func:`bootstrap`); ``PYMT_WRFHYDRO_MPI`` picks between mpi4py and serial
+mode (see :mod:`pymt_wrfhydro._bootstrap`).
+"""
 import sys
-import ctypes
-
-# MPI bootstrap: must happen BEFORE Cython extension loads libbmiwrfhydrof.so
-# Open MPI 5.0.8 requires RTLD_GLOBAL for its plugin system to resolve symbols.
-# Without this, loading libbmiwrfhydrof.so (which links libmpi) causes segfaults.
-_old_dlopen_flags = sys.getdlopenflags()
-sys.setdlopenflags(_old_dlopen_flags | ctypes.RTLD_GLOBAL)
-
-try:
-    from mpi4py import MPI  # noqa: F401
-except ImportError:
-    sys.setdlopenflags(_old_dlopen_flags)  # restore before raising
-    raise ImportError(
-        "pymt_wrfhydro requires mpi4py for MPI support.\n"
-        "Install with: conda install -c conda-forge mpi4py\n"
-        "or: pip install mpi4py"
-    )
-
-sys.setdlopenflags(_old_dlopen_flags)  # restore after MPI is loaded
-
-# Version from package metadata (replaces deprecated pkg_resources)
-from importlib.metadata import version as _get_version
-__version__ = _get_version("pymt_wrfhydro")
-__bmi_version__ = "2.0"
 
-# NOW safe to import the Cython extension (triggers libbmiwrfhydrof.so load)
 from .bmi import WrfHydroBmi
 
-__all__ = ["WrfHydroBmi"]
+__bmi_version__ = "2.0"
+
+__all__ = ["WrfHydroBmi", "bootstrap"]
+
+
+def __getattr__(name):
+    # importlib.metadata is slow to import; only look the version up if asked
+    if name == "__version__":
+        from importlib.metadata import version as _get_version
+
+        globals()["__version__"] = _get_version("pymt_wrfhydro")
+        return globals()["__version__"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def bootstrap(mpi=None):
+    """Start MPI and load the WRF-Hydro library now instead of on first use.
+
+    *mpi* is ``"auto"``, ``"mpi4py"`` or ``"serial"`` and overrides
+    ``PYMT_WRFHYDRO_MPI``; it has no effect once the library is loaded.
+    Returns the mode in use.
+    """
+    from . import _bootstrap
+
+    _bootstrap.start_mpi(mpi)
+    from . import lib  # noqa: F401
+
+    return _bootstrap.mode()
 
 
 def info():
     """Print debugging information about pymt_wrfhydro installation."""
-    print(f"pymt_wrfhydro version: {__version__}")
+    from . import _bootstrap
+
+    print(f"pymt_wrfhydro version: {sys.modules[__name__].__version__}")
     print(f"BMI version: {__bmi_version__}")
     print(f"Python: {sys.version}")
-    try:
-        from mpi4py import MPI as _MPI
+    print(f"MPI mode: {_bootstrap.mode() or 'not started'}")
+    # Importing mpi4py here would start MPI ahead of the bootstrap
+    _MPI = sys.modules.get("mpi4py.MPI")
+    if _MPI is not None:
         lib_ver = _MPI.Get_library_version()
         print(f"mpi4py: {lib_ver.split(chr(10))[0][:70]}...")
-    except Exception:
-        print("mpi4py: not available")
+    else:
+        print("mpi4py: not loaded")
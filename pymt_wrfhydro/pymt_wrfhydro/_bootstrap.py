@@ -0,0 +1,125 @@
+"""Bring up MPI before the compiled extension loads.
+
+``libbmiwrfhydrof.so`` links ``libmpi``, and Open MPI's plugins resolve
+symbols from it only if it was loaded with ``RTLD_GLOBAL``; loading it
+otherwise segfaults. :func:`start_mpi` runs once, from
+``pymt_wrfhydro.lib`` just before the extension is imported, in one of two
+modes chosen by the ``PYMT_WRFHYDRO_MPI`` environment variable:
+
+``mpi4py``
+    Import mpi4py (which initializes MPI) with ``RTLD_GLOBAL``. Needed for
+    communicators from Python: several ranks, ``set_comm``, ensembles.
+``serial``
+    Skip mpi4py. The extension itself is loaded with ``RTLD_GLOBAL`` and
+    WRF-Hydro initializes MPI on the first ``initialize``, as the
+    standalone executable does. MPI is finalized at exit.
+``auto`` (default)
+    ``mpi4py`` if mpi4py is already imported or an MPI launcher started
+    more than one rank, ``serial`` otherwise.
+"""
+import atexit
+import contextlib
+import ctypes
+import os
+import sys
+
+MODES = ("auto", "mpi4py", "serial")
+
+# Set by MPI launchers to the number of ranks they started
+_SIZE_VARIABLES = ("OMPI_COMM_WORLD_SIZE", "PMI_SIZE", "MPI_LOCALNRANKS",
+                   "SLURM_NTASKS", "MV2_COMM_WORLD_SIZE")
+
+_mode = None
+
+
+def mode():
+    """The mode MPI was started in, or None before the extension loads."""
+    return _mode
+
+
+def _launched_ranks():
+    for name in _SIZE_VARIABLES:
+        try:
+            return int(os.environ[name])
+        except (KeyError, ValueError):
+            continue
+    return 1
+
+
+def _choose(requested):
+    requested = requested or os.environ.get("PYMT_WRFHYDRO_MPI") or "auto"
+    if requested not in MODES:
+        raise ValueError(
+            f"PYMT_WRFHYDRO_MPI must be one of {', '.join(MODES)}, "
+            f"not {requested!r}"
+        )
+    if requested != "auto":
+        return requested
+    if "mpi4py" in sys.modules or _launched_ranks() > 1:
+        return "mpi4py"
+    return "serial"
+
+
+@contextlib.contextmanager
+def dlopen_global():
+    """Load shared libraries with ``RTLD_GLOBAL`` inside the block."""
+    old_flags = sys.getdlopenflags()
+    sys.setdlopenflags(old_flags | ctypes.RTLD_GLOBAL)
+    try:
+        yield
+    finally:
+        sys.setdlopenflags(old_flags)
+
+
+def start_mpi(requested=None):
+    """Prepare MPI for the extension and return the mode used.
+
+    Later calls return the mode of the first one.
+    """
+    global _mode
+
+    if _mode is not None:
+        return _mode
+    chosen = _choose(requested)
+    if chosen == "mpi4py":
+        with dlopen_global():
+            try:
+                from mpi4py import MPI  # noqa: F401
+            except ImportError:
+                raise ImportError(
+                    "pymt_wrfhydro requires mpi4py for MPI support.\n"
+                    "Install with: conda install -c conda-forge mpi4py\n"
+                    "or: pip install mpi4py\n"
+                    "Single-rank runs work without it with "
+                    "PYMT_WRFHYDRO_MPI=serial."
+                ) from None
+    else:
+        atexit.register(_finalize_mpi)
+    _mode = chosen
+    return _mode
+
+
+def import_mpi4py():
+    """Return ``mpi4py.MPI`` for code that needs communicators.
+
+    Before the extension loads this fixes the mode to ``mpi4py``, so
+    mpi4py, not WRF-Hydro, starts MPI.
+    """
+    if _mode is None:
+        start_mpi("mpi4py")
+    with dlopen_global():
+        from mpi4py import MPI
+    return MPI
+
+
+def _finalize_mpi():
+    """Finalize MPI if WRF-Hydro started it and nobody else finished it."""
+    try:
+        libmpi = ctypes.CDLL(None)
+        initialized, finalized = ctypes.c_int(0), ctypes.c_int(0)
+        libmpi.MPI_Initialized(ctypes.byref(initialized))
+        libmpi.MPI_Finalized(ctypes.byref(finalized))
+        if initialized.value and not finalized.value:
+            libmpi.MPI_Finalize()
+    except (AttributeError, OSError):
+        pass
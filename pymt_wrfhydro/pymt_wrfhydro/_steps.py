@@ -0,0 +1,58 @@
+"""The ``iter_steps`` loop, shared by the model and its stand-ins.
+
+:class:`~pymt_wrfhydro.WrfHydroBmi` and the mock, isolated, published and
+replayed models all expose ``iter_steps``; each delegates to
+:func:`iter_steps`, which drives any object with the BMI time, update and
+value methods.
+"""
+import numpy as np
+
+__all__ = ["iter_steps"]
+
+
+def iter_steps(model, var_names, until=None, every=1, copy=False,
+               ring_size=2):
+    """Advance *model* and yield ``(time, {name: values})`` as it goes.
+
+    Each iteration runs *every* updates (fewer on the last one if
+    *until* falls in between) and then reads *var_names*. Runs until
+    the model reaches *until*, or its end time if *until* is None.
+
+    Values are read into a ring of *ring_size* preallocated buffer
+    sets, so no arrays are allocated per step: the arrays yielded by
+    one iteration stay valid for the next ``ring_size - 1`` iterations
+    and are then overwritten. Pass ``copy=True`` to get fresh arrays
+    that are safe to keep.
+    """
+    if isinstance(var_names, str):
+        var_names = [var_names]
+    if every < 1:
+        raise ValueError("every must be at least 1")
+    if ring_size < 1:
+        raise ValueError("ring_size must be at least 1")
+
+    ring = [
+        {name: np.empty(model.get_grid_size(model.get_var_grid(name)),
+                        dtype=model.get_var_type(name))
+         for name in var_names}
+        for _ in range(ring_size)
+    ]
+    end_time = model.get_end_time() if until is None else until
+    half_step = 0.5 * model.get_time_step()
+    time = model.get_current_time()
+    slot = 0
+
+    while time + half_step <= end_time:
+        for _ in range(every):
+            if time + half_step > end_time:
+                break
+            model.update()
+            time = model.get_current_time()
+        buffers = ring[slot]
+        slot = (slot + 1) % ring_size
+        for name, buffer in buffers.items():
+            model.get_value(name, buffer)
+        if copy:
+            yield time, {name: buffer.copy() for name, buffer in buffers.items()}
+        else:
+            yield time, buffers
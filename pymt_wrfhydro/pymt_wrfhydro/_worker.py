@@ -0,0 +1,236 @@
+"""Model processes of :class:`pymt_wrfhydro.coupler.Coupler` and
+:class:`pymt_wrfhydro.isolated.IsolatedWrfHydroBmi`.
+
+:func:`serve` runs in a child process. It owns one BMI model and obeys
+commands from the coupler over a pipe. Exchanged fields never go through
+the pipe: they are read from and written to shared memory, which the
+coupler allocates with two slots per field so that one model can write the
+next snapshot while the other still reads the current one.
+
+:func:`serve_model` hosts one model behind an isolated proxy and runs any
+method the proxy forwards; variable values again travel through shared
+memory.
+"""
+import importlib
+import os
+import sys
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def create_model(factory):
+    """Instantiate a model from a class or a ``"module:Class"`` string."""
+    if isinstance(factory, str):
+        module, _, name = factory.partition(":")
+        factory = getattr(importlib.import_module(module), name)
+    return factory()
+
+
+class SharedField:
+    """An array in shared memory with *slots* rows of *size* elements.
+
+    The coupler double-buffers its fields (two slots); an isolated model
+    needs one.
+    """
+
+    def __init__(self, name, size, dtype, slots=2, create=False):
+        dtype = np.dtype(dtype)
+        nbytes = max(slots * size * dtype.itemsize, 1)
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.size = size
+        self.dtype = dtype
+        self.slots = np.ndarray((slots, size), dtype=dtype, buffer=self.shm.buf)
+
+    @property
+    def spec(self):
+        """What another process needs to attach to this field."""
+        return self.shm.name, self.size, self.dtype.str, len(self.slots)
+
+    def close(self, unlink=False):
+        del self.slots
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _describe(model, exports):
+    return {
+        field: (model.get_grid_size(model.get_var_grid(name)),
+                np.dtype(model.get_var_type(name)).str)
+        for field, name in exports
+    }
+
+
+def serve(conn, spec, exports, imports):
+    """Run one model under the coupler's commands.
+
+    Parameters
+    ----------
+    conn : multiprocessing.connection.Connection
+        Pipe to the coupler.
+    spec : ModelSpec
+        What model to create and how to initialize it.
+    exports : sequence of (str, str)
+        ``(field, var_name)``: output variables this model publishes, and
+        the shared fields they go to.
+    imports : sequence of (str, str, callable or None)
+        ``(field, var_name, transform)``: the shared *field* is
+        transformed and passed to ``set_value(var_name, ...)``.
+
+    Commands are tuples; every command is answered with ``("ok", result)``
+    or, if it raised, ``("error", traceback)``:
+
+    * ``("attach", {field: spec})``: map the shared fields of both models,
+      given their :attr:`SharedField.spec`.
+    * ``("advance", until, read_slot, write_slot)``: set imports from
+      *read_slot* (skipped if None), ``update_until(until)`` (skipped if
+      None) and write exports to *write_slot*. Returns the model time.
+    * ``("finalize",)``: finalize the model and exit.
+    """
+    fields = {}
+    try:
+        if spec.run_dir:
+            os.chdir(spec.run_dir)
+        model = create_model(spec.factory)
+        model.initialize(spec.config_file)
+        conn.send(("ok", {
+            "start_time": model.get_start_time(),
+            "end_time": model.get_end_time(),
+            "time_step": model.get_time_step(),
+            "time_units": model.get_time_units(),
+            "exports": _describe(model, exports),
+        }))
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+        return
+
+    try:
+        while True:
+            command, *args = conn.recv()
+            if command == "finalize":
+                break
+            try:
+                if command == "attach":
+                    for field, field_spec in args[0].items():
+                        fields[field] = SharedField(*field_spec)
+                    result = None
+                elif command == "advance":
+                    result = _advance(model, fields, exports, imports, *args)
+                else:
+                    raise ValueError(f"unknown command: {command!r}")
+            except Exception:
+                conn.send(("error", traceback.format_exc()))
+            else:
+                conn.send(("ok", result))
+    finally:
+        for field in fields.values():
+            field.close()
+
+    try:
+        model.finalize()
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+    else:
+        conn.send(("ok", None))
+
+
+def _advance(model, fields, exports, imports, until, read_slot, write_slot):
+    if read_slot is not None:
+        for field, var_name, transform in imports:
+            values = fields[field].slots[read_slot]
+            if transform is not None:
+                values = transform(values)
+            dtype = model.get_var_type(var_name)
+            model.set_value(var_name, np.ascontiguousarray(values, dtype=dtype))
+    if until is not None:
+        model.update_until(until)
+    for field, var_name in exports:
+        model.get_value(var_name, fields[field].slots[write_slot])
+    return model.get_current_time()
+
+
+# Set by an MPI launcher for the parent; a worker is a job of its own
+_LAUNCHER_ENV = ("OMPI_", "PMIX_", "PMI_", "HYDRA_", "MPI_LOCALRANKID")
+
+
+def serve_model(conn, factory):
+    """Host one model for an isolated proxy.
+
+    Commands are tuples answered with ``("ok", result)`` or, if they
+    raised, ``("error", (exception, traceback))``:
+
+    * ``("call", method, args, kwds)``: return ``model.method(*args,
+      **kwds)``.
+    * ``("attach", var_name, spec)``: map the shared field that carries
+      *var_name*, given its :attr:`SharedField.spec`.
+    * ``("get", var_name)``: ``get_value`` into slot 0 of its field.
+    * ``("set", var_name)``: ``set_value`` from slot 0 of its field.
+    * ``("detach",)``: unmap every field (before a re-initialize).
+    * ``("exit",)``: stop serving.
+    """
+    for key in list(os.environ):
+        if key.startswith(_LAUNCHER_ENV):
+            del os.environ[key]
+
+    fields = {}
+    try:
+        model = create_model(factory)
+    except Exception as error:
+        conn.send(("error", (error, traceback.format_exc())))
+        return
+    conn.send(("ok", None))
+
+    try:
+        while True:
+            try:
+                command, *args = conn.recv()
+            except EOFError:
+                break
+            if command == "exit":
+                conn.send(("ok", None))
+                break
+            try:
+                result = None
+                if command == "call":
+                    method, call_args, kwds = args
+                    result = getattr(model, method)(*call_args, **kwds)
+                elif command == "attach":
+                    var_name, field_spec = args
+                    if var_name in fields:
+                        fields.pop(var_name).close()
+                    fields[var_name] = SharedField(*field_spec)
+                elif command == "get":
+                    model.get_value(args[0], fields[args[0]].slots[0])
+                elif command == "set":
+                    model.set_value(args[0], fields[args[0]].slots[0])
+                elif command == "detach":
+                    for field in fields.values():
+                        field.close()
+                    fields.clear()
+                else:
+                    raise ValueError(f"unknown command: {command!r}")
+            except Exception as error:
+                conn.send(("error", (_picklable(error),
+                                     traceback.format_exc())))
+            else:
+                conn.send(("ok", result))
+    finally:
+        for field in fields.values():
+            field.close()
+        sys.stdout.flush()
+
+
+def _picklable(error):
+    """*error*, or a RuntimeError with its message if it will not pickle."""
+    import pickle
+
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
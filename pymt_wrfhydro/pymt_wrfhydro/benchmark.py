@@ -0,0 +1,302 @@
+"""Strong- and weak-scaling benchmarks for MPI runs.
+
+Two steps, usually driven by ``benchmark.sh``:
+
+``mpirun --oversubscribe -np N python -m pymt_wrfhydro.benchmark run ...``
+    Runs one case on N ranks. It times ``initialize``, ``update_until``
+    and reading each variable in several ways: ``get_value`` on the
+    rank-local array (each read the first of its step, so the per-step
+    cache does not answer it), ``get_value_local``, and
+    ``get_value_global`` onto rank 0 and onto every rank. Each rank times
+    its own share; phases start together after a barrier, so the slowest
+    rank gives the wall time. Rank 0 writes one JSON record with every
+    rank's times and peak memory.
+
+``python -m pymt_wrfhydro.benchmark report RESULTS_DIR``
+    Reads the records and prints strong-scaling tables (one case, growing
+    N) and weak-scaling tables (a series of cases whose domain grows with
+    N, tagged with ``--series``). It also writes them to ``scaling.json``.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+
+__all__ = ["run_case", "strong_scaling", "weak_scaling", "format_table"]
+
+DEFAULT_VARS = (
+    "channel_water__volume_flow_rate",
+    "land_surface_water__depth",
+    "soil_water__volume_fraction",
+)
+PHASES = ("initialize", "update_until")
+READS = ("get_value", "get_value_local", "gather_root", "gather_all")
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process (ru_maxrss is KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _summary(per_rank):
+    per_rank = [float(t) for t in per_rank]
+    return {
+        "max": max(per_rank),
+        "mean": sum(per_rank) / len(per_rank),
+        "min": min(per_rank),
+        "per_rank": per_rank,
+    }
+
+
+def run_case(run_dir, case, steps=6, var_names=DEFAULT_VARS, repeat=5,
+             series=None, comm=None, factory=None):
+    """Benchmark one WRF-Hydro run directory on every rank of *comm*.
+
+    Collective. Returns the record on rank 0 and None elsewhere.
+    """
+    from ._bootstrap import import_mpi4py
+
+    MPI = import_mpi4py()
+
+    comm = MPI.COMM_WORLD if comm is None else comm
+    if factory is None:
+        from .bmi import WrfHydroBmi as factory
+
+    # One config file for all ranks, written before anyone reads it
+    config_file = os.path.join(run_dir, "bmi_config_bench.nml")
+    if comm.rank == 0:
+        with open(config_file, "w") as nml:
+            nml.write("&bmi_wrf_hydro_config\n")
+            nml.write(f'  wrfhydro_run_dir = "{os.path.abspath(run_dir)}/"\n')
+            nml.write("/\n")
+    comm.Barrier()
+
+    model = factory()
+    times = {}
+
+    def timed(phase, func, n=1, setup=None):
+        if setup is None:
+            comm.Barrier()
+            start = time.perf_counter()
+            for _ in range(n):
+                func()
+            times[phase] = (time.perf_counter() - start) / n
+            return
+        total = 0.0
+        for _ in range(n):
+            setup()
+            comm.Barrier()
+            start = time.perf_counter()
+            func()
+            total += time.perf_counter() - start
+        times[phase] = total / n
+
+    def new_step():
+        # A zero-length update_until marks the per-step value cache stale
+        # without advancing, so every timed get_value reads from Fortran
+        model.update_until(model.get_current_time())
+
+    timed("initialize", lambda: model.initialize(config_file))
+    until = model.get_start_time() + steps * model.get_time_step()
+    timed("update_until", lambda: model.update_until(until))
+
+    reads = {}
+    grids = {}
+    for name in var_names:
+        grid = model.get_var_grid(name)
+        buffer = np.empty(model.get_grid_size(grid),
+                          dtype=model.get_var_type(name))
+        timed("get_value", lambda: model.get_value(name, buffer), repeat,
+              setup=new_step)
+        timed("get_value_local", lambda: model.get_value_local(name), repeat)
+        timed("gather_root", lambda: model.get_value_global(name, root=0),
+              repeat)
+        timed("gather_all", lambda: model.get_value_global(name), repeat)
+        reads[name] = {phase: times.pop(phase) for phase in READS}
+        grids[name] = int(np.prod(model.get_grid_global_shape(grid)))
+
+    model.finalize()
+    gathered = comm.gather(
+        {"times": times, "reads": reads, "memory_mb": _peak_rss_mb()}, root=0
+    )
+    if comm.rank != 0:
+        return None
+
+    return {
+        "case": case,
+        "series": series,
+        "run_dir": os.path.abspath(run_dir),
+        "nprocs": comm.size,
+        "steps": steps,
+        "repeat": repeat,
+        "phases": {
+            phase: _summary([rank["times"][phase] for rank in gathered])
+            for phase in PHASES
+        },
+        "reads": {
+            name: dict(
+                {
+                    phase: _summary([rank["reads"][name][phase]
+                                     for rank in gathered])
+                    for phase in READS
+                },
+                global_size=grids[name],
+                gathered_bytes=8 * grids[name],
+            )
+            for name in var_names
+        },
+        "memory_mb": _summary([rank["memory_mb"] for rank in gathered]),
+    }
+
+
+def load_results(paths):
+    """Records from JSON files (or directories of them), skipping reports."""
+    records = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, "*.json")))
+        else:
+            files = [path]
+        for name in files:
+            if os.path.basename(name) == "scaling.json":
+                continue
+            with open(name) as fp:
+                records.append(json.load(fp))
+    return records
+
+
+def _row(record, base):
+    """Wall times of one record, with speedup and efficiency against *base*."""
+    row = {"nprocs": record["nprocs"]}
+    for phase in PHASES:
+        row[phase] = record["phases"][phase]["max"]
+    row["gather_all"] = sum(
+        read["gather_all"]["max"] for read in record["reads"].values()
+    )
+    row["memory_mb"] = record["memory_mb"]["max"]
+    row["speedup"] = base["phases"]["update_until"]["max"] / row["update_until"]
+    return row
+
+
+def strong_scaling(records):
+    """``{case: [row, ...]}`` for every case run on more than one rank count.
+
+    Speedup is the ``update_until`` time on the fewest ranks over the
+    time on N ranks; efficiency divides it by the rank ratio.
+    """
+    tables = {}
+    for case in sorted({record["case"] for record in records}):
+        runs = sorted(
+            (r for r in records if r["case"] == case and not r.get("series")),
+            key=lambda r: r["nprocs"],
+        )
+        if len(runs) < 2:
+            continue
+        rows = [_row(run, runs[0]) for run in runs]
+        for row in rows:
+            row["efficiency"] = row["speedup"] * runs[0]["nprocs"] / row["nprocs"]
+        tables[case] = rows
+    return tables
+
+
+def weak_scaling(records):
+    """``{series: [row, ...]}``: runs whose domain grows with the rank count.
+
+    Efficiency is the ``update_until`` time on the fewest ranks over the
+    time on N ranks (1.0 is perfect weak scaling).
+    """
+    tables = {}
+    for series in sorted({r["series"] for r in records if r.get("series")}):
+        runs = sorted(
+            (r for r in records if r.get("series") == series),
+            key=lambda r: r["nprocs"],
+        )
+        rows = [_row(run, runs[0]) for run in runs]
+        for row, run in zip(rows, runs):
+            row["case"] = run["case"]
+            row["efficiency"] = row.pop("speedup")
+        tables[series] = rows
+    return tables
+
+
+def format_table(rows, columns):
+    """Plain-text table of *rows* (dicts), one column per key in *columns*."""
+    def cell(value):
+        if isinstance(value, float):
+            return f"{value:.4g}"
+        return str(value)
+
+    body = [[cell(row.get(column, "")) for column in columns] for row in rows]
+    widths = [
+        max([len(column)] + [len(line[k]) for line in body])
+        for k, column in enumerate(columns)
+    ]
+    lines = ["  ".join(c.rjust(w) for c, w in zip(columns, widths))]
+    lines.append("  ".join("-" * w for w in widths))
+    lines.extend("  ".join(c.rjust(w) for c, w in zip(line, widths))
+                 for line in body)
+    return "\n".join(lines)
+
+
+_STRONG_COLUMNS = ("nprocs",) + PHASES + (
+    "gather_all", "memory_mb", "speedup", "efficiency")
+_WEAK_COLUMNS = ("nprocs", "case") + PHASES + (
+    "gather_all", "memory_mb", "efficiency")
+
+
+def report(paths, output=None):
+    """Print the scaling tables of the records in *paths*; save as JSON."""
+    records = load_results(paths)
+    tables = {"strong": strong_scaling(records), "weak": weak_scaling(records)}
+    for kind, columns in (("strong", _STRONG_COLUMNS), ("weak", _WEAK_COLUMNS)):
+        for name, rows in tables[kind].items():
+            print(f"\n{kind.capitalize()} scaling: {name} (wall seconds, "
+                  "slowest rank)")
+            print(format_table(rows, columns))
+    if output is not None:
+        with open(output, "w") as fp:
+            json.dump(tables, fp, indent=2)
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pymt_wrfhydro.benchmark",
+                                     description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="benchmark one case (under mpirun)")
+    run.add_argument("--run-dir", required=True)
+    run.add_argument("--case", required=True)
+    run.add_argument("--series", help="weak-scaling series this case belongs to")
+    run.add_argument("--steps", type=int, default=6)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--var", dest="var_names", action="append")
+    run.add_argument("--output", required=True)
+
+    rep = commands.add_parser("report", help="tabulate benchmark records")
+    rep.add_argument("paths", nargs="+")
+    rep.add_argument("--output")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        record = run_case(args.run_dir, args.case, steps=args.steps,
+                          var_names=args.var_names or DEFAULT_VARS,
+                          repeat=args.repeat, series=args.series)
+        if record is not None:
+            with open(args.output, "w") as fp:
+                json.dump(record, fp, indent=2)
+    else:
+        output = args.output
+        if output is None and os.path.isdir(args.paths[0]):
+            output = os.path.join(args.paths[0], "scaling.json")
+        report(args.paths, output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
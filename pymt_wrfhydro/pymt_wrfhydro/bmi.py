@@ -1,7 +1,59 @@
 from __future__ import absolute_import
 
-from .lib import WrfHydroBmi
+import sys
 
 __all__ = [
     "WrfHydroBmi",
 ]
+
+
+def _extension_class():
+    """The compiled class; the first call starts MPI and loads the library."""
+    from .lib import WrfHydroBmi
+
+    return WrfHydroBmi
+
+
+class _LazyBmiType(type):
+    """Stand in for the compiled class until it is needed.
+
+    Class attributes (method docstrings, ``help``) and ``isinstance``
+    checks are answered by the compiled class, loading it on first use.
+    """
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(_extension_class(), name)
+
+    def __instancecheck__(cls, instance):
+        if type.__instancecheck__(cls, instance):
+            return True
+        # Nothing can be an instance before the library is loaded
+        return ("pymt_wrfhydro.lib.wrfhydrobmi" in sys.modules
+                and isinstance(instance, _extension_class()))
+
+
+class WrfHydroBmi(metaclass=_LazyBmiType):
+    """The WRF-Hydro BMI.
+
+    Importing this class is cheap: MPI is started and the WRF-Hydro
+    library is loaded the first time an instance is created (see
+    :mod:`pymt_wrfhydro._bootstrap`).
+
+    Parameters
+    ----------
+    isolated : bool, optional
+        Run the model in a worker process of its own and return an
+        :class:`~pymt_wrfhydro.isolated.IsolatedWrfHydroBmi` proxy for it,
+        so that several instances can run at once.
+    """
+
+    METADATA = "data/WrfHydroBmi"
+
+    def __new__(cls, isolated=False):
+        if isolated:
+            from .isolated import IsolatedWrfHydroBmi
+
+            return IsolatedWrfHydroBmi()
+        return _extension_class()()
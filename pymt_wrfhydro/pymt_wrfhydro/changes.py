@@ -0,0 +1,153 @@
+"""Compact binary encoding for sparse per-step value changes.
+
+``WrfHydroBmi.get_value_changes`` returns the flat indices and new values
+of the elements that moved by more than a tolerance since they were last
+published. This module packs such a change set into a small byte string
+for transport to downstream consumers, and unpacks it on the other side.
+
+Wire format (all little-endian)::
+
+    header   magic b"WHDC", version (u1), index width (u1),
+             value dtype char (1 byte), pad (1 byte),
+             grid size (u8), change count (u8), model time (f8)
+    indices  gaps between consecutive sorted indices, first one absolute,
+             stored as unsigned integers of "index width" bytes
+    values   one item per change in the value dtype
+
+Gaps are small when changes cluster, so most change sets use 1- or 2-byte
+indices instead of 8.
+"""
+import struct
+
+import numpy as np
+
+__all__ = ["encode_changes", "decode_changes", "apply_changes"]
+
+MAGIC = b"WHDC"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sBBcxQQd")
+_INDEX_DTYPES = {1: "<u1", 2: "<u2", 4: "<u4", 8: "<u8"}
+
+
+def _index_width(max_gap):
+    for width in (1, 2, 4):
+        if max_gap < 1 << (8 * width):
+            return width
+    return 8
+
+
+def encode_changes(indices, values, grid_size, time=float("nan")):
+    """Pack a change set into bytes.
+
+    Parameters
+    ----------
+    indices : array_like of int
+        Flat, strictly increasing indices of the changed elements.
+    values : array_like
+        New values at *indices*.
+    grid_size : int
+        Number of elements in the full variable, so a consumer can size
+        its mirror array from the first message.
+    time : float, optional
+        Model time the change set belongs to.
+
+    Returns
+    -------
+    bytes
+        The encoded change set.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    values = np.asarray(values)
+
+    if indices.ndim != 1 or values.shape != indices.shape:
+        raise ValueError("indices and values must be 1D arrays of equal length")
+    if values.dtype.char not in "bhilqBHILQfd":
+        raise ValueError(f"unsupported value dtype: {values.dtype}")
+
+    gaps = np.diff(indices, prepend=0)
+    if len(gaps) and (gaps[0] < 0 or np.any(gaps[1:] <= 0)):
+        raise ValueError("indices must be non-negative and strictly increasing")
+    if len(indices) and indices[-1] >= grid_size:
+        raise ValueError("index out of range for grid_size")
+
+    width = _index_width(int(gaps.max()) if len(gaps) else 0)
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        width,
+        values.dtype.char.encode("ascii"),
+        int(grid_size),
+        len(indices),
+        float(time),
+    )
+
+    return b"".join(
+        [
+            header,
+            gaps.astype(_INDEX_DTYPES[width]).tobytes(),
+            values.astype(values.dtype.newbyteorder("<")).tobytes(),
+        ]
+    )
+
+
+def decode_changes(payload):
+    """Unpack a change set produced by :func:`encode_changes`.
+
+    Parameters
+    ----------
+    payload : bytes-like
+        The encoded change set.
+
+    Returns
+    -------
+    tuple of (ndarray, ndarray, int, float)
+        Flat indices, values, grid size and model time.
+    """
+    payload = memoryview(payload)
+    magic, version, width, char, grid_size, count, time = _HEADER.unpack_from(
+        payload
+    )
+    if magic != MAGIC:
+        raise ValueError("not a change set (bad magic)")
+    if version != VERSION:
+        raise ValueError(f"unsupported change set version: {version}")
+    if width not in _INDEX_DTYPES:
+        raise ValueError(f"bad index width: {width}")
+
+    value_dtype = np.dtype(char.decode("ascii")).newbyteorder("<")
+    offset = _HEADER.size
+    gaps = np.frombuffer(
+        payload, dtype=_INDEX_DTYPES[width], count=count, offset=offset
+    )
+    offset += count * width
+    values = np.frombuffer(payload, dtype=value_dtype, count=count, offset=offset)
+
+    indices = np.cumsum(gaps, dtype=np.int64)
+
+    return indices, values.astype(value_dtype.newbyteorder("=")), grid_size, time
+
+
+def apply_changes(mirror, payload):
+    """Apply an encoded change set to a consumer-side mirror array.
+
+    Parameters
+    ----------
+    mirror : ndarray
+        The consumer's copy of the variable, updated in place.
+    payload : bytes-like
+        The encoded change set.
+
+    Returns
+    -------
+    float
+        Model time of the change set.
+    """
+    indices, values, grid_size, time = decode_changes(payload)
+    if mirror.size != grid_size:
+        raise ValueError(
+            f"mirror has {mirror.size} elements, change set expects {grid_size}"
+        )
+    mirror.flat[indices] = values
+
+    return time
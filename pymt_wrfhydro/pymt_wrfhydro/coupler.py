@@ -0,0 +1,288 @@
+"""Lockstep coupling of WRF-Hydro with a second BMI model.
+
+:class:`Coupler` runs each model in its own process and advances both on
+one simulation clock, exchanging fields every coupling *interval* (by
+default WRF-Hydro's time step). Each model reaches the next exchange time
+with ``update_until``, so a partner with a shorter time step sub-cycles
+within the interval.
+
+Fields are exchanged through shared memory: a model writes its exports
+straight into a shared slot with ``get_value`` and the other model's
+process reads that slot, applies an optional transform (e.g. a
+:class:`~pymt_wrfhydro.remap.Remapper`) and calls ``set_value``. Every
+field has two slots, so a snapshot can be written while the previous one
+is still being read.
+
+With ``pipeline=True`` (the default) WRF-Hydro runs interval ``n + 1``
+while the partner runs interval ``n`` on WRF-Hydro's outputs at the end of
+interval ``n``, so both processes compute at once. One-way forcing of the
+partner is identical to running the models in turn. Fields sent back to
+WRF-Hydro arrive one interval later than in turn-by-turn coupling: the
+interval ``n + 1`` sees the partner's state at the start of interval
+``n``. With ``pipeline=False`` the models alternate, WRF-Hydro first, and
+each interval sees the partner's state at its start.
+
+Example::
+
+    coupler = Coupler(
+        ModelSpec("pymt_wrfhydro:WrfHydroBmi", "bmi_config.nml", run_dir),
+        ModelSpec("pyschism.bmi:Schism", "schism.nml", schism_dir),
+        to_partner=[("channel_water__volume_flow_rate", "river_discharge",
+                     outlets_to_mesh)],
+        to_hydro=[("sea_water_surface__elevation",
+                   "sea_water_surface__elevation", mesh_to_lsm)],
+    )
+    with coupler:
+        for time in coupler.iter_exchanges():
+            print(time)
+"""
+import multiprocessing
+
+from ._worker import SharedField, serve
+
+__all__ = ["Coupler", "ModelSpec"]
+
+
+class ModelSpec:
+    """How a worker process creates and initializes a model.
+
+    Parameters
+    ----------
+    factory : str or callable
+        The model class, or ``"module:Class"`` to import it in the worker.
+    config_file : str
+        Passed to ``initialize``.
+    run_dir : str, optional
+        Directory the worker changes to before initializing.
+    """
+
+    def __init__(self, factory, config_file, run_dir=None):
+        self.factory = factory
+        self.config_file = config_file
+        self.run_dir = run_dir
+
+    def __repr__(self):
+        return f"ModelSpec({self.factory!r}, {self.config_file!r})"
+
+
+def _pairs(exchange):
+    """Normalize ``(source, target[, transform])`` tuples."""
+    pairs = []
+    for item in exchange:
+        source, target, *transform = item
+        pairs.append((source, target, transform[0] if transform else None))
+    return pairs
+
+
+class _Process:
+    """One model process and its command pipe."""
+
+    def __init__(self, context, label, spec, exports, imports):
+        self.label = label
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=serve, args=(child, spec, exports, imports),
+            name=f"coupler-{label}", daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.pending = False
+
+    def send(self, *command):
+        self.conn.send(command)
+        self.pending = True
+
+    def wait(self):
+        try:
+            status, result = self.conn.recv()
+        except EOFError:
+            raise RuntimeError(f"{self.label} process exited unexpectedly")
+        finally:
+            self.pending = False
+        if status != "ok":
+            raise RuntimeError(f"{self.label} model failed:\n{result}")
+        return result
+
+    def call(self, *command):
+        self.send(*command)
+        return self.wait()
+
+
+class Coupler:
+    """Run WRF-Hydro and a partner model in lockstep in two processes.
+
+    Parameters
+    ----------
+    hydro, partner : ModelSpec
+        The WRF-Hydro model and the model it is coupled to. Both clocks
+        must use the same units and origin.
+    to_partner, to_hydro : sequence of tuple
+        ``(source_var, target_var)`` or ``(source_var, target_var,
+        transform)``: after each interval *source_var* of one model is
+        passed through *transform* (which must be picklable) and set as
+        *target_var* of the other.
+    interval : float, optional
+        Coupling interval; WRF-Hydro's time step by default.
+    pipeline : bool, optional
+        Overlap the two models' intervals (see the module docstring).
+    """
+
+    def __init__(self, hydro, partner, to_partner=(), to_hydro=(),
+                 interval=None, pipeline=True):
+        self.hydro_spec = hydro
+        self.partner_spec = partner
+        self.to_partner = _pairs(to_partner)
+        self.to_hydro = _pairs(to_hydro)
+        self.interval = interval
+        self.pipeline = pipeline
+        self._hydro = self._partner = None
+        self._fields = {}
+        self._n = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        """Start both processes, initialize the models and share memory."""
+        if self._hydro is not None:
+            raise RuntimeError("coupler is already running")
+        context = multiprocessing.get_context("spawn")
+        # Shared fields are named after the model that writes them
+        hydro_exports = sorted(
+            {(f"hydro:{source}", source) for source, _, _ in self.to_partner}
+        )
+        partner_exports = sorted(
+            {(f"partner:{source}", source) for source, _, _ in self.to_hydro}
+        )
+        self._hydro = _Process(
+            context, "WRF-Hydro", self.hydro_spec, hydro_exports,
+            [(f"partner:{source}", target, transform)
+             for source, target, transform in self.to_hydro],
+        )
+        self._partner = _Process(
+            context, "partner", self.partner_spec, partner_exports,
+            [(f"hydro:{source}", target, transform)
+             for source, target, transform in self.to_partner],
+        )
+        try:
+            hydro_info = self._hydro.wait()
+            partner_info = self._partner.wait()
+            if hydro_info["time_units"] != partner_info["time_units"]:
+                raise ValueError(
+                    f"time units differ: {hydro_info['time_units']!r} "
+                    f"and {partner_info['time_units']!r}"
+                )
+            self.start_time = max(hydro_info["start_time"],
+                                  partner_info["start_time"])
+            self.end_time = min(hydro_info["end_time"],
+                                partner_info["end_time"])
+            if self.interval is None:
+                self.interval = hydro_info["time_step"]
+            if self.interval <= 0:
+                raise ValueError("coupling interval must be positive")
+
+            specs = {}
+            for info in (hydro_info, partner_info):
+                for name, (size, dtype) in info["exports"].items():
+                    self._fields[name] = SharedField(None, size, dtype,
+                                                     create=True)
+                    specs[name] = self._fields[name].spec
+            self._hydro.call("attach", specs)
+            self._partner.call("attach", specs)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def time(self):
+        """Time of the last exchange."""
+        return self.start_time + (self._n or 0) * self.interval
+
+    def iter_exchanges(self, until=None):
+        """Run the coupled models and yield the time of every exchange.
+
+        Runs to *until*, or to the earlier of the two models' end times.
+        Calling it again continues from where the last call stopped.
+        """
+        if self._hydro is None:
+            raise RuntimeError("coupler is not running")
+        hydro, partner = self._hydro, self._partner
+        end_time = self.end_time if until is None else min(until, self.end_time)
+        last = int((end_time - self.start_time) / self.interval + 1e-6)
+
+        def time(n):
+            return self.start_time + n * self.interval
+
+        # Slot n % 2 of every field holds its model's state at time(n)
+        if self._n is None:
+            partner.call("advance", None, None, 0)
+            self._n = 0
+        first = self._n
+        if last <= first:
+            return
+        hydro.call("advance", time(first + 1), first % 2, (first + 1) % 2)
+
+        for n in range(first + 1, last + 1):
+            partner.send("advance", time(n), n % 2, n % 2)
+            if n < last:
+                if self.pipeline:
+                    hydro.send("advance", time(n + 1), (n - 1) % 2, (n + 1) % 2)
+                else:
+                    partner.wait()
+                    hydro.send("advance", time(n + 1), n % 2, (n + 1) % 2)
+            self._wait_all()
+            self._n = n
+            yield time(n)
+
+    def run(self, until=None):
+        """Run the coupled models; return the time reached."""
+        for _ in self.iter_exchanges(until):
+            pass
+        return self.time
+
+    def get_value(self, var_name, model="hydro"):
+        """Copy of an exchanged field as of the last exchange.
+
+        *var_name* is a source variable of *model* ('hydro' or 'partner').
+        """
+        key = f"{model}:{var_name}"
+        if key not in self._fields:
+            raise ValueError(f"{var_name!r} is not exchanged by {model}")
+        return self._fields[key].slots[(self._n or 0) % 2].copy()
+
+    def _wait_all(self):
+        errors = []
+        for process in (self._hydro, self._partner):
+            if process.pending:
+                try:
+                    process.wait()
+                except RuntimeError as error:
+                    errors.append(error)
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """Finalize both models, stop the processes and free shared memory."""
+        for process in (self._hydro, self._partner):
+            if process is None:
+                continue
+            try:
+                if process.pending:
+                    process.wait()
+                if process.process.is_alive():
+                    process.call("finalize")
+            except (RuntimeError, OSError):
+                pass
+            process.process.join(timeout=30)
+            if process.process.is_alive():
+                process.process.terminate()
+            process.conn.close()
+        for field in self._fields.values():
+            field.close(unlink=True)
+        self._fields = {}
+        self._hydro = self._partner = None
+        self._n = None
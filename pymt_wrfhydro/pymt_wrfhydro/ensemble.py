@@ -0,0 +1,155 @@
+"""Many WRF-Hydro members in one MPI job.
+
+WRF-Hydro keeps one engine per process, so an ensemble runs one member
+per group of ranks. :class:`Ensemble` splits a communicator (by default
+``MPI_COMM_WORLD``) into consecutive groups of *ranks_per_member* ranks,
+hands each group its own communicator with ``set_comm`` and initializes
+the member from its own config file, so a single launch can fill a node
+with 64 single-rank members or 8 members of 8 ranks each::
+
+    # mpirun -np 64 python run_ensemble.py
+    ensemble = Ensemble("members/{member:03d}/bmi_config.nml")
+    ensemble.initialize()
+    while ensemble.get_current_time() < ensemble.get_end_time():
+        ensemble.update()
+        flow = ensemble.gather("channel_water__volume_flow_rate")
+        if ensemble.is_root:
+            print(flow.mean(axis=0))          # [n_members, n_links]
+    ensemble.finalize()
+
+Every method is collective over the whole communicator. :meth:`gather`
+collects each member's field onto the member's first rank (with
+``get_value_global``) and then onto rank 0 of the communicator, so only
+one array per member crosses between groups.
+
+Without Python in charge, the same layout comes from ``ranks_per_member``
+and ``{member}`` in the BMI config file (see the Fortran ``initialize``).
+"""
+import numpy as np
+
+__all__ = ["Ensemble"]
+
+
+class _MemberNumber(int):
+    """A member number whose plain ``{member}`` has three digits.
+
+    That is how the Fortran ``initialize`` fills ``{member}`` in
+    ``wrfhydro_run_dir``, so one directory layout serves both. An explicit
+    format spec, e.g. ``{member:02d}``, is used as given.
+    """
+
+    def __format__(self, spec):
+        return int.__format__(self, spec or "03d")
+
+
+def _default_factory():
+    from .bmi import WrfHydroBmi
+
+    return WrfHydroBmi()
+
+
+class Ensemble:
+    """One WRF-Hydro member per group of ranks of *comm*.
+
+    Parameters
+    ----------
+    config_file : str
+        BMI config file of a member; ``{member}`` fields are formatted with
+        the member number. A plain ``{member}`` is zero-padded to three
+        digits (``run_007``), as in the Fortran config file; a format spec
+        overrides that, e.g. ``"run_{member:02d}/bmi_config.nml"``.
+    ranks_per_member : int, optional
+        Size of each group. Member ``k`` runs on ranks ``k * n`` to
+        ``k * n + n - 1``; if the communicator size is not a multiple of
+        *n*, the last member gets only the ranks left over.
+    comm : mpi4py.MPI.Comm, optional
+        Communicator to split (``MPI.COMM_WORLD`` by default).
+    factory : callable, optional
+        Creates the member's model (``WrfHydroBmi`` by default).
+    """
+
+    def __init__(self, config_file, ranks_per_member=1, comm=None,
+                 factory=None):
+        from ._bootstrap import import_mpi4py
+
+        MPI = import_mpi4py()
+
+        if ranks_per_member < 1:
+            raise ValueError("ranks_per_member must be at least 1")
+        self.comm = MPI.COMM_WORLD if comm is None else comm
+        self.ranks_per_member = int(ranks_per_member)
+        self.member = self.comm.rank // self.ranks_per_member
+        self.n_members = -(-self.comm.size // self.ranks_per_member)
+        self.config_file = config_file.format(
+            member=_MemberNumber(self.member))
+
+        self.member_comm = self.comm.Split(self.member, self.comm.rank)
+        # Rank 0 of every member gathers for it; these ranks talk to root
+        is_leader = self.member_comm.rank == 0
+        self._leaders = self.comm.Split(
+            0 if is_leader else MPI.UNDEFINED, self.member
+        )
+        self.model = (factory or _default_factory)()
+        self.model.set_comm(self.member_comm)
+
+    def __repr__(self):
+        return (
+            f"Ensemble(member={self.member}/{self.n_members}, "
+            f"ranks_per_member={self.ranks_per_member})"
+        )
+
+    @property
+    def is_root(self):
+        """True on the rank :meth:`gather` delivers to."""
+        return self.comm.rank == 0
+
+    def initialize(self):
+        self.model.initialize(self.config_file)
+
+    def update(self):
+        self.model.update()
+
+    def update_until(self, time):
+        self.model.update_until(time)
+
+    def get_current_time(self):
+        return self.model.get_current_time()
+
+    def get_end_time(self):
+        return self.model.get_end_time()
+
+    def finalize(self):
+        """Finalize the member and free the communicators."""
+        from mpi4py import MPI
+
+        self.model.finalize()
+        if self._leaders != MPI.COMM_NULL:
+            self._leaders.Free()
+        self.member_comm.Free()
+
+    def gather(self, var_name):
+        """One variable from every member, on the root rank.
+
+        Returns a ``[n_members, size]`` float64 array on rank 0 of the
+        communicator and None on every other rank. If the members' grids
+        differ in size, the root gets a list of arrays instead.
+        """
+        from mpi4py import MPI
+
+        values = self.model.get_value_global(var_name, root=0)
+        if self._leaders == MPI.COMM_NULL:
+            return None
+
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        sizes = self._leaders.gather(values.size, root=0)
+        if self._leaders.rank != 0:
+            self._leaders.Gatherv(values, None, root=0)
+            return None
+
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        result = np.empty(offsets[-1])
+        self._leaders.Gatherv(values, [result, sizes, offsets[:-1], MPI.DOUBLE],
+                              root=0)
+        if len(set(sizes)) == 1:
+            return result.reshape(len(sizes), sizes[0])
+        return [result[start:stop] for start, stop in zip(offsets, offsets[1:])]
@@ -0,0 +1,197 @@
+"""Time-interpolating buffers for exchanging fields between models.
+
+A partner model that steps faster than WRF-Hydro needs forcing at times
+between WRF-Hydro's hourly outputs, and WRF-Hydro may need a partner's
+fields at its own step times. :class:`ExchangeBuffer` keeps the last
+*depth* snapshots of a set of variables in preallocated arrays and serves
+values at any time between the oldest and newest snapshot, by linear or
+step interpolation; given an output array, nothing is allocated per call.
+:meth:`ExchangeBuffer.apply` feeds the interpolated values to a model's
+``set_value``, so the same buffer serves inputs as well as outputs.
+
+Example::
+
+    buffer = ExchangeBuffer.from_model(hydro, ["channel_water__volume_flow_rate"])
+    buffer.record(hydro)                 # snapshot at t
+    hydro.update()
+    buffer.record(hydro)                 # snapshot at t + 3600
+    for time in np.arange(t, t + 3600, 300.0):
+        flow = buffer.interpolate("channel_water__volume_flow_rate", time)
+        ocean.set_value("river_discharge", flow)
+        ocean.update_until(time + 300.0)
+"""
+import numpy as np
+
+__all__ = ["ExchangeBuffer"]
+
+_METHODS = ("linear", "previous", "next")
+
+
+class ExchangeBuffer:
+    """Ring of the last *depth* snapshots of some variables.
+
+    Parameters
+    ----------
+    variables : dict
+        Maps each variable name to ``(size, dtype)``.
+    depth : int, optional
+        Number of snapshots kept; the oldest is overwritten.
+    method : str, optional
+        Default interpolation: 'linear', or 'previous'/'next' to take the
+        snapshot at or before (after) the requested time.
+    """
+
+    def __init__(self, variables, depth=2, method="linear"):
+        if depth < 2 and method == "linear":
+            raise ValueError("linear interpolation needs a depth of at least 2")
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        if method not in _METHODS:
+            raise ValueError(f"unknown interpolation method: {method!r}")
+        self.depth = int(depth)
+        self.method = method
+        self._data = {
+            name: np.zeros((self.depth, size), dtype=dtype)
+            for name, (size, dtype) in variables.items()
+        }
+        self._scratch = {
+            name: np.empty(size, dtype=np.float64)
+            for name, (size, _) in variables.items()
+        }
+        self._times = np.full(self.depth, np.nan)
+        self._count = 0
+        self._order = np.empty(0, dtype=np.intp)
+
+    @classmethod
+    def from_model(cls, model, var_names, **kwds):
+        """Buffer sized for *var_names* of *model*."""
+        if isinstance(var_names, str):
+            var_names = [var_names]
+        variables = {
+            name: (model.get_grid_size(model.get_var_grid(name)),
+                   model.get_var_type(name))
+            for name in var_names
+        }
+        return cls(variables, **kwds)
+
+    def __len__(self):
+        return min(self._count, self.depth)
+
+    def __repr__(self):
+        return (
+            f"ExchangeBuffer(vars={len(self._data)}, depth={self.depth}, "
+            f"snapshots={len(self)})"
+        )
+
+    @property
+    def var_names(self):
+        return tuple(self._data)
+
+    @property
+    def times(self):
+        """Times of the snapshots held, oldest first."""
+        return self._times[self._order]
+
+    def _next_slot(self, time):
+        if len(self) and time <= self._times[self._order[-1]]:
+            raise ValueError(
+                f"snapshot at {time} is not after {self._times[self._order[-1]]}"
+            )
+        return self._count % self.depth
+
+    def _commit(self, slot, time):
+        self._times[slot] = time
+        self._count += 1
+        n = len(self)
+        self._order = (np.arange(self._count - n, self._count)) % self.depth
+
+    def push(self, time, values):
+        """Store a snapshot of every variable from a ``{name: array}`` dict."""
+        slot = self._next_slot(time)
+        for name, data in self._data.items():
+            data[slot] = np.asarray(values[name]).reshape(-1)
+        self._commit(slot, time)
+
+    def record(self, model):
+        """Snapshot every variable of *model* at its current time.
+
+        Values are read straight into the ring with ``get_value``.
+        """
+        time = model.get_current_time()
+        slot = self._next_slot(time)
+        for name, data in self._data.items():
+            model.get_value(name, data[slot])
+        self._commit(slot, time)
+
+    def _bracket(self, time, method):
+        """Ring slots around each of *time* and the weight of the later one."""
+        held = self.times
+        if not len(held):
+            raise ValueError("buffer is empty")
+        time = np.asarray(time, dtype=float)
+        if np.any(time < held[0]) or np.any(time > held[-1]):
+            raise ValueError(
+                f"time {time} is outside the buffered range "
+                f"[{held[0]}, {held[-1]}]"
+            )
+        hi = np.minimum(np.searchsorted(held, time, side="left"), len(held) - 1)
+        exact = held[hi] == time
+        lo = np.where(exact, hi, hi - 1)
+        if method == "next":
+            lo = hi
+        elif method == "previous":
+            hi = lo
+        weight = np.zeros(time.shape)
+        if method == "linear":
+            span = held[hi] - held[lo]
+            np.divide(time - held[lo], span, out=weight, where=~exact)
+        return self._order[lo], self._order[hi], weight
+
+    def interpolate(self, var_name, time, out=None, method=None):
+        """Value of *var_name* at *time*.
+
+        *time* must lie within :attr:`times`. With *out*, the result is
+        written there and nothing is allocated.
+        """
+        data = self._data[var_name]
+        lo, hi, weight = self._bracket(time, method or self.method)
+        if out is None:
+            dtype = np.float64 if weight else data.dtype
+            out = np.empty(data.shape[1], dtype=dtype)
+        if weight:
+            np.subtract(data[hi], data[lo], out=out)
+            out *= weight
+            out += data[lo]
+        else:
+            out[:] = data[lo]
+        return out
+
+    def interpolate_many(self, var_name, times, method=None):
+        """Values of *var_name* at each of *times*, as ``(len(times), size)``.
+
+        All times are interpolated in one vectorized pass.
+        """
+        data = self._data[var_name]
+        lo, hi, weight = self._bracket(
+            np.atleast_1d(times), method or self.method
+        )
+        out = data[hi] - data[lo].astype(np.float64)
+        out *= weight[:, None]
+        out += data[lo]
+        return out
+
+    def apply(self, model, time, names=None, method=None):
+        """``set_value`` every buffered variable of *model* at *time*.
+
+        *names* maps buffered variables to the model's input names when
+        they differ.
+        """
+        names = names or {}
+        for var_name in self._data:
+            target = names.get(var_name, var_name)
+            values = self.interpolate(
+                var_name, time, out=self._scratch[var_name], method=method
+            )
+            model.set_value(
+                target, values.astype(model.get_var_type(target), copy=False)
+            )
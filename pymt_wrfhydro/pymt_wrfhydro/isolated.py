@@ -0,0 +1,309 @@
+"""WRF-Hydro behind the BMI, in a process of its own.
+
+The Fortran library keeps its state in module variables, so one process
+holds one live domain. :class:`IsolatedWrfHydroBmi`, which is what
+``WrfHydroBmi(isolated=True)`` returns, lifts that limit: each instance
+starts a worker process that hosts an ordinary
+:class:`~pymt_wrfhydro.WrfHydroBmi` and forwards every call to it, so
+several domains, or a domain and its perturbed twin, run side by side on
+different cores::
+
+    base = WrfHydroBmi(isolated=True)
+    twin = WrfHydroBmi(isolated=True)
+    base.initialize("croton/bmi_config.nml")
+    twin.initialize("croton_wet/bmi_config.nml")
+    while base.get_current_time() < base.get_end_time():
+        base.update(wait=False)         # both models step at once
+        twin.update(wait=False)
+        base.wait(), twin.wait()
+
+Calls and small results (names, units, grid geometry, statistics) go over
+a pipe. Variable values do not: ``get_value``, ``set_value`` and the
+cached views read and write a shared-memory buffer per variable, which
+the worker fills or reads in place, so moving a field costs one copy
+rather than a pickle round trip. Exceptions raised in the worker are
+raised again with their original type, chained to the worker's traceback.
+
+``update`` and ``update_until`` take ``wait=False`` to return at once;
+the next call (or :meth:`IsolatedWrfHydroBmi.wait`) collects the result.
+``finalize`` stops the worker, and so does dropping the instance.
+
+Workers are started with the ``spawn`` method, so scripts that create
+isolated models must keep their top-level code under
+``if __name__ == "__main__":``.
+"""
+import multiprocessing
+
+import numpy as np
+
+from ._steps import iter_steps
+from ._worker import SharedField, serve_model
+
+__all__ = ["IsolatedWrfHydroBmi"]
+
+
+class RemoteTraceback(Exception):
+    """The traceback of an exception raised in a worker process."""
+
+    def __init__(self, tb):
+        super().__init__(tb)
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+# Forwarded calls that change values, like update and set_value
+_STALE_AFTER = {"wait_exchanges", "set_value_at_global_indices"}
+
+# Position of the array a call fills in place
+_OUT_ARG = {
+    "get_grid_shape": 1, "get_grid_spacing": 1, "get_grid_origin": 1,
+    "get_grid_x": 1, "get_grid_y": 1, "get_grid_z": 1,
+    "get_grid_edge_nodes": 1, "get_grid_face_edges": 1,
+    "get_grid_face_nodes": 1, "get_grid_nodes_per_face": 1,
+}
+
+
+class IsolatedWrfHydroBmi:
+    """A WRF-Hydro BMI model running in a worker process.
+
+    Parameters
+    ----------
+    factory : class or str, optional
+        What the worker instantiates: a class or ``"module:Class"``,
+        which must be importable in a fresh interpreter.
+    context : str, optional
+        The multiprocessing start method. The default, ``"spawn"``, gives
+        the worker its own MPI and Fortran runtime.
+    """
+
+    def __init__(self, factory="pymt_wrfhydro.bmi:WrfHydroBmi",
+                 context="spawn"):
+        ctx = multiprocessing.get_context(context)
+        self._fields = {}
+        self._grid_shapes = {}
+        self._value_cache = {}
+        self._step = 0
+        self._pending = False
+        self._conn, child = ctx.Pipe()
+        self._process = ctx.Process(target=serve_model, args=(child, factory),
+                                    name="wrfhydro-isolated", daemon=True)
+        self._process.start()
+        child.close()
+        self._pending = True
+        try:
+            self.wait()
+        except BaseException:
+            self.close()
+            raise
+
+    # ------------------------------------------------------------------
+    # The worker
+    # ------------------------------------------------------------------
+
+    @property
+    def pid(self):
+        """Process ID of the worker."""
+        return self._process.pid
+
+    def _send(self, *command):
+        if self._pending:
+            self.wait()
+        if self._conn is None:
+            raise RuntimeError("the model's worker process has stopped")
+        self._conn.send(command)
+        self._pending = True
+
+    def wait(self):
+        """Wait for the call in flight, if any, and return its result."""
+        if not self._pending:
+            return None
+        self._pending = False
+        try:
+            status, result = self._conn.recv()
+        except EOFError:
+            self.close()
+            raise RuntimeError("the model's worker process exited "
+                               "unexpectedly") from None
+        if status != "ok":
+            error, tb = result
+            raise error from RemoteTraceback(tb)
+        return result
+
+    def _call(self, method, *args, **kwds):
+        self._send("call", method, args, kwds)
+        return self.wait()
+
+    def close(self):
+        """Stop the worker and release the shared memory."""
+        if self._conn is not None:
+            try:
+                if self._pending:
+                    self.wait()
+                self._send("exit")
+                self.wait()
+            except (RuntimeError, OSError):
+                pass
+            finally:
+                self._pending = False
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+        if self._process.is_alive():
+            self._process.join(timeout=10.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        self._release_fields()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(*args, **kwds):
+            result = self._call(name, *args, **kwds)
+            if name in _STALE_AFTER:
+                self._step += 1
+            position = _OUT_ARG.get(name)
+            if position is not None and len(args) > position:
+                out = args[position]
+                np.copyto(out, np.reshape(result, np.shape(out)),
+                          casting="unsafe")
+                return out
+            return result
+
+        call.__name__ = name
+        return call
+
+    # ------------------------------------------------------------------
+    # Shared variable buffers
+    # ------------------------------------------------------------------
+
+    def _field(self, var_name):
+        field = self._fields.get(var_name)
+        if field is None:
+            size = self.get_grid_size(self.get_var_grid(var_name))
+            dtype = self.get_var_type(var_name)
+            field = SharedField(None, size, dtype, slots=1, create=True)
+            try:
+                self._send("attach", var_name, field.spec)
+                self.wait()
+            except BaseException:
+                field.close(unlink=True)
+                raise
+            self._fields[var_name] = field
+        return field
+
+    def _release_fields(self):
+        for field in self._fields.values():
+            field.close(unlink=True)
+        self._fields.clear()
+        self._grid_shapes.clear()
+        self._value_cache.clear()
+
+    # ------------------------------------------------------------------
+    # Calls that need more than forwarding
+    # ------------------------------------------------------------------
+
+    def initialize(self, config_file):
+        self._step += 1
+        if self._fields:
+            # Grids may change size with the new configuration
+            self._send("detach")
+            self.wait()
+            self._release_fields()
+        return self._call("initialize", config_file)
+
+    def finalize(self):
+        try:
+            return self._call("finalize")
+        finally:
+            self.close()
+
+    def update(self, wait=True):
+        self._step += 1
+        self._send("call", "update", (), {})
+        if wait:
+            return self.wait()
+
+    def update_until(self, time_later, wait=True):
+        self._step += 1
+        self._send("call", "update_until", (time_later,), {})
+        if wait:
+            return self.wait()
+
+    def get_value(self, var_name, buffer):
+        values = self.get_value_cached(var_name)
+        np.copyto(buffer, values.reshape(np.shape(buffer)), casting="unsafe")
+        return buffer
+
+    def set_value(self, var_name, buffer):
+        field = self._field(var_name)
+        self._step += 1
+        np.copyto(field.slots[0], np.reshape(buffer, -1), casting="unsafe")
+        self._send("set", var_name)
+        self.wait()
+
+    def get_value_cached(self, var_name):
+        """Get a variable as a read-only view of its shared buffer.
+
+        The worker fills the buffer on the first read after ``update``,
+        ``update_until`` or ``set_value``; later reads in the same step,
+        ``get_value`` included, return the view without a round trip. The
+        buffer is refilled in place on the next step, so copy the view if
+        the values must outlive the current step.
+        """
+        entry = self._value_cache.get(var_name)
+        if entry is not None and entry[0] == self._step:
+            return entry[1]
+
+        field = self._field(var_name)
+        self._send("get", var_name)
+        self.wait()
+        values = field.slots[0].view()
+        values.flags.writeable = False
+        self._value_cache[var_name] = (self._step, values)
+        return values
+
+    def get_value_ptr(self, var_name):
+        """Like ``get_value_cached``: the model's own memory is in the
+        worker, so this is a snapshot rather than a live reference.
+        """
+        return self.get_value_cached(var_name)
+
+    def get_value_2d(self, var_name, out=None):
+        values = self.get_value_cached(var_name)
+        grid_id = self.get_var_grid(var_name)
+        shape = self._grid_shapes.get(grid_id)
+        if shape is None:
+            if self.get_grid_rank(grid_id) != 2:
+                raise ValueError(f"grid {grid_id} is not a 2D grid")
+            shape = tuple(int(n) for n in self._call("get_grid_shape", grid_id,
+                                                     np.empty(2, dtype=np.intc)))
+            self._grid_shapes[grid_id] = shape
+        if out is None:
+            return values.reshape(shape)
+        if (out.shape != shape or out.dtype != values.dtype
+                or not out.flags.c_contiguous):
+            raise ValueError(
+                f"out must be a C-contiguous {values.dtype} array of shape "
+                f"{shape}"
+            )
+        np.copyto(out, values.reshape(shape))
+        return out
+
+    def iter_steps(self, var_names, until=None, every=1, copy=False,
+                   ring_size=2):
+        return iter_steps(self, var_names, until, every, copy, ring_size)
+
+    def get_spatial_index(self, grid_id):
+        from .spatial import SpatialIndex
+
+        return SpatialIndex.from_model(self, grid_id)
@@ -1,7 +1,16 @@
 #! /usr/bin/env python
 
-from .wrfhydrobmi import WrfHydroBmi
+from .._bootstrap import dlopen_global, start_mpi
+
+# MPI first: the extension links libmpi (see pymt_wrfhydro._bootstrap)
+if start_mpi() == "serial":
+    with dlopen_global():
+        from .wrfhydrobmi import WrfHydroBmi, get_max_models, set_max_models
+else:
+    from .wrfhydrobmi import WrfHydroBmi, get_max_models, set_max_models
 
 
 __all__ = ["WrfHydroBmi",
+           "get_max_models",
+           "set_max_models",
 ]
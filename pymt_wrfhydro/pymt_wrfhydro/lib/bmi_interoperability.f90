@@ -9,29 +9,107 @@ module bmi_interoperability
 
   implicit none
 
-  integer, parameter :: N_MODELS = 2048
-  type (bmi_wrf_hydro) :: model_array(N_MODELS)
-  logical :: model_avail(N_MODELS) = .true.
+  ! Model registry. The C side refers to models by 1-based slot index.
+  ! Slots are allocated on first use, the table grows geometrically up to
+  ! max_models, and finalized or deleted slots are reused. WRF-Hydro keeps
+  ! its state in module variables, so a second live model in the same
+  ! process would silently share the first one's state: max_models
+  ! therefore defaults to 1 and bmi_new refuses a slot beyond it.
+  type :: model_slot
+     type (bmi_wrf_hydro), allocatable :: model
+  end type model_slot
+
+  integer, parameter :: DEFAULT_MAX_MODELS = 1
+  integer :: max_models = DEFAULT_MAX_MODELS
+  integer :: n_live = 0
+  type (model_slot), allocatable :: registry(:)
+
+  ! bmi_new results other than a slot index
+  integer (c_int), parameter :: BMI_REGISTRY_FULL = -1
 
 contains
 
   !
-  ! Find the next unused model index in the array.
+  ! Hand out a free slot, growing the registry if needed. Returns
+  ! BMI_REGISTRY_FULL if max_models models are already live.
   !
   function bmi_new() bind(c) result(model_index)
     integer (c_int) :: model_index
+    type (model_slot), allocatable :: grown(:)
     integer :: i
 
-    model_index = -1
-    do i = 1, N_MODELS
-       if (model_avail(i)) then
-          model_avail(i) = .false.
+    model_index = BMI_REGISTRY_FULL
+    if (n_live >= max_models) return
+
+    if (.not. allocated(registry)) allocate(registry(1))
+    do i = 1, size(registry)
+       if (.not. allocated(registry(i)%model)) then
           model_index = i
           exit
        end if
     end do
+
+    if (model_index == BMI_REGISTRY_FULL) then
+       ! Every slot is live but the limit allows more: double the table.
+       ! move_alloc hands each model over without copying it, so anything
+       ! pointing into a live model stays valid.
+       allocate(grown(min(2 * size(registry), max_models)))
+       do i = 1, size(registry)
+          call move_alloc(registry(i)%model, grown(i)%model)
+       end do
+       model_index = size(registry) + 1
+       call move_alloc(grown, registry)
+    end if
+
+    allocate(registry(model_index)%model)
+    n_live = n_live + 1
   end function bmi_new
 
+  !
+  ! Release a slot without finalizing its model (e.g. when the owning
+  ! object is garbage collected). Unknown or free slots are ignored.
+  !
+  function bmi_delete(model_index) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int) :: status
+
+    status = BMI_SUCCESS
+    if (.not. allocated(registry)) return
+    if (model_index < 1 .or. model_index > size(registry)) return
+    if (.not. allocated(registry(model_index)%model)) return
+    deallocate(registry(model_index)%model)
+    n_live = n_live - 1
+  end function bmi_delete
+
+  !
+  ! Set how many models may be live at once. Fails if the limit is below
+  ! one or below the number of live models.
+  !
+  function bmi_set_max_models(limit) bind(c) result(status)
+    integer (c_int), intent(in), value :: limit
+    integer (c_int) :: status
+
+    if (limit < 1 .or. limit < n_live) then
+       status = BMI_FAILURE
+    else
+       max_models = limit
+       status = BMI_SUCCESS
+    end if
+  end function bmi_set_max_models
+
+  !
+  ! Get the registry limit and the number of live models.
+  !
+  function bmi_get_max_models(limit, live) bind(c) result(status)
+    integer (c_int), intent(out) :: limit
+    integer (c_int), intent(out) :: live
+    integer (c_int) :: status
+
+    limit = max_models
+    live = n_live
+    status = BMI_SUCCESS
+  end function bmi_get_max_models
+
   !
   ! Initialize one model in the array, based on the input index.
   !
@@ -48,7 +126,7 @@ contains
        config_file_(i:i) = config_file(i)
     enddo
 
-    status = model_array(model_index)%initialize(config_file_)
+    status = registry(model_index)%model%initialize(config_file_)
   end function bmi_initialize
 
   !
@@ -58,8 +136,8 @@ contains
     integer (c_int), intent(in), value :: model_index
     integer (c_int) :: status
 
-    status = model_array(model_index)%finalize()
-    model_avail(model_index) = .true.
+    status = registry(model_index)%model%finalize()
+    if (bmi_delete(model_index) /= BMI_SUCCESS) status = BMI_FAILURE
   end function bmi_finalize
 
   !
@@ -75,7 +153,7 @@ contains
     character (len=n, kind=c_char), pointer :: pname
     character (len=n, kind=c_char) :: name_
 
-    status = model_array(model_index)%get_component_name(pname)
+    status = registry(model_index)%model%get_component_name(pname)
 
     ! Cast `pname` back to a string, dereferences `pname`.
     name_ = pname
@@ -97,7 +175,7 @@ contains
     integer (c_int) :: status
     character (len=BMI_MAX_VAR_NAME), pointer :: pnames(:)
 
-    status = model_array(model_index)%get_input_var_names(pnames)
+    status = registry(model_index)%model%get_input_var_names(pnames)
     count = size(pnames)
     status = BMI_SUCCESS
   end function bmi_get_input_item_count
@@ -113,7 +191,7 @@ contains
     integer (c_int) :: status, i
     character (len=BMI_MAX_VAR_NAME), dimension(:), pointer :: pnames
 
-    status = model_array(model_index)%get_input_var_names(pnames)
+    status = registry(model_index)%model%get_input_var_names(pnames)
 
     do i = 1, n
        pnames(i) = trim(pnames(i))//C_NULL_CHAR
@@ -131,7 +209,7 @@ contains
     integer (c_int) :: status
     character (len=BMI_MAX_VAR_NAME), pointer :: pnames(:)
 
-    status = model_array(model_index)%get_output_var_names(pnames)
+    status = registry(model_index)%model%get_output_var_names(pnames)
     count = size(pnames)
     status = BMI_SUCCESS
   end function bmi_get_output_item_count
@@ -147,7 +225,7 @@ contains
     integer (c_int) :: status, i
     character (len=BMI_MAX_VAR_NAME), dimension(:), pointer :: pnames
 
-    status = model_array(model_index)%get_output_var_names(pnames)
+    status = registry(model_index)%model%get_output_var_names(pnames)
 
     do i = 1, n
        pnames(i) = trim(pnames(i))//C_NULL_CHAR
@@ -163,7 +241,7 @@ contains
     real (c_double), intent(out) :: time
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_start_time(time)
+    status = registry(model_index)%model%get_start_time(time)
   end function bmi_get_start_time
 
   !
@@ -174,7 +252,7 @@ contains
     real (c_double), intent(out) :: time
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_end_time(time)
+    status = registry(model_index)%model%get_end_time(time)
   end function bmi_get_end_time
 
   !
@@ -185,7 +263,7 @@ contains
     real (c_double), intent(out) :: time
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_current_time(time)
+    status = registry(model_index)%model%get_current_time(time)
   end function bmi_get_current_time
 
   !
@@ -197,7 +275,7 @@ contains
     real (c_double), intent(out) :: time_step
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_time_step(time_step)
+    status = registry(model_index)%model%get_time_step(time_step)
   end function bmi_get_time_step
 
   !
@@ -217,7 +295,7 @@ contains
        time_units_(i:i) = time_units(i)
     enddo
 
-    status = model_array(model_index)%get_time_units(time_units_)
+    status = registry(model_index)%model%get_time_units(time_units_)
 
     ! Load the `time_units_` result back into `time_units` for output.
     do i = 1, len(trim(time_units_))
@@ -233,7 +311,7 @@ contains
     integer (c_int), intent(in), value :: model_index
     integer (c_int) :: status
 
-    status = model_array(model_index)%update()
+    status = registry(model_index)%model%update()
   end function bmi_update
 
   !
@@ -244,7 +322,7 @@ contains
     real (c_double), intent(in), value :: time_later
     integer (c_int) :: status
 
-    status = model_array(model_index)%update_until(time_later)
+    status = registry(model_index)%model%update_until(time_later)
   end function bmi_update_until
 
   !
@@ -264,7 +342,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_var_grid(var_name_, grid_id)
+    status = registry(model_index)%model%get_var_grid(var_name_, grid_id)
   end function bmi_get_var_grid
 
   !
@@ -284,7 +362,7 @@ contains
        grid_type_(i:i) = grid_type(i)
     enddo
 
-    status = model_array(model_index)%get_grid_type(grid_id, grid_type_)
+    status = registry(model_index)%model%get_grid_type(grid_id, grid_type_)
 
     do i = 1, len(trim(grid_type_))
         grid_type(i) = grid_type_(i:i)
@@ -302,7 +380,7 @@ contains
     integer (c_int), intent(out) :: grid_rank
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_rank(grid_id, grid_rank)
+    status = registry(model_index)%model%get_grid_rank(grid_id, grid_rank)
   end function bmi_get_grid_rank
 
   !
@@ -316,7 +394,7 @@ contains
     integer (c_int), intent(out) :: grid_shape(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_shape(grid_id, grid_shape)
+    status = registry(model_index)%model%get_grid_shape(grid_id, grid_shape)
   end function bmi_get_grid_shape
 
   !
@@ -329,7 +407,7 @@ contains
     integer (c_int), intent(out) :: grid_size
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_size(grid_id, grid_size)
+    status = registry(model_index)%model%get_grid_size(grid_id, grid_size)
   end function bmi_get_grid_size
 
   !
@@ -343,7 +421,7 @@ contains
     real (c_double), intent(out) :: grid_spacing(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_spacing(grid_id, grid_spacing)
+    status = registry(model_index)%model%get_grid_spacing(grid_id, grid_spacing)
   end function bmi_get_grid_spacing
 
   !
@@ -357,7 +435,7 @@ contains
     real (c_double), intent(out) :: grid_origin(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_origin(grid_id, grid_origin)
+    status = registry(model_index)%model%get_grid_origin(grid_id, grid_origin)
   end function bmi_get_grid_origin
 
   !
@@ -371,7 +449,7 @@ contains
     real (c_double), intent(out) :: grid_x(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_x(grid_id, grid_x)
+    status = registry(model_index)%model%get_grid_x(grid_id, grid_x)
   end function bmi_get_grid_x
 
   !
@@ -385,7 +463,7 @@ contains
     real (c_double), intent(out) :: grid_y(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_y(grid_id, grid_y)
+    status = registry(model_index)%model%get_grid_y(grid_id, grid_y)
   end function bmi_get_grid_y
 
   !
@@ -399,7 +477,7 @@ contains
     real (c_double), intent(out) :: grid_z(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_z(grid_id, grid_z)
+    status = registry(model_index)%model%get_grid_z(grid_id, grid_z)
   end function bmi_get_grid_z
 
   !
@@ -412,7 +490,7 @@ contains
     integer (c_int), intent(out) :: node_count
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_node_count(grid_id, node_count)
+    status = registry(model_index)%model%get_grid_node_count(grid_id, node_count)
   end function bmi_get_grid_node_count
 
   !
@@ -425,7 +503,7 @@ contains
     integer (c_int), intent(out) :: edge_count
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_edge_count(grid_id, edge_count)
+    status = registry(model_index)%model%get_grid_edge_count(grid_id, edge_count)
   end function bmi_get_grid_edge_count
 
   !
@@ -438,7 +516,7 @@ contains
     integer (c_int), intent(out) :: face_count
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_face_count(grid_id, face_count)
+    status = registry(model_index)%model%get_grid_face_count(grid_id, face_count)
   end function bmi_get_grid_face_count
 
   !
@@ -452,7 +530,7 @@ contains
     integer (c_int), intent(out) :: edge_nodes(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_edge_nodes(grid_id, edge_nodes)
+    status = registry(model_index)%model%get_grid_edge_nodes(grid_id, edge_nodes)
   end function bmi_get_grid_edge_nodes
 
   !
@@ -466,7 +544,7 @@ contains
     integer (c_int), intent(out) :: face_edges(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_face_edges(grid_id, face_edges)
+    status = registry(model_index)%model%get_grid_face_edges(grid_id, face_edges)
   end function bmi_get_grid_face_edges
 
   !
@@ -480,7 +558,7 @@ contains
     integer (c_int), intent(out) :: face_nodes(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_face_nodes(grid_id, face_nodes)
+    status = registry(model_index)%model%get_grid_face_nodes(grid_id, face_nodes)
   end function bmi_get_grid_face_nodes
 
   !
@@ -494,7 +572,7 @@ contains
     integer (c_int), intent(out) :: nodes_per_face(n)
     integer (c_int) :: status
 
-    status = model_array(model_index)%get_grid_nodes_per_face(grid_id, nodes_per_face)
+    status = registry(model_index)%model%get_grid_nodes_per_face(grid_id, nodes_per_face)
   end function bmi_get_grid_nodes_per_face
 
   !
@@ -519,7 +597,7 @@ contains
        var_type_(i:i) = var_type(i)
     enddo
 
-    status = model_array(model_index)%get_var_type(var_name_, var_type_)
+    status = registry(model_index)%model%get_var_type(var_name_, var_type_)
 
     do i = 1, len(trim(var_type_))
         var_type(i) = var_type_(i:i)
@@ -549,7 +627,7 @@ contains
        var_units_(i:i) = var_units(i)
     enddo
 
-    status = model_array(model_index)%get_var_units(var_name_, var_units_)
+    status = registry(model_index)%model%get_var_units(var_name_, var_units_)
 
     do i = 1, len(trim(var_units_))
         var_units(i) = var_units_(i:i)
@@ -574,7 +652,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_var_itemsize(var_name_, var_itemsize)
+    status = registry(model_index)%model%get_var_itemsize(var_name_, var_itemsize)
   end function bmi_get_var_itemsize
 
   !
@@ -594,7 +672,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_var_nbytes(var_name_, var_nbytes)
+    status = registry(model_index)%model%get_var_nbytes(var_name_, var_nbytes)
   end function bmi_get_var_nbytes
 
   !
@@ -619,7 +697,7 @@ contains
        var_location_(i:i) = var_location(i)
     enddo
 
-    status = model_array(model_index)%get_var_location(var_name_, var_location_)
+    status = registry(model_index)%model%get_var_location(var_name_, var_location_)
 
     do i = 1, len(trim(var_location_))
         var_location(i) = var_location_(i:i)
@@ -645,7 +723,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_value(var_name_, buffer)
+    status = registry(model_index)%model%get_value(var_name_, buffer)
   end function bmi_get_value_int
 
   !
@@ -666,7 +744,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_value(var_name_, buffer)
+    status = registry(model_index)%model%get_value(var_name_, buffer)
     ! write(*,*) "Fortran"
     ! write(*,'(8f6.2)') buffer
     ! write(*,'(48f6.1)') buffer
@@ -693,7 +771,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_value(var_name_, buffer)
+    status = registry(model_index)%model%get_value(var_name_, buffer)
   end function bmi_get_value_double
 
   !
@@ -717,21 +795,21 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%get_var_type(var_name_, var_type)
+    status = registry(model_index)%model%get_var_type(var_name_, var_type)
 
     select case(var_type)
     case("integer", "INTEGER")
-       status = model_array(model_index)%get_value_ptr(var_name_, idest)
+       status = registry(model_index)%model%get_value_ptr(var_name_, idest)
        if (status == BMI_SUCCESS) then
           ref = c_loc(idest(1))
        end if
     case("real", "REAL", "real*4", "REAL*4")
-       status = model_array(model_index)%get_value_ptr(var_name_, rdest)
+       status = registry(model_index)%model%get_value_ptr(var_name_, rdest)
        if (status == BMI_SUCCESS) then
           ref = c_loc(rdest(1))
        end if
     case("double precision", "DOUBLE PRECISION", "real*8", "REAL*8")
-       status = model_array(model_index)%get_value_ptr(var_name_, ddest)
+       status = registry(model_index)%model%get_value_ptr(var_name_, ddest)
        if (status == BMI_SUCCESS) then
           ref = c_loc(ddest(1))
        end if
@@ -758,7 +836,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%set_value(var_name_, buffer)
+    status = registry(model_index)%model%set_value(var_name_, buffer)
   end function bmi_set_value_int
 
   !
@@ -779,7 +857,7 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%set_value(var_name_, buffer)
+    status = registry(model_index)%model%set_value(var_name_, buffer)
 
     ! (1) Can't have assumed-shape array `buffer(:)` with bind(c).
     ! (2) Can't have type-bound (therefore generic) procedures with bind(c).
@@ -803,7 +881,317 @@ contains
        var_name_(i:i) = var_name(i)
     enddo
 
-    status = model_array(model_index)%set_value(var_name_, buffer)
+    status = registry(model_index)%model%set_value(var_name_, buffer)
   end function bmi_set_value_double
 
+  !
+  ! Extensions to BMI 2.0 specific to WRF-Hydro.
+  !
+
+  !
+  ! Get the validity mask (1 = computed, 0 = not) of a variable's grid.
+  !
+  function bmi_get_var_mask(model_index, var_name, n, buffer, m) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: m
+    integer (c_int), intent(out) :: buffer(m)
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%get_var_mask(var_name_, buffer)
+  end function bmi_get_var_mask
+
+  !
+  ! Reduce a variable to summary statistics (STAT_* codes).
+  ! Pass n_mask = 0 to use the variable's validity mask.
+  !
+  function bmi_get_value_stats(model_index, var_name, n, stats, n_stats, &
+       mask, n_mask, result) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: n_stats
+    integer (c_int), intent(in) :: stats(n_stats)
+    integer (c_int), intent(in), value :: n_mask
+    integer (c_int), intent(in) :: mask(n_mask)
+    real (c_double), intent(out) :: result(n_stats)
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    if (n_mask > 0) then
+       status = registry(model_index)%model%get_value_stats(var_name_, stats, &
+            result, mask)
+    else
+       status = registry(model_index)%model%get_value_stats(var_name_, stats, &
+            result)
+    end if
+  end function bmi_get_value_stats
+
+  ! Per-zone reductions; zones are (indptr, cells) in CSR form and result
+  ! is laid out as result[stat][zone].
+  function bmi_get_value_zonal(model_index, var_name, n, indptr, n_zones, &
+       cells, n_cells, stats, n_stats, result) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: n_zones
+    integer (c_int), intent(in) :: indptr(n_zones + 1)
+    integer (c_int), intent(in), value :: n_cells
+    integer (c_int), intent(in) :: cells(n_cells)
+    integer (c_int), intent(in), value :: n_stats
+    integer (c_int), intent(in) :: stats(n_stats)
+    real (c_double), intent(out) :: result(n_zones, n_stats)
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%get_value_zonal(var_name_, indptr, &
+         cells, stats, result)
+  end function bmi_get_value_zonal
+
+  ! Longitude and latitude of every node of a grid.
+  function bmi_get_grid_lonlat(model_index, grid_id, lon, lat, n) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: grid_id
+    integer (c_int), intent(in), value :: n
+    real (c_double), intent(out) :: lon(n), lat(n)
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%get_grid_lonlat(grid_id, lon, lat)
+  end function bmi_get_grid_lonlat
+
+  ! Map feature IDs to 0-based channel positions (-1 if unknown).
+  function bmi_get_link_positions(model_index, feature_ids, n, positions) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    integer (c_int64_t), intent(in) :: feature_ids(n)
+    integer (c_int), intent(out) :: positions(n)
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%get_link_positions(feature_ids, &
+         positions)
+  end function bmi_get_link_positions
+
+  function bmi_register_gauges(model_index, feature_ids, n, capacity) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    integer (c_int64_t), intent(in) :: feature_ids(n)
+    integer (c_int), intent(in), value :: capacity
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%register_gauges(feature_ids, capacity)
+  end function bmi_register_gauges
+
+  function bmi_get_gauge_count(model_index, count) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(out) :: count
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%get_gauge_count(count)
+  end function bmi_get_gauge_count
+
+  ! Records come out as values[record][gauge], oldest first.
+  function bmi_drain_gauges(model_index, values, n_values, times, n_times, &
+       count) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n_values
+    real (c_double), intent(out) :: values(n_values)
+    integer (c_int), intent(in), value :: n_times
+    real (c_double), intent(out) :: times(n_times)
+    integer (c_int), intent(out) :: count
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%drain_gauges(values, times, count)
+  end function bmi_drain_gauges
+
+  ! comm is a Fortran MPI handle (mpi4py: Comm.py2f()).
+  function bmi_set_comm(model_index, comm) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: comm
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%set_comm(comm)
+  end function bmi_set_comm
+
+  function bmi_set_intercomm(model_index, comm) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: comm
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%set_intercomm(comm)
+  end function bmi_set_intercomm
+
+  function bmi_send_value(model_index, var_name, n, rank, tag) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: rank
+    integer (c_int), intent(in), value :: tag
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%send_value(var_name_, rank, tag)
+  end function bmi_send_value
+
+  function bmi_recv_value(model_index, var_name, n, rank, tag) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: rank
+    integer (c_int), intent(in), value :: tag
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%recv_value(var_name_, rank, tag)
+  end function bmi_recv_value
+
+  function bmi_wait_exchanges(model_index) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%wait_exchanges()
+  end function bmi_wait_exchanges
+
+  function bmi_get_decomposition(model_index, rank, nprocs) bind(c) &
+       result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(out) :: rank
+    integer (c_int), intent(out) :: nprocs
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%get_decomposition(rank, nprocs)
+  end function bmi_get_decomposition
+
+  ! tile is [row offset, column offset, rows, columns] in the global grid.
+  function bmi_get_grid_tile(model_index, grid_id, tile) bind(c) &
+       result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: grid_id
+    integer (c_int), intent(out) :: tile(4)
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%get_grid_tile(grid_id, tile)
+  end function bmi_get_grid_tile
+
+  function bmi_get_grid_global_shape(model_index, grid_id, shape) bind(c) &
+       result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: grid_id
+    integer (c_int), intent(out) :: shape(2)
+    integer (c_int) :: status
+
+    status = registry(model_index)%model%get_grid_global_shape(grid_id, shape)
+  end function bmi_get_grid_global_shape
+
+  function bmi_get_value_local(model_index, var_name, n, dest, n_dest) &
+       bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: n_dest
+    real (c_double), intent(out) :: dest(n_dest)
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%get_value_local(var_name_, dest)
+  end function bmi_get_value_local
+
+  ! root < 0 gathers onto every rank.
+  function bmi_get_value_global(model_index, var_name, n, dest, n_dest, &
+       root) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: n_dest
+    real (c_double), intent(inout) :: dest(n_dest)
+    integer (c_int), intent(in), value :: root
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%get_value_global(var_name_, dest, root)
+  end function bmi_get_value_global
+
+  ! inds are 0-based flat indices into the global grid.
+  function bmi_get_value_at_global_indices(model_index, var_name, n, dest, &
+       inds, n_inds) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: n_inds
+    real (c_double), intent(out) :: dest(n_inds)
+    integer (c_int), intent(in) :: inds(n_inds)
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%get_value_at_global_indices(var_name_, &
+         dest, inds)
+  end function bmi_get_value_at_global_indices
+
+  function bmi_set_value_at_global_indices(model_index, var_name, n, inds, &
+       src, n_inds) bind(c) result(status)
+    integer (c_int), intent(in), value :: model_index
+    integer (c_int), intent(in), value :: n
+    character (len=1, kind=c_char), intent(in) :: var_name(n)
+    integer (c_int), intent(in), value :: n_inds
+    integer (c_int), intent(in) :: inds(n_inds)
+    real (c_double), intent(in) :: src(n_inds)
+
+    integer (c_int) :: i, status
+    character (len=n, kind=c_char) :: var_name_
+
+    do i = 1, n
+       var_name_(i:i) = var_name(i)
+    enddo
+
+    status = registry(model_index)%model%set_value_at_global_indices(var_name_, &
+         inds, src)
+  end function bmi_set_value_at_global_indices
+
 end module bmi_interoperability
@@ -9,6 +9,9 @@
 #define MAX_UNITS_NAME (2048)
 
 int bmi_new(void);
+int bmi_delete(int model);
+int bmi_set_max_models(int limit);
+int bmi_get_max_models(int *limit, int *live);
 
 int bmi_initialize(int model, const char *config_file, int n_chars);
 int bmi_update(int model);
@@ -76,3 +79,42 @@ int bmi_set_value_float(int model, const char *var_name, int n_chars,
 			void *buffer, int size);
 int bmi_set_value_double(int model, const char *var_name, int n_chars,
 			 void *buffer, int size);
+
+/* Extensions to BMI 2.0 specific to WRF-Hydro. */
+int bmi_get_var_mask(int model, const char *var_name, int n_chars,
+		     int *mask, int size);
+int bmi_get_value_stats(int model, const char *var_name, int n_chars,
+			int *stats, int n_stats, int *mask, int n_mask,
+			double *result);
+int bmi_get_value_zonal(int model, const char *var_name, int n_chars,
+			int *indptr, int n_zones, int *cells, int n_cells,
+			int *stats, int n_stats, double *result);
+int bmi_get_grid_lonlat(int model, int grid_id, double *lon, double *lat,
+			int n);
+int bmi_get_link_positions(int model, long long *feature_ids, int n,
+			   int *positions);
+int bmi_register_gauges(int model, long long *feature_ids, int n,
+			int capacity);
+int bmi_get_gauge_count(int model, int *count);
+int bmi_drain_gauges(int model, double *values, int n_values,
+		     double *times, int n_times, int *count);
+int bmi_set_comm(int model, int comm);
+int bmi_set_intercomm(int model, int comm);
+int bmi_send_value(int model, const char *var_name, int n_chars, int rank,
+		   int tag);
+int bmi_recv_value(int model, const char *var_name, int n_chars, int rank,
+		   int tag);
+int bmi_wait_exchanges(int model);
+int bmi_get_decomposition(int model, int *rank, int *nprocs);
+int bmi_get_grid_tile(int model, int grid_id, int *tile);
+int bmi_get_grid_global_shape(int model, int grid_id, int *shape);
+int bmi_get_value_local(int model, const char *var_name, int n_chars,
+			double *dest, int n_dest);
+int bmi_get_value_global(int model, const char *var_name, int n_chars,
+			 double *dest, int n_dest, int root);
+int bmi_get_value_at_global_indices(int model, const char *var_name,
+				    int n_chars, double *dest, int *inds,
+				    int n_inds);
+int bmi_set_value_at_global_indices(int model, const char *var_name,
+				    int n_chars, int *inds, double *src,
+				    int n_inds);
@@ -1,10 +1,13 @@
 # cython: language_level=3
 import ctypes
 from libc.stdlib cimport malloc, free
+from libc.string cimport memcpy
 
 cimport numpy as np
 import numpy as np
 
+from .._steps import iter_steps
+
 
 SIZEOF_FLOAT = 8 * ctypes.sizeof(ctypes.c_float)
 SIZEOF_DOUBLE = 8 * ctypes.sizeof(ctypes.c_double)
@@ -26,6 +29,18 @@ for k in list(DTYPE_F_TO_PY.keys()):
 
 ENOMSG = 42  # No message of desired type
 
+# Reduction codes understood by bmi_get_value_stats. A percentile p is
+# requested as STAT_PERCENTILE + round(100 * p).
+STAT_CODES = {
+    'min': 1,
+    'max': 2,
+    'mean': 3,
+    'sum': 4,
+    'std': 5,
+    'count': 6,
+}
+STAT_PERCENTILE = 10000
+
 cdef extern from "bmi_interoperability.h":
     int MAX_COMPONENT_NAME
     int MAX_VAR_NAME
@@ -33,6 +48,9 @@ cdef extern from "bmi_interoperability.h":
     int MAX_UNITS_NAME
 
     int bmi_new()
+    int bmi_delete(int model)
+    int bmi_set_max_models(int limit)
+    int bmi_get_max_models(int *limit, int *live)
 
     int bmi_initialize(int model, const char *config_file, int n_chars)
     int bmi_update(int model)
@@ -103,12 +121,89 @@ cdef extern from "bmi_interoperability.h":
     int bmi_set_value_double(int model, const char *var_name, int n_chars,
                              void *buffer, int size)
 
+    int bmi_get_var_mask(int model, const char *var_name, int n_chars,
+                         int *mask, int size)
+    int bmi_get_value_stats(int model, const char *var_name, int n_chars,
+                            int *stats, int n_stats, int *mask, int n_mask,
+                            double *result)
+    int bmi_get_value_zonal(int model, const char *var_name, int n_chars,
+                            int *indptr, int n_zones, int *cells,
+                            int n_cells, int *stats, int n_stats,
+                            double *result)
+    int bmi_get_grid_lonlat(int model, int grid_id, double *lon,
+                            double *lat, int n)
+    int bmi_get_link_positions(int model, long long *feature_ids, int n,
+                               int *positions)
+    int bmi_register_gauges(int model, long long *feature_ids, int n,
+                            int capacity)
+    int bmi_get_gauge_count(int model, int *count)
+    int bmi_drain_gauges(int model, double *values, int n_values,
+                         double *times, int n_times, int *count)
+    int bmi_set_comm(int model, int comm)
+    int bmi_set_intercomm(int model, int comm)
+    int bmi_send_value(int model, const char *var_name, int n_chars,
+                       int rank, int tag)
+    int bmi_recv_value(int model, const char *var_name, int n_chars,
+                       int rank, int tag)
+    int bmi_wait_exchanges(int model)
+    int bmi_get_decomposition(int model, int *rank, int *nprocs)
+    int bmi_get_grid_tile(int model, int grid_id, int *tile)
+    int bmi_get_grid_global_shape(int model, int grid_id, int *shape)
+    int bmi_get_value_local(int model, const char *var_name, int n_chars,
+                            double *dest, int n_dest)
+    int bmi_get_value_global(int model, const char *var_name, int n_chars,
+                             double *dest, int n_dest, int root)
+    int bmi_get_value_at_global_indices(int model, const char *var_name,
+                                        int n_chars, double *dest, int *inds,
+                                        int n_inds)
+    int bmi_set_value_at_global_indices(int model, const char *var_name,
+                                        int n_chars, int *inds, double *src,
+                                        int n_inds)
+
 
 def ok_or_raise(status):
     if status != 0:
         raise RuntimeError('error code {status}'.format(status=status))
 
 
+cpdef int stat_code(stat) except -1:
+    """Map a statistic name ('mean', 'median', 'p95', ...) to its code."""
+    if stat in STAT_CODES:
+        return STAT_CODES[stat]
+    if stat == 'median':
+        stat = 'p50'
+    if isinstance(stat, str) and stat.startswith('p'):
+        try:
+            percentile = float(stat[1:])
+        except ValueError:
+            pass
+        else:
+            if 0.0 <= percentile <= 100.0:
+                return STAT_PERCENTILE + int(round(100 * percentile))
+    raise ValueError('unknown statistic: {stat!r}'.format(stat=stat))
+
+
+def set_max_models(int limit):
+    """Set how many ``WrfHydroBmi`` objects may hold a model at once.
+
+    The limit is 1 by default: WRF-Hydro keeps its state in module
+    variables, so two live models in one process would share it. Use
+    ``WrfHydroBmi(isolated=True)`` to run several.
+    """
+    if bmi_set_max_models(limit) != 0:
+        _, live = get_max_models()
+        raise ValueError(
+            'limit must be at least 1 and at least the {live} live models'
+            .format(live=live))
+
+
+def get_max_models():
+    """Return the model limit and the number of live models."""
+    cdef int limit, live
+    ok_or_raise(bmi_get_max_models(&limit, &live))
+    return limit, live
+
+
 cpdef to_bytes(string):
     try:
         return bytes(string.encode('utf-8'))
@@ -128,15 +223,40 @@ cdef class WrfHydroBmi:
 
     cdef int _bmi
     cdef char[2048] STR_BUFFER
+    cdef dict _value_cache
+    cdef dict _published
+    cdef dict _grid_layout
+    cdef dict _mask_cache
+    cdef dict _spatial_index
+    cdef object _intercomm
+    cdef int _n_gauges
+    cdef unsigned long _step
 
     METADATA = "../data/WrfHydroBmi"
 
     def __cinit__(self):
+        self._value_cache = {}
+        self._published = {}
+        self._grid_layout = {}
+        self._mask_cache = {}
+        self._spatial_index = {}
+        self._intercomm = None
+        self._n_gauges = 0
+        self._step = 0
         self._bmi = bmi_new()
 
         if self._bmi < 0:
-            raise MemoryError('out of range model index: {}'
-                              .format(self._bmi))
+            limit, live = get_max_models()
+            raise RuntimeError(
+                '{live} of {limit} WrfHydroBmi instance(s) already live in '
+                'this process; WRF-Hydro keeps its state in module '
+                'variables, so another would share it. Finalize the '
+                'other instance or use WrfHydroBmi(isolated=True)'
+                .format(live=live, limit=limit))
+
+    def __dealloc__(self):
+        if self._bmi > 0:
+            bmi_delete(self._bmi)
 
     cpdef int _get_model_index(self):
         return self._bmi
@@ -145,15 +265,54 @@ cdef class WrfHydroBmi:
         self.STR_BUFFER = np.zeros(MAX_VAR_NAME, dtype=np.byte)
 
     def initialize(self, config_file):
+        self._invalidate_cache()
+        # Grids may change size with the next configuration
+        self._value_cache.clear()
+        self._published.clear()
+        self._grid_layout.clear()
+        self._mask_cache.clear()
+        self._spatial_index.clear()
+        self._intercomm = None
+        self._n_gauges = 0
         status = <int>bmi_initialize(self._bmi, to_bytes(config_file),
                                      len(config_file))
         ok_or_raise(status)
 
     def finalize(self):
+        self._invalidate_cache()
+        # Grids may change size with the next configuration
+        self._value_cache.clear()
+        self._published.clear()
+        self._grid_layout.clear()
+        self._mask_cache.clear()
+        self._spatial_index.clear()
+        self._n_gauges = 0
         status = <int>bmi_finalize(self._bmi)
+        self._intercomm = None
         self._bmi = -1
         ok_or_raise(status)
 
+    cdef void _invalidate_cache(self):
+        # Bumping the step stamp marks every cached array as stale while
+        # keeping its storage around for the next refill.
+        self._step += 1
+
+    def iter_steps(self, var_names, until=None, every=1, copy=False,
+                   ring_size=2):
+        """Advance the model and yield ``(time, {name: values})`` as it goes.
+
+        Each iteration runs *every* updates (fewer on the last one if
+        *until* falls in between) and then reads *var_names*. Runs until
+        the model reaches *until*, or its end time if *until* is None.
+
+        Values are read into a ring of *ring_size* preallocated buffer
+        sets, so no arrays are allocated per step: the arrays yielded by
+        one iteration stay valid for the next ``ring_size - 1`` iterations
+        and are then overwritten. Pass ``copy=True`` to get fresh arrays
+        that are safe to keep.
+        """
+        return iter_steps(self, var_names, until, every, copy, ring_size)
+
     cpdef object get_component_name(self):
         self.reset_str_buffer()
         ok_or_raise(<int>bmi_get_component_name(self._bmi,
@@ -254,10 +413,12 @@ cdef class WrfHydroBmi:
         return to_string(self.STR_BUFFER)
 
     cpdef update(self):
+        self._invalidate_cache()
         status = <int>bmi_update(self._bmi)
         ok_or_raise(status)
 
     cpdef update_until(self, time_later):
+        self._invalidate_cache()
         status = <int>bmi_update_until(self._bmi, time_later)
         ok_or_raise(status)
 
@@ -450,6 +611,473 @@ cdef class WrfHydroBmi:
         return to_string(self.STR_BUFFER)
 
     cpdef np.ndarray get_value(self, var_name, np.ndarray buffer):
+        cdef np.ndarray values = self.get_value_cached(var_name)
+        if buffer.dtype != values.dtype or not buffer.flags.c_contiguous:
+            raise TypeError(
+                'buffer must be a contiguous {dtype} array'.format(
+                    dtype=values.dtype))
+        if buffer.nbytes < values.nbytes:
+            raise ValueError(
+                'buffer has {size} elements, expected {grid_size}'.format(
+                    size=buffer.size, grid_size=values.size))
+        memcpy(buffer.data, values.data, values.nbytes)
+        return buffer
+
+    cpdef np.ndarray get_value_cached(self, var_name):
+        """Get a read-only array of a variable's values for the current step.
+
+        The first read after ``update``, ``update_until`` or ``set_value``
+        of the same variable refills the cached array from the model; later
+        reads in the same step return it without calling into Fortran. The
+        array is refilled in place on the next step, so copy it if the
+        values must outlive the current step.
+        """
+        cdef np.ndarray values
+        entry = self._value_cache.get(var_name)
+
+        if entry is not None and entry[0] == self._step:
+            return entry[1]
+
+        grid_size = self.get_grid_size(self.get_var_grid(var_name))
+        if entry is not None and entry[1].size == grid_size:
+            values = entry[1]
+            values.flags.writeable = True
+        else:
+            values = np.empty(grid_size, dtype=self.get_var_type(var_name))
+
+        self._fill_value(var_name, values)
+        values.flags.writeable = False
+        self._value_cache[var_name] = (self._step, values)
+
+        return values
+
+    cpdef np.ndarray get_var_mask(self, var_name):
+        """Get the validity mask of a variable's grid.
+
+        Returns a read-only int array, 1 where the model computes the
+        element and 0 where it does not (open-water cells on the LSM
+        grid). An air-temperature element is valid once the model has
+        computed it or it has been set, so none are before the first
+        update. Once the model has stepped the mask is fetched once per
+        variable and cached until the next ``initialize`` or ``set_value``.
+        """
+        cdef np.ndarray[int, ndim=1] mask = self._mask_cache.get(var_name)
+
+        if mask is None:
+            grid_size = self.get_grid_size(self.get_var_grid(var_name))
+            mask = np.empty(grid_size, dtype=np.intc)
+            ok_or_raise(<int>bmi_get_var_mask(self._bmi, to_bytes(var_name),
+                                              len(var_name), &mask[0],
+                                              grid_size))
+            mask.flags.writeable = False
+            if self.get_current_time() > self.get_start_time():
+                self._mask_cache[var_name] = mask
+
+        return mask
+
+    cpdef object get_value_masked(self, var_name):
+        """Get a variable as a masked array hiding its invalid elements.
+
+        The data is the read-only per-step cached array (see
+        ``get_value_cached``) and the mask comes from ``get_var_mask``.
+        """
+        return np.ma.masked_array(self.get_value_cached(var_name),
+                                  mask=self.get_var_mask(var_name) == 0)
+
+    cpdef dict get_value_stats(self, var_name, stats=('min', 'max', 'mean'),
+                               mask=None):
+        """Reduce a variable to summary statistics inside the model.
+
+        *stats* names the reductions: 'min', 'max', 'mean', 'sum', 'std'
+        (population), 'count', 'median' or a percentile such as 'p95' or
+        'p99.5'. Only elements where *mask* is true take part; by default
+        that is the variable's validity mask (see ``get_var_mask``). NaNs
+        are skipped. Returns a dict mapping each name in *stats* to a float.
+        """
+        if len(stats) == 0:
+            return {}
+
+        cdef np.ndarray[int, ndim=1] codes = np.array(
+            [stat_code(stat) for stat in stats], dtype=np.intc)
+        cdef np.ndarray[double, ndim=1] result = np.empty(len(codes))
+        cdef np.ndarray[int, ndim=1] mask_ = np.zeros(1, dtype=np.intc)
+        cdef int n_mask = 0
+
+        if mask is not None:
+            grid_size = self.get_grid_size(self.get_var_grid(var_name))
+            # Truthiness, not the integer value: 0.5 or True must select
+            mask_ = np.ascontiguousarray(
+                np.asarray(mask, dtype=bool).astype(np.intc)).reshape(-1)
+            if mask_.size != grid_size:
+                raise ValueError(
+                    'mask has {size} elements, expected {grid_size}'.format(
+                        size=mask_.size, grid_size=grid_size))
+            n_mask = grid_size
+
+        ok_or_raise(<int>bmi_get_value_stats(self._bmi, to_bytes(var_name),
+                                             len(var_name), &codes[0],
+                                             len(codes), &mask_[0], n_mask,
+                                             &result[0]))
+
+        return dict(zip(stats, result.tolist()))
+
+    cpdef dict get_value_zonal(self, var_name, indptr, cells,
+                               stats=('mean',)):
+        """Reduce a variable over many zones inside the model.
+
+        Zones are in compressed sparse row form: the flat cell indices of
+        zone ``z`` are ``cells[indptr[z]:indptr[z + 1]]``. Build them once
+        (see ``pymt_wrfhydro.zonal.ZonalIndex``) and reuse them every step.
+        *stats* may contain 'min', 'max', 'mean', 'sum', 'std' and
+        'count'. Invalid and NaN cells are skipped. Returns a dict mapping
+        each name in *stats* to an array with one value per zone; zones
+        without valid cells get a count of 0 and NaN otherwise.
+        """
+        cdef np.ndarray[int, ndim=1] indptr_ = np.ascontiguousarray(
+            indptr, dtype=np.intc)
+        cdef np.ndarray[int, ndim=1] cells_ = np.ascontiguousarray(
+            cells, dtype=np.intc)
+        cdef np.ndarray[int, ndim=1] codes = np.array(
+            [stat_code(stat) for stat in stats], dtype=np.intc)
+        cdef int n_zones = len(indptr_) - 1
+
+        if n_zones < 0:
+            raise ValueError('indptr must have at least one element')
+        if np.any(codes >= STAT_PERCENTILE):
+            raise ValueError('percentiles are not supported per zone')
+        if len(codes) == 0 or n_zones == 0:
+            return {stat: np.empty(n_zones) for stat in stats}
+
+        cdef np.ndarray[double, ndim=2] result = np.empty(
+            (len(codes), n_zones))
+        if len(cells_) == 0:
+            cells_ = np.zeros(1, dtype=np.intc)
+
+        ok_or_raise(<int>bmi_get_value_zonal(self._bmi, to_bytes(var_name),
+                                             len(var_name), &indptr_[0],
+                                             n_zones, &cells_[0],
+                                             len(cells_), &codes[0],
+                                             len(codes), &result[0, 0]))
+
+        return dict(zip(stats, result))
+
+    cpdef tuple get_grid_lonlat(self, grid_id):
+        """Get the longitude and latitude of every node of a grid.
+
+        Returns ``(lon, lat)`` in degrees, one value per node in flat value
+        order: cell centres on the LSM and routing grids, link positions
+        on the channel grid. The BMI grid functions keep describing the
+        rectilinear grids by their local origin and spacing.
+        """
+        cdef int size = self.get_grid_size(grid_id)
+        cdef np.ndarray[double, ndim=1] lon = np.empty(max(size, 1))
+        cdef np.ndarray[double, ndim=1] lat = np.empty(max(size, 1))
+
+        ok_or_raise(<int>bmi_get_grid_lonlat(self._bmi, grid_id, &lon[0],
+                                             &lat[0], size))
+        return lon[:size], lat[:size]
+
+    cpdef object get_spatial_index(self, grid_id):
+        """Get a spatial index over the nodes of a grid.
+
+        Built on first use and kept until the next ``initialize``; see
+        ``pymt_wrfhydro.spatial.SpatialIndex`` for the queries.
+        """
+        index = self._spatial_index.get(grid_id)
+        if index is None:
+            from ..spatial import SpatialIndex
+
+            index = SpatialIndex.from_model(self, grid_id)
+            self._spatial_index[grid_id] = index
+        return index
+
+    cpdef np.ndarray get_link_positions(self, feature_ids):
+        """Map NWM feature IDs to positions on the channel grid.
+
+        Returns an int array with the 0-based index of each ID in
+        ``channel_water__volume_flow_rate`` (and ``channel_link__id``), or
+        -1 where no link has that ID. Lookups go through a hash index the
+        model builds once at initialize.
+        """
+        cdef np.ndarray[long long, ndim=1] ids = np.ascontiguousarray(
+            feature_ids, dtype=np.longlong).reshape(-1)
+        cdef np.ndarray[int, ndim=1] positions = np.empty(len(ids),
+                                                          dtype=np.intc)
+        if len(ids) == 0:
+            return positions
+
+        ok_or_raise(<int>bmi_get_link_positions(self._bmi, &ids[0], len(ids),
+                                                &positions[0]))
+        return positions
+
+    cpdef register_gauges(self, feature_ids, int capacity=1024):
+        """Record streamflow at these feature IDs after every update.
+
+        The model appends one record per step (the flow at each gauge, in
+        the order given here) to a ring buffer holding the last *capacity*
+        steps; collect them with ``drain_gauges``. Replaces any earlier
+        registration; an empty list unregisters. Raises KeyError, and
+        registers nothing, if an ID is not a channel link.
+        """
+        cdef np.ndarray[long long, ndim=1] ids = np.ascontiguousarray(
+            feature_ids, dtype=np.longlong).reshape(-1)
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+
+        missing = ids[self.get_link_positions(ids) < 0]
+        if len(missing):
+            raise KeyError('unknown feature IDs: {ids}'.format(
+                ids=missing.tolist()))
+
+        if len(ids) == 0:
+            ids = np.zeros(1, dtype=np.longlong)
+            ok_or_raise(<int>bmi_register_gauges(self._bmi, &ids[0], 0,
+                                                 capacity))
+            self._n_gauges = 0
+        else:
+            ok_or_raise(<int>bmi_register_gauges(self._bmi, &ids[0],
+                                                 len(ids), capacity))
+            self._n_gauges = len(ids)
+
+    cpdef tuple drain_gauges(self):
+        """Collect the gauge records gathered since the last drain.
+
+        Returns ``(times, values)``: the model time of each record, oldest
+        first, and a ``(records, gauges)`` array of flows with columns in
+        registration order. The buffer is empty afterwards. Records older
+        than the buffer capacity have been overwritten.
+        """
+        cdef int count = 0
+        ok_or_raise(<int>bmi_get_gauge_count(self._bmi, &count))
+
+        cdef np.ndarray[double, ndim=1] times = np.empty(max(count, 1))
+        cdef np.ndarray[double, ndim=2] values = np.empty(
+            (max(count, 1), max(self._n_gauges, 1)))
+        if count > 0:
+            ok_or_raise(<int>bmi_drain_gauges(self._bmi, &values[0, 0],
+                                              values.size, &times[0],
+                                              len(times), &count))
+
+        return times[:count], values[:count, :self._n_gauges]
+
+    cpdef set_comm(self, comm):
+        """Run WRF-Hydro on *comm* instead of ``MPI_COMM_WORLD``.
+
+        *comm* is an mpi4py communicator (or a Fortran handle), e.g. from
+        ``MPI.COMM_WORLD.Split(color)`` in an MPMD job. Call before the
+        first ``initialize``; the engine cannot change communicator later.
+        """
+        handle = comm.py2f() if hasattr(comm, 'py2f') else int(comm)
+        ok_or_raise(<int>bmi_set_comm(self._bmi, handle))
+
+    cpdef set_intercomm(self, comm):
+        """Exchange fields with a partner model over *comm*.
+
+        Usually an intercommunicator to the partner's ranks (or set
+        ``partner_leader`` in the config file to have ``initialize``
+        build one). Call after ``initialize``; the caller keeps ownership.
+        """
+        handle = comm.py2f() if hasattr(comm, 'py2f') else int(comm)
+        ok_or_raise(<int>bmi_set_intercomm(self._bmi, handle))
+        self._intercomm = comm
+
+    cpdef send_value(self, var_name, int rank, int tag=0):
+        """Start sending a variable to *rank* of the partner model.
+
+        The values are copied in the library and sent as doubles without
+        passing through Python; the send completes in ``wait_exchanges``.
+        """
+        ok_or_raise(<int>bmi_send_value(self._bmi, to_bytes(var_name),
+                                        len(var_name), rank, tag))
+
+    cpdef recv_value(self, var_name, int rank, int tag=0):
+        """Start receiving an input variable from *rank* of the partner.
+
+        The partner sends one double per node of the variable's grid;
+        ``wait_exchanges`` applies them with ``set_value``.
+        """
+        ok_or_raise(<int>bmi_recv_value(self._bmi, to_bytes(var_name),
+                                        len(var_name), rank, tag))
+
+    cpdef wait_exchanges(self):
+        """Complete every posted send and receive."""
+        self._invalidate_cache()
+        ok_or_raise(<int>bmi_wait_exchanges(self._bmi))
+
+    cpdef tuple get_decomposition(self):
+        """``(rank, nprocs)`` of this process among WRF-Hydro's ranks."""
+        cdef int rank, nprocs
+        ok_or_raise(<int>bmi_get_decomposition(self._bmi, &rank, &nprocs))
+        return rank, nprocs
+
+    cpdef np.ndarray get_grid_tile(self, grid_id):
+        """The block of a grid this rank owns.
+
+        Returns ``[row offset, column offset, rows, columns]`` within the
+        global grid (0-based, C order). Channel links count as one row, so
+        a rank's links are ``[0, first, 1, count]``. With one rank the tile
+        is the whole grid.
+        """
+        cdef np.ndarray[int, ndim=1] tile = np.empty(4, dtype=np.intc)
+        ok_or_raise(<int>bmi_get_grid_tile(self._bmi, grid_id, &tile[0]))
+        return tile
+
+    cpdef np.ndarray get_grid_global_shape(self, grid_id):
+        """``get_grid_shape`` of the whole grid across all ranks.
+
+        ``[links]`` for the channel grid.
+        """
+        cdef np.ndarray[int, ndim=1] shape = np.empty(2, dtype=np.intc)
+        ok_or_raise(<int>bmi_get_grid_global_shape(self._bmi, grid_id,
+                                                   &shape[0]))
+        return shape[:self.get_grid_rank(grid_id)].copy()
+
+    cpdef np.ndarray get_value_local(self, var_name):
+        """Values of a variable on this rank's tile, as float64.
+
+        Flat in C order over the tile's rows and columns (see
+        ``get_grid_tile``); unlike ``get_value`` the routing grid's halo
+        cells are left out. No communication.
+        """
+        tile = self.get_grid_tile(self.get_var_grid(var_name))
+        cdef np.ndarray[double, ndim=1] dest = np.empty(tile[2] * tile[3])
+        if dest.size:
+            ok_or_raise(<int>bmi_get_value_local(
+                self._bmi, to_bytes(var_name), len(var_name), &dest[0],
+                dest.size))
+        return dest
+
+    cpdef object get_value_global(self, var_name, root=None):
+        """Values of a variable over the whole domain, as float64.
+
+        Collective: every rank must call it. The tiles are gathered with
+        ``MPI_Gatherv`` onto rank *root* of WRF-Hydro's communicator, which
+        gets the flat global array while the other ranks get None, or,
+        without *root*, with ``MPI_Allgatherv`` onto every rank. Counts and
+        displacements are exchanged once at initialize.
+        """
+        cdef int root_ = -1 if root is None else root
+        cdef int rank
+        rank, _ = self.get_decomposition()
+        shape = self.get_grid_global_shape(self.get_var_grid(var_name))
+        cdef np.ndarray[double, ndim=1] dest = np.empty(
+            int(np.prod(shape)) if root_ < 0 or rank == root_ else 1)
+        if dest.size:
+            ok_or_raise(<int>bmi_get_value_global(
+                self._bmi, to_bytes(var_name), len(var_name), &dest[0],
+                dest.size, root_))
+        return dest if root_ < 0 or rank == root_ else None
+
+    cpdef np.ndarray get_value_at_global_indices(self, var_name, inds):
+        """Values of a variable at 0-based flat indices of the global grid.
+
+        Collective when WRF-Hydro runs on several ranks: each rank fills
+        the indices it owns and every rank gets all the values. Indices
+        outside the grid give -1.
+        """
+        cdef np.ndarray[int, ndim=1] inds_ = np.ascontiguousarray(
+            inds, dtype=np.intc).reshape(-1)
+        cdef np.ndarray[double, ndim=1] dest = np.empty(len(inds_))
+        if len(inds_):
+            ok_or_raise(<int>bmi_get_value_at_global_indices(
+                self._bmi, to_bytes(var_name), len(var_name), &dest[0],
+                &inds_[0], len(inds_)))
+        return dest
+
+    cpdef set_value_at_global_indices(self, var_name, inds, src):
+        """Set a variable at 0-based flat indices of the global grid.
+
+        Pass the same indices and values on every rank; each keeps the
+        ones its tile owns.
+        """
+        cdef np.ndarray[int, ndim=1] inds_ = np.ascontiguousarray(
+            inds, dtype=np.intc).reshape(-1)
+        cdef np.ndarray[double, ndim=1] src_ = np.ascontiguousarray(
+            src, dtype=np.float64).reshape(-1)
+        if src_.size != inds_.size:
+            raise ValueError(
+                'expected {n} values, got {size}'.format(n=inds_.size,
+                                                         size=src_.size))
+        self._value_cache.pop(var_name, None)
+        self._mask_cache.pop(var_name, None)
+        if len(inds_):
+            ok_or_raise(<int>bmi_set_value_at_global_indices(
+                self._bmi, to_bytes(var_name), len(var_name), &inds_[0],
+                &src_[0], len(inds_)))
+
+    cpdef np.ndarray get_value_2d(self, var_name, np.ndarray out=None):
+        """Get a variable on a rectilinear grid as a 2D ``[row, col]`` array.
+
+        The model flattens its ``(ix, jx)`` Fortran arrays with ``ix``
+        varying fastest, which is exactly C order for the ``[jx, ix]``
+        shape the grid reports, so no transpose is needed. Without *out*,
+        returns a zero-copy read-only view of the per-step value cache
+        (see ``get_value_cached``). With *out*, copies into it; *out* must
+        be C-contiguous with the grid's shape and the variable's dtype.
+        """
+        cdef np.ndarray values = self.get_value_cached(var_name)
+        grid_id = self.get_var_grid(var_name)
+        shape, strides = self._get_grid_layout(grid_id, values.itemsize)
+
+        if out is None:
+            return np.ndarray(shape, dtype=values.dtype, buffer=values,
+                              strides=strides)
+
+        if ((<object>out).shape != shape or out.dtype != values.dtype
+                or not out.flags.c_contiguous):
+            raise ValueError(
+                "out must be a C-contiguous {dtype} array of shape {shape}"
+                .format(dtype=values.dtype, shape=shape))
+        memcpy(out.data, values.data, values.nbytes)
+        return out
+
+    cdef tuple _get_grid_layout(self, grid_id, int itemsize):
+        # Shape and C-order strides of a rank-2 grid, looked up once per
+        # grid and itemsize since they only change on re-initialize.
+        key = (grid_id, itemsize)
+        layout = self._grid_layout.get(key)
+        if layout is None:
+            if self.get_grid_rank(grid_id) != 2:
+                raise ValueError(
+                    "grid {grid} is not a 2D grid".format(grid=grid_id))
+            shape = tuple(int(n) for n in self.get_grid_shape(
+                grid_id, np.empty(2, dtype=np.intc)))
+            layout = (shape, (shape[1] * itemsize, itemsize))
+            self._grid_layout[key] = layout
+        return layout
+
+    cpdef tuple get_value_changes(self, var_name, double tolerance=0.0):
+        """Get the elements of a variable that changed since last published.
+
+        Compares the current values against the copy last published for
+        *var_name* and returns ``(indices, values)`` for the elements that
+        differ by more than *tolerance*; the first call publishes and
+        returns every element. Only the returned elements are published,
+        so changes below *tolerance* accumulate until they cross it and a
+        consumer's mirror never lags the model by more than *tolerance*.
+        Use ``pymt_wrfhydro.changes.encode_changes`` to pack the result
+        for transport.
+        """
+        cdef np.ndarray current = self.get_value_cached(var_name)
+        cdef np.ndarray published = self._published.get(var_name)
+
+        if published is None:
+            self._published[var_name] = current.copy()
+            return np.arange(current.size, dtype=np.int64), current.copy()
+
+        changed = np.abs(current - published) > tolerance
+        if current.dtype.kind == "f":
+            # NaN compares unequal to everything, so a move to or from NaN
+            # shows up only in the masks.
+            changed |= np.isnan(current) != np.isnan(published)
+
+        indices = np.flatnonzero(changed)
+        values = current[indices]
+        published[indices] = values
+
+        return indices, values
+
+    cdef _fill_value(self, var_name, np.ndarray buffer):
         cdef int grid_id = self.get_var_grid(var_name)
         cdef int grid_size = self.get_grid_size(grid_id)
         type = self.get_var_type(var_name)
@@ -501,6 +1129,9 @@ cdef class WrfHydroBmi:
         cdef int grid_size = self.get_grid_size(grid_id)
         type = self.get_var_type(var_name)
 
+        self._value_cache.pop(var_name, None)
+        self._mask_cache.pop(var_name, None)
+
         if type == DTYPE_DOUBLE:
             ok_or_raise(<int>bmi_set_value_double(self._bmi,
                                                   to_bytes(var_name),
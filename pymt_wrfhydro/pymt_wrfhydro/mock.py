@@ -0,0 +1,686 @@
+"""Pure-NumPy stand-in for :class:`~pymt_wrfhydro.WrfHydroBmi`.
+
+:class:`MockWrfHydroBmi` has the variables, units, types, grids and time
+semantics of the real model, without the compiled library, MPI or the
+Croton data. It lets coupling code, recorders, remappers and benchmarks
+of them be developed and timed anywhere:
+
+- The same names, units and types, and the same grids: 0 (LSM, uniform
+  rectilinear), 1 (routing, ``aggfactrt`` times finer) and 2 (channel
+  links, a vector grid with edges from each link to the one it drains
+  into).
+- The same clock: start at 0 s, one time step per ``update``,
+  ``update_until`` rounding to whole steps and refusing to go back.
+- The same extensions, on one rank: cached and 2D reads, masks, stats
+  and zonal stats, spatial index, link positions, gauges, change
+  tracking, ``iter_steps`` and the tile/global reads of a one-rank
+  decomposition. The MPMD exchange (``set_intercomm``, ``send_value``,
+  ``recv_value``) is not mocked.
+
+The basin is a :class:`~pymt_wrfhydro.synthetic.SyntheticDomain` of any
+size, driven by its synthetic forcing. A bucket model makes the fields
+physically shaped: soil moisture rises with rain and drains, snow
+accumulates below freezing, ponded water collects along the channels and
+streamflow grows downstream through a linear reservoir. Each ``update``
+is a few vectorised numpy passes over the grids, so the model costs far
+less than the code around it.
+
+Setting ``atmosphere_water__precipitation_leq-volume_flux`` or
+``land_surface_air__temperature`` replaces the synthetic forcing for the
+next ``update``.
+
+Example::
+
+    model = MockWrfHydroBmi(lsm_shape=(500, 500))   # 4M routing cells
+    model.initialize()
+    model.update_until(24 * 3600.0)
+
+As a ``factory`` string it is ``"pymt_wrfhydro.mock:MockWrfHydroBmi"``;
+the domain is then read from an optional ``&mock_wrfhydro_config``
+namelist in the config file (``lsm_rows``, ``lsm_cols``, ``aggfactrt``,
+``n_steps``, ``time_step``, ``channel_spacing``, ``reach_cells``).
+"""
+import collections
+import os
+import re
+
+import numpy as np
+
+from ._steps import iter_steps
+from .synthetic import SyntheticDomain
+
+__all__ = ["MockWrfHydroBmi"]
+
+GRID_LSM, GRID_ROUTING, GRID_CHANNEL = 0, 1, 2
+
+# name: (grid, units, type), as reported by the Fortran library
+_VARS = {
+    "channel_water__volume_flow_rate": (GRID_CHANNEL, "m3 s-1", "float64"),
+    "land_surface_water__depth": (GRID_ROUTING, "m", "float64"),
+    "soil_water__volume_fraction": (GRID_LSM, "1", "float64"),
+    "snowpack__liquid-equivalent_depth": (GRID_LSM, "mm", "float64"),
+    "land_surface_water__evaporation_volume_flux": (GRID_LSM, "mm", "float64"),
+    "land_surface_water__runoff_volume_flux": (GRID_LSM, "m", "float64"),
+    "soil_water__domain_time_integral_of_baseflow_volume_flux":
+        (GRID_LSM, "mm", "float64"),
+    "land_surface_air__temperature": (GRID_LSM, "K", "float64"),
+    "atmosphere_water__precipitation_leq-volume_flux":
+        (GRID_LSM, "mm s-1", "float64"),
+    "sea_water_surface__elevation": (GRID_LSM, "m", "float64"),
+    "sea_water__x_velocity": (GRID_LSM, "m s-1", "float64"),
+    "channel_link__id": (GRID_CHANNEL, "1", "int32"),
+}
+INPUT_VAR_NAMES = (
+    "atmosphere_water__precipitation_leq-volume_flux",
+    "land_surface_air__temperature",
+    "sea_water_surface__elevation",
+    "sea_water__x_velocity",
+)
+OUTPUT_VAR_NAMES = (
+    "channel_water__volume_flow_rate",
+    "land_surface_water__depth",
+    "soil_water__volume_fraction",
+    "snowpack__liquid-equivalent_depth",
+    "land_surface_water__evaporation_volume_flux",
+    "land_surface_water__runoff_volume_flux",
+    "soil_water__domain_time_integral_of_baseflow_volume_flux",
+    "land_surface_air__temperature",
+    "channel_link__id",
+)
+
+_CONFIG_KEYS = {
+    "lsm_rows": int, "lsm_cols": int, "aggfactrt": int, "n_steps": int,
+    "time_step": float, "channel_spacing": int, "reach_cells": int,
+}
+
+# Bucket model
+_ROOT_ZONE = 1000.0      # mm of soil per unit volume fraction
+_POROSITY = 0.45
+_FIELD_CAPACITY = 0.2
+_DRAINAGE = 0.0005       # per hour, above field capacity
+_RECESSION = 6 * 3600.0  # s, channel linear reservoir
+_PONDING = 3 * 3600.0    # s, ponded water e-folding time
+
+
+def _read_config(config_file):
+    """Domain options from a ``&mock_wrfhydro_config`` group, if any."""
+    if not config_file or not os.path.isfile(config_file):
+        return {}
+    with open(config_file) as fp:
+        text = fp.read()
+    group = re.search(r"&mock_wrfhydro_config(.*?)^\s*/", text,
+                      re.DOTALL | re.MULTILINE | re.IGNORECASE)
+    if group is None:
+        return {}
+    options = {}
+    for key, value in re.findall(r"(\w+)\s*=\s*([^\s,]+)", group.group(1)):
+        key = key.lower()
+        if key not in _CONFIG_KEYS:
+            raise ValueError(f"unknown mock_wrfhydro_config key: {key}")
+        options[key] = _CONFIG_KEYS[key](float(value))
+    return options
+
+
+def _percentile(stat):
+    if stat == "median":
+        return 50.0
+    if isinstance(stat, str) and stat.startswith("p"):
+        try:
+            percentile = float(stat[1:])
+        except ValueError:
+            pass
+        else:
+            if 0.0 <= percentile <= 100.0:
+                return percentile
+    raise ValueError(f"unknown statistic: {stat!r}")
+
+
+class MockWrfHydroBmi:
+    """WRF-Hydro's BMI over a synthetic basin, in numpy.
+
+    Parameters
+    ----------
+    lsm_shape : tuple of int, optional
+        ``[rows, cols]`` of the LSM grid (Croton's by default).
+    aggfactrt : int, optional
+        Routing cells per LSM cell along each axis.
+    n_steps : int, optional
+        Steps from the start to the end time.
+    time_step : float, optional
+        Seconds per step.
+    channel_spacing, reach_cells : int, optional
+        Passed to :class:`~pymt_wrfhydro.synthetic.SyntheticDomain`.
+    """
+
+    def __init__(self, lsm_shape=(16, 15), aggfactrt=4, n_steps=24,
+                 time_step=3600.0, channel_spacing=8, reach_cells=16):
+        self._options = {
+            "lsm_rows": lsm_shape[0], "lsm_cols": lsm_shape[1],
+            "aggfactrt": aggfactrt, "n_steps": n_steps,
+            "time_step": time_step, "channel_spacing": channel_spacing,
+            "reach_cells": reach_cells,
+        }
+        self._domain = None
+        self._values = {}
+
+    # ------------------------------------------------------------------
+    # Model control
+    # ------------------------------------------------------------------
+
+    def initialize(self, config_file=None):
+        options = dict(self._options, **_read_config(config_file))
+        if self._domain is None or options != self._built:
+            self._domain = SyntheticDomain(
+                (options["lsm_rows"], options["lsm_cols"]),
+                aggfactrt=options["aggfactrt"],
+                channel_spacing=options["channel_spacing"],
+                reach_cells=options["reach_cells"],
+            )
+            self._built = options
+            self._link_setup()
+        domain = self._domain
+        self._dt = float(options["time_step"])
+        self._end_time = options["n_steps"] * self._dt
+        self._step = 0
+        self._time = 0.0
+        self._forced = set()
+        self._published = {}
+        self._gauges = np.zeros(0, dtype=np.intp)
+        self._records = collections.deque(maxlen=1)
+        self._spatial_index = {}
+
+        self._values = {name: np.zeros(self._grid_sizes[grid])
+                        for name, (grid, _, kind) in _VARS.items()
+                        if kind == "float64"}
+        self._values["channel_link__id"] = domain.link_id.astype(np.int32)
+        self._values["soil_water__volume_fraction"][:] = 0.3
+        self._apply_forcing(domain.forcing(0))
+        self._values["channel_water__volume_flow_rate"][:] = (
+            self._link_area * 1e-8
+        )
+
+    def _link_setup(self):
+        domain = self._domain
+        ny, nx = domain.lsm_shape
+        self._grid_sizes = {GRID_LSM: ny * nx, GRID_ROUTING: domain.n_cells,
+                            GRID_CHANNEL: domain.n_links}
+        # Upstream area of each link: the accumulation at its outlet cell
+        area = np.zeros(domain.n_links + 1)
+        np.maximum.at(area, domain.link_grid[domain.channel],
+                      domain.flow_accumulation[domain.channel])
+        self._link_area = area[1:] * domain.dx_rt ** 2
+        # Ponded water gathers where flow converges
+        acc = domain.flow_accumulation.reshape(-1)
+        self._wetness = (acc / acc.mean()) ** 0.2
+        self._positions = {int(link): k for k, link in
+                           enumerate(domain.link_id)}
+        self._downstream = domain.link_to.astype(np.intp) - 1
+        lon, lat = domain.lonlat(domain.link_x, domain.link_y)
+        self._link_xyz = {"x": lon, "y": lat, "z": domain.link_elevation}
+
+    def _apply_forcing(self, forcing):
+        values = self._values
+        for name, field in (("land_surface_air__temperature", "T2D"),
+                            ("atmosphere_water__precipitation_leq-volume_flux",
+                             "RAINRATE")):
+            if name not in self._forced:
+                values[name][:] = forcing[field].reshape(-1)
+        self._forced.clear()
+
+    def update(self):
+        self._check_initialized()
+        values = self._values
+        dt = self._dt
+        hours = dt / 3600.0
+
+        # Forcing over this step: set inputs win over the synthetic fields
+        forcing = self._domain.forcing((self._time / 3600.0) % 24)
+        self._apply_forcing(forcing)
+        temp = values["land_surface_air__temperature"]
+        rain = values["atmosphere_water__precipitation_leq-volume_flux"] * dt
+
+        # Snow below freezing, degree-hour melt above it
+        swe = values["snowpack__liquid-equivalent_depth"]
+        cold = temp < 273.15
+        melt = np.where(cold, 0.0,
+                        np.minimum(swe, 0.1 * (temp - 273.15) * hours))
+        swe += np.where(cold, rain, 0.0) - melt
+        liquid = np.where(cold, 0.0, rain) + melt
+
+        # Soil bucket
+        soil = values["soil_water__volume_fraction"]
+        sun = forcing["SWDOWN"].reshape(-1) / 800.0
+        et = np.minimum(0.2 * hours * sun * soil / _POROSITY,
+                        _ROOT_ZONE * soil)
+        drain = (_DRAINAGE * hours * _ROOT_ZONE
+                 * np.maximum(soil - _FIELD_CAPACITY, 0.0))
+        # Saturation excess: wetter soil sheds more of the water
+        excess = liquid * (soil / _POROSITY) ** 3
+        excess += np.maximum(
+            liquid - excess - _ROOT_ZONE * (_POROSITY - soil) - et - drain, 0.0
+        )
+        infiltration = liquid - excess
+        soil += (infiltration - et - drain) / _ROOT_ZONE
+        values["land_surface_water__evaporation_volume_flux"] += et
+        values["soil_water__domain_time_integral_of_baseflow_volume_flux"] += \
+            drain
+        values["land_surface_water__runoff_volume_flux"] += excess / 1000.0
+
+        # Ponded water on the routing grid
+        ny, nx = self._domain.lsm_shape
+        agg = self._domain.aggfactrt
+        excess_rt = np.broadcast_to(
+            excess.reshape(ny, 1, nx, 1), (ny, agg, nx, agg)
+        ).reshape(-1)
+        depth = values["land_surface_water__depth"]
+        depth *= np.exp(-dt / _PONDING)
+        depth += excess_rt * self._wetness / 1000.0
+
+        # Streamflow: basin-mean runoff and baseflow through a reservoir
+        inflow = self._link_area * (excess.mean() + drain.mean()) / (1000.0 * dt)
+        flow = values["channel_water__volume_flow_rate"]
+        flow += (inflow - flow) * (dt / (dt + _RECESSION))
+
+        self._step += 1
+        self._time = self._step * dt
+        if len(self._gauges):
+            self._records.append((self._time, flow[self._gauges].copy()))
+
+    def update_until(self, time_later):
+        self._check_initialized()
+        if time_later < self._time:
+            raise RuntimeError(
+                f"cannot go back in time: {time_later} < {self._time}"
+            )
+        for _ in range(int(round((time_later - self._time) / self._dt))):
+            self.update()
+
+    def finalize(self):
+        self._values = {}
+        self._published = {}
+        self._spatial_index = {}
+
+    def _check_initialized(self):
+        if not self._values:
+            raise RuntimeError("model is not initialized")
+
+    def iter_steps(self, var_names, until=None, every=1, copy=False,
+                   ring_size=2):
+        """Advance and yield ``(time, {name: values})``, as the real model."""
+        return iter_steps(self, var_names, until, every, copy, ring_size)
+
+    # ------------------------------------------------------------------
+    # Model information and time
+    # ------------------------------------------------------------------
+
+    def get_component_name(self):
+        return "WRF-Hydro v5.4.0 (NCAR) [mock]"
+
+    def get_input_item_count(self):
+        return len(INPUT_VAR_NAMES)
+
+    def get_output_item_count(self):
+        return len(OUTPUT_VAR_NAMES)
+
+    def get_input_var_names(self):
+        return tuple(INPUT_VAR_NAMES)
+
+    def get_output_var_names(self):
+        return tuple(OUTPUT_VAR_NAMES)
+
+    def get_start_time(self):
+        return 0.0
+
+    def get_end_time(self):
+        return self._end_time
+
+    def get_current_time(self):
+        return self._time
+
+    def get_time_step(self):
+        return self._dt
+
+    def get_time_units(self):
+        return "s"
+
+    # ------------------------------------------------------------------
+    # Variables
+    # ------------------------------------------------------------------
+
+    def _var(self, name):
+        try:
+            return _VARS[name]
+        except KeyError:
+            raise RuntimeError(f"unknown variable: {name}") from None
+
+    def get_var_grid(self, var_name):
+        return self._var(var_name)[0]
+
+    def get_var_units(self, var_name):
+        return self._var(var_name)[1]
+
+    def get_var_type(self, var_name):
+        return self._var(var_name)[2]
+
+    def get_var_itemsize(self, var_name):
+        return np.dtype(self.get_var_type(var_name)).itemsize
+
+    def get_var_nbytes(self, var_name):
+        return (self.get_var_itemsize(var_name)
+                * self.get_grid_size(self.get_var_grid(var_name)))
+
+    def get_var_location(self, var_name):
+        self._var(var_name)
+        return "node"
+
+    def get_value_ptr(self, var_name):
+        self._var(var_name)
+        self._check_initialized()
+        return self._values[var_name]
+
+    def get_value(self, var_name, buffer):
+        buffer[:] = self.get_value_ptr(var_name)
+        return buffer
+
+    def get_value_cached(self, var_name):
+        """A read-only view of the current values, refilled every step."""
+        values = self.get_value_ptr(var_name).view()
+        values.flags.writeable = False
+        return values
+
+    def set_value(self, var_name, buffer):
+        values = self.get_value_ptr(var_name)
+        if var_name == "channel_link__id":
+            raise RuntimeError(f"{var_name} is read-only")
+        values[:] = np.asarray(buffer).reshape(-1)
+        if var_name in INPUT_VAR_NAMES:
+            self._forced.add(var_name)
+        return buffer
+
+    def get_value_2d(self, var_name, out=None):
+        grid_id = self.get_var_grid(var_name)
+        if self.get_grid_rank(grid_id) != 2:
+            raise ValueError(f"grid {grid_id} is not a 2D grid")
+        shape = tuple(self.get_grid_shape(grid_id, np.empty(2, dtype=np.intc)))
+        values = self.get_value_cached(var_name).reshape(shape)
+        if out is None:
+            return values
+        if (out.shape != shape or out.dtype != values.dtype
+                or not out.flags.c_contiguous):
+            raise ValueError(
+                f"out must be a C-contiguous {values.dtype} array of shape "
+                f"{shape}"
+            )
+        out[...] = values
+        return out
+
+    def get_var_mask(self, var_name):
+        """All ones: the synthetic basin has no open water."""
+        mask = np.ones(self.get_grid_size(self.get_var_grid(var_name)),
+                       dtype=np.intc)
+        mask.flags.writeable = False
+        return mask
+
+    def get_value_masked(self, var_name):
+        return np.ma.masked_array(self.get_value_cached(var_name),
+                                  mask=self.get_var_mask(var_name) == 0)
+
+    def get_value_stats(self, var_name, stats=("min", "max", "mean"),
+                        mask=None):
+        values = self.get_value_cached(var_name).astype(float)
+        if mask is not None:
+            mask = np.asarray(mask).reshape(-1)
+            if mask.size != values.size:
+                raise ValueError(
+                    f"mask has {mask.size} elements, expected {values.size}"
+                )
+            values = values[mask != 0]
+        values = values[~np.isnan(values)]
+
+        result = {}
+        for stat in stats:
+            if stat == "count":
+                result[stat] = float(values.size)
+            elif stat in ("min", "max", "mean", "sum", "std"):
+                result[stat] = (float(getattr(np, stat)(values))
+                                if values.size else np.nan)
+            else:
+                percentile = _percentile(stat)
+                result[stat] = (float(np.percentile(values, percentile))
+                                if values.size else np.nan)
+        return result
+
+    def get_value_zonal(self, var_name, indptr, cells, stats=("mean",)):
+        indptr = np.asarray(indptr, dtype=np.intp).reshape(-1)
+        cells = np.asarray(cells, dtype=np.intp).reshape(-1)
+        n_zones = len(indptr) - 1
+        if n_zones < 0:
+            raise ValueError("indptr must have at least one element")
+        for stat in stats:
+            if stat not in ("min", "max", "mean", "sum", "std", "count"):
+                _percentile(stat)
+                raise ValueError("percentiles are not supported per zone")
+
+        values = self.get_value_cached(var_name).astype(float)[cells]
+        zone = np.repeat(np.arange(n_zones), np.diff(indptr))
+        keep = ~np.isnan(values)
+        values, zone = values[keep], zone[keep]
+
+        count = np.bincount(zone, minlength=n_zones).astype(float)
+        total = np.bincount(zone, weights=values, minlength=n_zones)
+        empty = count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+        result = {"count": count, "sum": np.where(empty, np.nan, total),
+                  "mean": mean}
+        if "std" in stats:
+            squares = np.bincount(zone, weights=(values - mean[zone]) ** 2,
+                                  minlength=n_zones)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result["std"] = np.sqrt(squares / count)
+        if "min" in stats or "max" in stats:
+            low = np.full(n_zones, np.inf)
+            high = np.full(n_zones, -np.inf)
+            np.minimum.at(low, zone, values)
+            np.maximum.at(high, zone, values)
+            result["min"] = np.where(empty, np.nan, low)
+            result["max"] = np.where(empty, np.nan, high)
+        return {stat: result[stat] for stat in stats}
+
+    def get_value_changes(self, var_name, tolerance=0.0):
+        current = self.get_value_cached(var_name)
+        published = self._published.get(var_name)
+        if published is None:
+            self._published[var_name] = current.copy()
+            return np.arange(current.size, dtype=np.int64), current.copy()
+
+        changed = np.abs(current - published) > tolerance
+        if current.dtype.kind == "f":
+            changed |= np.isnan(current) != np.isnan(published)
+        indices = np.flatnonzero(changed)
+        values = current[indices]
+        published[indices] = values
+        return indices, values
+
+    # ------------------------------------------------------------------
+    # Grids
+    # ------------------------------------------------------------------
+
+    def _grid(self, grid_id):
+        self._check_initialized()
+        if grid_id not in self._grid_sizes:
+            raise RuntimeError(f"unknown grid: {grid_id}")
+        return grid_id
+
+    def get_grid_type(self, grid_id):
+        if self._grid(grid_id) == GRID_CHANNEL:
+            return "vector"
+        return "uniform_rectilinear"
+
+    def get_grid_rank(self, grid_id):
+        return 1 if self._grid(grid_id) == GRID_CHANNEL else 2
+
+    def get_grid_size(self, grid_id):
+        return self._grid_sizes[self._grid(grid_id)]
+
+    def get_grid_shape(self, grid_id, shape):
+        if self._grid(grid_id) == GRID_CHANNEL:
+            raise RuntimeError("the channel grid has no shape")
+        shape[:] = (self._domain.lsm_shape if grid_id == GRID_LSM
+                    else self._domain.rt_shape)
+        return shape
+
+    def get_grid_spacing(self, grid_id, spacing):
+        if self._grid(grid_id) == GRID_CHANNEL:
+            raise RuntimeError("the channel grid has no spacing")
+        spacing[:] = (self._domain.dx if grid_id == GRID_LSM
+                      else self._domain.dx_rt)
+        return spacing
+
+    def get_grid_origin(self, grid_id, origin):
+        if self._grid(grid_id) == GRID_CHANNEL:
+            raise RuntimeError("the channel grid has no origin")
+        origin[:] = 0.0
+        return origin
+
+    def _link_coordinate(self, grid_id, axis, out):
+        if self._grid(grid_id) != GRID_CHANNEL:
+            raise RuntimeError(f"grid {grid_id} has no node coordinates")
+        out[:] = self._link_xyz[axis]
+        return out
+
+    def get_grid_x(self, grid_id, x):
+        return self._link_coordinate(grid_id, "x", x)
+
+    def get_grid_y(self, grid_id, y):
+        return self._link_coordinate(grid_id, "y", y)
+
+    def get_grid_z(self, grid_id, z):
+        return self._link_coordinate(grid_id, "z", z)
+
+    def get_grid_lonlat(self, grid_id):
+        """Longitude and latitude of every node, as the library serves them."""
+        grid = self._grid(grid_id)
+        if grid == GRID_CHANNEL:
+            return self._link_xyz["x"].copy(), self._link_xyz["y"].copy()
+        domain = self._domain
+        xy = domain.lsm_xy() if grid == GRID_LSM else domain.routing_xy()
+        lon, lat = domain.lonlat(*xy)
+        return lon.reshape(-1), lat.reshape(-1)
+
+    def get_grid_node_count(self, grid_id):
+        return self.get_grid_size(grid_id)
+
+    def get_grid_edge_count(self, grid_id):
+        if self._grid(grid_id) != GRID_CHANNEL:
+            raise RuntimeError(f"grid {grid_id} has no edges")
+        return int(np.count_nonzero(self._downstream >= 0))
+
+    def get_grid_face_count(self, grid_id):
+        if self._grid(grid_id) != GRID_CHANNEL:
+            raise RuntimeError(f"grid {grid_id} has no faces")
+        return 0
+
+    def get_grid_edge_nodes(self, grid_id, edge_nodes):
+        n_edges = self.get_grid_edge_count(grid_id)
+        if len(edge_nodes) < 2 * n_edges:
+            raise RuntimeError("edge_nodes is too small")
+        upstream = np.flatnonzero(self._downstream >= 0)
+        edge_nodes[:2 * n_edges:2] = upstream
+        edge_nodes[1:2 * n_edges:2] = self._downstream[upstream]
+        return edge_nodes
+
+    def get_grid_face_edges(self, grid_id, face_edges):
+        if len(face_edges):
+            raise RuntimeError(f"grid {grid_id} has no faces")
+        return face_edges
+
+    def get_grid_face_nodes(self, grid_id, face_nodes):
+        return self.get_grid_face_edges(grid_id, face_nodes)
+
+    def get_grid_nodes_per_face(self, grid_id, nodes_per_face):
+        return nodes_per_face
+
+    def get_spatial_index(self, grid_id):
+        index = self._spatial_index.get(grid_id)
+        if index is None:
+            from .spatial import SpatialIndex
+
+            index = SpatialIndex.from_model(self, grid_id)
+            self._spatial_index[grid_id] = index
+        return index
+
+    # ------------------------------------------------------------------
+    # Channel links and gauges
+    # ------------------------------------------------------------------
+
+    def get_link_positions(self, feature_ids):
+        self._check_initialized()
+        ids = np.asarray(feature_ids, dtype=np.int64).reshape(-1)
+        return np.array([self._positions.get(int(i), -1) for i in ids],
+                        dtype=np.intc)
+
+    def register_gauges(self, feature_ids, capacity=1024):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        ids = np.asarray(feature_ids, dtype=np.int64).reshape(-1)
+        positions = self.get_link_positions(ids)
+        if np.any(positions < 0):
+            raise KeyError(f"unknown feature IDs: {ids[positions < 0].tolist()}")
+        self._gauges = positions.astype(np.intp)
+        self._records = collections.deque(maxlen=capacity)
+
+    def drain_gauges(self):
+        records = list(self._records)
+        self._records.clear()
+        times = np.array([time for time, _ in records])
+        values = np.array([flow for _, flow in records]).reshape(
+            len(records), len(self._gauges)
+        )
+        return times, values
+
+    # ------------------------------------------------------------------
+    # Decomposition: always one rank
+    # ------------------------------------------------------------------
+
+    def set_comm(self, comm):
+        if getattr(comm, "size", 1) != 1:
+            raise ValueError("the mock model runs on one rank")
+
+    def get_decomposition(self):
+        return 0, 1
+
+    def get_grid_global_shape(self, grid_id):
+        if self._grid(grid_id) == GRID_CHANNEL:
+            return np.array([self.get_grid_size(grid_id)], dtype=np.intc)
+        return self.get_grid_shape(grid_id, np.empty(2, dtype=np.intc))
+
+    def get_grid_tile(self, grid_id):
+        shape = self.get_grid_global_shape(grid_id)
+        rows, cols = (1, shape[0]) if len(shape) == 1 else shape
+        return np.array([0, 0, rows, cols], dtype=np.intc)
+
+    def get_value_local(self, var_name):
+        return self.get_value_ptr(var_name).astype(np.float64)
+
+    def get_value_global(self, var_name, root=None):
+        if root not in (None, 0):
+            return None
+        return self.get_value_local(var_name)
+
+    def get_value_at_global_indices(self, var_name, inds):
+        values = self.get_value_ptr(var_name)
+        inds = np.asarray(inds, dtype=np.intp).reshape(-1)
+        inside = (inds >= 0) & (inds < values.size)
+        return np.where(inside, values[np.where(inside, inds, 0)], -1.0)
+
+    def set_value_at_global_indices(self, var_name, inds, src):
+        values = self.get_value_ptr(var_name)
+        inds = np.asarray(inds, dtype=np.intp).reshape(-1)
+        src = np.asarray(src, dtype=np.float64).reshape(-1)
+        if src.size != inds.size:
+            raise ValueError(f"expected {inds.size} values, got {src.size}")
+        inside = (inds >= 0) & (inds < values.size)
+        values[inds[inside]] = src[inside]
+        if var_name in INPUT_VAR_NAMES:
+            self._forced.add(var_name)
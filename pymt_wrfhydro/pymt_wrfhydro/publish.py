@@ -0,0 +1,326 @@
+"""Publish model outputs to other local processes through shared memory.
+
+A :class:`Publisher` wraps a model and, after every ``update`` or
+``update_until``, copies selected variables into one named shared-memory
+segment. Any number of :class:`Subscriber` instances, in any local
+processes, attach to the segment by name and read the latest snapshot
+without calling into the model or slowing it down::
+
+    model = Publisher(model, ["channel_water__volume_flow_rate"],
+                      name="wrfhydro-croton")
+    while model.get_current_time() < model.get_end_time():
+        model.update()                  # publishes a snapshot
+
+    # in a flood mapper, gauge logger, dashboard, ...
+    feed = Subscriber("wrfhydro-croton")
+    snapshot = feed.wait_for(0)
+    print(snapshot.sequence, snapshot.time,
+          snapshot.values["channel_water__volume_flow_rate"].max())
+
+The segment starts with a header (a magic string, the layout version, a
+sequence counter, the model time) and a table of the variables with their
+dtype, offset and size, so a subscriber needs only the segment's name.
+The counter makes a seqlock: the publisher makes it odd before writing a
+snapshot and even again afterwards. A reader copies the values out between
+two reads of the counter and retries if the counter was odd or changed, so
+it never sees a half-written snapshot and the publisher never waits for
+readers. Snapshot ``n`` is the ``n``-th publication.
+"""
+import collections
+import sys
+import time as _time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from ._steps import iter_steps
+
+__all__ = ["Publisher", "Subscriber", "Snapshot"]
+
+MAGIC = b"WRFHYPUB"
+FORMAT_VERSION = 1
+
+_OPEN, _CLOSED = 1, 2
+_ALIGN = 64
+
+_HEADER = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("n_vars", "<u4"),
+    ("seq", "<u8"), ("time", "<f8"), ("state", "<u8"),
+])
+_HEADER_SIZE = _ALIGN
+_ENTRY = np.dtype([
+    ("name", "S128"), ("dtype", "S8"), ("offset", "<u8"), ("size", "<u8"),
+])
+
+Snapshot = collections.namedtuple("Snapshot", ["sequence", "time", "values"])
+Snapshot.__doc__ = """A consistent copy of the published variables."""
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+# Segments published from this process
+_created = set()
+
+
+def _attach(name):
+    """Map an existing segment without adopting it.
+
+    The resource tracker of a process that merely attaches would otherwise
+    unlink the segment when that process exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if shm._name not in _created:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class _Segment:
+    """The header, variable table and value arrays of a mapped segment."""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), dtype=_HEADER, buffer=shm.buf)
+        if (shm.size < _HEADER_SIZE
+                or bytes(self.header["magic"]) != MAGIC):
+            del self.header
+            shm.close()
+            raise ValueError(f"{shm.name} is not a published model segment")
+        if int(self.header["version"]) != FORMAT_VERSION:
+            version = int(self.header["version"])
+            del self.header
+            shm.close()
+            raise ValueError(f"unsupported segment version: {version}")
+        table = np.ndarray((int(self.header["n_vars"]),), dtype=_ENTRY,
+                           buffer=shm.buf, offset=_HEADER_SIZE)
+        self.values = {}
+        for entry in table:
+            name = entry["name"].decode()
+            self.values[name] = np.ndarray(
+                (int(entry["size"]),), dtype=np.dtype(entry["dtype"].decode()),
+                buffer=shm.buf, offset=int(entry["offset"]),
+            )
+        del table
+        # Scalar views of the header fields the seqlock touches
+        self.seq = np.ndarray((), dtype="<u8", buffer=shm.buf,
+                              offset=_HEADER.fields["seq"][1])
+        self.time = np.ndarray((), dtype="<f8", buffer=shm.buf,
+                               offset=_HEADER.fields["time"][1])
+        self.state = np.ndarray((), dtype="<u8", buffer=shm.buf,
+                                offset=_HEADER.fields["state"][1])
+
+    @classmethod
+    def create(cls, variables, name=None):
+        table_end = _HEADER_SIZE + len(variables) * _ENTRY.itemsize
+        entries, offset = [], _aligned(table_end)
+        for var_name, (size, dtype) in variables.items():
+            dtype = np.dtype(dtype)
+            if len(var_name.encode()) > _ENTRY["name"].itemsize:
+                raise ValueError(f"variable name too long: {var_name!r}")
+            entries.append((var_name.encode(), dtype.str.encode(), offset, size))
+            offset = _aligned(offset + size * dtype.itemsize)
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=offset)
+        _created.add(shm._name)
+        header = np.ndarray((), dtype=_HEADER, buffer=shm.buf)
+        header[()] = (MAGIC, FORMAT_VERSION, len(entries), 0, np.nan, _OPEN)
+        table = np.ndarray((len(entries),), dtype=_ENTRY, buffer=shm.buf,
+                           offset=_HEADER_SIZE)
+        table[:] = entries
+        del header, table
+        return cls(shm)
+
+    def close(self, unlink=False):
+        del self.header, self.values, self.seq, self.time, self.state
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+            _created.discard(self.shm._name)
+
+
+class Publisher:
+    """Pass calls through to *model*, publishing *var_names* after updates.
+
+    The model must be initialized; its current state is published right
+    away as snapshot 1.
+
+    Parameters
+    ----------
+    model : WrfHydroBmi
+        The model, or anything with its BMI.
+    var_names : str or sequence of str
+        Variables to publish.
+    name : str, optional
+        Name of the shared-memory segment; a unique name is chosen if not
+        given (see :attr:`name`).
+    """
+
+    def __init__(self, model, var_names, name=None):
+        if isinstance(var_names, str):
+            var_names = [var_names]
+        self.model = model
+        self.var_names = list(var_names)
+        self._segment = _Segment.create(
+            {var_name: (model.get_grid_size(model.get_var_grid(var_name)),
+                        model.get_var_type(var_name))
+             for var_name in self.var_names},
+            name=name,
+        )
+        self.publish()
+
+    @property
+    def name(self):
+        """Name subscribers attach to."""
+        return self._segment.shm.name
+
+    @property
+    def sequence(self):
+        """Number of snapshots published so far."""
+        return int(self._segment.seq) // 2
+
+    def publish(self):
+        """Publish the model's current values of :attr:`var_names`."""
+        segment = self._segment
+        segment.seq[()] += 1
+        try:
+            for var_name, values in segment.values.items():
+                self.model.get_value(var_name, values)
+            segment.time[()] = self.model.get_current_time()
+        finally:
+            segment.seq[()] += 1
+
+    def close(self):
+        """Mark the feed closed and remove the segment.
+
+        Subscribers that are attached keep their mapping and can still
+        read the last snapshot.
+        """
+        if self._segment is not None:
+            self._segment.state[()] = _CLOSED
+            self._segment.close(unlink=True)
+            self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def update(self):
+        self.model.update()
+        self.publish()
+
+    def update_until(self, time_later):
+        self.model.update_until(time_later)
+        self.publish()
+
+    def iter_steps(self, var_names, until=None, every=1, copy=False,
+                   ring_size=2):
+        return iter_steps(self, var_names, until, every, copy, ring_size)
+
+    def finalize(self):
+        try:
+            self.model.finalize()
+        finally:
+            self.close()
+
+
+class Subscriber:
+    """Read snapshots that a :class:`Publisher` puts in segment *name*.
+
+    Parameters
+    ----------
+    name : str
+        Name of the publisher's segment.
+    """
+
+    def __init__(self, name):
+        self._segment = _Segment(_attach(name))
+        self.name = name
+        self._buffers = {
+            var_name: np.empty_like(values)
+            for var_name, values in self._segment.values.items()
+        }
+
+    @property
+    def var_names(self):
+        """The published variables."""
+        return list(self._buffers)
+
+    @property
+    def sequence(self):
+        """Number of the latest snapshot (0 before the first)."""
+        return int(self._segment.seq) // 2
+
+    @property
+    def closed(self):
+        """True once the publisher has closed the feed."""
+        return int(self._segment.state) == _CLOSED
+
+    def read(self, copy=True, timeout=1.0):
+        """Return the latest consistent :class:`Snapshot`.
+
+        With ``copy=False`` the values are reused buffers, overwritten by
+        the next read. Returns None if nothing has been published yet.
+        Raises :class:`TimeoutError` if no consistent snapshot could be
+        read within *timeout* seconds.
+        """
+        segment = self._segment
+        deadline = _time.monotonic() + timeout
+        while True:
+            before = int(segment.seq)
+            if before % 2 == 0:
+                if before == 0:
+                    return None
+                for var_name, values in segment.values.items():
+                    np.copyto(self._buffers[var_name], values)
+                time = float(segment.time)
+                if int(segment.seq) == before:
+                    break
+            if _time.monotonic() > deadline:
+                raise TimeoutError(f"no consistent snapshot in {self.name}")
+            _time.sleep(0)
+
+        if copy:
+            values = {k: v.copy() for k, v in self._buffers.items()}
+        else:
+            values = dict(self._buffers)
+        return Snapshot(before // 2, time, values)
+
+    def wait_for(self, sequence, timeout=None, poll=0.001, copy=True):
+        """Wait for a snapshot newer than *sequence* and return it.
+
+        Returns None if the publisher closes the feed first. Raises
+        :class:`TimeoutError` after *timeout* seconds (wait forever if
+        None).
+        """
+        deadline = None if timeout is None else _time.monotonic() + timeout
+        while self.sequence <= sequence:
+            if self.closed:
+                return None
+            if deadline is not None and _time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"no snapshot after {sequence} in {self.name}"
+                )
+            _time.sleep(poll)
+        return self.read(copy=copy)
+
+    def close(self):
+        """Detach from the segment."""
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
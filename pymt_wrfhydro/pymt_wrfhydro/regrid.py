@@ -0,0 +1,208 @@
+"""Conservative regridding between the LSM and routing grids.
+
+WRF-Hydro keeps land-surface fields on ``GRID_LSM`` (``[jx, ix]``) and
+terrain-routing fields on the finer ``GRID_ROUTING`` (``[jxrt, ixrt]``);
+both grids cover the same domain. :class:`Regridder` builds two sparse
+operators once per domain from the cell overlaps:
+
+* :attr:`Regridder.aggregate` (routing -> LSM): area-weighted mean of the
+  routing cells in each LSM cell.
+* :attr:`Regridder.disaggregate` (LSM -> routing): area-weighted mean of
+  the LSM cells under each routing cell (piecewise constant).
+
+Applying either is one sparse mat-vec per field. Overlaps are computed per
+axis from the cell counts, so the ratio need not be an integer nor the
+same along x and y. The LSM spacing the model reports is only derived
+from the x ratio, so it is not used to place cells.
+
+Example::
+
+    regrid = Regridder.from_model(model, cache_dir="~/.cache/wrfhydro")
+    head = model.get_value_2d("land_surface_water__depth")
+    head_lsm = regrid.to_lsm(head)               # [jx, ix]
+"""
+import hashlib
+import os
+
+import numpy as np
+from scipy import sparse
+
+__all__ = ["Regridder"]
+
+# Operators built this session, by domain key
+_built = {}
+
+
+def _overlap(n_coarse, n_fine):
+    """Overlap lengths of two partitions of ``[0, 1]`` as a sparse matrix.
+
+    Entry ``(i, j)`` is the length shared by coarse cell ``i`` and fine
+    cell ``j``.
+    """
+    coarse = np.linspace(0.0, 1.0, n_coarse + 1)
+    fine = np.linspace(0.0, 1.0, n_fine + 1)
+    edges = np.union1d(coarse, fine)
+    length = np.diff(edges)
+    keep = length > 1e-12 / max(n_coarse, n_fine)
+    middle = 0.5 * (edges[:-1] + edges[1:])[keep]
+    i = np.searchsorted(coarse, middle) - 1
+    j = np.searchsorted(fine, middle) - 1
+    return sparse.csr_matrix(
+        (length[keep], (i, j)), shape=(n_coarse, n_fine)
+    )
+
+
+def _row_normalized(matrix):
+    total = np.asarray(matrix.sum(axis=1)).reshape(-1)
+    return sparse.diags(1.0 / total) @ matrix
+
+
+def _domain_key(lsm_shape, rt_shape, lsm_spacing=(), rt_spacing=()):
+    """Cache key of a pair of grids: a hash of their shapes and spacings."""
+    text = repr((
+        tuple(int(n) for n in lsm_shape),
+        tuple(int(n) for n in rt_shape),
+        tuple(float(d) for d in lsm_spacing),
+        tuple(float(d) for d in rt_spacing),
+    ))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class Regridder:
+    """Sparse aggregation and disaggregation between two nested grids.
+
+    Parameters
+    ----------
+    lsm_shape, rt_shape : tuple of int
+        ``[rows, cols]`` of the coarse (LSM) and fine (routing) grids.
+
+    Attributes
+    ----------
+    aggregate : scipy.sparse.csr_matrix
+        ``(n_lsm, n_rt)`` operator, rows sum to one.
+    disaggregate : scipy.sparse.csr_matrix
+        ``(n_rt, n_lsm)`` operator, rows sum to one.
+    """
+
+    def __init__(self, lsm_shape, rt_shape, _operators=None):
+        self.lsm_shape = tuple(int(n) for n in lsm_shape)
+        self.rt_shape = tuple(int(n) for n in rt_shape)
+        if len(self.lsm_shape) != 2 or len(self.rt_shape) != 2:
+            raise ValueError("grid shapes must be [rows, cols]")
+        if min(self.lsm_shape + self.rt_shape) < 1:
+            raise ValueError("grids must have at least one cell")
+
+        if _operators is not None:
+            self.aggregate, self.disaggregate = _operators
+            return
+
+        # C order: flat index is row * cols + col, so rows are the outer
+        # Kronecker factor
+        area = sparse.kron(
+            _overlap(self.lsm_shape[0], self.rt_shape[0]),
+            _overlap(self.lsm_shape[1], self.rt_shape[1]),
+            format="csr",
+        )
+        self.aggregate = _row_normalized(area).tocsr()
+        self.disaggregate = _row_normalized(area.T.tocsr()).tocsr()
+
+    @classmethod
+    def from_model(cls, model, cache_dir=None):
+        """Operators for the model's LSM and routing grids.
+
+        They are built once per domain per session and, with *cache_dir*,
+        saved there and reused by later runs on the same domain.
+        """
+        shape = {}
+        spacing = {}
+        for grid in (0, 1):
+            shape[grid] = np.empty(2, dtype=np.intc)
+            spacing[grid] = np.empty(2)
+            model.get_grid_shape(grid, shape[grid])
+            model.get_grid_spacing(grid, spacing[grid])
+        key = _domain_key(shape[0], shape[1], spacing[0], spacing[1])
+
+        if key in _built:
+            return _built[key]
+        path = None
+        if cache_dir is not None:
+            cache_dir = os.path.expanduser(cache_dir)
+            path = os.path.join(cache_dir, f"regrid_{key}.npz")
+            if os.path.exists(path):
+                _built[key] = cls.load(path)
+                return _built[key]
+
+        regridder = cls(shape[0], shape[1])
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            regridder.save(path)
+        _built[key] = regridder
+        return regridder
+
+    def __repr__(self):
+        return f"Regridder(lsm={self.lsm_shape}, routing={self.rt_shape})"
+
+    @staticmethod
+    def _apply(operator, values, out_shape, mask):
+        values = np.asarray(values)
+        n_in = operator.shape[1]
+        if values.size != n_in:
+            raise ValueError(f"expected {n_in} values, got {values.size}")
+        flat = values.reshape(-1).astype(np.float64, copy=False)
+
+        if mask is None:
+            result = operator @ flat
+        else:
+            # Average over the valid source cells only
+            mask = np.asarray(mask, dtype=bool).reshape(-1)
+            if mask.size != n_in:
+                raise ValueError(f"expected {n_in} mask values, got {mask.size}")
+            weight = operator @ mask.astype(np.float64)
+            total = operator @ np.where(mask, flat, 0.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result = np.where(weight > 0, total / weight, np.nan)
+
+        return result.reshape(out_shape) if values.ndim == 2 else result
+
+    def to_lsm(self, values, mask=None):
+        """Aggregate a routing-grid field onto the LSM grid.
+
+        *values* is flat or ``[jxrt, ixrt]``; the result has the matching
+        LSM form. With a boolean *mask* of valid routing cells, each LSM
+        cell averages its valid cells only (NaN if it has none).
+        """
+        return self._apply(self.aggregate, values, self.lsm_shape, mask)
+
+    def to_routing(self, values, mask=None):
+        """Disaggregate an LSM-grid field onto the routing grid.
+
+        *values* is flat or ``[jx, ix]``; *mask* marks valid LSM cells.
+        """
+        return self._apply(self.disaggregate, values, self.rt_shape, mask)
+
+    def save(self, path):
+        """Write both operators to an ``.npz`` file."""
+        arrays = {"lsm_shape": self.lsm_shape, "rt_shape": self.rt_shape}
+        for name in ("aggregate", "disaggregate"):
+            matrix = getattr(self, name)
+            arrays[f"{name}_data"] = matrix.data
+            arrays[f"{name}_indices"] = matrix.indices
+            arrays[f"{name}_indptr"] = matrix.indptr
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Read operators written by :meth:`save`."""
+        with np.load(path) as data:
+            lsm_shape = tuple(data["lsm_shape"])
+            rt_shape = tuple(data["rt_shape"])
+            n_lsm, n_rt = np.prod(lsm_shape), np.prod(rt_shape)
+            operators = []
+            for name, shape in (("aggregate", (n_lsm, n_rt)),
+                                ("disaggregate", (n_rt, n_lsm))):
+                operators.append(sparse.csr_matrix(
+                    (data[f"{name}_data"], data[f"{name}_indices"],
+                     data[f"{name}_indptr"]),
+                    shape=shape,
+                ))
+        return cls(lsm_shape, rt_shape, _operators=tuple(operators))
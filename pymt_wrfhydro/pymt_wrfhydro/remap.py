@@ -0,0 +1,354 @@
+"""Remapping between WRF-Hydro grids and a SCHISM unstructured mesh.
+
+Compound-flood coupling passes ``sea_water_surface__elevation`` and
+``sea_water__x_velocity`` from SCHISM mesh nodes onto the LSM grid, and
+channel outflow from WRF-Hydro outlets onto SCHISM boundary nodes.
+:class:`Remapper` holds the weights of one such mapping as a sparse matrix,
+so each exchange is a single sparse mat-vec. Weights are computed once
+with the KD-trees of :mod:`pymt_wrfhydro.spatial` and, with ``cache_dir``,
+saved under a hash of everything they depend on (coordinates, node subsets,
+method and its parameters), so later runs on the same mesh and domain load
+them instead of recomputing.
+
+Methods:
+
+* ``"nearest"``: each target takes its nearest source.
+* ``"idw"``: inverse-distance weighting of the *k* nearest sources.
+* ``"conservative"``: each source is assigned to the target it is nearest
+  to, and each target takes the area-weighted mean of its sources. Mesh
+  nodes are weighted by their median-dual area. Suited to fine-to-coarse
+  mappings; targets no source falls to get the fill value.
+
+The model's grids are all indexed by longitude/latitude (cell centres on
+the LSM and routing grids, link positions on the channel grid), so the
+mesh must be in longitude/latitude too, e.g. SCHISM's ``hgrid.ll``.
+Distances are great-circle metres.
+
+Example::
+
+    mesh = Mesh.read_gr3("hgrid.ll")
+    to_lsm = Remapper.mesh_to_grid(mesh, model, 0, "conservative",
+                                   cache_dir="weights")
+    model.set_value("sea_water_surface__elevation", to_lsm(elevation, fill=0.0))
+"""
+import hashlib
+import os
+
+import numpy as np
+from scipy import sparse
+
+from .spatial import EARTH_RADIUS, SpatialIndex
+
+__all__ = ["Mesh", "Remapper"]
+
+_METHODS = ("nearest", "idw", "conservative")
+
+# Weights built this session, by content hash
+_built = {}
+
+
+class Mesh:
+    """Nodes and elements of an unstructured (SCHISM) mesh.
+
+    Parameters
+    ----------
+    x, y : array_like
+        Node coordinates.
+    depth : array_like
+        Node depth (positive down, as in ``hgrid.gr3``).
+    elements : array_like of int
+        ``(n_elements, 4)`` 0-based node indices; triangles pad the fourth
+        column with -1.
+    geographic : bool, optional
+        Coordinates are longitude/latitude in degrees.
+    """
+
+    def __init__(self, x, y, depth, elements, geographic=False, name=""):
+        self.x = np.ascontiguousarray(x, dtype=float)
+        self.y = np.ascontiguousarray(y, dtype=float)
+        self.depth = np.ascontiguousarray(depth, dtype=float)
+        self.elements = np.ascontiguousarray(elements, dtype=np.int64)
+        self.geographic = bool(geographic)
+        self.name = name
+        self._index = None
+
+    @classmethod
+    def read_gr3(cls, path, geographic=None):
+        """Read an ``hgrid.gr3``-format file.
+
+        Open and land boundary sections after the elements are ignored.
+        If *geographic* is None, coordinates are taken as longitude and
+        latitude when they all fit those ranges.
+        """
+        with open(path) as gr3:
+            lines = gr3.read().splitlines()
+        name = lines[0].strip()
+        n_elements, n_nodes = (int(n) for n in lines[1].split()[:2])
+        if len(lines) < 2 + n_nodes + n_elements:
+            raise ValueError(f"{path}: truncated mesh")
+
+        node_lines = lines[2:2 + n_nodes]
+        nodes = np.array(
+            [line.split()[:4] for line in node_lines], dtype=float
+        ).reshape(n_nodes, 4)
+        elements = np.full((n_elements, 4), -1, dtype=np.int64)
+        for k, line in enumerate(lines[2 + n_nodes:2 + n_nodes + n_elements]):
+            row = line.split()
+            n_vertices = int(row[1])
+            if n_vertices not in (3, 4):
+                raise ValueError(f"{path}: element {row[0]} has {n_vertices} nodes")
+            elements[k, :n_vertices] = [int(n) - 1 for n in row[2:2 + n_vertices]]
+
+        x, y = nodes[:, 1], nodes[:, 2]
+        if geographic is None:
+            geographic = bool(
+                np.all(np.abs(x) <= 360.0) and np.all(np.abs(y) <= 90.0)
+            )
+        return cls(x, y, nodes[:, 3], elements, geographic=geographic, name=name)
+
+    @property
+    def n_nodes(self):
+        return len(self.x)
+
+    @property
+    def n_elements(self):
+        return len(self.elements)
+
+    def __repr__(self):
+        return f"Mesh(nodes={self.n_nodes}, elements={self.n_elements})"
+
+    @property
+    def element_area(self):
+        """Area of every element (shoelace formula, coordinate units)."""
+        nodes = self.elements
+        vertices = np.where(nodes >= 0, nodes, nodes[:, :1])
+        x, y = self.x[vertices], self.y[vertices]
+        if self.geographic:
+            scale = np.radians(1.0) * EARTH_RADIUS
+            x = x * scale * np.cos(np.radians(y.mean(axis=1, keepdims=True)))
+            y = y * scale
+        cross = x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y
+        return 0.5 * np.abs(cross.sum(axis=1))
+
+    @property
+    def node_area(self):
+        """Median-dual area of every node: each element split among its nodes."""
+        valid = self.elements >= 0
+        share = self.element_area / valid.sum(axis=1)
+        area = np.zeros(self.n_nodes)
+        np.add.at(area, self.elements[valid], np.broadcast_to(
+            share[:, None], self.elements.shape
+        )[valid])
+        return area
+
+    @property
+    def index(self):
+        """KD-tree over the mesh nodes, built on first use."""
+        if self._index is None:
+            self._index = SpatialIndex(self.x, self.y, geographic=self.geographic)
+        return self._index
+
+
+def _digest(*parts):
+    sha = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            sha.update(str((part.dtype, part.shape)).encode())
+            sha.update(np.ascontiguousarray(part).tobytes())
+        else:
+            sha.update(repr(part).encode())
+    return sha.hexdigest()[:20]
+
+
+def _subset(index, nodes):
+    """Index over a subset of nodes, plus the map back to full indices."""
+    if nodes is None:
+        return index, np.arange(len(index))
+    nodes = np.asarray(nodes, dtype=np.int64)
+    subset = SpatialIndex(
+        index.x[nodes], index.y[nodes], geographic=index.geographic
+    )
+    return subset, nodes
+
+
+def _grid_index(model, grid, mesh):
+    """The model's index over *grid*, checked against *mesh*."""
+    if not mesh.geographic:
+        raise ValueError(
+            "the model's grids are in longitude/latitude; "
+            "remap from a geographic mesh (hgrid.ll)"
+        )
+    return model.get_spatial_index(grid)
+
+
+def _weights(method, source, target, source_area, k, power, max_distance):
+    """Weight triplets ``(rows, cols, values)`` within the subsets."""
+    if method == "conservative":
+        # Assign every source to its nearest target
+        _, owner = target.nearest(source.x, source.y, max_distance=max_distance)
+        cols = np.flatnonzero(owner >= 0)
+        return owner[cols], cols, source_area[cols]
+
+    k = 1 if method == "nearest" else min(k, len(source))
+    distance, found = source.nearest(
+        target.x, target.y, k=k, max_distance=max_distance
+    )
+    distance, found = distance.reshape(len(target), k), found.reshape(len(target), k)
+    if method == "nearest":
+        values = np.ones(found.shape)
+    else:
+        with np.errstate(divide="ignore"):
+            values = np.where(found >= 0, distance ** -float(power), 0.0)
+        # A target sitting on a source takes that source alone
+        exact = distance[:, 0] == 0.0
+        values[exact] = 0.0
+        values[exact, 0] = 1.0
+    rows = np.repeat(np.arange(len(target)), k).reshape(found.shape)
+    keep = (found >= 0) & (values > 0)
+    return rows[keep], found[keep], values[keep]
+
+
+class Remapper:
+    """Sparse weights mapping values at source nodes onto target nodes.
+
+    Parameters
+    ----------
+    weights : scipy.sparse matrix
+        ``(n_target, n_source)``; each non-empty row sums to one.
+    """
+
+    def __init__(self, weights):
+        self.weights = sparse.csr_matrix(weights)
+        self._empty = np.diff(self.weights.indptr) == 0
+
+    @property
+    def shape(self):
+        return self.weights.shape
+
+    def __repr__(self):
+        n_target, n_source = self.shape
+        return (
+            f"Remapper(sources={n_source}, targets={n_target}, "
+            f"unmapped={int(self._empty.sum())})"
+        )
+
+    def __call__(self, values, fill=np.nan):
+        """Map *values* (one per source node) onto the target nodes.
+
+        Targets with no weights get *fill*.
+        """
+        values = np.asarray(values).reshape(-1)
+        if values.size != self.shape[1]:
+            raise ValueError(f"expected {self.shape[1]} values, got {values.size}")
+        result = self.weights @ values.astype(np.float64, copy=False)
+        result[self._empty] = fill
+        return result
+
+    @classmethod
+    def build(cls, source, target, method="nearest", source_nodes=None,
+              target_nodes=None, source_area=None, k=4, power=2.0,
+              max_distance=np.inf, cache_dir=None):
+        """Compute (or load cached) weights between two sets of nodes.
+
+        Parameters
+        ----------
+        source, target : SpatialIndex
+            Nodes to map from and to, in the same coordinates.
+        method : str, optional
+            'nearest', 'idw' or 'conservative'.
+        source_nodes, target_nodes : array_like of int, optional
+            Only map from / to these nodes, e.g. the channel outlets or the
+            mesh's open boundary. Other targets are unmapped.
+        source_area : array_like, optional
+            Weight of every source node for 'conservative' (default 1).
+        k, power : optional
+            Neighbour count and distance exponent for 'idw'.
+        max_distance : float, optional
+            Ignore sources farther than this (metres for geographic nodes).
+        cache_dir : str, optional
+            Directory to keep weights in, keyed by a hash of all inputs.
+        """
+        if method not in _METHODS:
+            raise ValueError(f"unknown remapping method: {method!r}")
+        if source.geographic != target.geographic:
+            raise ValueError(
+                "source and target nodes must both be geographic or both projected"
+            )
+        if source_area is None:
+            source_area = np.ones(len(source))
+        source_area = np.asarray(source_area, dtype=float)
+
+        key = _digest(
+            method, k, float(power), float(max_distance), source.geographic,
+            source.x, source.y, target.x, target.y, source_area,
+            np.asarray(source_nodes if source_nodes is not None else []),
+            np.asarray(target_nodes if target_nodes is not None else []),
+        )
+        if key in _built:
+            return _built[key]
+        path = None
+        if cache_dir is not None:
+            cache_dir = os.path.expanduser(cache_dir)
+            path = os.path.join(cache_dir, f"remap_{key}.npz")
+            if os.path.exists(path):
+                _built[key] = cls.load(path)
+                return _built[key]
+
+        source_sub, source_map = _subset(source, source_nodes)
+        target_sub, target_map = _subset(target, target_nodes)
+        rows, cols, values = _weights(
+            method, source_sub, target_sub, source_area[source_map],
+            k, power, max_distance,
+        )
+        weights = sparse.csr_matrix(
+            (values, (target_map[rows], source_map[cols])),
+            shape=(len(target), len(source)),
+        )
+        total = np.asarray(weights.sum(axis=1)).reshape(-1)
+        total[total == 0] = 1.0
+        remapper = cls(sparse.diags(1.0 / total) @ weights)
+
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            remapper.save(path)
+        _built[key] = remapper
+        return remapper
+
+    @classmethod
+    def mesh_to_grid(cls, mesh, model, grid, method="conservative", **kwds):
+        """Weights from mesh nodes to the nodes of one of the model's grids."""
+        if method == "conservative":
+            kwds.setdefault("source_area", mesh.node_area)
+        return cls.build(
+            mesh.index, _grid_index(model, grid, mesh), method, **kwds
+        )
+
+    @classmethod
+    def grid_to_mesh(cls, model, grid, mesh, method="nearest", **kwds):
+        """Weights from the nodes of one of the model's grids to mesh nodes.
+
+        Pass ``source_nodes=ChannelNetwork.from_model(model).outlets`` to
+        map only the channel outlets.
+        """
+        return cls.build(
+            _grid_index(model, grid, mesh), mesh.index, method, **kwds
+        )
+
+    def save(self, path):
+        """Write the weights to an ``.npz`` file."""
+        np.savez(
+            path,
+            shape=self.shape,
+            data=self.weights.data,
+            indices=self.weights.indices,
+            indptr=self.weights.indptr,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read weights written by :meth:`save`."""
+        with np.load(path) as data:
+            return cls(sparse.csr_matrix(
+                (data["data"], data["indices"], data["indptr"]),
+                shape=tuple(data["shape"]),
+            ))
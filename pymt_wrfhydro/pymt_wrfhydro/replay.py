@@ -0,0 +1,456 @@
+"""Record a WRF-Hydro BMI session once, replay it at memory speed.
+
+:class:`Recorder` wraps a model (usually a real
+:class:`~pymt_wrfhydro.WrfHydroBmi`) and passes every call through,
+writing each call and its result to a recording file. :class:`Replay`
+reads that file back and answers the same calls through the same
+interface without running the model, so downstream coupling, data
+assimilation and post-processing code can be tested and benchmarked
+against real WRF-Hydro output many times over for the price of one run::
+
+    with Recorder(WrfHydroBmi(), "croton.bmirec") as model:
+        model.initialize("bmi_config.nml")
+        pipeline(model)                 # every call is recorded
+        model.finalize()
+
+    model = Replay("croton.bmirec")
+    model.initialize()
+    pipeline(model)                     # same answers, no Fortran
+
+Replay answers a call from what was recorded for the same method and
+arguments. Calls that do not depend on the clock (names, units, grids,
+link positions, ...) are served at any time. Everything else is served
+for the step the replay has reached with ``update``/``update_until``.
+If a call was recorded several times at one step (``get_value_changes``,
+``drain_gauges``), the results are served in order and the last one is
+repeated. Exceptions are recorded and raised again. Inputs
+(``set_value`` and friends) are accepted and listed in
+:attr:`Replay.events` but change nothing: a replay is the recorded
+session's output, not a model. A call that was never recorded raises
+:class:`LookupError`.
+
+The file is a zip archive. Each distinct array is stored once as an
+``.npy`` member (deflated), named by its content hash, so unchanged
+fields such as ``channel_link__id`` cost nothing after the first step.
+An ``index.json`` member maps calls to results. Arrays are loaded on
+first use and kept in memory.
+"""
+import builtins
+import hashlib
+import io
+import json
+import zipfile
+
+import numpy as np
+
+from ._steps import iter_steps
+
+__all__ = ["Recorder", "Replay"]
+
+FORMAT_VERSION = 1
+
+# Calls answered the same way at every step of a run
+STATIC = frozenset((
+    "get_component_name", "get_input_item_count", "get_output_item_count",
+    "get_input_var_names", "get_output_var_names", "get_start_time",
+    "get_end_time", "get_time_step", "get_time_units", "get_var_grid",
+    "get_var_type", "get_var_units", "get_var_itemsize", "get_var_nbytes",
+    "get_var_location", "get_grid_type", "get_grid_rank", "get_grid_size",
+    "get_grid_shape", "get_grid_spacing", "get_grid_origin", "get_grid_x",
+    "get_grid_y", "get_grid_z", "get_grid_node_count", "get_grid_edge_count",
+    "get_grid_face_count", "get_grid_edge_nodes", "get_grid_face_edges",
+    "get_grid_face_nodes", "get_grid_nodes_per_face", "get_link_positions",
+    "get_grid_lonlat", "get_decomposition", "get_grid_tile",
+    "get_grid_global_shape",
+))
+
+# Calls that feed the model; recorded as events, ignored on replay
+INPUTS = frozenset((
+    "set_value", "set_value_at_global_indices", "register_gauges",
+    "set_comm", "set_intercomm", "send_value", "recv_value",
+    "wait_exchanges",
+))
+
+# Position of the array a call fills in place (not part of its key)
+OUT_ARG = {
+    "get_value": 1, "get_grid_shape": 1, "get_grid_spacing": 1,
+    "get_grid_origin": 1, "get_grid_x": 1, "get_grid_y": 1,
+    "get_grid_z": 1, "get_grid_edge_nodes": 1, "get_grid_face_edges": 1,
+    "get_grid_face_nodes": 1, "get_grid_nodes_per_face": 1,
+    "get_value_2d": 1,
+}
+
+_CLOCK = ("get_start_time", "get_end_time", "get_time_step")
+
+
+def _digest(array):
+    array = np.ascontiguousarray(array)
+    sha = hashlib.sha1(array.dtype.str.encode())
+    sha.update(str(array.shape).encode())
+    sha.update(array.tobytes())
+    return sha.hexdigest()
+
+
+def _arg_key(value):
+    """A JSON-able stand-in for an argument, equal for equal arguments."""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str)
+                                                for v in value):
+        return list(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        # Numbers compare by value whatever the container or dtype
+        return {"sha1": _digest(np.asarray(value, dtype=np.float64))}
+    return repr(value)
+
+
+def _call_key(method, args, kwds):
+    args = list(args)
+    kwds = dict(kwds)
+    if method in OUT_ARG:
+        if len(args) > OUT_ARG[method]:
+            del args[OUT_ARG[method]]
+        kwds.pop("out", None)
+        kwds.pop("buffer", None)
+    return json.dumps([method, [_arg_key(a) for a in args],
+                       sorted((k, _arg_key(v)) for k, v in kwds.items())])
+
+
+def _out_arg(method, args, kwds):
+    position = OUT_ARG.get(method)
+    if position is None:
+        return None
+    if len(args) > position:
+        return args[position]
+    return kwds.get("out", kwds.get("buffer"))
+
+
+class Recorder:
+    """Pass calls through to *model* and record them in *path*.
+
+    Parameters
+    ----------
+    model : object
+        The model to record, e.g. ``WrfHydroBmi()``.
+    path : str
+        Recording file to write (conventionally ``*.bmirec``).
+    compress : bool, optional
+        Deflate the arrays.
+
+    The file is complete once :meth:`close` has run; ``finalize`` and
+    leaving a ``with`` block close it.
+    """
+
+    def __init__(self, model, path, compress=True):
+        self.model = model
+        self.path = path
+        self._zip = zipfile.ZipFile(
+            path, "w", zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        )
+        self._stored = set()
+        self._static = {}
+        self._steps = {}
+        self._events = []
+        self._clock = None
+        self._step = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        if name.startswith("_") or "model" not in self.__dict__:
+            raise AttributeError(name)
+        attr = getattr(self.model, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwds):
+            return self._call(name, attr, args, kwds)
+
+        call.__name__ = name
+        return call
+
+    # ------------------------------------------------------------------
+
+    def _encode(self, value):
+        if isinstance(value, np.ma.MaskedArray):
+            return {"masked": [self._encode(value.data),
+                               self._encode(np.ma.getmaskarray(value))]}
+        if isinstance(value, np.ndarray):
+            digest = _digest(value)
+            if digest not in self._stored:
+                data = io.BytesIO()
+                np.save(data, np.ascontiguousarray(value), allow_pickle=False)
+                self._zip.writestr(f"arrays/{digest}.npy", data.getvalue())
+                self._stored.add(digest)
+            return {"array": digest}
+        if isinstance(value, tuple):
+            return {"tuple": [self._encode(v) for v in value]}
+        if isinstance(value, list):
+            return [self._encode(v) for v in value]
+        if isinstance(value, dict):
+            return {"dict": [[k, self._encode(v)] for k, v in value.items()]}
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def _call(self, method, func, args, kwds):
+        try:
+            result = func(*args, **kwds)
+        except Exception as error:
+            encoded = {"error": [type(error).__name__, str(error)]}
+            result, raised = None, error
+        else:
+            encoded, raised = self._encode(result), None
+
+        if method in INPUTS:
+            self._events.append([self._step, method,
+                                 json.loads(_call_key(method, args, kwds))[1]])
+        elif method in ("update", "update_until", "initialize", "finalize"):
+            self._events.append([self._step, method,
+                                 [_arg_key(a) for a in args]])
+            if method == "initialize" and raised is None:
+                self._clock = {m: float(getattr(self.model, m)())
+                               for m in _CLOCK}
+                self._clock["get_time_units"] = self.model.get_time_units()
+            if method != "finalize" and self._clock is not None:
+                self._step = int(round(
+                    (self.model.get_current_time()
+                     - self._clock["get_start_time"])
+                    / self._clock["get_time_step"]
+                ))
+        else:
+            table = (self._static if method in STATIC
+                     else self._steps.setdefault(str(self._step), {}))
+            table.setdefault(_call_key(method, args, kwds), []).append(encoded)
+
+        if method == "finalize":
+            self.close()
+        if raised is not None:
+            raise raised
+        return result
+
+    def iter_steps(self, var_names, until=None, every=1, copy=False,
+                   ring_size=2):
+        """``iter_steps`` through this recorder, so every step is recorded."""
+        return iter_steps(self, var_names, until, every, copy, ring_size)
+
+    def get_spatial_index(self, grid_id):
+        from .spatial import SpatialIndex
+
+        return SpatialIndex.from_model(self, grid_id)
+
+    def close(self):
+        """Write the index and close the file (idempotent)."""
+        if self._zip is None:
+            return
+        index = {
+            "version": FORMAT_VERSION,
+            "clock": self._clock,
+            "static": self._static,
+            "steps": self._steps,
+            "events": self._events,
+        }
+        self._zip.writestr("index.json", json.dumps(index))
+        self._zip.close()
+        self._zip = None
+
+
+class Replay:
+    """Serve a recorded session through the BMI.
+
+    Parameters
+    ----------
+    path : str, optional
+        Recording to replay. Without it, ``initialize`` takes the path
+        instead of a config file, so ``"pymt_wrfhydro.replay:Replay"``
+        works as a coupler factory.
+    preload : bool, optional
+        Load every array when the recording is opened rather than on
+        first use.
+    """
+
+    def __init__(self, path=None, preload=False):
+        self._source = path
+        self.path = path
+        self.preload = preload
+        self.events = []
+        self.recorded_events = []
+        self._zip = None
+        self._arrays = {}
+        if path is not None:
+            self._open(path)
+
+    def _open(self, path):
+        self.close()
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        index = json.loads(self._zip.read("index.json"))
+        if index.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"unsupported recording version: {index.get('version')}"
+            )
+        if index["clock"] is None:
+            raise ValueError(f"{path} has no initialized session")
+        self._clock = index["clock"]
+        self._static = index["static"]
+        self._steps = index["steps"]
+        self.recorded_events = index["events"]
+        self._arrays = {}
+        if self.preload:
+            for name in self._zip.namelist():
+                if name.startswith("arrays/"):
+                    self._array(name[len("arrays/"):-len(".npy")])
+        self._reset()
+
+    def _reset(self):
+        self._step = 0
+        self._cursor = {}
+        self.events = []
+
+    def close(self):
+        """Close the recording file."""
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in INPUTS:
+            def accept(*args, **kwds):
+                self.events.append(
+                    [self._step, name,
+                     json.loads(_call_key(name, args, kwds))[1]]
+                )
+            accept.__name__ = name
+            return accept
+
+        def call(*args, **kwds):
+            return self._serve(name, args, kwds)
+
+        call.__name__ = name
+        return call
+
+    # ------------------------------------------------------------------
+
+    def _array(self, digest):
+        array = self._arrays.get(digest)
+        if array is None:
+            with self._zip.open(f"arrays/{digest}.npy") as fp:
+                array = np.load(io.BytesIO(fp.read()), allow_pickle=False)
+            array.flags.writeable = False
+            self._arrays[digest] = array
+        return array
+
+    def _decode(self, value):
+        if isinstance(value, dict):
+            if "array" in value:
+                return self._array(value["array"])
+            if "masked" in value:
+                data, mask = (self._decode(v) for v in value["masked"])
+                return np.ma.masked_array(data, mask=mask)
+            if "tuple" in value:
+                return tuple(self._decode(v) for v in value["tuple"])
+            if "dict" in value:
+                return {k: self._decode(v) for k, v in value["dict"]}
+            if "error" in value:
+                kind, message = value["error"]
+                error = getattr(builtins, kind, RuntimeError)
+                if not (isinstance(error, type)
+                        and issubclass(error, Exception)):
+                    error = RuntimeError
+                raise error(message)
+        if isinstance(value, list):
+            return [self._decode(v) for v in value]
+        return value
+
+    def _serve(self, method, args, kwds):
+        if self._zip is None:
+            raise RuntimeError("no recording is open")
+        key = _call_key(method, args, kwds)
+        if method in STATIC:
+            results, cursor_key = self._static.get(key), key
+        else:
+            results = self._steps.get(str(self._step), {}).get(key)
+            cursor_key = (self._step, key)
+        if not results:
+            raise LookupError(
+                f"{method}{tuple(args)} was not recorded at step {self._step}"
+            )
+
+        position = self._cursor.get(cursor_key, 0)
+        self._cursor[cursor_key] = position + 1
+        result = self._decode(results[min(position, len(results) - 1)])
+
+        out = _out_arg(method, args, kwds)
+        if out is not None and isinstance(result, np.ndarray):
+            np.copyto(out, result.reshape(np.shape(out)), casting="unsafe")
+            return out
+        return result
+
+    # ------------------------------------------------------------------
+    # The clock
+    # ------------------------------------------------------------------
+
+    def initialize(self, config_file=None):
+        if self._zip is None:
+            self._open(self._source if self._source is not None
+                       else config_file)
+        self._reset()
+
+    def finalize(self):
+        self._arrays = {}
+        self.close()
+
+    def get_start_time(self):
+        return self._clock["get_start_time"]
+
+    def get_end_time(self):
+        return self._clock["get_end_time"]
+
+    def get_time_step(self):
+        return self._clock["get_time_step"]
+
+    def get_time_units(self):
+        return self._clock["get_time_units"]
+
+    def get_current_time(self):
+        return self.get_start_time() + self._step * self.get_time_step()
+
+    def update(self):
+        self._step += 1
+
+    def update_until(self, time_later):
+        now = self.get_current_time()
+        if time_later < now:
+            raise RuntimeError(f"cannot go back in time: {time_later} < {now}")
+        self._step += int(round((time_later - now) / self.get_time_step()))
+
+    def iter_steps(self, var_names, until=None, every=1, copy=False,
+                   ring_size=2):
+        return iter_steps(self, var_names, until, every, copy, ring_size)
+
+    def get_value_cached(self, var_name):
+        return self._serve("get_value_cached", (var_name,), {})
+
+    def get_value_ptr(self, var_name):
+        return self._serve("get_value_ptr", (var_name,), {})
+
+    def get_spatial_index(self, grid_id):
+        from .spatial import SpatialIndex
+
+        return SpatialIndex.from_model(self, grid_id)
+
+    @property
+    def recorded_steps(self):
+        """Steps with recorded calls, in order."""
+        return sorted(int(step) for step in self._steps)
+
@@ -0,0 +1,163 @@
+"""Spatial index over the nodes of a WRF-Hydro grid.
+
+Matching gauges, coastal boundary nodes or observation points to channel
+links and grid cells is a nearest-neighbour problem. :class:`SpatialIndex`
+builds a KD-tree (``scipy.spatial.cKDTree``) over a grid's nodes once and
+answers k-nearest, radius and bounding-box queries for many points per
+call, instead of scanning every node for every point.
+
+Nodes are located by longitude/latitude from the ``get_grid_lonlat``
+extension: link positions on the channel grid, cell centres (XLAT/XLONG
+and the Fulldom LATITUDE/LONGITUDE) on the LSM and routing grids, whose
+BMI ``get_grid_origin`` is [0, 0], a local frame only. Every grid is
+therefore indexed on the sphere, and distances and radii are great-circle
+metres.
+
+Example::
+
+    links = model.get_spatial_index(model.get_var_grid("channel_link__id"))
+    distance, link = links.nearest(gauge_lon, gauge_lat)
+    links.save("channel_index.npz")           # reuse with SpatialIndex.load
+"""
+import itertools
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+__all__ = ["SpatialIndex", "EARTH_RADIUS"]
+
+EARTH_RADIUS = 6371008.8  # mean Earth radius (m)
+
+
+def _to_sphere(lon, lat):
+    lon = np.radians(np.asarray(lon, dtype=float))
+    lat = np.radians(np.asarray(lat, dtype=float))
+    return EARTH_RADIUS * np.stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)],
+        axis=-1,
+    )
+
+
+def _chord_to_arc(chord):
+    half = np.minimum(chord / (2.0 * EARTH_RADIUS), 1.0)
+    return 2.0 * EARTH_RADIUS * np.arcsin(half)
+
+
+def _arc_to_chord(arc):
+    half_angle = np.minimum(arc / EARTH_RADIUS, np.pi) / 2.0
+    return 2.0 * EARTH_RADIUS * np.sin(half_angle)
+
+
+class SpatialIndex:
+    """KD-tree over the nodes of a grid.
+
+    Parameters
+    ----------
+    x, y : array_like
+        Node coordinates in flat node order; longitude and latitude in
+        degrees if *geographic*.
+    geographic : bool, optional
+        Index on the sphere and measure distances in metres.
+    leafsize : int, optional
+        Passed to ``cKDTree``.
+    """
+
+    def __init__(self, x, y, geographic=False, leafsize=16):
+        self.x = np.ascontiguousarray(x, dtype=float).reshape(-1)
+        self.y = np.ascontiguousarray(y, dtype=float).reshape(-1)
+        if self.x.shape != self.y.shape:
+            raise ValueError("x and y must have the same number of nodes")
+        self.geographic = bool(geographic)
+        self.leafsize = int(leafsize)
+        self._tree = cKDTree(self._points(self.x, self.y), leafsize=self.leafsize)
+
+    @classmethod
+    def from_model(cls, model, grid_id, **kwds):
+        """Index the nodes of one of the model's grids by longitude/latitude.
+
+        Nodes are in the model's flat value order on every grid.
+        """
+        lon, lat = model.get_grid_lonlat(grid_id)
+        return cls(lon, lat, geographic=True, **kwds)
+
+    def __len__(self):
+        return len(self.x)
+
+    def __repr__(self):
+        return f"SpatialIndex(nodes={len(self)}, geographic={self.geographic})"
+
+    def _points(self, x, y):
+        if self.geographic:
+            return _to_sphere(x, y).reshape(-1, 3)
+        x = np.asarray(x, dtype=float).reshape(-1)
+        y = np.asarray(y, dtype=float).reshape(-1)
+        return np.stack([x, y], axis=-1)
+
+    def nearest(self, x, y, k=1, max_distance=np.inf):
+        """Find the *k* nearest nodes to each point.
+
+        Returns ``(distance, index)``, each of shape ``(n,)`` for ``k == 1``
+        and ``(n, k)`` otherwise, nearest first. Where fewer than *k*
+        nodes lie within *max_distance*, distance is ``inf`` and index -1.
+        """
+        bound = max_distance
+        if self.geographic and np.isfinite(max_distance):
+            bound = _arc_to_chord(max_distance)
+        distance, index = self._tree.query(
+            self._points(x, y), k=k, distance_upper_bound=bound
+        )
+        missing = index == len(self)
+        index = np.where(missing, -1, index)
+        if self.geographic:
+            distance = np.where(missing, np.inf, _chord_to_arc(distance))
+        return distance, index
+
+    def within(self, x, y, radius):
+        """Find every node within *radius* of each point.
+
+        Returns ``(indptr, indices)`` in compressed sparse row form: the
+        nodes near point ``i`` are ``indices[indptr[i]:indptr[i + 1]]``,
+        sorted by node index.
+        """
+        if self.geographic:
+            radius = _arc_to_chord(radius)
+        hits = self._tree.query_ball_point(
+            self._points(x, y), r=radius, return_sorted=True
+        )
+        indptr = np.zeros(len(hits) + 1, dtype=np.int64)
+        np.cumsum([len(h) for h in hits], out=indptr[1:])
+        indices = np.fromiter(
+            itertools.chain.from_iterable(hits), dtype=np.int64, count=indptr[-1]
+        )
+        return indptr, indices
+
+    def in_box(self, xmin, ymin, xmax, ymax):
+        """Indices of the nodes inside a bounding box (edges included).
+
+        Coordinates are the node coordinates as given (degrees for a
+        geographic index).
+        """
+        inside = (self.x >= xmin) & (self.x <= xmax)
+        inside &= (self.y >= ymin) & (self.y <= ymax)
+        return np.flatnonzero(inside)
+
+    def save(self, path):
+        """Write the node coordinates to an ``.npz`` file."""
+        np.savez(
+            path,
+            x=self.x,
+            y=self.y,
+            geographic=self.geographic,
+            leafsize=self.leafsize,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read an index written by :meth:`save`, rebuilding the tree."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["x"],
+                data["y"],
+                geographic=bool(data["geographic"]),
+                leafsize=int(data["leafsize"]),
+            )
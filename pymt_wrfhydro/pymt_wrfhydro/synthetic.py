@@ -0,0 +1,709 @@
+"""Synthetic WRF-Hydro domains of any size, for scaling and soak tests.
+
+Croton NY (15 x 16 LSM cells, 60 x 64 routing cells) is too small to show
+how the model behaves on large basins. :class:`SyntheticDomain` lays out a
+basin of any size and writes a complete run directory for it: geo_em,
+wrfinput, Fulldom_hires and Route_Link in ``DOMAIN/``, hourly LDASIN
+forcing in ``FORCING/``, ``namelist.hrldas``, ``hydro.namelist`` and a
+``bmi_config.nml``. Everything is computed, so no data has to be
+downloaded; only the physics parameter tables (``*.TBL``) are copied
+from an existing run directory.
+
+The basin is a herringbone. Tributaries run east along every
+*channel_spacing*-th routing row into a trunk along the east edge, which
+flows south to the outlet in the south-east corner. Every other routing
+cell drains north or south to its nearest tributary. The elevation falls
+along every flow path, so the D8 flow directions, flow accumulation,
+channel grid, stream order, reach IDs and Route_Link topology all agree
+with the terrain and with each other. The layout is computed analytically
+with numpy, so ``10**7`` routing cells take seconds.
+
+Example::
+
+    domain = SyntheticDomain.from_cells(10**6)       # routing cells
+    config = domain.write("synthetic_1M", hours=24,
+                          tables_dir="WRF_Hydro_Run_Local/run")
+    model.initialize(config)
+
+From the shell::
+
+    python -m pymt_wrfhydro.synthetic synthetic_1M --cells 1e6 \\
+        --tables-dir WRF_Hydro_Run_Local/run
+"""
+import argparse
+import datetime
+import glob
+import os
+import shutil
+import sys
+
+import numpy as np
+from scipy.io import netcdf_file
+
+from .spatial import EARTH_RADIUS
+
+__all__ = ["SyntheticDomain"]
+
+# D8 flow direction codes of Fulldom_hires FLOWDIRECTION
+EAST, SOUTH, NORTH = 1, 4, 64
+
+# Fill value of the routing stack
+MISSING = -9999
+
+# MODIS (IGBP) land cover and STATSGO soil classes used on the LSM grid
+_LAND_COVER = np.array([5, 10, 12, 14], dtype=np.int32)   # forest .. mosaic
+_SOIL = np.array([3, 6, 8], dtype=np.int32)               # sandy loam .. silty clay loam
+
+_SOIL_THICKNESS = (0.10, 0.30, 0.60, 1.00)
+
+
+class SyntheticDomain:
+    """Terrain, channel network and reaches of a synthetic basin.
+
+    Parameters
+    ----------
+    lsm_shape : tuple of int
+        ``[rows, cols]`` of the LSM grid.
+    aggfactrt : int, optional
+        Routing cells per LSM cell along each axis.
+    dx : float, optional
+        LSM grid spacing in metres.
+    channel_spacing : int, optional
+        Routing rows between tributaries.
+    reach_cells : int, optional
+        Routing cells per tributary reach (Route_Link link).
+    slope : float, optional
+        Hillslope gradient; channels fall at a tenth and the trunk at a
+        twentieth of it.
+    center : tuple of float, optional
+        Latitude and longitude of the domain centre.
+
+    Arrays on the routing grid are ``[row, col]`` with row 0 to the south.
+    """
+
+    def __init__(self, lsm_shape, aggfactrt=4, dx=1000.0, channel_spacing=8,
+                 reach_cells=16, slope=0.02, center=(41.4, -73.8)):
+        self.lsm_shape = tuple(int(n) for n in lsm_shape)
+        self.aggfactrt = int(aggfactrt)
+        self.dx = float(dx)
+        self.dx_rt = self.dx / self.aggfactrt
+        self.center = tuple(float(c) for c in center)
+        self.slope = float(slope)
+        if len(self.lsm_shape) != 2 or min(self.lsm_shape) < 1:
+            raise ValueError("lsm_shape must be [rows, cols] of at least one cell")
+        if self.aggfactrt < 1 or channel_spacing < 1 or reach_cells < 1:
+            raise ValueError(
+                "aggfactrt, channel_spacing and reach_cells must be positive"
+            )
+        ny, nx = self.rt_shape
+        if nx < 2:
+            raise ValueError("the routing grid needs at least two columns")
+
+        # Tributary rows, and the tributary each row drains to
+        self.tributary_rows = np.arange(min(channel_spacing // 2, ny - 1), ny,
+                                        channel_spacing)
+        nearest = np.clip(np.searchsorted(self.tributary_rows, np.arange(ny)),
+                          1, max(len(self.tributary_rows) - 1, 1))
+        if len(self.tributary_rows) == 1:
+            band = np.zeros(ny, dtype=np.intp)
+        else:
+            lower = self.tributary_rows[nearest - 1]
+            upper = self.tributary_rows[nearest]
+            rows = np.arange(ny)
+            band = np.where(rows - lower <= upper - rows, nearest - 1, nearest)
+        self._band = band
+        drain_row = self.tributary_rows[band]
+
+        j = np.arange(ny)[:, None]
+        i = np.arange(nx)[None, :]
+        trunk = nx - 1
+        step = self.dx_rt * slope
+
+        self.flow_direction = np.empty(self.rt_shape, dtype=np.int16)
+        self.flow_direction[:] = np.where(
+            j < drain_row[:, None], NORTH,
+            np.where(j > drain_row[:, None], SOUTH, EAST),
+        )
+        self.flow_direction[:, trunk] = SOUTH
+
+        self.elevation = 100.0 + (
+            0.05 * step * drain_row[:, None]
+            + 0.1 * step * (trunk - i)
+            + step * np.abs(j - drain_row[:, None])
+        )
+        self.elevation[:, trunk] = 100.0 + 0.05 * step * np.arange(ny)
+
+        self.channel = (j == drain_row[:, None]) | (i == trunk)
+        self.stream_order = np.where(self.channel, 1, MISSING).astype(np.int32)
+        if len(self.tributary_rows) > 1:
+            self.stream_order[:, trunk] = 2
+
+        self._accumulate()
+        self._reaches(reach_cells)
+        self._lsm_height = None
+
+    @classmethod
+    def from_cells(cls, n_cells, aggfactrt=4, **kwds):
+        """A square-ish domain with about *n_cells* routing cells."""
+        side = max(int(round(np.sqrt(float(n_cells)) / aggfactrt)), 1)
+        rows = max(int(round(float(n_cells) / (side * aggfactrt ** 2))), 1)
+        return cls((rows, side), aggfactrt=aggfactrt, **kwds)
+
+    @property
+    def rt_shape(self):
+        return (self.lsm_shape[0] * self.aggfactrt,
+                self.lsm_shape[1] * self.aggfactrt)
+
+    @property
+    def n_cells(self):
+        return int(np.prod(self.rt_shape))
+
+    @property
+    def n_links(self):
+        return len(self.link_id)
+
+    def __repr__(self):
+        return (
+            f"SyntheticDomain(lsm={self.lsm_shape}, routing={self.rt_shape}, "
+            f"links={self.n_links})"
+        )
+
+    def _accumulate(self):
+        """Upstream cell counts (FLOWACC), from the layout."""
+        ny, nx = self.rt_shape
+        rows = np.arange(ny)
+        drain_row = self.tributary_rows[self._band]
+        lo = np.array([rows[self._band == k].min()
+                       for k in range(len(self.tributary_rows))])
+        hi = np.array([rows[self._band == k].max()
+                       for k in range(len(self.tributary_rows))])
+        size = hi - lo + 1
+
+        # Hillslopes: the cells beyond each one in its column, plus itself
+        side = np.where(rows < drain_row, rows - lo[self._band] + 1,
+                        hi[self._band] - rows + 1)
+        acc = np.repeat(side[:, None], nx, axis=1).astype(np.int64)
+        # Tributaries: whole band columns from the west edge on
+        acc[self.tributary_rows, :nx - 1] = (
+            size[:, None] * np.arange(1, nx)[None, :]
+        )
+        # Trunk: itself, the trunk to the north and the tributary joining
+        inflow = np.ones(ny, dtype=np.int64)
+        if nx > 1:
+            inflow[self.tributary_rows] += acc[self.tributary_rows, nx - 2]
+        acc[:, nx - 1] = np.cumsum(inflow[::-1])[::-1]
+        self.flow_accumulation = acc
+
+    def _reaches(self, reach_cells):
+        """Split the channels into links and derive Route_Link fields."""
+        ny, nx = self.rt_shape
+        n_tributaries = len(self.tributary_rows)
+        n_per_tributary = -(-(nx - 1) // reach_cells)
+
+        # Trunk reach k runs from tributary k's row up to the next one;
+        # tributary links follow, west to east
+        trunk_ids = np.arange(1, n_tributaries + 1)
+        tributary_ids = (n_tributaries + 1 + np.arange(
+            n_tributaries * n_per_tributary
+        ).reshape(n_tributaries, n_per_tributary))
+
+        link_grid = np.zeros(self.rt_shape, dtype=np.int32)
+        segment = np.clip(np.searchsorted(self.tributary_rows, np.arange(ny),
+                                          side="right") - 1, 0, None)
+        link_grid[:, nx - 1] = trunk_ids[segment]
+        link_grid[self.tributary_rows, :nx - 1] = tributary_ids[
+            :, np.arange(nx - 1) // reach_cells
+        ]
+        self.link_grid = link_grid
+
+        n_links = n_tributaries * (n_per_tributary + 1)
+        to = np.zeros(n_links + 1, dtype=np.int32)
+        to[trunk_ids[1:]] = trunk_ids[:-1]
+        to[tributary_ids[:, :-1]] = tributary_ids[:, 1:]
+        to[tributary_ids[:, -1]] = trunk_ids
+        self.link_id = np.arange(1, n_links + 1, dtype=np.int32)
+        self.link_to = to[1:]
+        self.link_order = np.where(self.link_id <= n_tributaries,
+                                   2 if n_tributaries > 1 else 1,
+                                   1).astype(np.int32)
+
+        # Per-link geometry from its cells
+        flat = link_grid.reshape(-1)
+        cells = flat > 0
+        ids = flat[cells]
+        x, y = self.routing_xy()
+        count = np.bincount(ids, minlength=n_links + 1)[1:]
+
+        def mean(values):
+            total = np.bincount(ids, weights=values.reshape(-1)[cells],
+                                minlength=n_links + 1)[1:]
+            return total / count
+
+        self.link_length = count * self.dx_rt
+        self.link_x = mean(x)
+        self.link_y = mean(y)
+        self.link_elevation = mean(self.elevation)
+        # Channels fall evenly: a tenth of the hillslope, half that on the trunk
+        self.link_slope = np.where(self.link_id <= n_tributaries,
+                                   0.05, 0.1) * self.slope
+
+    def routing_xy(self):
+        """Projected x, y (metres from the centre) of every routing cell."""
+        ny, nx = self.rt_shape
+        x = (np.arange(nx) + 0.5 - nx / 2.0) * self.dx_rt
+        y = (np.arange(ny) + 0.5 - ny / 2.0) * self.dx_rt
+        return np.meshgrid(x, y)
+
+    def lsm_xy(self):
+        """Projected x, y of every LSM cell centre."""
+        ny, nx = self.lsm_shape
+        x = (np.arange(nx) + 0.5 - nx / 2.0) * self.dx
+        y = (np.arange(ny) + 0.5 - ny / 2.0) * self.dx
+        return np.meshgrid(x, y)
+
+    def lonlat(self, x, y):
+        """Longitude and latitude of projected points (local tangent plane)."""
+        lat0, lon0 = self.center
+        lat = lat0 + np.degrees(y / EARTH_RADIUS)
+        lon = lon0 + np.degrees(x / (EARTH_RADIUS * np.cos(np.radians(lat0))))
+        return lon, lat
+
+    def lsm_elevation(self):
+        """Mean routing elevation over each LSM cell."""
+        ny, nx = self.lsm_shape
+        agg = self.aggfactrt
+        return self.elevation.reshape(ny, agg, nx, agg).mean(axis=(1, 3))
+
+    def forcing(self, hour, storm_hours=(3, 9)):
+        """LDASIN fields on the LSM grid *hour* hours after the start.
+
+        A diurnal cycle of temperature and sunshine, plus a band of rain
+        (10 mm/h at its axis) that crosses the domain from west to east
+        between the first and last of *storm_hours*.
+        """
+        ny, nx = self.lsm_shape
+        if self._lsm_height is None:
+            self._lsm_height = self.lsm_elevation()
+            self._lsm_x = self.lsm_xy()[0]
+        height, x = self._lsm_height, self._lsm_x
+        ones = np.ones((ny, nx))
+
+        diurnal = np.sin(2.0 * np.pi * (hour - 9) / 24.0)
+        sun = max(np.sin(np.pi * ((hour % 24) - 6) / 12.0), 0.0)
+        rain = np.zeros((ny, nx))
+        first, last = storm_hours
+        if first <= hour <= last:
+            width = nx * self.dx
+            progress = (hour - first + 0.5) / (last - first + 1)
+            axis = (progress - 0.5) * width
+            rain = (10.0 / 3600.0) * np.exp(
+                -0.5 * ((x - axis) / (0.15 * width)) ** 2
+            )
+
+        return {
+            "T2D": 288.0 + 6.0 * diurnal - 0.0065 * height,
+            "Q2D": 0.008 * ones,
+            "U2D": 2.0 * ones,
+            "V2D": 1.0 * ones,
+            "PSFC": 101325.0 * np.exp(-height / 8400.0),
+            "SWDOWN": 800.0 * sun * ones,
+            "LWDOWN": 330.0 * ones,
+            "RAINRATE": rain,
+        }
+
+    # ------------------------------------------------------------------
+    # Writing a run directory
+    # ------------------------------------------------------------------
+
+    def write(self, run_dir, start=datetime.datetime(2011, 8, 26), hours=24,
+              tables_dir=None, storm_hours=(3, 9)):
+        """Write a WRF-Hydro run directory; return its BMI config file path.
+
+        Parameters
+        ----------
+        run_dir : str
+            Created if needed; existing files are overwritten.
+        start : datetime.datetime, optional
+            Model start time.
+        hours : int, optional
+            Simulated hours; forcing is written for each hour from
+            *start* to *start* + *hours*.
+        tables_dir : str, optional
+            Directory to copy the ``*.TBL`` parameter tables from (e.g.
+            the Croton run directory).
+        storm_hours : tuple of int, optional
+            First and last hour of a rain band that crosses the domain
+            from west to east.
+        """
+        run_dir = os.path.abspath(run_dir)
+        for sub in ("DOMAIN", "FORCING"):
+            os.makedirs(os.path.join(run_dir, sub), exist_ok=True)
+
+        self._write_geo_em(os.path.join(run_dir, "DOMAIN", "geo_em.d01.nc"))
+        self._write_wrfinput(os.path.join(run_dir, "DOMAIN", "wrfinput_d01.nc"),
+                             start)
+        self._write_fulldom(os.path.join(run_dir, "DOMAIN", "Fulldom_hires.nc"))
+        self._write_route_link(os.path.join(run_dir, "DOMAIN", "Route_Link.nc"))
+        for hour in range(hours + 1):
+            time = start + datetime.timedelta(hours=hour)
+            self._write_forcing(
+                os.path.join(run_dir, "FORCING",
+                             time.strftime("%Y%m%d%H") + ".LDASIN_DOMAIN1"),
+                hour, storm_hours,
+            )
+
+        with open(os.path.join(run_dir, "namelist.hrldas"), "w") as fp:
+            fp.write(_namelist_hrldas(start, hours))
+        with open(os.path.join(run_dir, "hydro.namelist"), "w") as fp:
+            fp.write(_hydro_namelist(self.dx_rt, self.aggfactrt))
+        if tables_dir is not None:
+            for table in glob.glob(os.path.join(tables_dir, "*.TBL")):
+                shutil.copy(table, run_dir)
+
+        config = os.path.join(run_dir, "bmi_config.nml")
+        with open(config, "w") as fp:
+            fp.write("&bmi_wrf_hydro_config\n")
+            fp.write(f'  wrfhydro_run_dir = "{run_dir}/"\n')
+            fp.write("/\n")
+        return config
+
+    def _global_attributes(self, nc):
+        ny, nx = self.lsm_shape
+        nc.TITLE = "Synthetic WRF-Hydro domain (pymt_wrfhydro.synthetic)"
+        nc.DX = np.float32(self.dx)
+        nc.DY = np.float32(self.dx)
+        setattr(nc, "WEST-EAST_GRID_DIMENSION", np.int32(nx + 1))
+        setattr(nc, "SOUTH-NORTH_GRID_DIMENSION", np.int32(ny + 1))
+        nc.MAP_PROJ = np.int32(1)
+        nc.CEN_LAT = np.float32(self.center[0])
+        nc.CEN_LON = np.float32(self.center[1])
+        nc.MOAD_CEN_LAT = np.float32(self.center[0])
+        nc.STAND_LON = np.float32(self.center[1])
+        nc.TRUELAT1 = np.float32(self.center[0])
+        nc.TRUELAT2 = np.float32(self.center[0])
+        nc.MMINLU = "MODIFIED_IGBP_MODIS_NOAH"
+        nc.NUM_LAND_CAT = np.int32(20)
+        nc.ISWATER = np.int32(17)
+        nc.ISLAKE = np.int32(21)
+        nc.ISICE = np.int32(15)
+        nc.ISURBAN = np.int32(13)
+        nc.ISOILWATER = np.int32(14)
+        nc.grid_id = np.int32(1)
+
+    def _land_classes(self):
+        """Land cover and soil patterns on the LSM grid."""
+        x, y = self.lsm_xy()
+        wave = np.sin(x / (7.3 * self.dx)) + np.cos(y / (5.1 * self.dx))
+        cover = _LAND_COVER[
+            np.digitize(wave, [-1.0, 0.0, 1.0])
+        ]
+        soil = _SOIL[np.digitize(np.sin((x + y) / (9.7 * self.dx)), [-0.3, 0.3])]
+        return cover, soil
+
+    @staticmethod
+    def _variable(nc, name, dims, values, dtype=np.float32, **attrs):
+        var = nc.createVariable(name, np.dtype(dtype).char, dims)
+        var[:] = np.asarray(values, dtype=dtype).reshape(var.shape)
+        for key, value in attrs.items():
+            setattr(var, key, value)
+        return var
+
+    def _write_geo_em(self, path):
+        ny, nx = self.lsm_shape
+        lon, lat = self.lonlat(*self.lsm_xy())
+        cover, soil = self._land_classes()
+        height = self.lsm_elevation()
+        dims = ("Time", "south_north", "west_east")
+        monthly = ("Time", "month", "south_north", "west_east")
+        season = 0.5 + 0.4 * np.sin(np.pi * np.arange(12) / 11.0)[:, None, None]
+
+        with netcdf_file(path, "w", version=2) as nc:
+            self._global_attributes(nc)
+            nc.createDimension("Time", 1)
+            nc.createDimension("south_north", ny)
+            nc.createDimension("west_east", nx)
+            nc.createDimension("month", 12)
+            self._variable(nc, "XLAT_M", dims, lat, units="degrees latitude")
+            self._variable(nc, "XLONG_M", dims, lon, units="degrees longitude")
+            self._variable(nc, "HGT_M", dims, height, units="meters MSL")
+            self._variable(nc, "LU_INDEX", dims, cover)
+            self._variable(nc, "SCT_DOM", dims, soil)
+            self._variable(nc, "SCB_DOM", dims, soil)
+            self._variable(nc, "LANDMASK", dims, np.ones((ny, nx)))
+            self._variable(nc, "SOILTEMP", dims, 285.0 - 0.0065 * height,
+                           units="Kelvin")
+            self._variable(nc, "SLOPECAT", dims, np.ones((ny, nx)))
+            self._variable(nc, "SNOALB", dims, np.full((ny, nx), 0.6))
+            self._variable(nc, "GREENFRAC", monthly,
+                           season * np.ones((12, ny, nx)))
+            self._variable(nc, "LAI12M", monthly,
+                           6.0 * season * np.ones((12, ny, nx)))
+            self._variable(nc, "ALBEDO12M", monthly, np.full((12, ny, nx), 15.0))
+
+    def _write_wrfinput(self, path, start):
+        ny, nx = self.lsm_shape
+        lon, lat = self.lonlat(*self.lsm_xy())
+        cover, soil = self._land_classes()
+        height = self.lsm_elevation()
+        dims = ("Time", "south_north", "west_east")
+        layers = ("Time", "soil_layers_stag", "south_north", "west_east")
+        ones = np.ones((ny, nx))
+        depth = np.cumsum(_SOIL_THICKNESS)
+
+        with netcdf_file(path, "w", version=2) as nc:
+            self._global_attributes(nc)
+            nc.START_DATE = start.strftime("%Y-%m-%d_%H:%M:%S")
+            nc.createDimension("Time", 1)
+            nc.createDimension("south_north", ny)
+            nc.createDimension("west_east", nx)
+            nc.createDimension("soil_layers_stag", len(_SOIL_THICKNESS))
+            wet = 0.25 + 0.05 * depth[:, None, None] * ones
+            self._variable(nc, "SMOIS", layers, wet)
+            self._variable(nc, "SH2O", layers, wet)
+            self._variable(nc, "TSLB", layers,
+                           (285.0 - 0.0065 * height) * np.ones((4, 1, 1)))
+            self._variable(nc, "DZS", ("Time", "soil_layers_stag"),
+                           _SOIL_THICKNESS)
+            self._variable(nc, "ZS", ("Time", "soil_layers_stag"),
+                           depth - 0.5 * np.array(_SOIL_THICKNESS))
+            self._variable(nc, "XLAT", dims, lat)
+            self._variable(nc, "XLONG", dims, lon)
+            self._variable(nc, "HGT", dims, height)
+            self._variable(nc, "IVGTYP", dims, cover, dtype=np.int32)
+            self._variable(nc, "ISLTYP", dims, soil, dtype=np.int32)
+            self._variable(nc, "XLAND", dims, ones)
+            self._variable(nc, "SEAICE", dims, 0 * ones)
+            self._variable(nc, "TSK", dims, 290.0 - 0.0065 * height)
+            self._variable(nc, "TMN", dims, 285.0 - 0.0065 * height)
+            self._variable(nc, "SNOW", dims, 0 * ones)
+            self._variable(nc, "SNODEP", dims, 0 * ones)
+            self._variable(nc, "CANWAT", dims, 0 * ones)
+            self._variable(nc, "LAI", dims, 3.0 * ones)
+            self._variable(nc, "VEGFRA", dims, 50.0 * ones)
+            self._variable(nc, "SHDMAX", dims, 80.0 * ones)
+            self._variable(nc, "SHDMIN", dims, 20.0 * ones)
+            self._variable(nc, "MAPFAC_MX", dims, ones)
+            self._variable(nc, "MAPFAC_MY", dims, ones)
+
+    def _write_fulldom(self, path):
+        """The routing stack, north row first as the GIS pre-processor writes it."""
+        ny, nx = self.rt_shape
+        x, y = self.routing_xy()
+        lon, lat = self.lonlat(x, y)
+        dims = ("y", "x")
+
+        def north_up(values):
+            return np.asarray(values)[::-1]
+
+        with netcdf_file(path, "w", version=2) as nc:
+            nc.createDimension("y", ny)
+            nc.createDimension("x", nx)
+            self._variable(nc, "x", ("x",), x[0], dtype=np.float64, units="m")
+            self._variable(nc, "y", ("y",), north_up(y[:, 0]), dtype=np.float64,
+                           units="m")
+            self._variable(nc, "TOPOGRAPHY", dims, north_up(self.elevation),
+                           units="Meters")
+            self._variable(nc, "FLOWDIRECTION", dims,
+                           north_up(self.flow_direction), dtype=np.int16)
+            self._variable(nc, "FLOWACC", dims,
+                           north_up(self.flow_accumulation), dtype=np.int32)
+            self._variable(nc, "CHANNELGRID", dims,
+                           north_up(np.where(self.channel, 0, MISSING)),
+                           dtype=np.int32)
+            self._variable(nc, "STREAMORDER", dims,
+                           north_up(self.stream_order), dtype=np.int8)
+            self._variable(nc, "LINKID", dims,
+                           north_up(np.where(self.channel, self.link_grid,
+                                             MISSING)), dtype=np.int32)
+            self._variable(nc, "LAKEGRID", dims, np.full((ny, nx), MISSING),
+                           dtype=np.int32)
+            self._variable(nc, "frxst_pts", dims, np.full((ny, nx), MISSING),
+                           dtype=np.int32)
+            self._variable(nc, "basn_msk", dims, np.ones((ny, nx)),
+                           dtype=np.int32)
+            self._variable(nc, "LKSATFAC", dims, np.full((ny, nx), 1000.0))
+            self._variable(nc, "OVROUGHRTFAC", dims, np.ones((ny, nx)))
+            self._variable(nc, "RETDEPRTFAC", dims, np.ones((ny, nx)))
+            self._variable(nc, "LATITUDE", dims, north_up(lat))
+            self._variable(nc, "LONGITUDE", dims, north_up(lon))
+
+    def _write_route_link(self, path):
+        lon, lat = self.lonlat(self.link_x, self.link_y)
+        n = self.n_links
+        order = self.link_order
+        links = ("feature_id",)
+
+        with netcdf_file(path, "w", version=2) as nc:
+            nc.createDimension("feature_id", n)
+            nc.createDimension("IDLength", 15)
+            self._variable(nc, "link", links, self.link_id, dtype=np.int32)
+            self._variable(nc, "from", links, np.zeros(n), dtype=np.int32)
+            self._variable(nc, "to", links, self.link_to, dtype=np.int32)
+            self._variable(nc, "lon", links, lon)
+            self._variable(nc, "lat", links, lat)
+            self._variable(nc, "alt", links, self.link_elevation)
+            self._variable(nc, "order", links, order, dtype=np.int32)
+            self._variable(nc, "Qi", links, np.zeros(n))
+            self._variable(nc, "MusK", links, np.full(n, 3600.0))
+            self._variable(nc, "MusX", links, np.full(n, 0.2))
+            self._variable(nc, "Length", links, self.link_length)
+            self._variable(nc, "n", links, np.full(n, 0.055))
+            self._variable(nc, "So", links, self.link_slope)
+            self._variable(nc, "ChSlp", links, np.full(n, 0.5))
+            self._variable(nc, "BtmWdth", links, 2.5 * order)
+            self._variable(nc, "Kchan", links, np.zeros(n), dtype=np.int16)
+            self._variable(nc, "NHDWaterbodyComID", links, np.full(n, MISSING),
+                           dtype=np.int32)
+            self._variable(nc, "ascendingIndex", links, np.arange(n),
+                           dtype=np.int32)
+            gages = nc.createVariable("gages", "c", ("feature_id", "IDLength"))
+            gages[:] = np.full((n, 15), b" ", dtype="S1")
+
+    def _write_forcing(self, path, hour, storm_hours):
+        ny, nx = self.lsm_shape
+        dims = ("Time", "south_north", "west_east")
+        units = {"T2D": "K", "Q2D": "kg kg-1", "U2D": "m s-1", "V2D": "m s-1",
+                 "PSFC": "Pa", "SWDOWN": "W m-2", "LWDOWN": "W m-2",
+                 "RAINRATE": "mm s^-1"}
+
+        with netcdf_file(path, "w", version=2) as nc:
+            nc.createDimension("Time", 1)
+            nc.createDimension("south_north", ny)
+            nc.createDimension("west_east", nx)
+            for name, values in self.forcing(hour, storm_hours).items():
+                self._variable(nc, name, dims, values, units=units[name])
+
+
+def _namelist_hrldas(start, hours):
+    return f"""&NOAHLSM_OFFLINE
+ HRLDAS_SETUP_FILE = "./DOMAIN/wrfinput_d01.nc"
+ INDIR = "./FORCING"
+ OUTDIR = "./"
+
+ START_YEAR  = {start.year}
+ START_MONTH = {start.month:02d}
+ START_DAY   = {start.day:02d}
+ START_HOUR  = {start.hour:02d}
+ START_MIN   = {start.minute:02d}
+
+ KHOUR = {hours}
+
+ DYNAMIC_VEG_OPTION                = 4
+ CANOPY_STOMATAL_RESISTANCE_OPTION = 1
+ BTR_OPTION                        = 1
+ RUNOFF_OPTION                     = 3
+ SURFACE_DRAG_OPTION               = 1
+ FROZEN_SOIL_OPTION                = 1
+ SUPERCOOLED_WATER_OPTION          = 1
+ RADIATIVE_TRANSFER_OPTION         = 3
+ SNOW_ALBEDO_OPTION                = 1
+ PCP_PARTITION_OPTION              = 1
+ TBOT_OPTION                       = 2
+ TEMP_TIME_SCHEME_OPTION           = 3
+ GLACIER_OPTION                    = 2
+ SURFACE_RESISTANCE_OPTION         = 4
+
+ FORCING_TIMESTEP = 3600
+ NOAH_TIMESTEP    = 3600
+ OUTPUT_TIMESTEP  = 3600
+
+ RESTART_FREQUENCY_HOURS = {hours}
+ SPLIT_OUTPUT_COUNT = 1
+
+ NSOIL = {len(_SOIL_THICKNESS)}
+{"".join(f" soil_thick_input({k + 1}) = {dz:.2f}" + chr(10)
+         for k, dz in enumerate(_SOIL_THICKNESS))}
+ ZLVL = 10.0
+/
+
+&WRF_HYDRO_OFFLINE
+ FORC_TYP = 1
+/
+"""
+
+
+def _hydro_namelist(dx_rt, aggfactrt):
+    depths = np.cumsum(_SOIL_THICKNESS)
+    return f"""&HYDRO_nlist
+ sys_cpl = 1
+ GEO_STATIC_FLNM   = "./DOMAIN/geo_em.d01.nc"
+ GEO_FINEGRID_FLNM = "./DOMAIN/Fulldom_hires.nc"
+ HYDROTBL_F        = "./DOMAIN/hydro2dtbl.nc"
+ LAND_SPATIAL_META_FLNM = ""
+
+ IGRID = 1
+ rst_dt = -99999
+ rst_typ = 1
+ rst_bi_in = 0
+ rst_bi_out = 0
+ RSTRT_SWC = 0
+ GW_RESTART = 0
+
+ out_dt = 60
+ SPLIT_OUTPUT_COUNT = 1
+ order_to_write = 1
+ io_form_outputs = 4
+ io_config_outputs = 0
+ t0OutputFlag = 1
+ output_channelBucket_influx = 0
+ CHRTOUT_DOMAIN = 1
+ CHANOBS_DOMAIN = 0
+ CHRTOUT_GRID = 0
+ LSMOUT_DOMAIN = 0
+ RTOUT_DOMAIN = 0
+ output_gw = 0
+ outlake = 0
+ frxst_pts_out = 0
+
+ NSOIL = {len(_SOIL_THICKNESS)}
+{"".join(f" ZSOIL8({k + 1}) = {-z:.2f}" + chr(10) for k, z in enumerate(depths))}
+ DXRT = {dx_rt:.1f}
+ AGGFACTRT = {aggfactrt}
+ DTRT_CH = 300
+ DTRT_TER = 10
+ SUBRTSWCRT = 1
+ OVRTSWCRT = 1
+ rt_option = 1
+ CHANRTSWCRT = 1
+ channel_option = 2
+ route_link_f = "./DOMAIN/Route_Link.nc"
+ compound_channel = .FALSE.
+ GWBASESWCRT = 0
+ UDMP_OPT = 0
+ bucket_loss = 0
+/
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pymt_wrfhydro.synthetic",
+        description="Write a synthetic WRF-Hydro run directory.",
+    )
+    parser.add_argument("run_dir")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--cells", type=float,
+                      help="approximate number of routing cells")
+    size.add_argument("--lsm-shape", type=int, nargs=2, metavar=("ROWS", "COLS"))
+    parser.add_argument("--aggfactrt", type=int, default=4)
+    parser.add_argument("--dx", type=float, default=1000.0,
+                        help="LSM grid spacing (m)")
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--tables-dir",
+                        help="run directory to copy the *.TBL files from")
+    args = parser.parse_args(argv)
+
+    if args.cells is not None:
+        domain = SyntheticDomain.from_cells(args.cells, aggfactrt=args.aggfactrt,
+                                            dx=args.dx)
+    else:
+        domain = SyntheticDomain(args.lsm_shape, aggfactrt=args.aggfactrt,
+                                 dx=args.dx)
+    config = domain.write(args.run_dir, hours=args.hours,
+                          tables_dir=args.tables_dir)
+    print(f"{domain}: {config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
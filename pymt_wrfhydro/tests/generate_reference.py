@@ -95,23 +95,19 @@ def main():
     print(f"\n[Step 3] Running {n_steps} update steps...")
     streamflow_arrays = {}
 
-    for step in range(1, n_steps + 1):
-        try:
-            model.update()
-            t = model.get_current_time()
-
-            # Capture streamflow
-            buf = np.zeros(grid_size, dtype=var_type)
-            model.get_value(var_name, buf)
+    try:
+        steps = model.iter_steps(var_name, until=n_steps * time_step, copy=True)
+        for step, (t, values) in enumerate(steps, start=1):
+            buf = values[var_name]
             key = f"streamflow_step_{step}"
-            streamflow_arrays[key] = buf.copy()
+            streamflow_arrays[key] = buf
 
             print(f"  Step {step}: t={t:.0f}s, streamflow "
                   f"min={buf.min():.10e}, max={buf.max():.10e}")
-        except Exception as e:
-            print(f"  FAIL: step {step} error: {e}")
-            _finalize_and_cleanup(model, config_path, orig_dir)
-            return 1
+    except Exception as e:
+        print(f"  FAIL: step {len(streamflow_arrays) + 1} error: {e}")
+        _finalize_and_cleanup(model, config_path, orig_dir)
+        return 1
 
     # -----------------------------------------------------------------------
     # Step 4: Save .npz
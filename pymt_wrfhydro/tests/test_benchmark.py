@@ -0,0 +1,147 @@
+"""
+Tests for the scaling tables in pymt_wrfhydro.benchmark.
+
+The records are made up here; running the benchmark for real needs
+WRF-Hydro and mpirun (see benchmark.sh).
+"""
+import json
+
+import pytest
+
+from pymt_wrfhydro.benchmark import (
+    format_table,
+    load_results,
+    report,
+    run_case,
+    strong_scaling,
+    weak_scaling,
+)
+
+
+def record(case, nprocs, update, series=None):
+    """A benchmark record whose update_until took *update* seconds."""
+    def summary(value):
+        return {"max": value, "mean": value, "min": value,
+                "per_rank": [value] * nprocs}
+
+    return {
+        "case": case,
+        "series": series,
+        "nprocs": nprocs,
+        "phases": {"initialize": summary(1.0), "update_until": summary(update)},
+        "reads": {
+            "q": {"get_value": summary(1e-4), "get_value_local": summary(1e-4),
+                  "gather_root": summary(2e-4), "gather_all": summary(3e-4),
+                  "global_size": 100, "gathered_bytes": 800},
+        },
+        "memory_mb": summary(50.0),
+    }
+
+
+@pytest.fixture
+def records():
+    return [
+        record("croton", 4, 2.5),
+        record("croton", 1, 8.0),
+        record("croton", 2, 4.0),
+        record("weak_np1", 1, 8.0, series="weak"),
+        record("weak_np2", 2, 10.0, series="weak"),
+        record("single", 1, 1.0),
+    ]
+
+
+def test_strong_scaling(records):
+    tables = strong_scaling(records)
+    assert list(tables) == ["croton"]
+    rows = tables["croton"]
+    assert [row["nprocs"] for row in rows] == [1, 2, 4]
+    assert [row["speedup"] for row in rows] == [1.0, 2.0, 3.2]
+    assert rows[2]["efficiency"] == pytest.approx(0.8)
+    assert rows[0]["gather_all"] == 3e-4
+
+
+def test_weak_scaling(records):
+    rows = weak_scaling(records)["weak"]
+    assert [row["case"] for row in rows] == ["weak_np1", "weak_np2"]
+    assert [row["efficiency"] for row in rows] == [1.0, 0.8]
+
+
+def test_format_table():
+    text = format_table([{"nprocs": 1, "speedup": 1.0},
+                         {"nprocs": 16, "speedup": 12.3456}],
+                        ("nprocs", "speedup"))
+    lines = text.splitlines()
+    assert lines[0].split() == ["nprocs", "speedup"]
+    assert lines[-1].split() == ["16", "12.35"]
+    assert len({len(line) for line in lines}) == 1
+
+
+def test_report_round_trip(records, tmp_path, capsys):
+    for k, item in enumerate(records):
+        (tmp_path / f"run{k}.json").write_text(json.dumps(item))
+    output = tmp_path / "scaling.json"
+    tables = report([str(tmp_path)], str(output))
+
+    assert "Strong scaling: croton" in capsys.readouterr().out
+    assert json.loads(output.read_text()) == json.loads(json.dumps(tables))
+    # The report itself is not read back as a record
+    assert len(load_results([str(tmp_path)])) == len(records)
+
+
+class CachingModel:
+    """Counts reads that miss a per-step cache like the extension's."""
+
+    def __init__(self):
+        self.time, self.step, self.cached, self.misses = 0.0, 0, set(), 0
+
+    def initialize(self, config_file):
+        pass
+
+    def get_start_time(self):
+        return 0.0
+
+    def get_time_step(self):
+        return 3600.0
+
+    def get_current_time(self):
+        return self.time
+
+    def update_until(self, time):
+        self.time, self.step = time, self.step + 1
+
+    def get_var_grid(self, name):
+        return 0
+
+    def get_grid_size(self, grid):
+        return 4
+
+    def get_var_type(self, name):
+        return "float64"
+
+    def get_grid_global_shape(self, grid):
+        return [2, 2]
+
+    def get_value(self, name, buffer):
+        if (name, self.step) not in self.cached:
+            self.cached.add((name, self.step))
+            self.misses += 1
+        return buffer
+
+    def get_value_local(self, name):
+        return None
+
+    def get_value_global(self, name, root=None):
+        return None
+
+    def finalize(self):
+        pass
+
+
+def test_get_value_timed_without_cache(tmp_path):
+    """Every timed get_value is a first read of its step."""
+    mpi = pytest.importorskip("mpi4py.MPI")
+    model = CachingModel()
+    record = run_case(str(tmp_path), "fake", var_names=("q",), repeat=5,
+                      comm=mpi.COMM_SELF, factory=lambda: model)
+    assert model.misses == 5
+    assert record["reads"]["q"]["get_value"]["per_rank"][0] >= 0.0
@@ -125,9 +125,9 @@ class TestInitAndInfo:
         assert name == "WRF-Hydro v5.4.0 (NCAR)", f"Got: '{name}'"
 
     def test_output_var_count(self, bmi_model):
-        """8 output variables are exposed."""
+        """8 physical output variables plus the channel link IDs."""
         count = bmi_model.get_output_item_count()
-        assert count == 8, f"Expected 8 output vars, got {count}"
+        assert count == 9, f"Expected 9 output vars, got {count}"
 
     def test_input_var_count(self, bmi_model):
         """4 input variables are exposed."""
@@ -135,9 +135,9 @@ class TestInitAndInfo:
         assert count == 4, f"Expected 4 input vars, got {count}"
 
     def test_output_var_names(self, bmi_model):
-        """All 8 expected output variable names are present."""
+        """All 9 expected output variable names are present."""
         names = bmi_model.get_output_var_names()
-        expected = set(PLAUSIBLE_RANGES.keys())
+        expected = set(PLAUSIBLE_RANGES.keys()) | {"channel_link__id"}
         actual = set(names)
         assert expected == actual, (
             f"Missing: {expected - actual}, Extra: {actual - expected}"
@@ -153,6 +153,17 @@ class TestInitAndInfo:
         units = bmi_model.get_time_units()
         assert units == "s", f"Expected 's', got '{units}'"
 
+    def test_temperature_before_first_update(self, bmi_model):
+        """At t=0 T2MVXY is the undefined sentinel everywhere; none leaks."""
+        if bmi_model.get_current_time() != bmi_model.get_start_time():
+            pytest.skip("session model has already been advanced")
+        values = get_value_array(bmi_model, "land_surface_air__temperature")
+        assert np.all(np.abs(values) < 1e30)
+        # No cell is computed yet, so the mask marks none valid
+        mask = bmi_model.get_var_mask("land_surface_air__temperature")
+        assert np.all(mask == 0)
+        assert np.all(values[mask == 0] == 0.0)
+
 
 # ===========================================================================
 # Tests: Update and Time Advancement
@@ -339,6 +350,613 @@ class TestAll8OutputVariables:
         )
 
 
+# ===========================================================================
+# Tests: Per-Step Value Cache
+# ===========================================================================
+class TestValueCache:
+    """get_value_cached() serves repeat reads within a step from memory."""
+
+    VAR = "channel_water__volume_flow_rate"
+
+    def test_cached_matches_get_value(self, model_after_6_steps):
+        """Cached array holds the same values get_value copies out."""
+        model, _ = model_after_6_steps
+        cached = model.get_value_cached(self.VAR)
+        np.testing.assert_array_equal(cached, get_value_array(model, self.VAR))
+
+    def test_cached_is_read_only(self, model_after_6_steps):
+        """Callers cannot scribble on the shared cached array."""
+        model, _ = model_after_6_steps
+        cached = model.get_value_cached(self.VAR)
+        assert not cached.flags.writeable
+        with pytest.raises(ValueError):
+            cached[0] = 0.0
+
+    def test_repeat_read_hits_cache(self, model_after_6_steps):
+        """A second read in the same step returns the same array object."""
+        model, _ = model_after_6_steps
+        first = model.get_value_cached(self.VAR)
+        assert model.get_value_cached(self.VAR) is first
+
+    def test_set_value_invalidates(self, model_after_6_steps):
+        """set_value() drops the stale cached copy of that variable."""
+        model, _ = model_after_6_steps
+        var = "sea_water__x_velocity"
+        before = model.get_value_cached(var)
+        model.set_value(var, np.full(before.size, 0.25))
+        after = model.get_value_cached(var)
+        assert after is not before
+        assert np.all(after == 0.25)
+        model.set_value(var, np.zeros(before.size))
+
+    def test_short_buffer_rejected(self, model_after_6_steps):
+        """get_value() will not copy past the end of the caller's buffer."""
+        model, _ = model_after_6_steps
+        size = model.get_grid_size(model.get_var_grid(self.VAR))
+        with pytest.raises(ValueError):
+            model.get_value(self.VAR, np.empty(size - 1))
+
+    def test_wrong_dtype_rejected(self, model_after_6_steps):
+        model, _ = model_after_6_steps
+        size = model.get_grid_size(model.get_var_grid(self.VAR))
+        with pytest.raises(TypeError):
+            model.get_value(self.VAR, np.empty(size, dtype=np.float32))
+
+
+# ===========================================================================
+# Tests: Change Feed
+# ===========================================================================
+class TestValueChanges:
+    """get_value_changes() reports only elements that moved."""
+
+    VAR = "sea_water_surface__elevation"
+
+    def test_first_call_publishes_everything(self, model_after_6_steps):
+        """The first call returns every element of the variable."""
+        model, _ = model_after_6_steps
+        indices, values = model.get_value_changes(self.VAR)
+        np.testing.assert_array_equal(indices, np.arange(values.size))
+        np.testing.assert_array_equal(values, get_value_array(model, self.VAR))
+
+    def test_only_changed_elements(self, model_after_6_steps):
+        """After set_value, exactly the modified elements are returned."""
+        model, _ = model_after_6_steps
+        model.get_value_changes(self.VAR)
+        elevation = get_value_array(model, self.VAR)
+        elevation[[1, 5]] += [0.5, 1e-9]
+        model.set_value(self.VAR, elevation)
+
+        indices, values = model.get_value_changes(self.VAR, tolerance=1e-6)
+        np.testing.assert_array_equal(indices, [1])
+        np.testing.assert_array_equal(values, elevation[[1]])
+
+        indices, _ = model.get_value_changes(self.VAR, tolerance=1e-6)
+        assert len(indices) == 0
+
+        model.set_value(self.VAR, np.zeros(elevation.size))
+
+
+# ===========================================================================
+# Tests: 2D Grid Views
+# ===========================================================================
+class TestValue2D:
+    """get_value_2d() returns fields shaped like their grid."""
+
+    @pytest.mark.parametrize("var_name,grid_id", [
+        ("soil_water__volume_fraction", 0),
+        ("land_surface_water__depth", 1),
+    ])
+    def test_view_matches_grid(self, model_after_6_steps, var_name, grid_id):
+        """The view has the grid shape and the flat values in C order."""
+        model, _ = model_after_6_steps
+        shape = tuple(model.get_grid_shape(grid_id, np.zeros(2, dtype=np.intc)))
+        field = model.get_value_2d(var_name)
+        assert field.shape == shape
+        assert field.flags.c_contiguous and not field.flags.writeable
+        np.testing.assert_array_equal(
+            field, get_value_array(model, var_name).reshape(shape)
+        )
+
+    def test_out_buffer(self, model_after_6_steps):
+        """Values are copied into a caller-supplied 2D buffer."""
+        model, _ = model_after_6_steps
+        var = "soil_water__volume_fraction"
+        out = np.zeros_like(model.get_value_2d(var))
+        assert model.get_value_2d(var, out) is out
+        np.testing.assert_array_equal(out, model.get_value_2d(var))
+
+    def test_bad_out_buffer(self, model_after_6_steps):
+        """A transposed (Fortran-ordered) buffer is rejected."""
+        model, _ = model_after_6_steps
+        var = "soil_water__volume_fraction"
+        out = np.zeros_like(model.get_value_2d(var)).T
+        with pytest.raises(ValueError):
+            model.get_value_2d(var, out)
+
+    def test_vector_grid_rejected(self, model_after_6_steps):
+        """Channel variables live on a 1D network and have no 2D view."""
+        model, _ = model_after_6_steps
+        with pytest.raises(ValueError):
+            model.get_value_2d("channel_water__volume_flow_rate")
+
+
+# ===========================================================================
+# Tests: Validity Masks
+# ===========================================================================
+class TestValidityMask:
+    """get_var_mask() marks cells the model never computes."""
+
+    VAR = "land_surface_air__temperature"
+
+    def test_mask_shape_and_values(self, model_after_6_steps):
+        """Mask is a 0/1 int array the size of the variable's grid."""
+        model, _ = model_after_6_steps
+        mask = model.get_var_mask(self.VAR)
+        assert mask.size == model.get_grid_size(model.get_var_grid(self.VAR))
+        assert set(np.unique(mask)) <= {0, 1}
+        assert mask.sum() > 0, "no valid LSM cells"
+
+    def test_mask_is_static(self, model_after_6_steps):
+        """The mask is fetched once and reused."""
+        model, _ = model_after_6_steps
+        assert model.get_var_mask(self.VAR) is model.get_var_mask(self.VAR)
+
+    def test_invalid_cells_filled(self, model_after_6_steps):
+        """With the default fill policy, invalid cells read as 0.0."""
+        model, _ = model_after_6_steps
+        mask = model.get_var_mask(self.VAR)
+        values = get_value_array(model, self.VAR)
+        assert np.all(values[mask == 0] == 0.0)
+        assert np.all(np.abs(values[mask == 1]) < 1e30)
+
+    def test_masked_array(self, model_after_6_steps):
+        """get_value_masked() hides invalid cells from reductions."""
+        model, _ = model_after_6_steps
+        masked = model.get_value_masked(self.VAR)
+        assert np.array_equal(np.ma.getmaskarray(masked),
+                              model.get_var_mask(self.VAR) == 0)
+        if masked.count() > 0:
+            assert masked.min() > 200.0, "masked min should skip 0.0 fill"
+
+    def test_channel_grid_all_valid(self, model_after_6_steps):
+        """Every channel link is computed."""
+        model, _ = model_after_6_steps
+        mask = model.get_var_mask("channel_water__volume_flow_rate")
+        assert np.all(mask == 1)
+
+
+# ===========================================================================
+# Tests: In-Library Reductions
+# ===========================================================================
+class TestValueStats:
+    """get_value_stats() matches numpy reductions over the valid cells."""
+
+    STATS = ["min", "max", "mean", "sum", "std", "count", "median", "p95"]
+
+    @staticmethod
+    def numpy_stats(values):
+        return {
+            "min": values.min(),
+            "max": values.max(),
+            "mean": values.mean(),
+            "sum": values.sum(),
+            "std": values.std(),
+            "count": values.size,
+            "median": np.median(values),
+            "p95": np.percentile(values, 95),
+        }
+
+    @pytest.mark.parametrize("var_name", list(PLAUSIBLE_RANGES.keys()))
+    def test_matches_numpy(self, model_after_6_steps, var_name):
+        """Every statistic agrees with numpy over the masked values."""
+        model, _ = model_after_6_steps
+        stats = model.get_value_stats(var_name, self.STATS)
+        expected = self.numpy_stats(model.get_value_masked(var_name).compressed())
+        for name in self.STATS:
+            assert np.isclose(stats[name], expected[name], rtol=1e-12), name
+
+    def test_explicit_mask(self, model_after_6_steps):
+        """An explicit mask selects the elements to reduce."""
+        model, _ = model_after_6_steps
+        var = "channel_water__volume_flow_rate"
+        values = get_value_array(model, var)
+        mask = values > np.median(values)
+        stats = model.get_value_stats(var, ["mean", "count"], mask=mask)
+        assert stats["count"] == mask.sum()
+        assert np.isclose(stats["mean"], values[mask].mean())
+
+    def test_nonzero_mask_is_true(self, model_after_6_steps):
+        """Any nonzero mask value selects, as for a boolean mask."""
+        model, _ = model_after_6_steps
+        var = "channel_water__volume_flow_rate"
+        values = get_value_array(model, var)
+        mask = values > np.median(values)
+        expected = model.get_value_stats(var, ["count", "sum"], mask=mask)
+        for weights in (mask * 2, mask * 0.5):
+            assert model.get_value_stats(var, ["count", "sum"],
+                                         mask=weights) == expected
+
+    def test_empty_selection(self, model_after_6_steps):
+        """Nothing selected: count is 0 and the rest are NaN."""
+        model, _ = model_after_6_steps
+        var = "channel_water__volume_flow_rate"
+        size = model.get_grid_size(model.get_var_grid(var))
+        stats = model.get_value_stats(var, ["count", "max"],
+                                      mask=np.zeros(size, dtype=bool))
+        assert stats["count"] == 0 and np.isnan(stats["max"])
+
+    def test_unknown_statistic(self, model_after_6_steps):
+        model, _ = model_after_6_steps
+        with pytest.raises(ValueError):
+            model.get_value_stats("channel_water__volume_flow_rate", ["mode"])
+
+
+# ===========================================================================
+# Tests: Zonal Statistics
+# ===========================================================================
+class TestValueZonal:
+    """get_value_zonal() matches numpy reductions zone by zone."""
+
+    @staticmethod
+    def make_zones(model, var_name, n_zones=5):
+        from pymt_wrfhydro.zonal import ZonalIndex
+
+        size = model.get_grid_size(model.get_var_grid(var_name))
+        labels = np.arange(size) % n_zones
+        labels[::7] = -1
+        return ZonalIndex(labels, nodata=-1)
+
+    @pytest.mark.parametrize(
+        "var_name",
+        ["soil_water__volume_fraction", "land_surface_air__temperature",
+         "land_surface_water__depth"],
+    )
+    def test_matches_numpy(self, model_after_6_steps, var_name):
+        """Every zone agrees with numpy over its valid cells."""
+        model, _ = model_after_6_steps
+        zones = self.make_zones(model, var_name)
+        stats = zones.aggregate(
+            model, var_name, ("min", "max", "mean", "sum", "std", "count")
+        )
+
+        values = get_value_array(model, var_name)
+        valid = model.get_var_mask(var_name) == 1
+        for z in range(len(zones)):
+            cells = zones.cells[zones.indptr[z]:zones.indptr[z + 1]]
+            selected = values[cells[valid[cells]]]
+            assert stats["count"][z] == selected.size
+            if selected.size == 0:
+                assert np.isnan(stats["mean"][z])
+                continue
+            assert stats["min"][z] == selected.min()
+            assert stats["max"][z] == selected.max()
+            assert np.isclose(stats["mean"][z], selected.mean(), rtol=1e-12)
+            assert np.isclose(stats["sum"][z], selected.sum(), rtol=1e-12)
+            assert np.isclose(stats["std"][z], selected.std(),
+                              rtol=1e-9, atol=1e-12)
+
+    def test_result_per_zone(self, model_after_6_steps):
+        """Each statistic is a contiguous array over the zones."""
+        model, _ = model_after_6_steps
+        var = "soil_water__volume_fraction"
+        zones = self.make_zones(model, var)
+        mean = zones.aggregate(model, var)["mean"]
+        assert mean.shape == (len(zones),)
+        assert mean.flags.c_contiguous
+
+    def test_labels_wrong_size(self, model_after_6_steps):
+        from pymt_wrfhydro.zonal import ZonalIndex
+
+        model, _ = model_after_6_steps
+        with pytest.raises(ValueError):
+            ZonalIndex(np.zeros(3, dtype=int)).aggregate(
+                model, "soil_water__volume_fraction")
+
+    def test_cell_out_of_range(self, model_after_6_steps):
+        """A corrupt index is rejected by the library."""
+        model, _ = model_after_6_steps
+        var = "soil_water__volume_fraction"
+        size = model.get_grid_size(model.get_var_grid(var))
+        with pytest.raises(RuntimeError):
+            model.get_value_zonal(var, [0, 1], [size], ("mean",))
+
+    def test_percentile_rejected(self, model_after_6_steps):
+        model, _ = model_after_6_steps
+        with pytest.raises(ValueError):
+            model.get_value_zonal("soil_water__volume_fraction", [0, 1], [0],
+                                  ("median",))
+
+
+# ===========================================================================
+# Tests: Channel Link IDs
+# ===========================================================================
+class TestLinkIds:
+    """channel_link__id and the feature-ID -> position index."""
+
+    VAR = "channel_link__id"
+
+    def test_metadata(self, bmi_model):
+        """Integer variable on the channel grid, same size as streamflow."""
+        assert bmi_model.get_var_type(self.VAR) == "int32"
+        assert bmi_model.get_var_itemsize(self.VAR) == 4
+        assert bmi_model.get_var_grid(self.VAR) == bmi_model.get_var_grid(
+            "channel_water__volume_flow_rate"
+        )
+
+    def test_ids_unique(self, bmi_model):
+        ids = get_value_array(bmi_model, self.VAR)
+        assert len(ids) == len(np.unique(ids))
+
+    def test_positions_roundtrip(self, bmi_model):
+        """Every ID maps back to its own position."""
+        ids = get_value_array(bmi_model, self.VAR)
+        positions = bmi_model.get_link_positions(ids)
+        np.testing.assert_array_equal(positions, np.arange(len(ids)))
+
+    def test_unknown_id(self, bmi_model):
+        ids = get_value_array(bmi_model, self.VAR)
+        positions = bmi_model.get_link_positions([ids.max() + 1, ids[0]])
+        np.testing.assert_array_equal(positions, [-1, 0])
+
+    def test_register_unknown_id(self, bmi_model):
+        ids = get_value_array(bmi_model, self.VAR)
+        with pytest.raises(KeyError):
+            bmi_model.register_gauges([ids[0], ids.max() + 1])
+
+
+# ===========================================================================
+# Tests: Channel Network Topology
+# ===========================================================================
+class TestChannelNetwork:
+    """The channel grid's edges form a valid drainage network."""
+
+    FLOW = "channel_water__volume_flow_rate"
+
+    @pytest.fixture
+    def network(self, bmi_model):
+        from pymt_wrfhydro.network import ChannelNetwork
+
+        return ChannelNetwork.from_model(bmi_model)
+
+    def test_one_edge_per_non_outlet(self, bmi_model, network):
+        grid = bmi_model.get_var_grid(self.FLOW)
+        assert bmi_model.get_grid_edge_count(grid) == (
+            len(network) - len(network.outlets)
+        )
+        assert len(network) == bmi_model.get_grid_size(grid)
+
+    def test_no_self_loops(self, network):
+        assert not np.any(network.downstream == np.arange(len(network)))
+
+    def test_every_link_reaches_an_outlet(self, network):
+        """Topological sort succeeded and basins partition the links."""
+        _, count = network.aggregate_by_outlet(np.ones(len(network)), "count")
+        assert count.sum() == len(network)
+        outlet_area = network.accumulate(np.ones(len(network)))[network.outlets]
+        np.testing.assert_array_equal(outlet_area, count)
+
+
+# ===========================================================================
+# Tests: Spatial Index
+# ===========================================================================
+class TestSpatialIndex:
+    """KD-tree indices over the model's grids."""
+
+    def test_links_find_themselves(self, bmi_model):
+        grid = bmi_model.get_var_grid("channel_link__id")
+        index = bmi_model.get_spatial_index(grid)
+        assert index.geographic
+        x, y = np.empty(len(index)), np.empty(len(index))
+        bmi_model.get_grid_x(grid, x)
+        bmi_model.get_grid_y(grid, y)
+        distance, _ = index.nearest(x, y)
+        np.testing.assert_allclose(distance, 0.0, atol=1e-6)
+
+    def test_lsm_cells(self, bmi_model):
+        grid = bmi_model.get_var_grid("soil_water__volume_fraction")
+        index = bmi_model.get_spatial_index(grid)
+        assert index.geographic
+        assert len(index) == bmi_model.get_grid_size(grid)
+        _, cell = index.nearest(index.x[[0, -1]], index.y[[0, -1]])
+        assert cell.tolist() == [0, len(index) - 1]
+
+    @pytest.mark.parametrize("grid", [0, 1])
+    def test_rectilinear_cells_on_the_earth(self, bmi_model, grid):
+        """LSM and routing cells are indexed by longitude/latitude."""
+        index = bmi_model.get_spatial_index(grid)
+        assert np.all(np.abs(index.x) <= 180.0)
+        assert np.all(np.abs(index.y) <= 90.0)
+        # Neighbouring cells are one grid spacing apart, in metres
+        spacing = np.empty(2)
+        bmi_model.get_grid_spacing(grid, spacing)
+        distance, _ = index.nearest(index.x[:1], index.y[:1], k=2)
+        assert np.isclose(distance[0, 1], spacing.min(), rtol=0.05)
+
+    @pytest.mark.parametrize("grid", [0, 1])
+    def test_bmi_coordinates_untouched(self, bmi_model, grid):
+        """Longitude/latitude come from the extension, not get_grid_x/y."""
+        lon, lat = bmi_model.get_grid_lonlat(grid)
+        assert lon.shape == lat.shape == (bmi_model.get_grid_size(grid),)
+        with pytest.raises(RuntimeError):
+            bmi_model.get_grid_x(grid, np.empty_like(lon))
+
+    def test_cached(self, bmi_model):
+        grid = bmi_model.get_var_grid("soil_water__volume_fraction")
+        assert bmi_model.get_spatial_index(grid) is bmi_model.get_spatial_index(grid)
+
+
+# ===========================================================================
+# Tests: LSM <-> Routing Regridding
+# ===========================================================================
+class TestRegrid:
+    """Operators built from the model's LSM and routing grids."""
+
+    @pytest.fixture
+    def regridder(self, bmi_model):
+        from pymt_wrfhydro.regrid import Regridder
+
+        return Regridder.from_model(bmi_model)
+
+    def test_shapes(self, bmi_model, regridder):
+        head = bmi_model.get_value_2d("land_surface_water__depth")
+        assert head.shape == regridder.rt_shape
+        soil = bmi_model.get_value_2d("soil_water__volume_fraction")
+        assert regridder.to_lsm(head).shape == soil.shape
+        assert regridder.to_routing(soil).shape == head.shape
+
+    def test_constant_preserved(self, regridder):
+        np.testing.assert_allclose(
+            regridder.to_lsm(np.full(regridder.rt_shape, 2.5)), 2.5
+        )
+        np.testing.assert_allclose(
+            regridder.to_routing(np.full(regridder.lsm_shape, 2.5)), 2.5
+        )
+
+
+# ===========================================================================
+# Tests: Mesh Remapping
+# ===========================================================================
+class TestRemap:
+    """Weights between the model's grids and an unstructured mesh."""
+
+    def test_mesh_to_lsm(self, bmi_model):
+        """A lon/lat mesh over the domain lands on the nearest LSM cells."""
+        from pymt_wrfhydro.remap import Mesh, Remapper
+        from pymt_wrfhydro.spatial import EARTH_RADIUS
+
+        size = bmi_model.get_grid_size(0)
+        x, y = bmi_model.get_grid_lonlat(0)
+        # Cell centres of the Croton domain are around 41.4 N, 73.8 W
+        lon, lat = np.meshgrid(np.linspace(x.min(), x.max(), 7),
+                               np.linspace(y.min(), y.max(), 5))
+        mesh = Mesh(lon.ravel(), lat.ravel(), np.zeros(lon.size),
+                    np.empty((0, 4)), geographic=True)
+        to_mesh = Remapper.grid_to_mesh(bmi_model, 0, mesh, "nearest")
+        found = to_mesh(np.arange(size, dtype=float)).astype(int)
+
+        lam0, phi0 = np.radians(mesh.x)[:, None], np.radians(mesh.y)[:, None]
+        lam1, phi1 = np.radians(x)[None, :], np.radians(y)[None, :]
+        hav = (np.sin((phi1 - phi0) / 2) ** 2 + np.cos(phi0) * np.cos(phi1)
+               * np.sin((lam1 - lam0) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(hav))
+        np.testing.assert_allclose(
+            distance[np.arange(mesh.n_nodes), found], distance.min(axis=1),
+            atol=1e-3,
+        )
+
+        to_lsm = Remapper.mesh_to_grid(mesh, bmi_model, 0, "nearest")
+        assert to_lsm.shape == (len(x), mesh.n_nodes)
+
+    def test_projected_mesh_rejected(self, bmi_model):
+        from pymt_wrfhydro.remap import Mesh, Remapper
+
+        mesh = Mesh([0.0, 1000.0], [0.0, 0.0], np.zeros(2), np.empty((0, 4)))
+        with pytest.raises(ValueError):
+            Remapper.mesh_to_grid(mesh, bmi_model, 0)
+
+    def test_outlets_to_mesh(self, bmi_model):
+        from pymt_wrfhydro.network import ChannelNetwork
+        from pymt_wrfhydro.remap import Mesh, Remapper
+
+        grid = bmi_model.get_var_grid("channel_link__id")
+        links = bmi_model.get_spatial_index(grid)
+        outlets = ChannelNetwork.from_model(bmi_model).outlets
+        mesh = Mesh(links.x[outlets], links.y[outlets], np.zeros(len(outlets)),
+                    np.empty((0, 4)), geographic=True)
+        to_mesh = Remapper.grid_to_mesh(
+            bmi_model, grid, mesh, source_nodes=outlets
+        )
+        flow = np.arange(len(links), dtype=float)
+        np.testing.assert_array_equal(to_mesh(flow), flow[outlets])
+
+
+# ===========================================================================
+# Tests: Exchange Buffers
+# ===========================================================================
+class TestExchangeBuffer:
+    """Snapshots are read straight from the model."""
+
+    FLOW = "channel_water__volume_flow_rate"
+
+    def test_record(self, bmi_model):
+        from pymt_wrfhydro.exchange import ExchangeBuffer
+
+        buffer = ExchangeBuffer.from_model(bmi_model, self.FLOW, method="previous")
+        buffer.record(bmi_model)
+        time = bmi_model.get_current_time()
+        np.testing.assert_array_equal(buffer.times, [time])
+        np.testing.assert_array_equal(
+            buffer.interpolate(self.FLOW, time), bmi_model.get_value_cached(self.FLOW)
+        )
+
+
+class TestIntercommExchange:
+    """send_value / recv_value round trip with MPI_COMM_SELF as partner."""
+
+    VAR = "sea_water_surface__elevation"
+
+    def test_send_without_intercomm_fails(self, bmi_model):
+        with pytest.raises(RuntimeError):
+            bmi_model.send_value(self.VAR, 0)
+
+    def test_round_trip(self, bmi_model):
+        MPI = pytest.importorskip("mpi4py.MPI")
+
+        size = bmi_model.get_grid_size(bmi_model.get_var_grid(self.VAR))
+        sent = np.arange(size, dtype=np.float64) + 0.5
+        bmi_model.set_intercomm(MPI.COMM_SELF)
+        bmi_model.set_value(self.VAR, sent)
+        bmi_model.send_value(self.VAR, 0, tag=3)
+        bmi_model.set_value(self.VAR, np.zeros(size))
+        bmi_model.recv_value(self.VAR, 0, tag=3)
+        bmi_model.wait_exchanges()
+
+        received = np.empty(size)
+        bmi_model.get_value(self.VAR, received)
+        np.testing.assert_array_equal(received, sent)
+
+
+class TestDecomposition:
+    """On a single rank, tiled access reduces to the plain BMI calls."""
+
+    VAR = "land_surface_water__depth"
+
+    def test_single_rank(self, bmi_model):
+        assert bmi_model.get_decomposition() == (0, 1)
+
+    def test_tile_is_whole_grid(self, bmi_model):
+        grid = bmi_model.get_var_grid(self.VAR)
+        shape = bmi_model.get_grid_shape(grid, np.empty(2, dtype=np.intc))
+        np.testing.assert_array_equal(bmi_model.get_grid_tile(grid),
+                                      [0, 0, shape[0], shape[1]])
+        np.testing.assert_array_equal(bmi_model.get_grid_global_shape(grid), shape)
+
+    def test_channel_global_shape(self, bmi_model):
+        assert list(bmi_model.get_grid_global_shape(2)) == [bmi_model.get_grid_size(2)]
+
+    def test_local_and_global_match_get_value(self, bmi_model):
+        expected = bmi_model.get_value_cached(self.VAR)
+        np.testing.assert_array_equal(bmi_model.get_value_local(self.VAR), expected)
+        np.testing.assert_array_equal(bmi_model.get_value_global(self.VAR), expected)
+        np.testing.assert_array_equal(
+            bmi_model.get_value_global(self.VAR, root=0), expected
+        )
+
+    def test_global_indices(self, bmi_model):
+        expected = bmi_model.get_value_cached(self.VAR)
+        inds = [len(expected) - 1, 0, len(expected)]
+        np.testing.assert_array_equal(
+            bmi_model.get_value_at_global_indices(self.VAR, inds),
+            [expected[-1], expected[0], -1.0],
+        )
+
+    def test_set_global_indices(self, bmi_model):
+        var = "sea_water_surface__elevation"
+        bmi_model.set_value_at_global_indices(var, [1, 4], [2.5, -1.5])
+        values = bmi_model.get_value_cached(var)
+        assert values[1] == 2.5 and values[4] == -1.5
+
+
 # ===========================================================================
 # Tests: Streamflow Reference Comparison (from .npz)
 # ===========================================================================
@@ -459,3 +1077,143 @@ class TestStreamflowReference:
         assert np.allclose(live.mean(), ref.mean(), rtol=RTOL, atol=ATOL), (
             f"Mean mismatch: live={live.mean():.10e}, ref={ref.mean():.10e}"
         )
+
+
+# ===========================================================================
+# Tests: Step Iterator
+# ===========================================================================
+# NOTE: Keep these classes last -- they advance the shared session model
+# past the 6-step state the reference comparisons above rely on.
+class TestIterSteps:
+    """iter_steps() advances the model and yields reused buffers."""
+
+    VAR = "channel_water__volume_flow_rate"
+
+    def test_yields_each_step(self, model_after_6_steps):
+        """One (time, values) pair per step, matching get_value."""
+        model, _ = model_after_6_steps
+        dt = model.get_time_step()
+        start = model.get_current_time()
+
+        seen = []
+        for time, values in model.iter_steps(self.VAR, until=start + 2 * dt):
+            np.testing.assert_array_equal(
+                values[self.VAR], get_value_array(model, self.VAR)
+            )
+            seen.append((time, values[self.VAR]))
+
+        assert [t for t, _ in seen] == [start + dt, start + 2 * dt]
+        assert seen[0][1] is not seen[1][1], "ring of 2 should alternate"
+
+    def test_every_and_copy(self, model_after_6_steps):
+        """every=2 yields once per two steps; copy=True gives fresh arrays."""
+        model, _ = model_after_6_steps
+        dt = model.get_time_step()
+        start = model.get_current_time()
+
+        steps = list(model.iter_steps(
+            [self.VAR], until=start + 2 * dt, every=2, copy=True, ring_size=1
+        ))
+
+        assert len(steps) == 1
+        assert steps[0][0] == start + 2 * dt
+        assert steps[0][1][self.VAR].flags.owndata
+
+
+# ===========================================================================
+# Tests: Gauge Ring Buffer
+# ===========================================================================
+class TestGauges:
+    """register_gauges() / drain_gauges() collect flows at feature IDs."""
+
+    FLOW = "channel_water__volume_flow_rate"
+
+    @pytest.fixture
+    def gauges(self, model_after_6_steps):
+        model, _ = model_after_6_steps
+        ids = get_value_array(model, "channel_link__id")
+        picked = ids[[-1, 0, len(ids) // 2]]
+        yield model, picked
+        model.register_gauges([])
+
+    def test_drain_matches_get_value(self, gauges):
+        """Each drained record equals the flow at the gauges that step."""
+        model, ids = gauges
+        positions = model.get_link_positions(ids)
+        model.register_gauges(ids, capacity=8)
+
+        expected, expected_times = [], []
+        for _ in range(3):
+            model.update()
+            expected.append(get_value_array(model, self.FLOW)[positions])
+            expected_times.append(model.get_current_time())
+
+        times, values = model.drain_gauges()
+        assert values.shape == (3, len(ids))
+        np.testing.assert_array_equal(times, expected_times)
+        np.testing.assert_array_equal(values, expected)
+
+        times, values = model.drain_gauges()
+        assert len(times) == 0 and values.shape == (0, len(ids))
+
+    def test_ring_keeps_latest(self, gauges):
+        """Past capacity the oldest records are overwritten."""
+        model, ids = gauges
+        model.register_gauges(ids, capacity=2)
+        for _ in range(3):
+            model.update()
+        times, _ = model.drain_gauges()
+        dt = model.get_time_step()
+        now = model.get_current_time()
+        np.testing.assert_array_equal(times, [now - dt, now])
+
+
+# ===========================================================================
+# Tests: Model Registry
+# ===========================================================================
+class TestRegistry:
+    """One live model per process unless the limit is raised."""
+
+    def test_second_instance_rejected(self, bmi_model):
+        """A second WrfHydroBmi() fails instead of sharing the first's state."""
+        from pymt_wrfhydro import WrfHydroBmi
+        from pymt_wrfhydro.lib import get_max_models
+
+        assert get_max_models() == (1, 1)
+        with pytest.raises(RuntimeError, match="isolated=True"):
+            WrfHydroBmi()
+        assert bmi_model.get_current_time() >= 0.0
+
+    def test_limit(self, bmi_model):
+        """The limit cannot drop below the live models."""
+        from pymt_wrfhydro.lib import set_max_models
+
+        with pytest.raises(ValueError):
+            set_max_models(0)
+
+
+# ===========================================================================
+# Tests: Process Isolation
+# ===========================================================================
+class TestIsolated:
+    """WrfHydroBmi(isolated=True) runs its own Croton domain in a worker."""
+
+    FLOW = "channel_water__volume_flow_rate"
+
+    def test_twin_matches_reference(self, bmi_model):
+        """A second, isolated domain runs beside the session model."""
+        from pymt_wrfhydro import WrfHydroBmi
+
+        config = os.path.join(os.getcwd(), "bmi_config.nml")
+        twin = WrfHydroBmi(isolated=True)
+        try:
+            twin.initialize(config)
+            twin.update()
+            assert twin.get_current_time() == 3600.0
+            ref = FORTRAN_REF_STEP1[self.FLOW]
+            flow = get_value_array(twin, self.FLOW)
+            np.testing.assert_allclose(flow.max(), ref["max"], rtol=RTOL)
+            np.testing.assert_allclose(flow[:5], ref["first_5"],
+                                       rtol=RTOL, atol=ATOL)
+        finally:
+            twin.finalize()
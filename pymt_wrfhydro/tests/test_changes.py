@@ -0,0 +1,96 @@
+"""
+Tests for the change-set wire format in pymt_wrfhydro.changes.
+
+These are pure numpy round trips and do not touch the model.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.changes import apply_changes, decode_changes, encode_changes
+
+
+class TestRoundTrip:
+    """encode_changes() followed by decode_changes() is lossless."""
+
+    def test_roundtrip_double(self):
+        """Indices, values, grid size and time survive a round trip."""
+        indices = np.array([0, 3, 4, 400, 504])
+        values = np.array([1.5, -2.0, np.nan, 1e-30, 7.0])
+
+        got_ind, got_val, grid_size, time = decode_changes(
+            encode_changes(indices, values, 505, time=3600.0)
+        )
+
+        np.testing.assert_array_equal(got_ind, indices)
+        np.testing.assert_array_equal(got_val, values)
+        assert got_val.dtype == np.float64
+        assert grid_size == 505
+        assert time == 3600.0
+
+    def test_roundtrip_empty(self):
+        """A step with no changes encodes to a header-only message."""
+        payload = encode_changes([], np.array([], dtype=float), 505)
+        indices, values, grid_size, _ = decode_changes(payload)
+        assert len(indices) == 0 and len(values) == 0
+        assert grid_size == 505
+
+    def test_roundtrip_int(self):
+        """Integer values keep their dtype."""
+        values = np.array([10, 20], dtype=np.int32)
+        _, got, _, _ = decode_changes(encode_changes([1, 2], values, 3))
+        assert got.dtype == np.int32
+        np.testing.assert_array_equal(got, values)
+
+    @pytest.mark.parametrize(
+        "gap,nbytes", [(1, 1), (255, 1), (256, 2), (70000, 4)]
+    )
+    def test_index_width(self, gap, nbytes):
+        """Index gaps are stored in the narrowest unsigned width that fits."""
+        indices = np.arange(0, 10 * gap, gap)
+        payload = encode_changes(indices, np.zeros(10), 10 * gap)
+        header = len(encode_changes([], np.zeros(0), 1))
+        assert len(payload) == header + 10 * nbytes + 10 * 8
+        np.testing.assert_array_equal(decode_changes(payload)[0], indices)
+
+
+class TestValidation:
+    """Malformed inputs are rejected."""
+
+    def test_unsorted_indices(self):
+        with pytest.raises(ValueError):
+            encode_changes([3, 1], np.zeros(2), 5)
+
+    def test_index_out_of_range(self):
+        with pytest.raises(ValueError):
+            encode_changes([5], np.zeros(1), 5)
+
+    def test_bad_magic(self):
+        payload = bytearray(encode_changes([1], np.zeros(1), 5))
+        payload[0:4] = b"XXXX"
+        with pytest.raises(ValueError):
+            decode_changes(bytes(payload))
+
+
+class TestApply:
+    """apply_changes() keeps a consumer mirror in sync."""
+
+    def test_mirror_tracks_source(self):
+        """Applying successive change sets reproduces the source array."""
+        rng = np.random.default_rng(0)
+        source = rng.random(100)
+        mirror = np.zeros(100)
+        apply_changes(mirror, encode_changes(np.arange(100), source, 100))
+
+        for step in range(5):
+            idx = np.sort(rng.choice(100, size=7, replace=False))
+            source[idx] = rng.random(7)
+            time = apply_changes(
+                mirror, encode_changes(idx, source[idx], 100, time=step)
+            )
+            assert time == step
+
+        np.testing.assert_array_equal(mirror, source)
+
+    def test_size_mismatch(self):
+        with pytest.raises(ValueError):
+            apply_changes(np.zeros(4), encode_changes([1], np.zeros(1), 5))
@@ -0,0 +1,148 @@
+"""
+Tests for the two-process coupler in pymt_wrfhydro.coupler.
+
+Both sides are small pure-Python BMI stand-ins defined here, so the
+worker processes can import them.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.coupler import Coupler, ModelSpec
+
+
+class Toy:
+    """Just the BMI the coupler uses.
+
+    'level' is ``time + [0, 1, 2]`` and 'clock' is ``[time]``; any input
+    set is echoed back by the output '<input>_seen'.
+    """
+
+    time_step = 1.0
+    end_time = 60.0
+    units = "s"
+    sizes = {"level": 3, "forcing": 3, "clock": 1, "feedback": 1}
+
+    def initialize(self, config_file):
+        self.time = 0.0
+        self.inputs = {name: np.zeros(size) for name, size in self.sizes.items()}
+        self.broken = config_file == "fail"
+
+    def finalize(self):
+        pass
+
+    def update_until(self, time):
+        if self.broken:
+            raise FloatingPointError("model blew up")
+        while self.time < time - 1e-9:
+            self.time += self.time_step
+
+    def get_start_time(self):
+        return 0.0
+
+    def get_end_time(self):
+        return self.end_time
+
+    def get_current_time(self):
+        return self.time
+
+    def get_time_step(self):
+        return self.time_step
+
+    def get_time_units(self):
+        return self.units
+
+    def get_var_grid(self, name):
+        return self.sizes[name.replace("_seen", "")]
+
+    def get_grid_size(self, grid):
+        return grid
+
+    def get_var_type(self, name):
+        return "float64"
+
+    def get_value(self, name, buffer):
+        if name == "level":
+            buffer[:] = self.time + np.arange(3)
+        elif name == "clock":
+            buffer[:] = self.time
+        else:
+            buffer[:] = self.inputs[name.replace("_seen", "")]
+        return buffer
+
+    def set_value(self, name, values):
+        self.inputs[name][:] = values
+
+
+class Hydro(Toy):
+    time_step = 10.0
+
+
+class Ocean(Toy):
+    time_step = 2.5
+
+
+class Minutes(Ocean):
+    units = "min"
+
+
+def double(values):
+    return 2.0 * values
+
+
+def coupler(pipeline=True, partner=Ocean, partner_config=""):
+    return Coupler(
+        ModelSpec(Hydro, ""),
+        ModelSpec(partner, partner_config),
+        to_partner=[("level", "forcing"), ("feedback_seen", "feedback")],
+        to_hydro=[("clock", "feedback"), ("forcing_seen", "forcing", double)],
+        pipeline=pipeline,
+    )
+
+
+@pytest.mark.parametrize("pipeline", [True, False])
+def test_exchange_times(pipeline):
+    with coupler(pipeline) as run:
+        assert run.interval == 10.0
+        times = list(run.iter_exchanges())
+        assert times == [10.0, 20.0, 30.0, 40.0, 50.0, 60.0]
+
+
+@pytest.mark.parametrize("pipeline, lag", [(True, 2), (False, 1)])
+def test_exchanged_values(pipeline, lag):
+    """One-way forcing is current either way; feedback lags when pipelined."""
+    with coupler(pipeline) as run:
+        for n, time in enumerate(run.iter_exchanges(), start=1):
+            np.testing.assert_array_equal(
+                run.get_value("forcing_seen", "partner"), time + np.arange(3)
+            )
+            assert run.get_value("clock", "partner")[0] == time
+            # WRF-Hydro's interval n saw the partner's clock at n - lag
+            seen = run.get_value("feedback_seen")[0]
+            assert seen == max(n - lag, 0) * 10.0
+
+
+def test_resume():
+    with coupler() as run:
+        assert run.run(until=25.0) == 20.0
+        assert list(run.iter_exchanges(until=40.0)) == [30.0, 40.0]
+        np.testing.assert_array_equal(
+            run.get_value("level"), 40.0 + np.arange(3)
+        )
+        assert run.get_value("feedback_seen")[0] == 20.0
+
+
+def test_model_errors_raise():
+    with pytest.raises(RuntimeError, match="partner model failed"):
+        with coupler(partner_config="fail") as run:
+            run.run()
+
+
+def test_time_units_must_match():
+    with pytest.raises(ValueError, match="time units"):
+        coupler(partner=Minutes).start()
+
+
+def test_unknown_field():
+    with coupler() as run:
+        with pytest.raises(ValueError):
+            run.get_value("clock", "hydro")
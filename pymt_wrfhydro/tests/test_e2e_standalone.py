@@ -6,7 +6,7 @@ Self-contained script that exercises the full BMI IRF cycle from Python:
   1. Creates BMI config file with absolute path to Croton NY data
   2. Instantiates WrfHydroBmi
   3. Calls initialize() / update() x6 / finalize()
-  4. Prints all 8 output variable summaries (min, max, mean, shape)
+  4. Prints all output variable summaries (min, max, mean)
   5. Prints SUCCESS/FAIL at the end
 
 Run with:
@@ -113,9 +113,9 @@ def main():
     print(f"  OK: All 6 steps completed, final time = {final_time:.0f} s")
 
     # -----------------------------------------------------------------------
-    # Step 4: Read all 8 output variables
+    # Step 4: Read all output variables
     # -----------------------------------------------------------------------
-    print("\n[Step 4] Reading all 8 output variables...")
+    print("\n[Step 4] Reading all output variables...")
     output_vars = model.get_output_var_names()
     print(f"  Variables: {len(output_vars)}")
 
@@ -127,16 +127,15 @@ def main():
             var_type = model.get_var_type(var_name)
             var_units = model.get_var_units(var_name)
 
-            buffer = np.zeros(grid_size, dtype=var_type)
-            model.get_value(var_name, buffer)
+            # Reduced inside the library over the valid (computed) cells
+            stats = model.get_value_stats(var_name, ["min", "max", "mean"])
 
             print(f"\n  {var_name}:")
             print(f"    Grid: {grid_id}, Size: {grid_size}, Type: {var_type}")
             print(f"    Units: {var_units}")
-            print(f"    Min:  {buffer.min():.10e}")
-            print(f"    Max:  {buffer.max():.10e}")
-            print(f"    Mean: {buffer.mean():.10e}")
-            print(f"    Shape: {buffer.shape}")
+            print(f"    Min:  {stats['min']:.10e}")
+            print(f"    Max:  {stats['max']:.10e}")
+            print(f"    Mean: {stats['mean']:.10e}")
 
             if grid_size == 0:
                 print("    WARNING: Empty array!")
@@ -0,0 +1,98 @@
+"""
+Tests for the MPI ensemble in pymt_wrfhydro.ensemble.
+
+These run on a single rank with a stand-in model; the group split and
+the gather are the same calls a full ``mpirun`` job makes.
+"""
+import numpy as np
+import pytest
+
+MPI = pytest.importorskip("mpi4py.MPI")
+
+from pymt_wrfhydro.ensemble import Ensemble  # noqa: E402
+
+
+class Member:
+    """Model stand-in: 'q' is ``time + [0, 1, 2, 3]``."""
+
+    def __init__(self):
+        self.time = 0.0
+        self.comm = None
+        self.config_file = None
+        self.finalized = False
+
+    def set_comm(self, comm):
+        self.comm = comm
+
+    def initialize(self, config_file):
+        self.config_file = config_file
+
+    def update(self):
+        self.time += 3600.0
+
+    def update_until(self, time):
+        self.time = time
+
+    def get_current_time(self):
+        return self.time
+
+    def get_end_time(self):
+        return 7200.0
+
+    def get_value_global(self, name, root=None):
+        return self.time + np.arange(4.0)
+
+    def finalize(self):
+        self.finalized = True
+
+
+@pytest.fixture
+def ensemble():
+    ensemble = Ensemble("run_{member:02d}/bmi_config.nml", comm=MPI.COMM_SELF,
+                        factory=Member)
+    ensemble.initialize()
+    yield ensemble
+    if not ensemble.model.finalized:
+        ensemble.finalize()
+
+
+def test_member_layout(ensemble):
+    assert (ensemble.member, ensemble.n_members) == (0, 1)
+    assert ensemble.is_root
+    assert ensemble.member_comm.size == 1
+    assert ensemble.model.comm is ensemble.member_comm
+
+
+def test_config_file_per_member(ensemble):
+    assert ensemble.model.config_file == "run_00/bmi_config.nml"
+
+
+def test_plain_member_matches_fortran():
+    """A bare {member} is padded to three digits, like wrfhydro_run_dir."""
+    ensemble = Ensemble("run_{member}/bmi_config.nml", comm=MPI.COMM_SELF,
+                        factory=Member)
+    assert ensemble.config_file == "run_000/bmi_config.nml"
+    ensemble.finalize()
+
+
+def test_gather(ensemble):
+    ensemble.update()
+    flow = ensemble.gather("q")
+    np.testing.assert_array_equal(flow, [3600.0 + np.arange(4.0)])
+
+
+def test_time_follows_member(ensemble):
+    ensemble.update_until(1800.0)
+    assert ensemble.get_current_time() == 1800.0
+    assert ensemble.get_end_time() == 7200.0
+
+
+def test_finalize(ensemble):
+    ensemble.finalize()
+    assert ensemble.model.finalized
+
+
+def test_ranks_per_member_must_be_positive():
+    with pytest.raises(ValueError):
+        Ensemble("bmi_config.nml", ranks_per_member=0, comm=MPI.COMM_SELF,
+                 factory=Member)
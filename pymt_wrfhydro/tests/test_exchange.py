@@ -0,0 +1,102 @@
+"""
+Tests for the snapshot ring in pymt_wrfhydro.exchange.
+
+These use a minimal stand-in model and do not touch WRF-Hydro.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.exchange import ExchangeBuffer
+
+
+class Recorder:
+    """Model stand-in with one output 'q' = time * [1, 2, 3] and input 'f'."""
+
+    def __init__(self):
+        self.time = 0.0
+        self.set = {}
+
+    def get_current_time(self):
+        return self.time
+
+    def get_var_grid(self, name):
+        return 0
+
+    def get_grid_size(self, grid):
+        return 3
+
+    def get_var_type(self, name):
+        return "float32" if name == "f" else "float64"
+
+    def get_value(self, name, buffer):
+        buffer[:] = self.time * np.arange(1, 4)
+        return buffer
+
+    def set_value(self, name, values):
+        self.set[name] = values.copy()
+
+
+@pytest.fixture
+def buffer():
+    buffer = ExchangeBuffer({"q": (3, "float64")}, depth=3)
+    for time in (0.0, 10.0, 20.0, 30.0):
+        buffer.push(time, {"q": time * np.arange(1, 4)})
+    return buffer
+
+
+def test_ring_keeps_last_snapshots(buffer):
+    assert len(buffer) == 3
+    np.testing.assert_array_equal(buffer.times, [10.0, 20.0, 30.0])
+    with pytest.raises(ValueError):
+        buffer.interpolate("q", 5.0)
+    with pytest.raises(ValueError):
+        buffer.push(30.0, {"q": np.zeros(3)})
+
+
+@pytest.mark.parametrize("time", [10.0, 12.5, 20.0, 27.0, 30.0])
+def test_linear(buffer, time):
+    np.testing.assert_allclose(buffer.interpolate("q", time), time * np.arange(1, 4))
+
+
+@pytest.mark.parametrize(
+    "method, time, expected",
+    [("previous", 25.0, 20.0), ("previous", 20.0, 20.0),
+     ("next", 25.0, 30.0), ("next", 20.0, 20.0)],
+)
+def test_step(buffer, method, time, expected):
+    result = buffer.interpolate("q", time, method=method)
+    np.testing.assert_array_equal(result, expected * np.arange(1, 4))
+
+
+def test_out_is_filled_in_place(buffer):
+    out = np.empty(3)
+    assert buffer.interpolate("q", 15.0, out=out) is out
+    np.testing.assert_allclose(out, [15.0, 30.0, 45.0])
+
+
+def test_interpolate_many_matches_single(buffer):
+    times = np.array([10.0, 11.0, 20.0, 29.5])
+    many = buffer.interpolate_many("q", times)
+    assert many.shape == (4, 3)
+    for time, row in zip(times, many):
+        np.testing.assert_allclose(row, buffer.interpolate("q", time))
+
+
+def test_record_and_apply():
+    model = Recorder()
+    buffer = ExchangeBuffer.from_model(model, ["q"])
+    buffer.record(model)
+    model.time = 3600.0
+    buffer.record(model)
+    buffer.apply(model, 900.0, names={"q": "f"})
+    assert model.set["f"].dtype == np.float32
+    np.testing.assert_allclose(model.set["f"], [900.0, 1800.0, 2700.0])
+
+
+def test_bad_arguments():
+    with pytest.raises(ValueError):
+        ExchangeBuffer({"q": (3, "float64")}, depth=1)
+    with pytest.raises(ValueError):
+        ExchangeBuffer({"q": (3, "float64")}, method="cubic")
+    with pytest.raises(ValueError):
+        ExchangeBuffer({"q": (3, "float64")}).interpolate("q", 0.0)
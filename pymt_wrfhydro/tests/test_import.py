@@ -0,0 +1,105 @@
+"""
+Import-time guards for pymt_wrfhydro.
+
+Importing the package must not start MPI or load the WRF-Hydro library;
+both happen on the first WrfHydroBmi(). Each check runs in a fresh
+interpreter so that nothing imported by the test session leaks in.
+"""
+import importlib.machinery
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Generous: the package itself imports in about a millisecond
+MAX_IMPORT_SECONDS = 0.1
+
+HEAVY = ["mpi4py", "numpy", "pymt_wrfhydro.lib", "importlib.metadata"]
+
+
+def extension_built():
+    """Whether the compiled extension is on disk.
+
+    Checked by file name: importing pymt_wrfhydro.lib, even through
+    ``importlib.util.find_spec``, would start MPI in the test process.
+    """
+    package = importlib.util.find_spec("pymt_wrfhydro")
+    lib = os.path.join(package.submodule_search_locations[0], "lib")
+    return any(
+        os.path.exists(os.path.join(lib, "wrfhydrobmi" + suffix))
+        for suffix in importlib.machinery.EXTENSION_SUFFIXES
+    )
+
+
+needs_extension = pytest.mark.skipif(
+    not extension_built(), reason="the compiled extension is not built"
+)
+
+
+def run_python(code, **env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, check=True,
+        env=dict(os.environ, **env),
+    )
+    return result.stdout, result.stderr
+
+
+def import_seconds(importtime_log, module):
+    """Cumulative import time of *module* from ``-X importtime`` output."""
+    for line in importtime_log.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) * 1e-6
+    raise AssertionError(f"{module} not in the import log")
+
+
+def loaded(code, **env):
+    stdout, _ = run_python(
+        code + f"\nimport json, sys\n"
+        f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))",
+        **env,
+    )
+    return json.loads(stdout.splitlines()[-1])
+
+
+def test_import_is_light():
+    assert loaded("import pymt_wrfhydro") == []
+    assert loaded("from pymt_wrfhydro import WrfHydroBmi\n"
+                  "WrfHydroBmi.METADATA") == []
+
+
+def test_import_time():
+    best = min(
+        import_seconds(run_python("import pymt_wrfhydro")[1], "pymt_wrfhydro")
+        for _ in range(3)
+    )
+    assert best < MAX_IMPORT_SECONDS
+
+
+@needs_extension
+def test_serial_mode_skips_mpi4py():
+    code = ("import pymt_wrfhydro\n"
+            "from pymt_wrfhydro import WrfHydroBmi\n"
+            "model = WrfHydroBmi()\n"
+            "assert isinstance(model, WrfHydroBmi)\n"
+            "assert pymt_wrfhydro.bootstrap() == 'serial'")
+    assert "mpi4py" not in loaded(code, PYMT_WRFHYDRO_MPI="serial")
+
+
+@needs_extension
+def test_mpi4py_mode():
+    pytest.importorskip("mpi4py")
+    code = ("import pymt_wrfhydro\n"
+            "assert pymt_wrfhydro.bootstrap() == 'mpi4py'")
+    assert "mpi4py" in loaded(code, PYMT_WRFHYDRO_MPI="mpi4py")
+
+
+def test_bad_mode():
+    with pytest.raises(subprocess.CalledProcessError) as info:
+        run_python("import pymt_wrfhydro\npymt_wrfhydro.WrfHydroBmi()",
+                   PYMT_WRFHYDRO_MPI="threads")
+    assert "PYMT_WRFHYDRO_MPI" in info.value.stderr
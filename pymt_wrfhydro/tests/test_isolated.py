@@ -0,0 +1,116 @@
+"""
+Tests for process-isolated models in pymt_wrfhydro.isolated.
+
+The workers host the pure-NumPy stand-in model, so every answer can be
+checked against an in-process instance of the same model.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.isolated import IsolatedWrfHydroBmi, RemoteTraceback
+from pymt_wrfhydro.mock import MockWrfHydroBmi
+
+MOCK = "pymt_wrfhydro.mock:MockWrfHydroBmi"
+FLOW = "channel_water__volume_flow_rate"
+PRECIP = "atmosphere_water__precipitation_leq-volume_flux"
+SOIL = "soil_water__volume_fraction"
+
+
+@pytest.fixture
+def models():
+    local = MockWrfHydroBmi()
+    local.initialize()
+    isolated = IsolatedWrfHydroBmi(MOCK)
+    isolated.initialize(None)
+    yield local, isolated
+    isolated.close()
+
+
+def test_runs_in_another_process(models):
+    _, isolated = models
+    assert isolated.pid != os.getpid()
+    assert isolated.get_component_name() == MockWrfHydroBmi().get_component_name()
+
+
+def test_same_answers(models):
+    local, isolated = models
+    shape = np.empty(2, dtype=np.intc)
+    assert isolated.get_output_var_names() == local.get_output_var_names()
+    assert isolated.get_grid_shape(1, shape) is shape
+    np.testing.assert_array_equal(shape, local.get_grid_shape(1, shape.copy()))
+
+    rain = np.full(local.get_grid_size(0), 2e-3)
+    for model in models:
+        model.set_value(PRECIP, rain)
+        model.update_until(6 * 3600.0)
+
+    flow = np.empty(local.get_grid_size(2))
+    assert isolated.get_value(FLOW, flow) is flow
+    np.testing.assert_array_equal(flow, local.get_value_cached(FLOW))
+    np.testing.assert_array_equal(isolated.get_value_2d(SOIL),
+                                  local.get_value_2d(SOIL))
+    assert isolated.get_value_stats(SOIL) == local.get_value_stats(SOIL)
+
+
+def test_cached_values_are_shared_views(models):
+    _, isolated = models
+    values = isolated.get_value_cached(SOIL)
+    before = values.copy()
+    assert not values.flags.writeable
+    isolated.update_until(6 * 3600.0)
+    assert isolated.get_value_cached(SOIL) is not values
+    # Refilled in place by the next read
+    assert not np.array_equal(values, before)
+
+
+def test_cached_values_last_the_step(models):
+    _, isolated = models
+    values = isolated.get_value_cached(SOIL)
+    isolated.get_value(SOIL, np.empty(values.size))
+    assert isolated.get_value_cached(SOIL) is values
+    # One slot per field: isolated reads never double-buffer
+    assert isolated._fields[SOIL].slots.shape == (1, values.size)
+    isolated.set_value(PRECIP, np.full(isolated.get_grid_size(0), 2e-3))
+    assert isolated.get_value_cached(SOIL) is not values
+
+
+def test_errors_keep_their_type(models):
+    _, isolated = models
+    with pytest.raises(RuntimeError) as info:
+        isolated.get_var_grid("not_a_variable")
+    assert isinstance(info.value.__cause__, RemoteTraceback)
+    with pytest.raises(KeyError):
+        isolated.register_gauges([-1])
+    assert isolated.get_current_time() == 0.0   # still serving
+
+
+def test_concurrent_updates():
+    models = [IsolatedWrfHydroBmi(MOCK) for _ in range(3)]
+    try:
+        for model in models:
+            model.initialize(None)
+        for model in models:
+            model.update_until(5 * 3600.0, wait=False)
+        for model in models:
+            model.wait()
+        assert [model.get_current_time() for model in models] == [5 * 3600.0] * 3
+    finally:
+        for model in models:
+            model.close()
+
+
+def test_finalize_stops_the_worker():
+    model = IsolatedWrfHydroBmi(MOCK)
+    model.initialize(None)
+    model.get_value_cached(FLOW)
+    model.finalize()
+    assert not model._process.is_alive()
+    with pytest.raises(RuntimeError):
+        model.get_current_time()
+
+
+def test_bad_factory():
+    with pytest.raises(AttributeError):
+        IsolatedWrfHydroBmi("pymt_wrfhydro.mock:NoSuchModel")
@@ -0,0 +1,162 @@
+"""
+Tests for the pure-NumPy stand-in model in pymt_wrfhydro.mock.
+
+The expected names, units and grids are those of the Fortran library (see
+tests/test_bmi_wrfhydro.py), so code developed against the mock sees the
+same contract as the real model.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.mock import MockWrfHydroBmi
+from pymt_wrfhydro.network import ChannelNetwork
+
+FLOW = "channel_water__volume_flow_rate"
+PRECIP = "atmosphere_water__precipitation_leq-volume_flux"
+SOIL = "soil_water__volume_fraction"
+
+EXPECTED = {
+    FLOW: (2, "m3 s-1", "float64"),
+    "land_surface_water__depth": (1, "m", "float64"),
+    SOIL: (0, "1", "float64"),
+    "snowpack__liquid-equivalent_depth": (0, "mm", "float64"),
+    "land_surface_air__temperature": (0, "K", "float64"),
+    PRECIP: (0, "mm s-1", "float64"),
+    "sea_water_surface__elevation": (0, "m", "float64"),
+    "channel_link__id": (2, "1", "int32"),
+}
+
+
+@pytest.fixture
+def model():
+    model = MockWrfHydroBmi()
+    model.initialize()
+    yield model
+    model.finalize()
+
+
+def test_variables(model):
+    assert model.get_input_item_count() == 4
+    assert model.get_output_item_count() == 9
+    for name, (grid, units, kind) in EXPECTED.items():
+        assert model.get_var_grid(name) == grid
+        assert model.get_var_units(name) == units
+        assert model.get_var_type(name) == kind
+        assert model.get_var_location(name) == "node"
+        assert model.get_var_nbytes(name) == (
+            model.get_var_itemsize(name) * model.get_grid_size(grid)
+        )
+    with pytest.raises(RuntimeError):
+        model.get_var_grid("not_a_variable")
+
+
+def test_croton_sized_grids(model):
+    shape = np.empty(2, dtype=np.intc)
+    assert model.get_grid_type(0) == "uniform_rectilinear"
+    assert model.get_grid_type(2) == "vector"
+    np.testing.assert_array_equal(model.get_grid_shape(0, shape), [16, 15])
+    np.testing.assert_array_equal(model.get_grid_shape(1, shape), [64, 60])
+    assert model.get_grid_rank(2) == 1
+    with pytest.raises(RuntimeError):
+        model.get_grid_shape(2, shape)
+
+
+def test_time(model):
+    assert (model.get_start_time(), model.get_time_step()) == (0.0, 3600.0)
+    assert model.get_end_time() == 24 * 3600.0
+    assert model.get_time_units() == "s"
+    model.update()
+    model.update_until(4 * 3600.0 + 10.0)
+    assert model.get_current_time() == 4 * 3600.0
+    with pytest.raises(RuntimeError):
+        model.update_until(0.0)
+
+
+def test_channel_network(model):
+    network = ChannelNetwork.from_model(model)
+    assert len(network.outlets) == 1
+    links = model.get_value_ptr("channel_link__id")
+    np.testing.assert_array_equal(model.get_link_positions(links[::-1]),
+                                  np.arange(len(links))[::-1])
+    assert model.get_link_positions([-5])[0] == -1
+    assert len(model.get_spatial_index(2)) == len(links)
+
+
+def test_flow_grows_downstream_after_rain(model):
+    model.update_until(12 * 3600.0)
+    flow = model.get_value_cached(FLOW)
+    outlet = ChannelNetwork.from_model(model).outlets[0]
+    assert flow[outlet] == flow.max() > 0.0
+    assert not flow.flags.writeable
+    assert model.get_value_stats("land_surface_water__depth")["max"] > 0.0
+
+
+def test_set_input_overrides_forcing(model):
+    rain = np.full(model.get_grid_size(0), 5e-3)
+    before = model.get_value_ptr(SOIL).copy()
+    model.set_value(PRECIP, rain)
+    model.update()
+    assert np.all(model.get_value_ptr(SOIL) > before)
+    # The next step is back on the synthetic forcing (dry at night)
+    model.update()
+    np.testing.assert_array_equal(model.get_value_ptr(PRECIP), 0.0)
+
+
+def test_stats_and_zonal(model):
+    model.update_until(6 * 3600.0)
+    values = model.get_value_cached(SOIL)
+    stats = model.get_value_stats(SOIL, ("mean", "p90", "count"))
+    assert stats["mean"] == pytest.approx(values.mean())
+    assert stats["p90"] == pytest.approx(np.percentile(values, 90))
+    assert stats["count"] == values.size
+
+    zonal = model.get_value_zonal(SOIL, [0, 2, 2, 5], [0, 1, 2, 3, 4],
+                                  ("mean", "count", "max"))
+    np.testing.assert_allclose(zonal["mean"][[0, 2]],
+                               [values[:2].mean(), values[2:5].mean()])
+    np.testing.assert_array_equal(zonal["count"], [2, 0, 3])
+    assert np.isnan(zonal["max"][1])
+
+
+def test_gauges(model):
+    links = model.get_value_ptr("channel_link__id")[:2]
+    model.register_gauges(links)
+    model.update_until(3 * 3600.0)
+    times, values = model.drain_gauges()
+    np.testing.assert_array_equal(times, [3600.0, 7200.0, 10800.0])
+    np.testing.assert_array_equal(values[-1], model.get_value_ptr(FLOW)[:2])
+    assert model.drain_gauges()[1].shape == (0, 2)
+    with pytest.raises(KeyError):
+        model.register_gauges([-1])
+
+
+def test_iter_steps(model):
+    times = [time for time, _ in model.iter_steps(FLOW, until=4 * 3600.0,
+                                                  every=2)]
+    assert times == [7200.0, 14400.0]
+
+
+def test_one_rank_decomposition(model):
+    assert model.get_decomposition() == (0, 1)
+    np.testing.assert_array_equal(model.get_grid_tile(1), [0, 0, 64, 60])
+    np.testing.assert_array_equal(model.get_value_global(SOIL, root=0),
+                                  model.get_value_ptr(SOIL))
+    np.testing.assert_array_equal(
+        model.get_value_at_global_indices(SOIL, [0, -1]),
+        [model.get_value_ptr(SOIL)[0], -1.0],
+    )
+
+
+def test_config_file(tmp_path):
+    config = tmp_path / "mock.nml"
+    config.write_text("&mock_wrfhydro_config\n"
+                      "  lsm_rows = 8, lsm_cols = 6\n"
+                      "  n_steps = 3\n/\n")
+    model = MockWrfHydroBmi()
+    model.initialize(str(config))
+    assert model.get_grid_size(0) == 48
+    assert model.get_end_time() == 3 * 3600.0
+
+    config.write_text("&mock_wrfhydro_config\n  lsm_size = 8\n/\n")
+    with pytest.raises(ValueError):
+        model.initialize(str(config))
@@ -0,0 +1,106 @@
+"""
+Tests for the channel network kernels in pymt_wrfhydro.network.
+
+These run on small hand-built networks and do not touch the model; the
+connectivity the model exports is tested in test_bmi_wrfhydro.py.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.network import ChannelNetwork
+
+
+# Two basins, given out of order on purpose:
+#
+#   3 -> 0 -> 2 -> 5 (outlet)      4 (isolated outlet)
+#   1 ------> 2
+#   6 -> 7 (outlet)
+EDGES = [3, 0, 0, 2, 1, 2, 2, 5, 6, 7]
+N = 8
+
+
+@pytest.fixture
+def net():
+    return ChannelNetwork(N, EDGES)
+
+
+class TestTopology:
+    """Adjacency, levels and outlets."""
+
+    def test_downstream(self, net):
+        np.testing.assert_array_equal(net.downstream, [2, 2, 5, 0, -1, -1, 7, -1])
+
+    def test_upstream_csr(self, net):
+        up = net.up_indices[net.up_indptr[2]:net.up_indptr[3]]
+        assert sorted(up) == [0, 1]
+        assert net.up_indptr[4] == net.up_indptr[3]  # 3 is a headwater
+
+    def test_topological_order(self, net):
+        """Every link comes after all links draining into it."""
+        rank = np.empty(N, dtype=int)
+        rank[net.order] = np.arange(N)
+        for link, down in enumerate(net.downstream):
+            if down >= 0:
+                assert rank[link] < rank[down]
+
+    def test_levels(self, net):
+        assert net.n_levels == 4  # 3 -> 0 -> 2 -> 5
+        assert net.level_ptr[-1] == N
+
+    def test_outlets(self, net):
+        np.testing.assert_array_equal(net.outlets, [4, 5, 7])
+        np.testing.assert_array_equal(net.outlet, [5, 5, 5, 5, 4, 5, 7, 7])
+
+    def test_cycle_rejected(self):
+        with pytest.raises(ValueError):
+            ChannelNetwork(3, [0, 1, 1, 2, 2, 0])
+
+    def test_two_downstream_rejected(self):
+        with pytest.raises(ValueError):
+            ChannelNetwork(3, [0, 1, 0, 2])
+
+
+class TestKernels:
+    """Accumulation, tracing and per-outlet aggregation."""
+
+    def test_accumulate_counts_basin(self, net):
+        np.testing.assert_array_equal(
+            net.accumulate(np.ones(N)), [2, 1, 4, 1, 1, 5, 1, 2]
+        )
+
+    def test_accumulate_columns(self, net):
+        values = np.stack([np.ones(N), np.arange(N)], axis=1)
+        total = net.accumulate(values)
+        assert total.shape == (N, 2)
+        assert total[5, 1] == 0 + 1 + 2 + 3 + 5
+
+    def test_trace(self, net):
+        np.testing.assert_array_equal(net.trace(3), [3, 0, 2, 5])
+        np.testing.assert_array_equal(net.trace(4), [4])
+
+    def test_downstream_of(self, net):
+        assert np.flatnonzero(net.downstream_of([0, 6])).tolist() == [0, 2, 5, 6, 7]
+        assert np.flatnonzero(net.downstream_of(0, include_self=False)).tolist() == [2, 5]
+
+    def test_upstream_of(self, net):
+        assert np.flatnonzero(net.upstream_of(2)).tolist() == [0, 1, 2, 3]
+        assert np.flatnonzero(net.upstream_of(2, include_self=False)).tolist() == [0, 1, 3]
+
+    @pytest.mark.parametrize(
+        "stat, expected",
+        [
+            ("sum", [4, 0 + 1 + 2 + 3 + 5, 6 + 7]),
+            ("count", [1, 5, 2]),
+            ("mean", [4, 11 / 5, 6.5]),
+            ("min", [4, 0, 6]),
+            ("max", [4, 5, 7]),
+        ],
+    )
+    def test_aggregate_by_outlet(self, net, stat, expected):
+        outlets, result = net.aggregate_by_outlet(np.arange(N, dtype=float), stat)
+        np.testing.assert_array_equal(outlets, [4, 5, 7])
+        np.testing.assert_allclose(result, expected)
+
+    def test_aggregate_unknown_stat(self, net):
+        with pytest.raises(ValueError):
+            net.aggregate_by_outlet(np.zeros(N), "median")
@@ -0,0 +1,96 @@
+"""
+Tests for shared-memory publishing in pymt_wrfhydro.publish.
+
+The publisher wraps the pure-NumPy stand-in model; subscribers attach from
+this process and from spawned ones.
+"""
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.mock import MockWrfHydroBmi
+from pymt_wrfhydro.publish import Publisher, Subscriber
+
+FLOW = "channel_water__volume_flow_rate"
+LINKS = "channel_link__id"
+SOIL = "soil_water__volume_fraction"
+
+
+@pytest.fixture
+def publisher():
+    model = MockWrfHydroBmi()
+    model.initialize()
+    publisher = Publisher(model, [FLOW, LINKS, SOIL])
+    yield publisher
+    publisher.close()
+
+
+def read_remote(name, after, queue):
+    with Subscriber(name) as feed:
+        snapshot = feed.wait_for(after, timeout=60.0)
+        queue.put((snapshot.sequence, snapshot.time,
+                   snapshot.values[FLOW].sum()))
+
+
+def test_snapshots_follow_updates(publisher):
+    feed = Subscriber(publisher.name)
+    assert feed.var_names == [FLOW, LINKS, SOIL]
+    first = feed.read()
+    assert (first.sequence, first.time) == (1, 0.0)
+
+    publisher.update()
+    publisher.update_until(5 * 3600.0)
+    snapshot = feed.read()
+    assert (snapshot.sequence, snapshot.time) == (3, 5 * 3600.0)
+    for var_name in feed.var_names:
+        np.testing.assert_array_equal(snapshot.values[var_name],
+                                      publisher.get_value_cached(var_name))
+    assert snapshot.values[LINKS].dtype == np.int32
+    feed.close()
+
+
+def test_copies_and_reused_buffers(publisher):
+    feed = Subscriber(publisher.name)
+    kept = feed.read()
+    reused = feed.read(copy=False)
+    publisher.update_until(8 * 3600.0)
+    assert feed.read(copy=False).values[SOIL] is reused.values[SOIL]
+    assert not np.array_equal(kept.values[SOIL], reused.values[SOIL])
+
+
+def test_torn_snapshot_is_never_served(publisher):
+    feed = Subscriber(publisher.name)
+    publisher._segment.seq[()] += 1     # a write in progress
+    with pytest.raises(TimeoutError):
+        feed.read(timeout=0.01)
+    publisher._segment.seq[()] += 1
+    assert feed.read().sequence == 2
+
+
+def test_other_processes(publisher):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    readers = [context.Process(target=read_remote,
+                               args=(publisher.name, 1, queue))
+               for _ in range(2)]
+    for reader in readers:
+        reader.start()
+    publisher.update_until(10 * 3600.0)
+    results = [queue.get(timeout=60.0) for _ in readers]
+    for reader in readers:
+        reader.join()
+    flow = publisher.get_value_cached(FLOW).sum()
+    assert results == [(2, 10 * 3600.0, flow)] * 2
+    # Readers exiting leave the segment in place
+    Subscriber(publisher.name).close()
+
+
+def test_close(publisher):
+    feed = Subscriber(publisher.name)
+    publisher.finalize()
+    assert feed.closed
+    assert feed.wait_for(1, timeout=1.0) is None
+    assert feed.read().sequence == 1
+    with pytest.raises(FileNotFoundError):
+        Subscriber(feed.name)
@@ -0,0 +1,91 @@
+"""
+Tests for the LSM <-> routing operators in pymt_wrfhydro.regrid.
+
+These build operators from grid shapes alone and do not touch the model.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro import regrid
+from pymt_wrfhydro.regrid import Regridder
+
+
+class FakeGrids:
+    """Just the grid queries Regridder.from_model makes."""
+
+    shapes = {0: (3, 4), 1: (12, 16)}
+    spacing = {0: 1000.0, 1: 250.0}
+
+    def get_grid_shape(self, grid, shape):
+        shape[:] = self.shapes[grid]
+
+    def get_grid_spacing(self, grid, spacing):
+        spacing[:] = self.spacing[grid]
+
+
+def test_integer_ratio_is_block_mean():
+    fine = np.random.default_rng(1).random((12, 16))
+    coarse = Regridder((3, 4), (12, 16)).to_lsm(fine)
+    expected = fine.reshape(3, 4, 4, 4).mean(axis=(1, 3))
+    np.testing.assert_allclose(coarse, expected)
+
+
+def test_integer_ratio_disaggregates_by_repeat():
+    coarse = np.arange(12.0).reshape(3, 4)
+    fine = Regridder((3, 4), (12, 16)).to_routing(coarse)
+    np.testing.assert_array_equal(fine, coarse.repeat(4, 0).repeat(4, 1))
+
+
+@pytest.mark.parametrize("lsm, rt", [((3, 4), (7, 9)), ((5, 2), (8, 7))])
+def test_non_integer_ratio_conserves(lsm, rt):
+    """Area-weighted totals survive a non-integer (and anisotropic) ratio."""
+    regridder = Regridder(lsm, rt)
+    fine = np.random.default_rng(2).random(rt)
+    coarse = regridder.to_lsm(fine)
+    assert coarse.shape == lsm
+    assert np.isclose(coarse.mean(), fine.mean())
+    assert np.isclose(regridder.to_routing(coarse).mean(), coarse.mean())
+
+
+@pytest.mark.parametrize("lsm, rt", [((3, 4), (12, 16)), ((3, 4), (7, 9))])
+def test_rows_sum_to_one(lsm, rt):
+    regridder = Regridder(lsm, rt)
+    for operator in (regridder.aggregate, regridder.disaggregate):
+        np.testing.assert_allclose(np.asarray(operator.sum(axis=1)).ravel(), 1.0)
+
+
+def test_flat_in_flat_out():
+    regridder = Regridder((3, 4), (12, 16))
+    assert regridder.to_lsm(np.ones(192)).shape == (12,)
+    with pytest.raises(ValueError):
+        regridder.to_lsm(np.ones(12))
+
+
+def test_mask_averages_valid_cells():
+    regridder = Regridder((1, 2), (2, 4))
+    fine = np.array([[1.0, 3.0, 5.0, -9999.0], [1.0, 3.0, -9999.0, -9999.0]])
+    coarse = regridder.to_lsm(fine, mask=fine != -9999.0)
+    np.testing.assert_allclose(coarse, [[2.0, 5.0]])
+    empty = regridder.to_lsm(fine, mask=np.zeros(fine.shape, dtype=bool))
+    assert np.all(np.isnan(empty))
+
+
+def test_save_load(tmp_path):
+    regridder = Regridder((3, 4), (7, 9))
+    regridder.save(tmp_path / "ops.npz")
+    loaded = Regridder.load(tmp_path / "ops.npz")
+    assert loaded.rt_shape == (7, 9)
+    fine = np.random.default_rng(3).random(63)
+    np.testing.assert_allclose(loaded.to_lsm(fine), regridder.to_lsm(fine))
+
+
+def test_from_model_caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(regrid, "_built", {})
+    first = Regridder.from_model(FakeGrids(), cache_dir=tmp_path)
+    assert Regridder.from_model(FakeGrids()) is first
+    assert len(list(tmp_path.glob("regrid_*.npz"))) == 1
+
+    monkeypatch.setattr(regrid, "_built", {})
+    again = Regridder.from_model(FakeGrids(), cache_dir=tmp_path)
+    assert again is not first
+    np.testing.assert_array_equal(again.aggregate.toarray(), first.aggregate.toarray())
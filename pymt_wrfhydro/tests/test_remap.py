@@ -0,0 +1,169 @@
+"""
+Tests for mesh reading and remapping weights in pymt_wrfhydro.remap.
+
+These use small synthetic meshes and the mock model, not the compiled one.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro import remap
+from pymt_wrfhydro.remap import Mesh, Remapper
+from pymt_wrfhydro.spatial import EARTH_RADIUS, SpatialIndex
+
+HGRID = """\
+unit square
+3 5
+1 0.0 0.0 5.0
+2 10.0 0.0 6.0
+3 10.0 10.0 7.0
+4 0.0 10.0 8.0
+5 20.0 5.0 9.0
+1 3 1 2 3
+2 3 1 3 4
+3 3 2 5 3
+0 = Number of open boundaries
+"""
+
+# Nodes around the Croton River basin (lon, lat), as in a SCHISM hgrid.ll
+HGRID_LL = """\
+croton
+2 4
+1 -73.90 41.30 2.0
+2 -73.70 41.30 3.0
+3 -73.70 41.50 4.0
+4 -73.90 41.50 5.0
+1 3 1 2 3
+2 3 1 3 4
+"""
+
+
+def haversine(lon0, lat0, lon1, lat1):
+    lon0, lat0, lon1, lat1 = (np.radians(c) for c in (lon0, lat0, lon1, lat1))
+    a = (np.sin((lat1 - lat0) / 2) ** 2
+         + np.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+@pytest.fixture(autouse=True)
+def no_session_cache(monkeypatch):
+    monkeypatch.setattr(remap, "_built", {})
+
+
+@pytest.fixture
+def mesh(tmp_path):
+    path = tmp_path / "hgrid.gr3"
+    path.write_text(HGRID)
+    return Mesh.read_gr3(path, geographic=False)
+
+
+def test_read_gr3(mesh):
+    assert mesh.n_nodes == 5 and mesh.n_elements == 3
+    assert mesh.elements[2].tolist() == [1, 4, 2, -1]
+    np.testing.assert_array_equal(mesh.depth, [5, 6, 7, 8, 9])
+    np.testing.assert_allclose(mesh.element_area, [50.0, 50.0, 50.0])
+    assert np.isclose(mesh.node_area.sum(), 150.0)
+
+
+def test_geographic_mesh(tmp_path):
+    """A lon/lat mesh over Croton maps by great-circle distance."""
+    path = tmp_path / "hgrid.ll"
+    path.write_text(HGRID_LL)
+    mesh = Mesh.read_gr3(path)
+    assert mesh.geographic
+    # 0.2 degrees of longitude is shorter than 0.2 of latitude at 41 N
+    west, east = mesh.element_area
+    assert np.isclose(west + east, haversine(-73.9, 41.4, -73.7, 41.4)
+                      * haversine(-73.8, 41.3, -73.8, 41.5), rtol=0.01)
+
+    rng = np.random.default_rng(1)
+    lon, lat = rng.uniform(-73.9, -73.7, 30), rng.uniform(41.3, 41.5, 30)
+    target = SpatialIndex(lon, lat, geographic=True)
+    remapper = Remapper.build(mesh.index, target, "nearest")
+    brute = haversine(mesh.x[None, :], mesh.y[None, :],
+                      lon[:, None], lat[:, None]).argmin(axis=1)
+    np.testing.assert_array_equal(remapper(mesh.depth), mesh.depth[brute])
+
+
+def test_model_grids_need_geographic_mesh(mesh):
+    from pymt_wrfhydro.mock import MockWrfHydroBmi
+
+    with pytest.raises(ValueError, match="longitude/latitude"):
+        Remapper.mesh_to_grid(mesh, MockWrfHydroBmi(), 0)
+
+
+def test_read_truncated(tmp_path):
+    path = tmp_path / "short.gr3"
+    path.write_text("\n".join(HGRID.splitlines()[:6]))
+    with pytest.raises(ValueError):
+        Mesh.read_gr3(path)
+
+
+def test_nearest_matches_brute_force(mesh):
+    rng = np.random.default_rng(0)
+    target = SpatialIndex(*rng.uniform(0, 20, size=(2, 40)))
+    remapper = Remapper.build(mesh.index, target, "nearest")
+    values = np.arange(5.0)
+    brute = np.hypot(
+        target.x[:, None] - mesh.x[None, :], target.y[:, None] - mesh.y[None, :]
+    ).argmin(axis=1)
+    np.testing.assert_array_equal(remapper(values), values[brute])
+
+
+def test_idw(mesh):
+    target = SpatialIndex([0.0, 5.0], [0.0, 5.0])
+    remapper = Remapper.build(mesh.index, target, "idw", k=4)
+    np.testing.assert_allclose(remapper.weights.sum(axis=1), 1.0)
+    result = remapper(np.arange(5.0))
+    assert result[0] == 0.0  # on node 1
+    # Centre of the square: equidistant from its four corners
+    assert np.isclose(result[1], 1.5)
+
+
+def test_conservative_area_weighted(mesh):
+    target = SpatialIndex([5.0, 17.0], [5.0, 5.0])
+    remapper = Remapper.build(
+        mesh.index, target, "conservative", source_area=mesh.node_area
+    )
+    values = np.array([1.0, 2.0, 3.0, 4.0, 5.0])
+    area = mesh.node_area
+    left = [0, 1, 2, 3]
+    assert np.isclose(remapper(values)[1], 5.0)
+    assert np.isclose(
+        remapper(values)[0], np.average(values[left], weights=area[left])
+    )
+
+
+def test_subsets_and_fill(mesh):
+    target = SpatialIndex([0.0, 10.0, 20.0], [0.0, 0.0, 5.0])
+    remapper = Remapper.build(
+        mesh.index, target, "nearest", source_nodes=[4], target_nodes=[0, 2]
+    )
+    assert remapper.shape == (3, 5)
+    result = remapper(np.arange(5.0), fill=-1.0)
+    np.testing.assert_array_equal(result, [4.0, -1.0, 4.0])
+
+
+def test_bad_arguments(mesh):
+    with pytest.raises(ValueError):
+        Remapper.build(mesh.index, mesh.index, "bilinear")
+    lonlat = SpatialIndex([0.0], [0.0], geographic=True)
+    with pytest.raises(ValueError):
+        Remapper.build(mesh.index, lonlat)
+    with pytest.raises(ValueError):
+        Remapper.build(mesh.index, mesh.index)(np.ones(3))
+
+
+def test_weights_cached_on_disk(mesh, tmp_path, monkeypatch):
+    target = SpatialIndex([1.0, 9.0], [1.0, 9.0])
+    first = Remapper.build(mesh.index, target, "idw", cache_dir=tmp_path / "w")
+    files = list((tmp_path / "w").glob("remap_*.npz"))
+    assert len(files) == 1
+
+    monkeypatch.setattr(remap, "_built", {})
+    again = Remapper.build(mesh.index, target, "idw", cache_dir=tmp_path / "w")
+    assert again is not first
+    np.testing.assert_allclose(again.weights.toarray(), first.weights.toarray())
+
+    # Different parameters hash to a different file
+    Remapper.build(mesh.index, target, "idw", power=1.0, cache_dir=tmp_path / "w")
+    assert len(list((tmp_path / "w").glob("remap_*.npz"))) == 2
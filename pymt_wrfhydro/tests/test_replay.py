@@ -0,0 +1,120 @@
+"""
+Tests for record-and-replay in pymt_wrfhydro.replay.
+
+Sessions are recorded from the pure-NumPy stand-in model, which answers
+the same calls as the real one.
+"""
+import zipfile
+
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.mock import MockWrfHydroBmi
+from pymt_wrfhydro.replay import Recorder, Replay
+
+FLOW = "channel_water__volume_flow_rate"
+SOIL = "soil_water__volume_fraction"
+LINKS = "channel_link__id"
+
+
+def pipeline(model):
+    """A downstream consumer: everything it sees, in order."""
+    seen = [model.get_output_var_names(), model.get_var_units(FLOW),
+            model.get_grid_shape(0, np.empty(2, dtype=np.intc)).tolist()]
+    flow = np.empty(model.get_grid_size(model.get_var_grid(FLOW)))
+    links = np.empty(len(flow), dtype=np.int32)
+    while model.get_current_time() < 4 * 3600.0:
+        model.update()
+        model.get_value(LINKS, links)
+        seen.append((model.get_current_time(), model.get_value(FLOW, flow).copy(),
+                     links.copy(), model.get_value_stats(SOIL, ("mean", "p95"))))
+    model.set_value("land_surface_air__temperature",
+                    np.full(model.get_grid_size(0), 270.0))
+    seen.append(model.get_value_changes(SOIL))
+    seen.append(model.get_value_changes(SOIL))
+    seen.append(model.get_value_masked(SOIL).mask.tolist())
+    return seen
+
+
+@pytest.fixture
+def recording(tmp_path):
+    path = str(tmp_path / "session.bmirec")
+    with Recorder(MockWrfHydroBmi(), path) as model:
+        model.initialize()
+        expected = pipeline(model)
+        with pytest.raises(RuntimeError):
+            model.get_var_grid("not_a_variable")
+        model.finalize()
+    return path, expected
+
+
+def assert_same(left, right):
+    assert type(left) is type(right) or isinstance(left, np.ndarray)
+    if isinstance(left, (list, tuple)):
+        assert len(left) == len(right)
+        for a, b in zip(left, right):
+            assert_same(a, b)
+    elif isinstance(left, dict):
+        assert left.keys() == right.keys()
+        for key in left:
+            assert_same(left[key], right[key])
+    elif isinstance(left, np.ndarray):
+        np.testing.assert_array_equal(left, right)
+    else:
+        assert left == right
+
+
+def test_replay_matches_recording(recording):
+    path, expected = recording
+    model = Replay(path)
+    model.initialize("bmi_config.nml")
+    assert_same(pipeline(model), expected)
+    assert [event[1] for event in model.events] == ["set_value"]
+
+
+def test_arrays_are_stored_once(recording):
+    path, _ = recording
+    with zipfile.ZipFile(path) as archive:
+        stored = [name for name in archive.namelist()
+                  if name.startswith("arrays/")]
+        references = archive.read("index.json").count(b'"array"')
+    # The link IDs are read every step but stored once
+    assert len(stored) < references
+
+
+def test_errors_and_unrecorded_calls(recording):
+    path, _ = recording
+    model = Replay(path)
+    model.initialize()
+    with pytest.raises(RuntimeError):
+        model.get_var_grid("not_a_variable")
+    with pytest.raises(LookupError):
+        model.get_var_units(SOIL)
+    with pytest.raises(LookupError):
+        model.get_value(FLOW, np.empty(1))   # nothing read before step 1
+
+
+def test_clock(recording):
+    path, _ = recording
+    model = Replay()
+    model.initialize(path)
+    assert (model.get_start_time(), model.get_time_step()) == (0.0, 3600.0)
+    assert model.get_end_time() == 24 * 3600.0
+    model.update_until(3 * 3600.0 + 5.0)
+    assert model.get_current_time() == 3 * 3600.0
+    with pytest.raises(RuntimeError):
+        model.update_until(0.0)
+    assert model.recorded_steps == [0, 1, 2, 3, 4]
+
+
+def test_iter_steps(tmp_path):
+    path = str(tmp_path / "steps.bmirec")
+    with Recorder(MockWrfHydroBmi(), path) as model:
+        model.initialize()
+        expected = [values[FLOW].copy()
+                    for _, values in model.iter_steps(FLOW, until=7200.0)]
+    model = Replay(path, preload=True)
+    model.initialize()
+    replayed = [values[FLOW].copy()
+                for _, values in model.iter_steps(FLOW, until=7200.0)]
+    np.testing.assert_array_equal(replayed, expected)
@@ -0,0 +1,109 @@
+"""
+Tests for the KD-tree index in pymt_wrfhydro.spatial.
+
+These compare against brute-force distance scans and do not touch the
+model.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.spatial import EARTH_RADIUS, SpatialIndex
+
+
+@pytest.fixture(scope="module")
+def planar():
+    rng = np.random.default_rng(42)
+    x, y = rng.uniform(0.0, 1000.0, size=(2, 500))
+    return SpatialIndex(x, y), x, y
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = np.random.default_rng(7)
+    return rng.uniform(0.0, 1000.0, size=(2, 50))
+
+
+def brute_distance(index, px, py):
+    return np.hypot(index.x[None, :] - px[:, None], index.y[None, :] - py[:, None])
+
+
+class TestPlanar:
+    """Queries on projected coordinates match a brute-force scan."""
+
+    def test_nearest(self, planar, points):
+        index, _, _ = planar
+        distance, found = index.nearest(*points)
+        brute = brute_distance(index, *points)
+        np.testing.assert_array_equal(found, brute.argmin(axis=1))
+        np.testing.assert_allclose(distance, brute.min(axis=1))
+
+    def test_k_nearest(self, planar, points):
+        index, _, _ = planar
+        distance, found = index.nearest(*points, k=3)
+        brute = np.sort(brute_distance(index, *points), axis=1)[:, :3]
+        assert found.shape == (50, 3)
+        np.testing.assert_allclose(distance, brute)
+
+    def test_max_distance(self, planar):
+        index, _, _ = planar
+        distance, found = index.nearest([5000.0], [5000.0], max_distance=10.0)
+        assert found[0] == -1 and np.isinf(distance[0])
+
+    def test_within(self, planar, points):
+        index, _, _ = planar
+        indptr, indices = index.within(*points, radius=60.0)
+        brute = brute_distance(index, *points) <= 60.0
+        assert len(indptr) == 51
+        for i in range(50):
+            np.testing.assert_array_equal(
+                indices[indptr[i]:indptr[i + 1]], np.flatnonzero(brute[i])
+            )
+
+    def test_in_box(self, planar):
+        index, x, y = planar
+        found = index.in_box(100.0, 200.0, 300.0, 400.0)
+        expected = np.flatnonzero((x >= 100) & (x <= 300) & (y >= 200) & (y <= 400))
+        np.testing.assert_array_equal(found, expected)
+
+    def test_save_load(self, planar, points, tmp_path):
+        index, _, _ = planar
+        index.save(tmp_path / "index.npz")
+        loaded = SpatialIndex.load(tmp_path / "index.npz")
+        np.testing.assert_array_equal(loaded.nearest(*points)[1], index.nearest(*points)[1])
+        assert not loaded.geographic
+
+    def test_saved_without_pickle(self, planar, tmp_path):
+        index, _, _ = planar
+        index.save(tmp_path / "index.npz")
+        with np.load(tmp_path / "index.npz", allow_pickle=False) as data:
+            assert set(data.files) == {"x", "y", "geographic", "leafsize"}
+
+
+class TestGeographic:
+    """Longitude/latitude indices measure great-circle metres."""
+
+    def test_distance_along_equator(self):
+        index = SpatialIndex([0.0, 1.0], [0.0, 0.0], geographic=True)
+        distance, found = index.nearest([0.9], [0.0])
+        assert found[0] == 1
+        assert np.isclose(distance[0], np.radians(0.1) * EARTH_RADIUS)
+
+    def test_dateline(self):
+        """Points either side of 180 degrees are neighbours."""
+        index = SpatialIndex([179.9, 0.0], [10.0, 10.0], geographic=True)
+        _, found = index.nearest([-179.9], [10.0])
+        assert found[0] == 0
+
+    def test_save_load(self, tmp_path):
+        index = SpatialIndex([-73.80, -73.70], [41.20, 41.30], geographic=True)
+        index.save(tmp_path / "index.npz")
+        loaded = SpatialIndex.load(tmp_path / "index.npz")
+        assert loaded.geographic
+        np.testing.assert_array_equal(
+            loaded.nearest([-73.71], [41.29])[0], index.nearest([-73.71], [41.29])[0]
+        )
+
+    def test_radius_in_metres(self):
+        index = SpatialIndex([-73.80, -73.70], [41.20, 41.20], geographic=True)
+        indptr, indices = index.within([-73.79], [41.20], radius=2000.0)
+        assert indices.tolist() == [0]
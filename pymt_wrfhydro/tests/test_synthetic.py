@@ -0,0 +1,108 @@
+"""
+Tests for the synthetic domain generator in pymt_wrfhydro.synthetic.
+
+The checks walk the small domains cell by cell, so every routing field is
+compared against the terrain it was derived from.
+"""
+import os
+
+import numpy as np
+import pytest
+from scipy.io import netcdf_file
+
+from pymt_wrfhydro.synthetic import EAST, NORTH, SOUTH, SyntheticDomain
+
+STEP = {EAST: (0, 1), NORTH: (1, 0), SOUTH: (-1, 0)}
+
+
+@pytest.fixture(params=[(6, 5), (3, 7), (1, 1)])
+def domain(request):
+    return SyntheticDomain(request.param, aggfactrt=2, channel_spacing=4,
+                           reach_cells=3)
+
+
+def downstream(domain, j, i):
+    dj, di = STEP[domain.flow_direction[j, i]]
+    j, i = j + dj, i + di
+    if 0 <= j < domain.rt_shape[0] and 0 <= i < domain.rt_shape[1]:
+        return j, i
+    return None
+
+
+def test_flow_runs_downhill_to_one_outlet(domain):
+    ny, nx = domain.rt_shape
+    acc = np.zeros(domain.rt_shape, dtype=int)
+    outlets = set()
+    for j in range(ny):
+        for i in range(nx):
+            cell = (j, i)
+            for _ in range(ny * nx):
+                acc[cell] += 1
+                below = downstream(domain, *cell)
+                if below is None:
+                    outlets.add(cell)
+                    break
+                assert domain.elevation[below] < domain.elevation[cell]
+                cell = below
+            else:
+                pytest.fail("flow path does not end")
+    assert outlets == {(0, nx - 1)}
+    np.testing.assert_array_equal(domain.flow_accumulation, acc)
+
+
+def test_links_follow_channels(domain):
+    assert np.all((domain.link_grid > 0) == domain.channel)
+    to = dict(zip(domain.link_id, domain.link_to))
+    assert set(np.unique(domain.link_grid[domain.channel])) == set(to)
+    assert list(to.values()).count(0) == 1
+
+    for j, i in zip(*np.nonzero(domain.channel)):
+        below = downstream(domain, j, i)
+        if below is not None:
+            assert domain.channel[below]
+            link, next_link = domain.link_grid[j, i], domain.link_grid[below]
+            assert next_link in (link, to[link])
+
+    lengths = np.bincount(domain.link_grid[domain.channel])[1:] * domain.dx_rt
+    np.testing.assert_allclose(domain.link_length, lengths)
+
+
+def test_from_cells():
+    domain = SyntheticDomain.from_cells(1e4)
+    assert domain.n_cells == pytest.approx(1e4, rel=0.05)
+    assert domain.rt_shape == (100, 100)
+
+
+def test_bad_shape():
+    with pytest.raises(ValueError):
+        SyntheticDomain((0, 4))
+
+
+def test_write(tmp_path):
+    domain = SyntheticDomain((6, 5), aggfactrt=2, channel_spacing=4)
+    tables = tmp_path / "tables"
+    tables.mkdir()
+    (tables / "MPTABLE.TBL").write_text("table\n")
+    config = domain.write(str(tmp_path / "run"), hours=3,
+                          tables_dir=str(tables))
+    run = tmp_path / "run"
+
+    assert os.path.dirname(config) == str(run)
+    assert str(run) in open(config).read()
+    assert (run / "MPTABLE.TBL").exists()
+    assert len(os.listdir(run / "FORCING")) == 4
+    assert "AGGFACTRT = 2" in (run / "hydro.namelist").read_text()
+    assert "KHOUR = 3" in (run / "namelist.hrldas").read_text()
+
+    with netcdf_file(str(run / "DOMAIN" / "geo_em.d01.nc"), mmap=False) as nc:
+        assert nc.variables["HGT_M"].shape == (1, 6, 5)
+        np.testing.assert_allclose(nc.variables["HGT_M"][0],
+                                   domain.lsm_elevation(), rtol=1e-6)
+    with netcdf_file(str(run / "DOMAIN" / "Fulldom_hires.nc"), mmap=False) as nc:
+        # Stored north row first
+        np.testing.assert_array_equal(nc.variables["FLOWDIRECTION"][:],
+                                      domain.flow_direction[::-1])
+    with netcdf_file(str(run / "DOMAIN" / "Route_Link.nc"), mmap=False) as nc:
+        np.testing.assert_array_equal(nc.variables["to"][:], domain.link_to)
+    forcing = sorted(os.listdir(run / "FORCING"))[0]
+    assert forcing == "2011082600.LDASIN_DOMAIN1"
@@ -0,0 +1,75 @@
+"""
+Tests for the CSR zone index in pymt_wrfhydro.zonal.
+
+These only build and use the index with numpy and do not touch the model;
+the per-zone reductions themselves are tested in test_bmi_wrfhydro.py.
+"""
+import numpy as np
+import pytest
+
+from pymt_wrfhydro.zonal import ZonalIndex
+
+
+LABELS = np.array(
+    [
+        [3, 3, 1, -1],
+        [3, 1, 1, -1],
+        [7, 7, 1, 3],
+    ]
+)
+
+
+class TestBuild:
+    """ZonalIndex() turns a label raster into a CSR index."""
+
+    def test_zones_sorted(self):
+        zones = ZonalIndex(LABELS, nodata=-1)
+        np.testing.assert_array_equal(zones.zones, [1, 3, 7])
+        assert len(zones) == 3
+
+    def test_cells_per_zone(self):
+        """Each zone lists exactly its flat cells, in raster order."""
+        zones = ZonalIndex(LABELS, nodata=-1)
+        flat = LABELS.reshape(-1)
+        for z, label in enumerate(zones.zones):
+            got = zones.cells[zones.indptr[z]:zones.indptr[z + 1]]
+            np.testing.assert_array_equal(got, np.flatnonzero(flat == label))
+
+    def test_nodata_excluded(self):
+        zones = ZonalIndex(LABELS, nodata=-1)
+        assert zones.indptr[-1] == np.count_nonzero(LABELS != -1)
+        np.testing.assert_array_equal(zones.counts, [4, 4, 2])
+
+    def test_without_nodata(self):
+        """Without nodata every label, even -1, is a zone."""
+        zones = ZonalIndex(LABELS)
+        assert zones.zones[0] == -1
+        assert zones.indptr[-1] == LABELS.size
+
+    def test_index_dtype(self):
+        """The index is already in the dtype the library expects."""
+        zones = ZonalIndex(LABELS, nodata=-1)
+        assert zones.indptr.dtype == np.intc
+        assert zones.cells.dtype == np.intc
+
+    def test_float_labels_rejected(self):
+        with pytest.raises(ValueError):
+            ZonalIndex(LABELS.astype(float))
+
+
+class TestToRaster:
+    """to_raster() paints per-zone values back onto the grid."""
+
+    def test_paint(self):
+        zones = ZonalIndex(LABELS, nodata=-1)
+        raster = zones.to_raster(np.array([10.0, 30.0, 70.0]))
+        assert raster.shape == LABELS.shape
+        np.testing.assert_array_equal(
+            raster[LABELS != -1], LABELS[LABELS != -1] * 10.0
+        )
+        assert np.all(np.isnan(raster[LABELS == -1]))
+
+    def test_wrong_length(self):
+        zones = ZonalIndex(LABELS, nodata=-1)
+        with pytest.raises(ValueError):
+            zones.to_raster([1.0, 2.0])